@@ -292,14 +292,7 @@ class IncidentReportFormatter:
             lines.append("-" * 50)
             
             # Seřadit podle severity a počtu raw incidents
-            sorted_ops = sorted(
-                operational_incidents, 
-                key=lambda x: (
-                    -{'critical': 4, 'high': 3, 'medium': 2, 'low': 1}.get(x['severity'].value, 0),
-                    -x['raw_count'],
-                    -x['total_errors']
-                )
-            )
+            sorted_ops = self._sort_operational(operational_incidents)
             
             for op in sorted_ops[:10]:
                 sev_icon = self.SEVERITY_ICONS.get(op['severity'], '⚪')
@@ -327,6 +320,60 @@ class IncidentReportFormatter:
         
         return "\n".join(lines)
     
+    def daily_summary(self, result: IncidentAnalysisResult, report_date: date = None, top: int = 30) -> Dict:
+        """
+        Strukturovaná verze format_daily() pro run artifact.
+
+        Stejná agregace a řazení jako textový report, takže exportéry
+        (recent_incidents_exporter) nemusí text parsovat regexem.
+        """
+        operational_incidents = self._aggregate_to_operational(result.incidents)
+        
+        severity_breakdown = {}
+        for level in (SeverityLevel.CRITICAL, SeverityLevel.HIGH, SeverityLevel.MEDIUM, SeverityLevel.LOW):
+            count = sum(1 for o in operational_incidents if o['severity'] == level)
+            if count > 0:
+                severity_breakdown[level.value.title()] = count
+        
+        top_incidents = []
+        for op in self._sort_operational(operational_incidents)[:top]:
+            top_incidents.append({
+                'severity': op['severity'].value.title(),
+                'title': op['title'],
+                'application': op['representative'].get_primary_app(),
+                'root_cause': op['root_cause'],
+                'affected_apps': op['apps'],
+                'raw_incidents': op['raw_count'],
+                'total_errors': op['total_errors'],
+                'action': op['actions'][0] if op['actions'] else '',
+            })
+        
+        app_counts = {}
+        for incident in result.incidents:
+            for app in set(incident.scope.apps):
+                app_counts[app] = app_counts.get(app, 0) + 1
+        
+        return {
+            'date': str(report_date or result.analysis_start.date()),
+            'raw_incidents': result.total_incidents,
+            'operational_incidents': len(operational_incidents),
+            'severity_breakdown': severity_breakdown,
+            'top_incidents': top_incidents,
+            'affected_applications': {app: app_counts[app] for app in sorted(app_counts)[:15]},
+        }
+    
+    @staticmethod
+    def _sort_operational(operational_incidents: List[Dict]) -> List[Dict]:
+        """Řazení operational incidents: severity, pak počet raw incidents a errors."""
+        return sorted(
+            operational_incidents,
+            key=lambda x: (
+                -{'critical': 4, 'high': 3, 'medium': 2, 'low': 1}.get(x['severity'].value, 0),
+                -x['raw_count'],
+                -x['total_errors']
+            )
+        )
+    
     def _aggregate_to_operational(self, incidents: List[IncidentAnalysis]) -> List[Dict]:
         """
         Agreguje raw incidents do operational incidents.
@@ -8,6 +8,7 @@
 #   ./run_regular.sh
 #   ./run_regular.sh --output data/reports/
 #   ./run_regular.sh --quiet  # pro cron
+#   ./run_regular.sh --daemon # rezidentní proces místo cronu
 #
 # Cron setup:
 #   */15 * * * * /path/to/run_regular.sh --quiet >> /var/log/ailog/cron.log 2>&1
@@ -31,6 +32,7 @@ QUIET=""
 DRY_RUN=""
 DATE_FROM=""
 DATE_TO=""
+DAEMON=""
 
 # Parse arguments
 while [[ $# -gt 0 ]]; do
@@ -47,6 +49,10 @@ while [[ $# -gt 0 ]]; do
             DRY_RUN="--dry-run"
             shift
             ;;
+        --daemon)
+            DAEMON="--daemon"
+            shift
+            ;;
         --from)
             DATE_FROM="--from $2"
             shift 2
@@ -62,6 +68,7 @@ while [[ $# -gt 0 ]]; do
             echo "  --output DIR    Output directory for reports"
             echo "  --quiet         Minimal output (for cron)"
             echo "  --dry-run       Dry run - no DB writes"
+            echo "  --daemon        Stay resident, run every 15-minute window"
             echo "  --from DATE     Start time (ISO format)"
             echo "  --to DATE       End time (ISO format)"
             echo "  -h, --help      Show this help"
@@ -75,7 +82,7 @@ while [[ $# -gt 0 ]]; do
 done
 
 # Build command
-CMD="python scripts/regular_phase.py $OUTPUT $QUIET $DRY_RUN $DATE_FROM $DATE_TO"
+CMD="python scripts/regular_phase.py $OUTPUT $QUIET $DRY_RUN $DAEMON $DATE_FROM $DATE_TO"
 
 if [ -z "$QUIET" ]; then
     echo "=============================================="
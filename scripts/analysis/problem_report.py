@@ -191,6 +191,37 @@ class ProblemReportGenerator:
 
         return "\n".join(lines)
 
+    def to_artifact_section(self, max_problems: int = 20) -> dict:
+        """
+        Sekce ``problem_report`` pro run artifact (core.run_artifact).
+
+        Stejný obsah jako textový report, ale strukturovaně: publishery
+        berou executive summary a bloky PROBLEM DETAILS bez regex parsování.
+        """
+        sorted_problems = sort_problems_by_priority(self.problems)
+        json_data = self._to_json_data(sorted_problems[:max_problems])
+        # _format_* vrací banner (---, nadpis, ---, prázdný řádek) + obsah
+        executive_summary = "\n".join(self._format_executive_summary()[4:]).strip()
+        return {
+            'header': {
+                'period': (
+                    f"{self.analysis_start.strftime('%Y-%m-%d %H:%M')} - {self.analysis_end.strftime('%Y-%m-%d %H:%M')}"
+                    if self.analysis_start and self.analysis_end else ''
+                ),
+                'generated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'run_id': self.run_id or '',
+            },
+            'summary': json_data['summary'],
+            'executive_summary': executive_summary,
+            'problem_details': [
+                "\n".join(self._format_single_problem(problem, index)).strip()
+                for index, problem in enumerate(sorted_problems[:max_problems], 1)
+            ],
+            'more_problems': max(0, len(sorted_problems) - max_problems),
+            'statistics': "\n".join(self._format_statistics()[4:]).strip(),
+            'problems': json_data['problems'],
+        }
+
     def _format_header(self) -> List[str]:
         """Formátuje header reportu."""
         lines = [
@@ -559,9 +590,10 @@ class ProblemReportGenerator:
 
         return files
 
-    def _to_json_data(self) -> dict:
-        """Serializuje do JSON struktury."""
-        sorted_problems = sort_problems_by_priority(self.problems)
+    def _to_json_data(self, sorted_problems: Optional[List[ProblemAggregate]] = None) -> dict:
+        """Serializuje do JSON struktury (``sorted_problems`` omezí seznam problémů)."""
+        if sorted_problems is None:
+            sorted_problems = sort_problems_by_priority(self.problems)
 
         return {
             'metadata': {
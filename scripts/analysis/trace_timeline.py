@@ -441,7 +441,7 @@ def timeline_from_raw_events(trace_id: str, raw_events: List[Dict[str, Any]]) ->
 
 def enrich_patterns_with_trace_context(
     patterns: List[TracePattern],
-    fetch_fn: Callable[[List[str], Any, Any], Dict[str, List[Dict[str, Any]]]],
+    fetch_fn: Callable[[List[str], Any, Any], Any],
     date_from: Any,
     date_to: Any,
     top_n: int = 10,
@@ -449,30 +449,34 @@ def enrich_patterns_with_trace_context(
     """Pro top-N patternů dotáhne VŠECHNY levely reprezentativního trace a přepočítá
     root_cause/outcome/propagation z bohatší časové osy (WARN/INFO před ERROR).
 
-    fetch_fn(trace_ids, date_from, date_to) -> dict[trace_id]->list[event dict].
+    fetch_fn(trace_ids, date_from, date_to) -> dict[trace_id]->list[event dict],
+    nebo iterátor (trace_id, events) — pak se timeline skládá průběžně, jak
+    dávky dobíhají (iter_trace_context).
     Non-blocking: při chybě ponechá původní (ERROR-only) heuristiku.
     """
     if not patterns or fetch_fn is None:
         return patterns
-    targets = [p for p in patterns[:top_n] if p.representative]
-    rep_ids = [p.representative.trace_id for p in targets if p.representative]
-    if not rep_ids:
+    targets: Dict[str, List[TracePattern]] = {}
+    for p in patterns[:top_n]:
+        if p.representative:
+            targets.setdefault(p.representative.trace_id, []).append(p)
+    if not targets:
         return patterns
     try:
-        ctx = fetch_fn(rep_ids, date_from, date_to) or {}
+        ctx = fetch_fn(list(targets), date_from, date_to) or {}
+        for trace_id, events in (ctx.items() if isinstance(ctx, dict) else ctx):
+            if not events or trace_id not in targets:
+                continue
+            tl = timeline_from_raw_events(trace_id, events)
+            if not tl.events:
+                continue
+            for p in targets[trace_id]:
+                p.representative = tl
+                p.propagation_path = [app for app, _ in _signature_strategy(tl)]
+                p.root_cause = _root_cause_strategy(tl)
+                p.outcome = _outcome(tl)
     except Exception:
         return patterns
-    for p in targets:
-        events = ctx.get(p.representative.trace_id)
-        if not events:
-            continue
-        tl = timeline_from_raw_events(p.representative.trace_id, events)
-        if not tl.events:
-            continue
-        p.representative = tl
-        p.propagation_path = [app for app, _ in _signature_strategy(tl)]
-        p.root_cause = _root_cause_strategy(tl)
-        p.outcome = _outcome(tl)
     return patterns
 
 
@@ -59,6 +59,8 @@ from core.delivery_persistence import (
     summarize_delivery_outcomes,
 )
 from core.run_persistence import build_query_hash, persist_analysis_run
+from core.run_profiler import profile_run
+from core.run_artifact import build_run_artifact, write_run_artifact
 from core.streaming_aggregator import StreamingAggregator
 from pipeline import Pipeline
 from pipeline.incident import IncidentCollection
@@ -477,9 +479,21 @@ def process_day_worker(date: datetime, dry_run: bool = False, skip_processed: bo
 
 def run_incident_analysis_daily(all_incidents, start_date, end_date, output_dir=None, quiet=False):
     """Spustí Incident Analysis na agregovaných datech."""
+    report, _summary = _incident_analysis_daily(all_incidents, start_date, end_date, output_dir, quiet)
+    return report
+
+
+def _incident_analysis_daily(all_incidents, start_date, end_date, output_dir=None, quiet=False, save=True):
+    """
+    Incident Analysis + uložení textového reportu.
+
+    Returns:
+        (report text, daily_summary pro sekci ``incident_analysis`` run
+        artefaktu nebo None při chybě)
+    """
     if not HAS_INCIDENT_ANALYSIS:
         safe_print("   ⚠️ Incident Analysis not available")
-        return "⚠️ Incident Analysis module not available"
+        return "⚠️ Incident Analysis module not available", None
     
     formatter = IncidentReportFormatter()
     
@@ -491,8 +505,9 @@ def run_incident_analysis_daily(all_incidents, start_date, end_date, output_dir=
             analysis_end=end_date,
         )
         report = formatter.format_daily(result)
-        _save_report_daily(report, output_dir, start_date, end_date, quiet)
-        return report
+        if save:
+            _save_report_daily(report, output_dir, start_date, end_date, quiet)
+        return report, formatter.daily_summary(result)
     
     try:
         engine = IncidentAnalysisEngine()
@@ -522,15 +537,16 @@ def run_incident_analysis_daily(all_incidents, start_date, end_date, output_dir=
                 )
         
         report = formatter.format_daily(result)
-        _save_report_daily(report, output_dir, start_date, end_date, quiet)
+        if save:
+            _save_report_daily(report, output_dir, start_date, end_date, quiet)
         
-        return report
+        return report, formatter.daily_summary(result)
         
     except Exception as e:
         safe_print(f"   ⚠️ Incident Analysis error: {e}")
         import traceback
         traceback.print_exc()
-        return f"⚠️ Incident Analysis error: {e}"
+        return f"⚠️ Incident Analysis error: {e}", None
 
 
 def _save_report_daily(report: str, output_dir, start_date, end_date, quiet: bool):
@@ -800,6 +816,24 @@ def run_backfill(
             safe_print(f" {status_icon} {r['date']}: {incidents} incidents, {saved} saved")
     
     last_report_path = None
+    last_artifact_path = None
+    incident_analysis_section = None
+    problem_report_section = None
+    peaks_table = None
+
+    # ==========================================================================
+    # DAILY INCIDENT ANALYSIS (sekce incident_analysis run artefaktu)
+    # ==========================================================================
+    if all_incidents_collection.total_incidents > 0 and HAS_INCIDENT_ANALYSIS and not skip_analysis:
+        safe_print("\n🔍 Running daily Incident Analysis...")
+        _daily_report, incident_analysis_section = _incident_analysis_daily(
+            all_incidents_collection,
+            start_date,
+            end_date,
+            output_dir,
+            quiet=False,
+            save=not dry_run,
+        )
 
     # ==========================================================================
     # PROBLEM-CENTRIC ANALYSIS REPORT
@@ -834,6 +868,7 @@ def run_backfill(
         # Textový report
         problem_report = generator.generate_text_report(max_problems=20)
         safe_print(problem_report)
+        problem_report_section = generator.to_artifact_section(max_problems=20)
         
         # Store for Teams notification
         global _global_problem_report
@@ -913,11 +948,38 @@ def run_backfill(
         try:
             exporter = TableExporter(_global_registry)
             export_files = exporter.export_all(str(exports_dir))
+            peaks_table = exporter.peaks_table()
             safe_print(f"   ✅ Errors table: errors_table_latest.csv/md/json")
             safe_print(f"   ✅ Peaks table: peaks_table_latest.csv/md/json")
         except Exception as e:
             safe_print(f"   ⚠️ Export error: {e}")
 
+    # ==========================================================================
+    # RUN ARTIFACT (strojově čitelný výstup pro publishery / exportéry)
+    # ==========================================================================
+    # Jeden artefakt na běh: incident analysis + top problémy + peaks tabulka
+    sections = (incident_analysis_section, problem_report_section, peaks_table)
+    if not dry_run and any(section is not None for section in sections):
+        try:
+            artifact = build_run_artifact(
+                'backfill',
+                run_id=all_incidents_collection.run_id,
+                period_start=start_date,
+                period_end=end_date,
+                incident_analysis=incident_analysis_section,
+                problem_report=problem_report_section,
+                peaks=peaks_table,
+            )
+            artifact_files = write_run_artifact(
+                artifact,
+                output_dir or str(SCRIPT_DIR / 'reports'),
+                keep=int(os.getenv('RUN_ARTIFACT_KEEP_BACKFILL', '30')),
+            )
+            last_artifact_path = artifact_files.get('msgpack') or artifact_files.get('json')
+            safe_print(f"\n📦 Run artifact saved: {', '.join(artifact_files.values())}")
+        except Exception as e:
+            safe_print(f"   ⚠️ Run artifact error: {e}")
+
     safe_print("\n" + "=" * 70)
     safe_print("✅ BACKFILL COMPLETE")
     safe_print("=" * 70)
@@ -941,7 +1003,10 @@ def run_backfill(
             pub_module = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(pub_module)
             
-            confluence_success = bool(pub_module.main(report_path=last_report_path))
+            confluence_success = bool(pub_module.main(
+                report_path=last_report_path,
+                artifact_path=last_artifact_path,
+            ))
             publication_outcomes.append({
                 'dedup_key': f'backfill-recent-incidents:{date_range_key}',
                 'destination': 'confluence_recent_incidents',
@@ -953,6 +1018,7 @@ def run_backfill(
                 ),
                 'metadata': {
                     'report_path': str(last_report_path or ''),
+                    'artifact_path': str(last_artifact_path or ''),
                     'date_range': date_range_key,
                 },
             })
@@ -1162,16 +1228,18 @@ def main():
     
     args = parser.parse_args()
     
-    result = run_backfill(
-        days=args.days,
-        date_from=args.date_from,
-        date_to=args.date_to,
-        output_dir=args.output,
-        dry_run=args.dry_run,
-        workers=args.workers,
-        skip_analysis=args.no_analysis,
-        skip_processed=not args.force,
-    )
+    # PROFILE_RUN=cpu|alloc → collapsed stacks + top report do $REGISTRY_DIR/profiles
+    with profile_run('backfill'):
+        result = run_backfill(
+            days=args.days,
+            date_from=args.date_from,
+            date_to=args.date_to,
+            output_dir=args.output,
+            dry_run=args.dry_run,
+            workers=args.workers,
+            skip_analysis=args.no_analysis,
+            skip_processed=not args.force,
+        )
     
     return 0 if (
         result['error_count'] == 0
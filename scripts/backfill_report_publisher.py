@@ -3,7 +3,8 @@
 Backfill Report Publisher - Upload backfill analysis to Confluence
 ===================================================================
 
-Vezme nejnovější backfill report a uploadne do Confluence jako HTML.
+Vezme nejnovější backfill run artifact (sekce problem_report) a uploadne
+do Confluence jako HTML. Bez artefaktu fallback na textový report.
 Zahrnuje: EXECUTIVE SUMMARY + TOP PROBLEM DETAILS
 
 Konfigurace (env vars):
@@ -15,6 +16,7 @@ Konfigurace (env vars):
 Použití:
     python backfill_report_publisher.py
     python backfill_report_publisher.py --report /path/to/report.txt
+    python backfill_report_publisher.py --report /path/to/run_artifact_backfill_<ts>.json
 """
 
 import os
@@ -24,7 +26,10 @@ import argparse
 import requests
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from core.run_artifact import RunArtifactError, load_latest_run_artifact, load_run_artifact
 
 try:
     from dotenv import load_dotenv
@@ -48,6 +53,13 @@ def find_latest_backfill_report() -> Optional[str]:
     return None
 
 
+def artifact_report_sections(artifact: Dict[str, Any], max_problems: int = 15) -> Tuple[str, str]:
+    """EXECUTIVE SUMMARY a PROBLEM DETAILS (top ``max_problems``) z run artifactu."""
+    section = artifact.get('problem_report') or {}
+    details = '\n\n'.join(section.get('problem_details', [])[:max_problems])
+    return section.get('executive_summary', ''), details
+
+
 def extract_report_sections(report_file: str) -> Tuple[str, str]:
     """Extrahuj EXECUTIVE SUMMARY a PROBLEM DETAILS z backfill reportu."""
     
@@ -207,16 +219,30 @@ def main():
     
     args = parser.parse_args()
     
-    # Najdi report
+    # Najdi report: explicitní soubor > nejnovější run artifact > textový report
     report_file = args.report
+    artifact = None
     if not report_file:
-        report_file = find_latest_backfill_report()
-    
-    if not report_file:
+        reports_dir = Path(__file__).parent / 'reports'
+        artifact = load_latest_run_artifact(
+            str(reports_dir), kind='backfill', require=('problem_report',),
+            text_glob='incident_analysis_daily_*.txt',
+        )
+        if artifact is None:
+            report_file = find_latest_backfill_report()
+    elif Path(report_file).suffix in ('.json', '.msgpack') and Path(report_file).exists():
+        try:
+            artifact = load_run_artifact(report_file)
+        except RunArtifactError as e:
+            print(f"❌ {e}")
+            return 1
+    
+    if artifact is not None:
+        report_file = artifact.get('_path', report_file)
+    elif not report_file:
         print("❌ No backfill report found")
         return 1
-    
-    if not Path(report_file).exists():
+    elif not Path(report_file).exists():
         print(f"❌ Report file not found: {report_file}")
         return 1
     
@@ -242,7 +268,10 @@ def main():
     
     # Extrahuj sekce z reportu
     print(f"📋 Extracting report sections...")
-    summary, details = extract_report_sections(report_file)
+    if artifact is not None:
+        summary, details = artifact_report_sections(artifact)
+    else:
+        summary, details = extract_report_sections(report_file)
     
     if not summary and not details:
         print("❌ Could not extract report sections")
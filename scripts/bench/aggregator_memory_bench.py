@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Aggregator memory benchmark - retained RAM StreamingAggregator stavu
+====================================================================
+
+Prožene syntetické (už naparsované) recordy přes ``StreamingAggregator`` bez
+SQLite spillu a změří (deep ``sys.getsizeof``), kolik paměti po ingestu drží
+akumulátorový stav (per-fp Countery, bucket dicty, error_kind_facts).
+Recordy se generují po stránkách a po ingestu zahazují — měří se jen stav,
+ne vstup.
+
+S ``--peak-memory`` navíc změří (tracemalloc) přechodnou špičku alokací
+během ``finalize()`` + ``Pipeline.run_streaming`` nad už naplněným stavem —
+retained stav po ingestu neukáže, když finalize dočasně dekóduje vše naráz:
+    - finalize.peak_bytes    špička alokací nad stavem po ingestu
+    - finalize.retained_bytes  co po run_streaming zůstane (IncidentCollection)
+
+Reportuje:
+    - retained_bytes     paměť držená stavem agregátoru po ingestu všech recordů
+    - state_bytes        totéž po atributech agregátoru
+    - bytes_per_record   retained_bytes / records
+    - mb_per_million     odhad pro 1M recordů se stejnou kardinalitou
+    - facts / fingerprints / buckets   velikost stavu (pro kontrolu fixture)
+
+Kardinalita je záměrně vysoká (celý den bucketů, stovky app/originatorů,
+krátké trace), protože tam paměť stavu dominuje. Výstup je JSON; dva běhy
+jde porovnat přes ``--baseline`` (jako replay_bench).
+
+Použití:
+    python scripts/bench/aggregator_memory_bench.py --records 1000000
+    python scripts/bench/aggregator_memory_bench.py --output after.json --baseline before.json
+    python scripts/bench/aggregator_memory_bench.py --records 200000 --peak-memory
+    python scripts/bench/aggregator_memory_bench.py --trace-fanout 1 --trace-top-k 1000 \\
+        --baseline exact.json
+"""
+
+import argparse
+import bisect
+import itertools
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+from collections import deque
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = BENCH_DIR.parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+from core.streaming_aggregator import StreamingAggregator  # noqa: E402
+from pipeline.pipeline import Pipeline  # noqa: E402
+
+DEFAULT_DAY_START = datetime(2026, 1, 20, 0, 0, tzinfo=timezone.utc)
+
+# Atributy agregátoru, které nejsou akumulátorovým stavem
+NON_STATE_ATTRS = {'parser', '_conn', '_pending', '_sqlite_path'}
+
+
+class _PassthroughParser:
+    """Recordy už jsou naparsované → měří se jen agregace."""
+
+    @staticmethod
+    def parse(record: Any) -> Any:
+        return record
+
+
+def iter_record_pages(
+    records: int,
+    fingerprints: int = 2000,
+    namespaces: int = 40,
+    applications: int = 200,
+    originators: int = 100,
+    trace_fanout: int = 5,
+    hours: int = 24,
+    page_size: int = 5000,
+    seed: int = 42,
+    day_start: datetime = DEFAULT_DAY_START,
+) -> Iterator[List[SimpleNamespace]]:
+    """Stránky duck-typed recordů vzestupně dle timestampu (jako ES pages)."""
+    rnd = random.Random(seed)
+    # Zipf-like: pár fingerprintů dominuje (kumulativní váhy + bisect, O(log n) na record)
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(fingerprints)))
+    step = hours * 3600.0 / max(1, records)
+    page: List[SimpleNamespace] = []
+    for index in range(records):
+        fp_i = bisect.bisect(cum_weights, rnd.random() * cum_weights[-1], 0, fingerprints - 1)
+        page.append(SimpleNamespace(
+            fingerprint=f"fp-{fp_i:06d}",
+            error_type=f"Domain{fp_i % 11}Exception",
+            normalized_message=f"Operation {fp_i} failed status=<NUM>",
+            raw_message=f"Operation {fp_i} failed status={500 + index % 4}",
+            app_name=f"svc-{(fp_i * 7 + index % 3) % applications:03d}",
+            namespace=f"ns-{(fp_i + index % 5) % namespaces:02d}",
+            trace_id=f"trace-{index // max(1, trace_fanout):010x}",
+            originator_application=f"eam-{(fp_i + index % 2) % originators:03d}",
+            app_version=f"1.{fp_i % 4}.0",
+            timestamp=day_start + timedelta(seconds=index * step),
+        ))
+        if len(page) >= page_size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """Součet ``sys.getsizeof`` přes vše dosažitelné z ``obj`` (sdílené objekty jednou).
+
+    Prochází kontejnery, ``array`` a objekty se ``__slots__`` / ``__dict__``.
+    Na rozdíl od tracemalloc je deterministický a neznásobí čas ingestu.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, type):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(current)
+        elif isinstance(current, (str, bytes, int, float, datetime, array)) or current is None:
+            continue
+        else:
+            for name in getattr(type(current), '__slots__', ()):
+                if hasattr(current, name):
+                    stack.append(getattr(current, name))
+            if hasattr(current, '__dict__'):
+                stack.append(vars(current))
+    return total
+
+
+def state_sizes(agg: StreamingAggregator) -> Dict[str, int]:
+    """Retained bajty stavu po částech (sdílené objekty se počítají u první části)."""
+    seen: set = set()
+    sizes = {}
+    for name, value in vars(agg).items():
+        if name not in NON_STATE_ATTRS:
+            sizes[name] = deep_sizeof(value, seen)
+    return sizes
+
+
+def measure_aggregator(
+    records: int,
+    window_minutes: int = 15,
+    trace_top_k: int = 0,
+    **fixture: Any,
+) -> Dict[str, Any]:
+    """Retained paměť stavu agregátoru po ingestu ``records`` recordů."""
+    agg = StreamingAggregator(
+        window_minutes=window_minutes, parser=_PassthroughParser(), spill_details=False,
+        trace_top_k=trace_top_k,
+    )
+    started = time.perf_counter()
+    for page in iter_record_pages(records, **fixture):
+        agg.ingest_page(page)
+    agg.finalize()
+    ingest_sec = time.perf_counter() - started
+
+    sizes = state_sizes(agg)
+    retained = sum(sizes.values())
+    buckets = {bucket for acc in agg.acc.values() for bucket in acc.window_counts}
+    report = {
+        'records': records,
+        'window_minutes': window_minutes,
+        'trace_top_k': trace_top_k,
+        'fixture': fixture,
+        'fingerprints': agg.fingerprint_count,
+        'facts': agg.fact_count,
+        'buckets': len(buckets),
+        'retained_bytes': retained,
+        'state_bytes': sizes,
+        'bytes_per_record': round(retained / max(1, records), 2),
+        'mb_per_million': round(retained / max(1, records) * 1_000_000 / (1024 * 1024), 2),
+        'ingest_sec': round(ingest_sec, 3),
+    }
+    agg.close()
+    return report
+
+
+def measure_finalize_peak(
+    records: int,
+    window_minutes: int = 15,
+    trace_top_k: int = 0,
+    **fixture: Any,
+) -> Dict[str, Any]:
+    """
+    Špička alokací během finalize() + run_streaming nad naplněným agregátorem.
+
+    tracemalloc se zapne až po ingestu (nezpomalí ho) — měří se tedy jen
+    přechodné struktury finalize fáze nad retained stavem.
+    """
+    agg = StreamingAggregator(
+        window_minutes=window_minutes, parser=_PassthroughParser(), spill_details=False,
+        trace_top_k=trace_top_k,
+    )
+    for page in iter_record_pages(records, **fixture):
+        agg.ingest_page(page)
+    pipeline = Pipeline(window_minutes=window_minutes, build_trace_patterns=False)
+
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            collection = pipeline.run_streaming(agg, run_id='bench')
+        finalize_sec = time.perf_counter() - started
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    report = {
+        'peak_bytes': peak,
+        'retained_bytes': retained,
+        'incidents': collection.total_incidents,
+        'error_kind_facts': len(collection.error_kind_facts),
+        'finalize_sec': round(finalize_sec, 3),
+    }
+    agg.close()
+    return report
+
+
+def compare_reports(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Redukce retained paměti (poměr before/after) pro stejnou fixture."""
+    def ratio(key: str) -> Optional[float]:
+        old, new = before.get(key), after.get(key)
+        return round(old / new, 2) if old and new else None
+
+    return {
+        'mb_per_million': {'before': before.get('mb_per_million'), 'after': after.get('mb_per_million'),
+                           'reduction': ratio('mb_per_million')},
+        'retained_bytes': {'before': before.get('retained_bytes'), 'after': after.get('retained_bytes'),
+                           'reduction': ratio('retained_bytes')},
+        'finalize_peak_bytes': {
+            'before': (before.get('finalize') or {}).get('peak_bytes'),
+            'after': (after.get('finalize') or {}).get('peak_bytes'),
+        },
+        'same_fixture': before.get('fixture') == after.get('fixture')
+        and before.get('records') == after.get('records'),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Retained-memory benchmark for StreamingAggregator state')
+    parser.add_argument('--records', type=int, default=200000)
+    parser.add_argument('--fingerprints', type=int, default=2000)
+    parser.add_argument('--namespaces', type=int, default=40)
+    parser.add_argument('--applications', type=int, default=200)
+    parser.add_argument('--originators', type=int, default=100)
+    parser.add_argument('--trace-fanout', type=int, default=5)
+    parser.add_argument('--hours', type=int, default=24, help='Time span of the fixture (bucket count)')
+    parser.add_argument('--window-minutes', type=int, default=15)
+    parser.add_argument('--trace-top-k', type=int, default=0,
+                        help='Bounded trace counters (Space-Saving top-K + HLL); 0 = exact Counter')
+    parser.add_argument('--peak-memory', action='store_true',
+                        help='Also measure peak allocations across finalize() + Pipeline.run_streaming')
+    parser.add_argument('--output', help='Write JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = measure_aggregator(
+        args.records,
+        window_minutes=args.window_minutes,
+        trace_top_k=args.trace_top_k,
+        fingerprints=args.fingerprints,
+        namespaces=args.namespaces,
+        applications=args.applications,
+        originators=args.originators,
+        trace_fanout=args.trace_fanout,
+        hours=args.hours,
+    )
+    if args.peak_memory:
+        report['finalize'] = measure_finalize_peak(
+            args.records,
+            window_minutes=args.window_minutes,
+            trace_top_k=args.trace_top_k,
+            **report['fixture'],
+        )
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            report['comparison'] = compare_reports(json.load(handle), report)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(text + '\n', encoding='utf-8')
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Lokální mock Elasticsearch pro replay benchmark
+===============================================
+
+Obsluhuje přesně tu část API, kterou volá ``fetch_unlimited()`` a
+``fetch_trace_context()``:
+
+    POST   /<indices>/_pit?keep_alive=...   → {"id": ...}
+    POST   /_search  (pit + search_after)   → stránka hits + hits.total
+    POST   /<indices>/_search               → trace context bez PIT
+                                              (terms traceId + top_hits agregace)
+    POST   /<indices>/_count                → {"count": ...} (early-exit precheck)
+    DELETE /_pit                            → {}
+
+Dokumenty jsou ``_source`` dicty seřazené podle ``@timestamp`` (stejně jako je
+vrací ES pro sort ``@timestamp asc, _shard_doc asc``). Range a namespace filtr
+z ``_build_error_query`` se aplikují, aby completeness check seděl i pro
+podmnožiny fixture. Stejně jako ES s ``http.compression: true`` přijímá
+gzip body (``Content-Encoding``) a odpovídá gzipem, pokud o to klient požádá.
+"""
+
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+def _doc_namespace(source: Dict[str, Any]) -> Optional[str]:
+    kubernetes = source.get('kubernetes')
+    if isinstance(kubernetes, dict) and kubernetes.get('namespace'):
+        return kubernetes['namespace']
+    return source.get('kubernetes.namespace')
+
+
+def _matching_docs(docs: List[Dict[str, Any]], query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    bool_query = query.get('query', {}).get('bool', {})
+    time_range = {}
+    for clause in bool_query.get('must', []):
+        time_range = clause.get('range', {}).get('@timestamp', time_range)
+    trace_ids = None
+    for clause in bool_query.get('must', []):
+        if 'terms' in clause and 'traceId' in clause['terms']:
+            trace_ids = set(clause['terms']['traceId'])
+    namespaces = None
+    for clause in bool_query.get('filter', []):
+        if 'terms' in clause and 'kubernetes.namespace' in clause['terms']:
+            namespaces = set(clause['terms']['kubernetes.namespace'])
+    # Fixture timestampy jsou ISO UTC se 'Z' → lexikální porovnání stačí
+    lower = time_range.get('gte')
+    upper = time_range.get('lt')
+    return [
+        doc for doc in docs
+        if (lower is None or doc['@timestamp'] >= lower)
+        and (upper is None or doc['@timestamp'] < upper)
+        and (namespaces is None or _doc_namespace(doc) in namespaces)
+        and (trace_ids is None or doc.get('traceId') in trace_ids)
+    ]
+
+
+class MockElasticsearch:
+    """ThreadingHTTPServer nad in-memory fixture; ``with`` spustí/zastaví server."""
+
+    def __init__(
+        self,
+        docs: List[Dict[str, Any]],
+        host: str = '127.0.0.1',
+        port: int = 0,
+        compression: bool = True,
+    ):
+        self.docs = docs
+        self.compression = compression
+        self.search_requests = 0
+        self.pit_opens = 0
+        self.gzip_requests = 0
+        self.bytes_served = 0
+        self._pits = set()
+        self._matches: Dict[tuple, List[Dict[str, Any]]] = {}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *_args):
+                pass
+
+            def _body(self) -> Dict[str, Any]:
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                if raw and self.headers.get('Content-Encoding') == 'gzip':
+                    mock.gzip_requests += 1
+                    raw = gzip.decompress(raw)
+                return json.loads(raw) if raw else {}
+
+            def _reply(self, payload: Dict[str, Any], status: int = 200) -> None:
+                data = json.dumps(payload).encode('utf-8')
+                compressed = mock.compression and 'gzip' in (self.headers.get('Accept-Encoding') or '')
+                if compressed:
+                    data = gzip.compress(data, compresslevel=1)
+                mock.bytes_served += len(data)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                if compressed:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                path = self.path.split('?', 1)[0]
+                body = self._body()
+                if path.endswith('/_pit'):
+                    mock.pit_opens += 1
+                    pit_id = f"bench-pit-{mock.pit_opens}"
+                    mock._pits.add(pit_id)
+                    self._reply({'id': pit_id})
+                elif path.endswith('/_count'):
+                    self._reply({'count': len(_matching_docs(mock.docs, body))})
+                elif path.endswith('/_search'):
+                    mock.search_requests += 1
+                    pit_id = (body.get('pit') or {}).get('id')
+                    if pit_id and pit_id not in mock._pits:
+                        self._reply({'error': {'reason': f'No search context found for id [{pit_id}]'}}, status=404)
+                    else:
+                        self._reply(mock.search(body))
+                else:
+                    self._reply({'error': {'reason': f'unsupported {path}'}}, status=404)
+
+            def do_DELETE(self):
+                body = self._body()
+                mock._pits.discard(body.get('id'))
+                for key in [key for key in mock._matches if key[0] == body.get('id')]:
+                    del mock._matches[key]
+                self._reply({'succeeded': True})
+
+        return Handler
+
+    def search(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        pit_id = (query.get('pit') or {}).get('id')
+        # Jeden PIT obslouží víc různých dotazů (fetch + trace context)
+        key = (pit_id, json.dumps(query.get('query'), sort_keys=True))
+        matches = self._matches.get(key) if pit_id else None
+        if matches is None:
+            matches = _matching_docs(self.docs, query)
+            if pit_id:
+                self._matches[key] = matches
+        if 'traces' in query.get('aggs', {}):
+            return self._trace_buckets(query, matches)
+        offset = int((query.get('search_after') or [-1])[0]) + 1
+        size = int(query.get('size', 10))
+        hits = [
+            {'_source': doc, 'sort': [index]}
+            for index, doc in enumerate(matches[offset:offset + size], start=offset)
+        ]
+        response = {'hits': {'hits': hits}}
+        if query.get('track_total_hits'):
+            response['hits']['total'] = {'value': len(matches), 'relation': 'eq'}
+        if pit_id:
+            response['pit_id'] = pit_id
+        return response
+
+    @staticmethod
+    def _trace_buckets(query: Dict[str, Any], matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+        agg = query['aggs']['traces']
+        per_trace = int(agg['aggs']['events']['top_hits'].get('size', 3))
+        by_trace: Dict[str, List[Dict[str, Any]]] = {}
+        for doc in matches:
+            by_trace.setdefault(doc.get('traceId'), []).append(doc)
+        buckets = [
+            {
+                'key': trace_id,
+                'doc_count': len(docs),
+                'events': {'hits': {'hits': [{'_source': doc} for doc in docs[:per_trace]]}},
+            }
+            for trace_id, docs in list(by_trace.items())[:int(agg['terms'].get('size', 10))]
+        ]
+        return {
+            'hits': {'total': {'value': len(matches), 'relation': 'eq'}, 'hits': []},
+            'aggregations': {'traces': {'buckets': buckets}},
+        }
+
+    def __enter__(self) -> 'MockElasticsearch':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
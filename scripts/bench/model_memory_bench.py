@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Model memory benchmark - paměť na záznam registry / pipeline modelů
+===================================================================
+
+Backfill drží desítky tisíc ``Incident`` objektů a regular/daemon celé
+registry (``ProblemEntry`` / ``PeakEntry``) najednou. Benchmark vyrobí
+``--entries`` realisticky naplněných instancí každého modelu a změří deep
+``sys.getsizeof`` (stejná metoda jako aggregator_memory_bench) — sdílené
+stringy / enumy se počítají jednou, takže výsledek je skutečná cena na
+záznam v paměti.
+
+Reportuje per model:
+    - bytes_per_entry    průměrná retained velikost jedné instance
+    - entries            počet měřených instancí
+
+Výstup je JSON; dva běhy jde porovnat přes ``--baseline``.
+
+Použití:
+    python scripts/bench/model_memory_bench.py --output before.json
+    python scripts/bench/model_memory_bench.py --baseline before.json
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = BENCH_DIR.parent
+for _path in (SCRIPTS_DIR / 'pipeline', SCRIPTS_DIR, BENCH_DIR):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
+
+from aggregator_memory_bench import deep_sizeof  # noqa: E402
+from core.problem_registry import PeakEntry, ProblemEntry  # noqa: E402
+from incident import Incident, IncidentCategory, IncidentSeverity  # noqa: E402
+
+START = datetime(2026, 1, 20, 0, 0, tzinfo=timezone.utc)
+
+
+def make_problem(index: int, history: int = 96) -> ProblemEntry:
+    problem = ProblemEntry(
+        id=f"KP-{index:06d}",
+        problem_key=f"business:flow_{index % 40}:error_{index}",
+        category='business',
+        flow=f"flow_{index % 40}",
+        error_class=f"error_{index}",
+        first_seen=START,
+        last_seen=START + timedelta(minutes=15 * history),
+    )
+    for slot in range(history):
+        problem.record_occurrence(START + timedelta(minutes=15 * slot), 10 + slot % 7)
+    problem.occurrences = sum(problem.occurrence_counts)
+    problem.fingerprints = [f"{index:08x}{slot:024x}" for slot in range(3)]
+    problem.sample_messages = [f"Operation {index} failed for request id=<ID> status={code}" for code in (500, 503)]
+    problem.behavior = problem.sample_messages[0]
+    problem.affected_apps = {f"svc-{(index + slot) % 200:03d}" for slot in range(3)}
+    problem.affected_namespaces = {f"ns-{(index + slot) % 40:02d}" for slot in range(2)}
+    problem.deployments_seen = {f"svc-{index % 200:03d}-v{slot}" for slot in range(2)}
+    problem.app_versions_seen = {f"1.{slot}.0" for slot in range(2)}
+    problem.app_counts = {app: 100 for app in problem.affected_apps}
+    problem.namespace_counts = {ns: 150 for ns in problem.affected_namespaces}
+    return problem
+
+
+def make_peak(index: int, history: int = 24) -> PeakEntry:
+    peak = PeakEntry(
+        id=f"PK-{index:06d}",
+        problem_key=f"PEAK:business:flow_{index % 40}:spike",
+        peak_type='SPIKE',
+        first_seen=START,
+        last_seen=START + timedelta(minutes=15 * history),
+    )
+    peak.occurrence_times = [START + timedelta(minutes=15 * slot) for slot in range(history)]
+    peak.occurrence_counts = [20 + slot % 5 for slot in range(history)]
+    peak.occurrences = history
+    peak.affected_apps = {f"svc-{(index + slot) % 200:03d}" for slot in range(3)}
+    peak.affected_namespaces = {f"ns-{(index + slot) % 40:02d}" for slot in range(2)}
+    peak.app_counts = {app: 40 for app in peak.affected_apps}
+    peak.namespace_counts = {ns: 60 for ns in peak.affected_namespaces}
+    peak.trace_counts = {f"trace-{index:08x}-{slot}": 3 for slot in range(10)}
+    return peak
+
+
+def make_incident(index: int) -> Incident:
+    incident = Incident(id=f"inc-20260120-{index:06d}", fingerprint=f"{index:032x}")
+    incident.normalized_message = f"Operation {index % 500} failed for request id=<ID>"
+    incident.error_type = f"Domain{index % 11}Exception"
+    incident.raw_samples = [f"Operation {index % 500} failed for request id={index}"]
+    incident.time.first_seen = START + timedelta(seconds=index)
+    incident.time.last_seen = START + timedelta(seconds=index + 600)
+    incident.time.duration_sec = 600
+    incident.stats.current_count = 10 + index % 50
+    incident.stats.current_rate = float(incident.stats.current_count)
+    incident.apps = [f"svc-{index % 200:03d}"]
+    incident.namespaces = [f"ns-{index % 40:02d}"]
+    incident.app_event_counts = {incident.apps[0]: incident.stats.current_count}
+    incident.namespace_event_counts = {incident.namespaces[0]: incident.stats.current_count}
+    incident.trace_event_counts = {f"trace-{index:08x}-{slot}": 1 for slot in range(10)}
+    incident.trace_ids = list(incident.trace_event_counts)
+    incident.trace_info.trace_ids = incident.trace_ids.copy()
+    incident.score = 42.0
+    incident.severity = IncidentSeverity.MEDIUM
+    incident.category = IncidentCategory.BUSINESS
+    return incident
+
+
+MODELS: Dict[str, Callable[[int], Any]] = {
+    'ProblemEntry': make_problem,
+    'PeakEntry': make_peak,
+    'Incident': make_incident,
+}
+
+
+def measure_models(entries: int = 2000) -> Dict[str, Any]:
+    report: Dict[str, Any] = {'entries': entries, 'models': {}}
+    for name, factory in MODELS.items():
+        instances = [factory(index) for index in range(entries)]
+        total = deep_sizeof(instances) - sys.getsizeof(instances)
+        report['models'][name] = {
+            'entries': entries,
+            'bytes_per_entry': round(total / max(1, entries), 1),
+        }
+    return report
+
+
+def compare_reports(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    comparison = {}
+    for name, row in after.get('models', {}).items():
+        old = before.get('models', {}).get(name, {}).get('bytes_per_entry')
+        new = row.get('bytes_per_entry')
+        comparison[name] = {
+            'before': old,
+            'after': new,
+            'saved_pct': round((old - new) / old * 100, 1) if old and new else None,
+        }
+    return comparison
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Per-entry memory of registry and pipeline models')
+    parser.add_argument('--entries', type=int, default=2000)
+    parser.add_argument('--output', help='Write JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = measure_models(args.entries)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            report['comparison'] = compare_reports(json.load(handle), report)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(text + '\n', encoding='utf-8')
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Registry occurrence benchmark - idempotentní záznam occurrence v ProblemRegistry
+================================================================================
+
+``_update_problem`` při každém volání kontroluje, jestli už minuta ``last_ts``
+v ``occurrence_times`` je (idempotentní re-run backfillu). Dřív se na to
+stavěl set ze VŠECH occurrence_times → O(historie) na incident a běh. Teď
+ProblemEntry drží minutový index (postaví se při loadu, udržuje se při
+append).
+
+Benchmark postaví registry s ``--problems`` záznamy po ``--history``
+occurrence (15min kadence) a měří:
+
+    - legacy_check_us    původní set comprehension na jednu kontrolu
+    - indexed_check_us   ProblemEntry.has_occurrence_minute na jednu kontrolu
+    - update_problem_us  celé _update_problem (nová minuta) na jedno volání
+    - load_sec           ProblemRegistry.load() vč. stavby indexů
+    - legacy_hits / indexed_hits / checks_agree   shoda obou kontrol
+      (hit = minuta už v occurrence_times), i po reloadu registry
+
+Použití:
+    python scripts/bench/registry_occurrence_bench.py
+    python scripts/bench/registry_occurrence_bench.py --problems 5000 --history 2000 --output out.json
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = BENCH_DIR.parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+from core.problem_registry import ProblemEntry, ProblemRegistry  # noqa: E402
+
+DEFAULT_HISTORY_START = datetime(2026, 1, 1, 0, 0, tzinfo=timezone.utc)
+
+
+def legacy_has_minute(problem: ProblemEntry, ts: datetime) -> bool:
+    """Původní kontrola z _update_problem (referenční, jen pro srovnání)."""
+    ts_bucket = ts.replace(second=0, microsecond=0)
+    existing_buckets = {
+        t.replace(second=0, microsecond=0) if hasattr(t, "replace") else t
+        for t in problem.occurrence_times
+    }
+    return ts_bucket in existing_buckets
+
+
+def build_registry(
+    registry_dir: str,
+    problems: int,
+    history: int,
+    start: datetime = DEFAULT_HISTORY_START,
+) -> ProblemRegistry:
+    registry = ProblemRegistry(registry_dir)
+    for index in range(problems):
+        problem = ProblemEntry(
+            id=f"KP-{index + 1:06d}",
+            problem_key=f"bench:flow-{index % 50}:error-{index}",
+            category='bench',
+            flow=f"flow-{index % 50}",
+            error_class=f"error-{index}",
+            first_seen=start,
+        )
+        for slot in range(history):
+            problem.record_occurrence(start + timedelta(minutes=15 * slot, seconds=index % 60), 1)
+        problem.occurrences = history
+        problem.last_seen = problem.occurrence_times[-1] if history else start
+        problem.fingerprints = [f"fp-{index:06d}"]
+        registry.problems[problem.problem_key] = problem
+        registry.fingerprint_index[problem.fingerprints[0]] = problem.problem_key
+    return registry
+
+
+def _per_call_us(fn, calls: List[tuple]) -> float:
+    started = time.perf_counter()
+    for args in calls:
+        fn(*args)
+    return (time.perf_counter() - started) / max(1, len(calls)) * 1e6
+
+
+def run_benchmark(problems: int = 1000, history: int = 200, checks: int = 2000) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix='registry_bench_') as registry_dir:
+        registry = build_registry(registry_dir, problems, history)
+        entries = list(registry.problems.values())
+        # Polovina kontrol trefí existující minutu (re-run), polovina novou
+        calls = []
+        for index in range(checks):
+            problem = entries[index % len(entries)]
+            if index % 2 and problem.occurrence_times:
+                ts = problem.occurrence_times[(index * 7) % len(problem.occurrence_times)]
+            else:
+                ts = DEFAULT_HISTORY_START + timedelta(minutes=15 * history + index)
+            calls.append((problem, ts))
+
+        legacy_us = _per_call_us(legacy_has_minute, calls)
+        indexed_us = _per_call_us(lambda problem, ts: problem.has_occurrence_minute(ts), calls)
+        legacy_results = [legacy_has_minute(*call) for call in calls]
+        indexed_results = [problem.has_occurrence_minute(ts) for problem, ts in calls]
+
+        registry.save()
+        reloaded = ProblemRegistry(registry_dir)
+        started = time.perf_counter()
+        reloaded.load()
+        load_sec = time.perf_counter() - started
+        # Index postavený při loadu musí odpovídat stejně jako udržovaný při append
+        reloaded_results = [
+            reloaded.problems[problem.problem_key].has_occurrence_minute(ts) for problem, ts in calls
+        ]
+
+        update_calls = []
+        for index, problem in enumerate(list(reloaded.problems.values())[:checks]):
+            ts = DEFAULT_HISTORY_START + timedelta(minutes=15 * (history + 1), seconds=index % 60)
+            update_calls.append((
+                problem.problem_key, problem.fingerprints[0], ['bench-app'], ['bench-ns'],
+                'BenchError', 'bench failure', ts, ts, 3,
+            ))
+        update_us = _per_call_us(reloaded._update_problem, update_calls)
+
+    return {
+        'problems': problems,
+        'history': history,
+        'checks': checks,
+        'legacy_check_us': round(legacy_us, 2),
+        'indexed_check_us': round(indexed_us, 2),
+        'check_speedup': round(legacy_us / indexed_us, 1) if indexed_us else None,
+        'legacy_hits': sum(legacy_results),
+        'indexed_hits': sum(indexed_results),
+        'checks_agree': legacy_results == indexed_results == reloaded_results,
+        'update_problem_us': round(update_us, 2),
+        'load_sec': round(load_sec, 3),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='ProblemRegistry occurrence-index micro-benchmark')
+    parser.add_argument('--problems', type=int, default=1000)
+    parser.add_argument('--history', type=int, default=200, help='occurrence_times per problem')
+    parser.add_argument('--checks', type=int, default=2000)
+    parser.add_argument('--output', help='Write JSON report here (default: stdout)')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = run_benchmark(args.problems, args.history, args.checks)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(text + '\n', encoding='utf-8')
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
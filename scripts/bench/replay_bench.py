@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Offline replay benchmark - celý regular-phase tok bez clusteru
+==============================================================
+
+Vygeneruje (nebo načte) fixture ES dokumentů, servíruje je lokálním mock ES
+a prožene je stejnou cestou jako regular_phase.py:
+
+    fetch_unlimited → StreamingAggregator → Pipeline.run_streaming
+        → ProblemRegistry.update_and_save → TableExporter.export_all
+
+Pro každou fázi reportuje wall time, records/sec, RSS delta a peak RSS; navíc
+velikost SQLite spillu a registry/export výstupů. Výstup je JSON, takže dva
+běhy (před/po změně) jde porovnat přes ``--baseline``.
+
+Použití:
+    python scripts/bench/replay_bench.py --records 200000 --fingerprints 500
+    python scripts/bench/replay_bench.py --save-fixture /tmp/fx.jsonl --records 50000
+    python scripts/bench/replay_bench.py --fixture /tmp/fx.jsonl --output after.json \\
+        --baseline before.json
+"""
+
+import argparse
+import importlib
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from unittest.mock import patch
+
+BENCH_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = BENCH_DIR.parent
+for _path in (SCRIPTS_DIR / 'pipeline', SCRIPTS_DIR / 'core', SCRIPTS_DIR, BENCH_DIR):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
+
+from core.problem_registry import ProblemRegistry  # noqa: E402
+from core.streaming_aggregator import StreamingAggregator  # noqa: E402
+from exports import TableExporter  # noqa: E402
+from mock_es import MockElasticsearch  # noqa: E402
+from pipeline import Pipeline  # noqa: E402
+
+# core/__init__ re-exportuje funkci fetch_unlimited → modul bereme ze sys.modules
+fetch_module = importlib.import_module('core.fetch_unlimited')
+
+DEFAULT_WINDOW_START = datetime(2026, 1, 20, 8, 0, tzinfo=timezone.utc)
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+def generate_docs(
+    records: int,
+    fingerprints: int,
+    namespaces: int,
+    applications: int = 8,
+    trace_fanout: int = 5,
+    window_minutes: int = 15,
+    seed: int = 42,
+    window_start: datetime = DEFAULT_WINDOW_START,
+) -> List[Dict[str, Any]]:
+    """ES ``_source`` dokumenty seřazené dle @timestamp.
+
+    fingerprints = počet různých message šablon (po normalizaci), trace_fanout
+    = kolik eventů sdílí jeden traceId, namespaces/applications = šíře scope.
+    Zipf-like rozdělení: pár fingerprintů dominuje jako v produkci.
+    """
+    rnd = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(fingerprints)]
+    fingerprint_ids = rnd.choices(range(fingerprints), weights=weights, k=records)
+    window_seconds = window_minutes * 60
+    docs = []
+    for index, fp_i in enumerate(fingerprint_ids):
+        namespace = f"bench-ns-{(fp_i + index % 3) % namespaces:02d}"
+        application = f"bench-svc-{(fp_i * 7 + index % 2) % applications:02d}"
+        timestamp = window_start + timedelta(seconds=rnd.uniform(0, window_seconds))
+        docs.append({
+            'message': (
+                f"Operation {fp_i} failed for request id={rnd.randint(1, 10 ** 6)} "
+                f"status={rnd.choice((500, 502, 503, 504))}"
+            ),
+            'application': {'name': application, 'version': f"1.{fp_i % 4}.0"},
+            'kubernetes': {
+                'namespace': namespace,
+                'labels': {'eamApplication': f"bench-eam-{fp_i % 5}"},
+            },
+            'topic': 'bench-cluster',
+            '@timestamp': timestamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            'traceId': f"trace-{index // max(1, trace_fanout):08x}",
+            'spanId': f"span-{index:08x}",
+            'exception': {'type': f"com.bench.Domain{fp_i % 11}Exception"},
+            'level': 'ERROR',
+        })
+    docs.sort(key=lambda doc: doc['@timestamp'])
+    return docs
+
+
+def load_fixture(path: str) -> List[Dict[str, Any]]:
+    """JSONL: jeden ``_source`` dokument (nebo celý ES hit s ``_source``) na řádek."""
+    docs = []
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            if line.strip():
+                doc = json.loads(line)
+                docs.append(doc.get('_source', doc))
+    docs.sort(key=lambda doc: doc.get('@timestamp', ''))
+    return docs
+
+
+def save_fixture(docs: List[Dict[str, Any]], path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as handle:
+        for doc in docs:
+            handle.write(json.dumps(doc, separators=(',', ':')) + '\n')
+
+
+def _window_bounds(docs: List[Dict[str, Any]], window_minutes: int) -> tuple:
+    first = datetime.fromisoformat(docs[0]['@timestamp'].replace('Z', '+00:00')) if docs \
+        else DEFAULT_WINDOW_START
+    start = first.replace(minute=(first.minute // 15) * 15, second=0, microsecond=0)
+    end = start + timedelta(minutes=window_minutes)
+    if docs:
+        last = datetime.fromisoformat(docs[-1]['@timestamp'].replace('Z', '+00:00'))
+        while end <= last:
+            end += timedelta(minutes=15)
+    return start, end
+
+
+# =============================================================================
+# MEASUREMENT
+# =============================================================================
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _path_size(path: Optional[str]) -> int:
+    if not path or not os.path.exists(path):
+        return 0
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _dirs, names in os.walk(path)
+        for name in names
+    )
+
+
+class BenchRecorder:
+    """Sbírá per-phase metriky (monotonní čas + RSS přes _process_rss_mb)."""
+
+    def __init__(self, records: int):
+        self.records = records
+        self.phases: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[Dict[str, Any]]:
+        extra: Dict[str, Any] = {}
+        rss_before = fetch_module._process_rss_mb()
+        started = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            wall = time.perf_counter() - started
+            self.phases.append({
+                'phase': name,
+                'wall_sec': round(wall, 4),
+                'records_per_sec': round(self.records / wall, 1) if wall > 0 else None,
+                'rss_delta_mb': round(fetch_module._process_rss_mb() - rss_before, 1),
+                'peak_rss_mb': round(_peak_rss_mb(), 1),
+                **extra,
+            })
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# =============================================================================
+# RUN
+# =============================================================================
+
+def run_benchmark(
+    docs: List[Dict[str, Any]],
+    batch_size: int = 5000,
+    window_minutes: int = 15,
+    work_dir: Optional[str] = None,
+    quiet: bool = True,
+) -> Dict[str, Any]:
+    """Prožene fixture celým tokem a vrátí JSON-serializovatelný report."""
+    namespaces = sorted({
+        (doc.get('kubernetes') or {}).get('namespace', 'unknown') for doc in docs
+    })
+    window_start, window_end = _window_bounds(docs, window_minutes)
+    recorder = BenchRecorder(len(docs))
+    owned_dir = tempfile.TemporaryDirectory(prefix='replay_bench_') if work_dir is None else None
+    base_dir = Path(work_dir or owned_dir.name)
+    registry_dir = base_dir / 'registry'
+    exports_dir = base_dir / 'exports'
+    registry_dir.mkdir(parents=True, exist_ok=True)
+
+    stdout = open(os.devnull, 'w') if quiet else sys.stdout
+    try:
+        with MockElasticsearch(docs) as mock_es, \
+                patch.object(fetch_module, 'BASE_URL', mock_es.base_url), \
+                patch.object(fetch_module, 'ES_PASSWORD', 'bench'), \
+                patch.dict(os.environ, {
+                    'MONITORED_NAMESPACES': ','.join(namespaces),
+                    'REGISTRY_DIR': str(registry_dir),
+                }), \
+                patch.object(sys, 'stdout', stdout):
+            registry = ProblemRegistry(str(registry_dir))
+            registry.load()
+
+            aggregator = StreamingAggregator()
+            try:
+                with recorder.phase('fetch_aggregate') as extra:
+                    fetched = fetch_module.fetch_unlimited(
+                        window_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                        window_end.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                        batch_size=batch_size,
+                        page_consumer=aggregator.ingest_page,
+                        collect_results=False,
+                    )
+                    if fetched is None or not fetch_module.LAST_FETCH_STATS.get('complete'):
+                        raise RuntimeError(
+                            f"mock fetch incomplete: {fetch_module.LAST_FETCH_STATS.get('reason')}"
+                        )
+                    extra.update(
+                        search_requests=mock_es.search_requests,
+                        bytes_served=mock_es.bytes_served,
+                        fingerprints=len(aggregator.acc),
+                    )
+
+                with recorder.phase('pipeline') as extra:
+                    pipeline = Pipeline(build_trace_patterns=True)
+                    pipeline.phase_c.registry = registry
+                    pipeline.phase_c.known_fingerprints = registry.get_all_known_fingerprints().copy()
+                    collection = pipeline.run_streaming(aggregator, run_id='replay-bench')
+                    extra.update(
+                        incidents=collection.total_incidents,
+                        spill_bytes=_path_size(aggregator._sqlite_path),
+                    )
+            finally:
+                aggregator.close()
+
+            with recorder.phase('registry_update') as extra:
+                event_timestamps = {
+                    incident.fingerprint: (incident.time.first_seen, incident.time.last_seen)
+                    for incident in collection.incidents
+                    if incident.time.first_seen and incident.time.last_seen
+                }
+                if not registry.update_and_save(collection.incidents, event_timestamps):
+                    raise RuntimeError('registry update failed')
+                extra.update(
+                    problems=len(registry.problems),
+                    registry_bytes=_path_size(str(registry_dir)),
+                )
+
+            with recorder.phase('export') as extra:
+                TableExporter(registry).export_all(str(exports_dir))
+                extra.update(export_bytes=_path_size(str(exports_dir)))
+    finally:
+        if quiet:
+            stdout.close()
+        if owned_dir is not None:
+            owned_dir.cleanup()
+
+    total_wall = sum(phase['wall_sec'] for phase in recorder.phases)
+    return {
+        'revision': _git_revision(),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'records': len(docs),
+        'batch_size': batch_size,
+        'window_start': window_start.isoformat(),
+        'window_end': window_end.isoformat(),
+        'phases': recorder.phases,
+        'total_wall_sec': round(total_wall, 4),
+        'records_per_sec': round(len(docs) / total_wall, 1) if total_wall > 0 else None,
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+    }
+
+
+def compare_reports(before: Dict[str, Any], after: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Per-phase speedup (before/after wall time) pro dva reporty."""
+    before_phases = {phase['phase']: phase for phase in before.get('phases', [])}
+    rows = []
+    for phase in after.get('phases', []) + [{'phase': 'total', 'wall_sec': after['total_wall_sec']}]:
+        name = phase['phase']
+        old = before['total_wall_sec'] if name == 'total' else before_phases.get(name, {}).get('wall_sec')
+        rows.append({
+            'phase': name,
+            'before_sec': old,
+            'after_sec': phase['wall_sec'],
+            'speedup': round(old / phase['wall_sec'], 2) if old and phase['wall_sec'] else None,
+        })
+    return rows
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Offline replay benchmark for the regular-phase pipeline')
+    parser.add_argument('--fixture', help='JSONL fixture of ES _source documents (default: generate)')
+    parser.add_argument('--save-fixture', help='Write the generated fixture to this JSONL path')
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--fingerprints', type=int, default=300)
+    parser.add_argument('--namespaces', type=int, default=8)
+    parser.add_argument('--applications', type=int, default=8)
+    parser.add_argument('--trace-fanout', type=int, default=5, help='Events per traceId')
+    parser.add_argument('--window-minutes', type=int, default=15)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=5000, help='ES page size')
+    parser.add_argument('--work-dir', help='Keep registry/exports/spill here instead of a temp dir')
+    parser.add_argument('--output', help='Write JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+    parser.add_argument('--verbose', action='store_true', help='Show pipeline progress output')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.fixture:
+        docs = load_fixture(args.fixture)
+    else:
+        docs = generate_docs(
+            records=args.records,
+            fingerprints=args.fingerprints,
+            namespaces=args.namespaces,
+            applications=args.applications,
+            trace_fanout=args.trace_fanout,
+            window_minutes=args.window_minutes,
+            seed=args.seed,
+        )
+    if args.save_fixture:
+        save_fixture(docs, args.save_fixture)
+
+    report = run_benchmark(
+        docs,
+        batch_size=args.batch_size,
+        window_minutes=args.window_minutes,
+        work_dir=args.work_dir,
+        quiet=not args.verbose,
+    )
+    report['shape'] = {
+        'fixture': args.fixture,
+        'fingerprints': None if args.fixture else args.fingerprints,
+        'namespaces': None if args.fixture else args.namespaces,
+        'applications': None if args.fixture else args.applications,
+        'trace_fanout': None if args.fixture else args.trace_fanout,
+        'seed': None if args.fixture else args.seed,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            report['comparison'] = compare_reports(json.load(handle), report)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(text + '\n', encoding='utf-8')
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
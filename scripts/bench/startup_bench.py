@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark - cena importu entrypointu (``python -X importtime``)
+======================================================================
+
+CronJob regular phase běží 96× denně a u prázdných oken dominuje start
+interpretu a importy. Benchmark spustí čistý interpret s ``-X importtime``,
+naparsuje stderr a reportuje:
+
+    - import_ms        kumulativní import cílového modulu (medián z --repeats)
+    - wall_ms          wall time celého podprocesu (start interpretu + import)
+    - top_modules      nejdražší moduly podle kumulativního času
+    - deferred_loaded  které z líně importovaných modulů se přesto načetly
+
+Výstup je JSON; dva běhy jde porovnat přes ``--baseline`` (jako replay_bench).
+
+Použití:
+    python scripts/bench/startup_bench.py
+    python scripts/bench/startup_bench.py --target backfill --repeats 10
+    python scripts/bench/startup_bench.py --output after.json --baseline before.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = BENCH_DIR.parent
+
+# Moduly, které regular_phase importuje až při prvním použití
+DEFERRED_MODULES = (
+    'psycopg2',
+    'pipeline.pipeline',
+    'pipeline.phase_e_classify',
+    'core.problem_registry',
+    'core.baseline_loader',
+    'incident_analysis',
+    'analysis',
+    'exports',
+)
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Řádky ``import time: self | cumulative | name`` → list dictů (µs)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # hlavička "self [us] | cumulative | imported package"
+        name = parts[2].rstrip()
+        module = name.lstrip()
+        rows.append({
+            'module': module,
+            'depth': (len(name) - len(module)) // 2,
+            'self_us': int(parts[0]),
+            'cumulative_us': int(parts[1]),
+        })
+    return rows
+
+
+def _run_once(target: str, python: str) -> Dict[str, Any]:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [str(SCRIPTS_DIR)] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else [])
+    )
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {target}'],
+        cwd=SCRIPTS_DIR, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000.0
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ['']
+        raise RuntimeError(f"import {target} failed: {tail[0]}")
+    rows = parse_importtime(proc.stderr)
+    target_row = next((row for row in rows if row['module'] == target and row['depth'] == 0), None)
+    return {
+        'wall_ms': wall_ms,
+        'import_ms': (target_row['cumulative_us'] / 1000.0) if target_row else None,
+        'rows': rows,
+    }
+
+
+def measure_startup(
+    target: str = 'regular_phase',
+    repeats: int = 5,
+    top: int = 15,
+    python: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Medián z ``repeats`` čistých interpretů; top moduly z posledního běhu."""
+    runs = [_run_once(target, python or sys.executable) for _ in range(max(1, repeats))]
+    import_times = [run['import_ms'] for run in runs if run['import_ms'] is not None]
+    last_rows = runs[-1]['rows']
+    loaded = {row['module'] for row in last_rows}
+    return {
+        'target': target,
+        'python': sys.version.split()[0],
+        'repeats': len(runs),
+        'import_ms': round(statistics.median(import_times), 2) if import_times else None,
+        'wall_ms': round(statistics.median(run['wall_ms'] for run in runs), 2),
+        'modules_loaded': len(loaded),
+        'top_modules': [
+            {
+                'module': row['module'],
+                'cumulative_ms': round(row['cumulative_us'] / 1000.0, 2),
+                'self_ms': round(row['self_us'] / 1000.0, 2),
+            }
+            for row in sorted(last_rows, key=lambda row: -row['cumulative_us'])[:top]
+        ],
+        'deferred_loaded': sorted(module for module in DEFERRED_MODULES if module in loaded),
+    }
+
+
+def compare_reports(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Speedup import/wall času a moduly, které přibyly/ubyly v top listu."""
+    def speedup(key: str) -> Optional[float]:
+        old, new = before.get(key), after.get(key)
+        return round(old / new, 2) if old and new else None
+
+    before_top = {row['module'] for row in before.get('top_modules', [])}
+    after_top = {row['module'] for row in after.get('top_modules', [])}
+    return {
+        'import_ms': {'before': before.get('import_ms'), 'after': after.get('import_ms'),
+                      'speedup': speedup('import_ms')},
+        'wall_ms': {'before': before.get('wall_ms'), 'after': after.get('wall_ms'),
+                    'speedup': speedup('wall_ms')},
+        'modules_loaded': {'before': before.get('modules_loaded'), 'after': after.get('modules_loaded')},
+        'dropped_from_top': sorted(before_top - after_top),
+        'new_in_top': sorted(after_top - before_top),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Import-time startup benchmark for pipeline entrypoints')
+    parser.add_argument('--target', default='regular_phase', help='Module to import (default: regular_phase)')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='Number of most expensive modules to report')
+    parser.add_argument('--output', help='Write JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = measure_startup(args.target, repeats=args.repeats, top=args.top)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            report['comparison'] = compare_reports(json.load(handle), report)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(text + '\n', encoding='utf-8')
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
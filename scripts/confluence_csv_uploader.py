@@ -5,6 +5,16 @@ Confluence CSV Uploader - Upload CSV files to Confluence as HTML tables
 
 Uploads errors_table.csv and peaks_table.csv to Confluence pages.
 
+Incremental publish:
+    - content hash (sha256 přes title + HTML) každé stránky se po úspěšném
+      uploadu uloží do manifestu exports/latest/.confluence_manifest.json
+      (override CONFLUENCE_MANIFEST_PATH); nezměněná stránka se přeskočí
+      bez jediného requestu na Confluence (outcome ``skipped``)
+    - hash se počítá streamovaně z iter_html_table() — celé HTML se sestaví
+      jen pro stránky, které se opravdu nahrávají
+    - stránky se nahrávají souběžně (CONFLUENCE_UPLOAD_WORKERS, default 2)
+    - CONFLUENCE_FORCE_UPLOAD=true nahraje vše (např. po ruční editaci stránky)
+
 Usage:
     python3 confluence_csv_uploader.py
 """
@@ -15,9 +25,12 @@ import json
 import urllib.request
 import urllib.error
 import ssl
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 try:
     from core.delivery_persistence import (
@@ -38,10 +51,15 @@ CONFLUENCE_KNOWN_PEAKS_PAGE_ID = os.getenv('CONFLUENCE_KNOWN_PEAKS_PAGE_ID', '13
 
 SCRIPT_DIR = Path(__file__).parent
 EXPORTS_DIR = SCRIPT_DIR / 'exports' / 'latest'
+MANIFEST_NAME = '.confluence_manifest.json'
 
 
-def csv_to_html_table(csv_file: Path, max_rows: Optional[int] = None) -> str:
-    """Convert CSV file to HTML table (Confluence storage format).
+def iter_html_table(csv_file: Path, max_rows: Optional[int] = None) -> Iterator[str]:
+    """Stream CSV file as HTML table fragments (Confluence storage format).
+
+    Fragmenty se čtou řádek po řádku z CSV — velká tabulka se tak dá
+    zahashovat bez sestavení celého HTML v paměti (viz page_content_digest).
+    Spojené přes '\\n' dávají přesně výstup csv_to_html_table().
 
         Column widths are derived from observed name lengths in real registries:
             - affected_apps: compact enough to stop dominating the table → 290px
@@ -118,8 +136,6 @@ def csv_to_html_table(csv_file: Path, max_rows: Optional[int] = None) -> str:
             formatted.append(part.lower() if any(ch.isdigit() for ch in part) else part.capitalize())
         return ' '.join(formatted)
 
-    html_parts = []
-
     with open(csv_file, 'r', encoding='utf-8') as f:
         reader = csv.reader(f)
         headers = next(reader)
@@ -133,24 +149,24 @@ def csv_to_html_table(csv_file: Path, max_rows: Optional[int] = None) -> str:
         widths = [COLUMN_WIDTHS.get(h_lower, DEFAULT_WIDTH) for h_lower in visible_header_keys]
         total_width = sum(widths)
 
-        html_parts.append('<div style="overflow-x: auto; max-width: 100%;">')
-        html_parts.append(
+        yield '<div style="overflow-x: auto; max-width: 100%;">'
+        yield (
             f'<table style="table-layout: fixed; width: {total_width}px; border-collapse: collapse;">'
         )
-        html_parts.append('<colgroup>')
+        yield '<colgroup>'
 
         # Column widths
         for width in widths:
-            html_parts.append(f'<col style="width: {width}px"/>')
-        html_parts.append('</colgroup>')
+            yield f'<col style="width: {width}px"/>'
+        yield '</colgroup>'
 
         # Header row
-        html_parts.append('<thead><tr>')
+        yield '<thead><tr>'
         for col_idx, header in enumerate(visible_headers):
             header_key = visible_header_keys[col_idx] if col_idx < len(visible_header_keys) else header.strip().lower()
             header_label = format_header_label(header_key, header)
             width = widths[col_idx] if col_idx < len(widths) else DEFAULT_WIDTH
-            html_parts.append(
+            yield (
                 '<th style="'
                 f'width: {width}px; min-width: {width}px; max-width: {width}px; '
                 'vertical-align: top; white-space: normal; overflow-wrap: anywhere; word-break: break-word;'
@@ -158,15 +174,15 @@ def csv_to_html_table(csv_file: Path, max_rows: Optional[int] = None) -> str:
                 f'{header_label}'
                 '</strong></p></th>'
             )
-        html_parts.append('</tr></thead>')
+        yield '</tr></thead>'
 
         # Data rows
-        html_parts.append('<tbody>')
+        yield '<tbody>'
         row_count = 0
         for row in reader:
             if max_rows is not None and row_count >= max_rows:
                 break
-            html_parts.append('<tr>')
+            yield '<tr>'
             for col_idx, source_index in enumerate(visible_indices):
                 cell = row[source_index] if source_index < len(row) else ''
                 col_key = visible_header_keys[col_idx] if col_idx < len(visible_header_keys) else ''
@@ -182,23 +198,26 @@ def csv_to_html_table(csv_file: Path, max_rows: Optional[int] = None) -> str:
                 # Multi-line columns: convert newlines to <br/>; align to top
                 if col_key in MULTILINE_COLUMNS:
                     escaped = escaped.replace('\n', '<br/>')
-                    html_parts.append(
+                    yield (
                         f'<td style="{cell_style}"><p>{escaped}</p></td>'
                     )
                 else:
                     # Single-line columns: collapse newlines to spaces (defensive)
                     escaped = escaped.replace('\n', ' ')
-                    html_parts.append(
+                    yield (
                         f'<td style="{cell_style}"><p>{escaped}</p></td>'
                     )
-            html_parts.append('</tr>')
+            yield '</tr>'
             row_count += 1
-        html_parts.append('</tbody>')
+        yield '</tbody>'
 
-    html_parts.append('</table>')
-    html_parts.append('</div>')
+    yield '</table>'
+    yield '</div>'
 
-    return '\n'.join(html_parts)
+
+def csv_to_html_table(csv_file: Path, max_rows: Optional[int] = None) -> str:
+    """Convert CSV file to HTML table (Confluence storage format)."""
+    return '\n'.join(iter_html_table(csv_file, max_rows))
 
 
 def upload_to_confluence(page_id: str, title: str, html_content: str) -> bool:
@@ -278,139 +297,180 @@ def upload_to_confluence(page_id: str, title: str, html_content: str) -> bool:
         return False
 
 
+# =============================================================================
+# INCREMENTAL PUBLISH (content hash manifest)
+# =============================================================================
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, 'false').strip().lower() in {'true', '1', 'yes'}
+
+
+def manifest_path() -> Path:
+    """Cesta k manifestu — počítá se při volání (EXPORTS_DIR lze přesměrovat)."""
+    override = os.getenv('CONFLUENCE_MANIFEST_PATH')
+    return Path(override) if override else EXPORTS_DIR / MANIFEST_NAME
+
+
+def load_manifest(path: Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_manifest(path: Path, manifest: Dict[str, Dict[str, Any]]) -> None:
+    """Atomic write (tmp + rename) jako TableExporter._write_atomic."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def page_content_digest(title: str, fragments: Iterator[str]) -> str:
+    """sha256 obsahu stránky ('\\n'.join(fragments)) bez sestavení celého řetězce."""
+    digest = hashlib.sha256(title.encode('utf-8') + b'\0')
+    first = True
+    for fragment in fragments:
+        if not first:
+            digest.update(b'\n')
+        digest.update(fragment.encode('utf-8'))
+        first = False
+    return digest.hexdigest()
+
+
+def _publish_page(
+    page: Dict[str, Any],
+    known: Dict[str, Any],
+    force: bool,
+) -> Tuple[bool, Optional[str], Dict[str, Any]]:
+    """
+    Nahraje jednu stránku (běží ve worker vlákně).
+
+    Returns:
+        (success, digest pro manifest nebo None, outcome pro persistenci)
+    """
+    csv_file: Path = page['csv_file']
+    outcome: Dict[str, Any] = {
+        'dedup_key': page['dedup_key'],
+        'destination': page['destination'],
+        'metadata': {
+            'page_id': page['page_id'],
+            'csv_file': str(csv_file),
+        },
+        'attempted_at': page['attempted_at'],
+    }
+
+    if not csv_file.exists():
+        print(f"\n⚠️ {page['title']} CSV not found: {csv_file}")
+        outcome.update(status='failed', provider_message='Expected CSV file is missing')
+        return False, None, outcome
+
+    try:
+        digest = page_content_digest(page['title'], iter_html_table(csv_file))
+        outcome['metadata']['sha256'] = digest
+        if not force and known.get('sha256') == digest:
+            print(f"\n⏭️  {page['title']} unchanged (page {page['page_id']}), skipping upload")
+            outcome.update(
+                status='skipped',
+                provider_message=f"Content unchanged since {known.get('uploaded_at', 'last upload')}",
+            )
+            return True, None, outcome
+
+        print(f"\n📊 Uploading {page['title']}...")
+        print(f"   File: {csv_file}")
+        print(f"   Page ID: {page['page_id']}")
+        success = upload_to_confluence(page['page_id'], page['title'], csv_to_html_table(csv_file))
+        outcome.update(
+            status='delivered' if success else 'failed',
+            provider_message=(
+                'Confluence page updated'
+                if success
+                else 'Uploader returned unsuccessful status'
+            ),
+        )
+        return bool(success), digest if success else None, outcome
+    except Exception as e:
+        print(f"❌ Error processing {page['title']} CSV: {e}")
+        outcome.update(status='failed', provider_message=str(e))
+        return False, None, outcome
+
+
 def main():
     """Main function."""
     print("📤 Confluence CSV Uploader")
     print("=" * 70)
-    
-    success_count = 0
-    total_count = 0
-    publication_outcomes = []
+
     attempted_at = datetime.now(timezone.utc)
     publication_date = attempted_at.date().isoformat()
-    
-    # Upload Known Errors
-    errors_csv = EXPORTS_DIR / 'errors_table.csv'
-    if errors_csv.exists():
-        total_count += 1
-        print(f"\n📊 Uploading Known Errors...")
-        print(f"   File: {errors_csv}")
-        print(f"   Page ID: {CONFLUENCE_KNOWN_ERRORS_PAGE_ID}")
-        
-        try:
-            html = csv_to_html_table(errors_csv)
-            success = upload_to_confluence(
-                CONFLUENCE_KNOWN_ERRORS_PAGE_ID,
-                'Known Errors',
-                html
-            )
-            publication_outcomes.append({
-                'dedup_key': f'known-errors:{publication_date}',
-                'destination': 'confluence_known_errors',
-                'status': 'delivered' if success else 'failed',
-                'provider_message': (
-                    'Confluence page updated'
-                    if success
-                    else 'Uploader returned unsuccessful status'
-                ),
-                'metadata': {
-                    'page_id': CONFLUENCE_KNOWN_ERRORS_PAGE_ID,
-                    'csv_file': str(errors_csv),
-                },
-                'attempted_at': attempted_at,
-            })
-            if success:
-                success_count += 1
-        except Exception as e:
-            publication_outcomes.append({
-                'dedup_key': f'known-errors:{publication_date}',
-                'destination': 'confluence_known_errors',
-                'status': 'failed',
-                'provider_message': str(e),
-                'metadata': {
-                    'page_id': CONFLUENCE_KNOWN_ERRORS_PAGE_ID,
-                    'csv_file': str(errors_csv),
-                },
-                'attempted_at': attempted_at,
-            })
-            print(f"❌ Error processing errors CSV: {e}")
-    else:
-        total_count += 1
-        publication_outcomes.append({
+    pages = [
+        {
             'dedup_key': f'known-errors:{publication_date}',
             'destination': 'confluence_known_errors',
-            'status': 'failed',
-            'provider_message': 'Expected CSV file is missing',
-            'metadata': {
-                'page_id': CONFLUENCE_KNOWN_ERRORS_PAGE_ID,
-                'csv_file': str(errors_csv),
-            },
+            'page_id': CONFLUENCE_KNOWN_ERRORS_PAGE_ID,
+            'title': 'Known Errors',
+            'csv_file': EXPORTS_DIR / 'errors_table.csv',
             'attempted_at': attempted_at,
-        })
-        print(f"\n⚠️ Known Errors CSV not found: {errors_csv}")
-    
-    # Upload Known Peaks
-    peaks_csv = EXPORTS_DIR / 'peaks_table.csv'
-    if peaks_csv.exists():
-        total_count += 1
-        print(f"\n📊 Uploading Known Peaks...")
-        print(f"   File: {peaks_csv}")
-        print(f"   Page ID: {CONFLUENCE_KNOWN_PEAKS_PAGE_ID}")
-        
-        try:
-            html = csv_to_html_table(peaks_csv)
-            success = upload_to_confluence(
-                CONFLUENCE_KNOWN_PEAKS_PAGE_ID,
-                'Known Peaks',
-                html
-            )
-            publication_outcomes.append({
-                'dedup_key': f'known-peaks:{publication_date}',
-                'destination': 'confluence_known_peaks',
-                'status': 'delivered' if success else 'failed',
-                'provider_message': (
-                    'Confluence page updated'
-                    if success
-                    else 'Uploader returned unsuccessful status'
-                ),
-                'metadata': {
-                    'page_id': CONFLUENCE_KNOWN_PEAKS_PAGE_ID,
-                    'csv_file': str(peaks_csv),
-                },
-                'attempted_at': attempted_at,
-            })
-            if success:
-                success_count += 1
-        except Exception as e:
-            publication_outcomes.append({
-                'dedup_key': f'known-peaks:{publication_date}',
-                'destination': 'confluence_known_peaks',
-                'status': 'failed',
-                'provider_message': str(e),
-                'metadata': {
-                    'page_id': CONFLUENCE_KNOWN_PEAKS_PAGE_ID,
-                    'csv_file': str(peaks_csv),
-                },
-                'attempted_at': attempted_at,
-            })
-            print(f"❌ Error processing peaks CSV: {e}")
-    else:
-        total_count += 1
-        publication_outcomes.append({
+        },
+        {
             'dedup_key': f'known-peaks:{publication_date}',
             'destination': 'confluence_known_peaks',
-            'status': 'failed',
-            'provider_message': 'Expected CSV file is missing',
-            'metadata': {
-                'page_id': CONFLUENCE_KNOWN_PEAKS_PAGE_ID,
-                'csv_file': str(peaks_csv),
-            },
+            'page_id': CONFLUENCE_KNOWN_PEAKS_PAGE_ID,
+            'title': 'Known Peaks',
+            'csv_file': EXPORTS_DIR / 'peaks_table.csv',
             'attempted_at': attempted_at,
-        })
-        print(f"\n⚠️ Known Peaks CSV not found: {peaks_csv}")
-    
+        },
+    ]
+
+    path = manifest_path()
+    manifest = load_manifest(path)
+    force = _env_flag('CONFLUENCE_FORCE_UPLOAD')
+    workers = max(1, min(int(os.getenv('CONFLUENCE_UPLOAD_WORKERS', '2')), len(pages)))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='confluence') as executor:
+        futures = [
+            executor.submit(_publish_page, page, manifest.get(str(page['page_id'])) or {}, force)
+            for page in pages
+        ]
+        # Pořadí výsledků = pořadí stránek → deterministický audit
+        results = [future.result() for future in futures]
+
+    publication_outcomes = []
+    success_count = 0
+    skipped_count = 0
+    for page, (success, digest, outcome) in zip(pages, results):
+        publication_outcomes.append(outcome)
+        if success:
+            success_count += 1
+        if outcome['status'] == 'skipped':
+            skipped_count += 1
+        if digest:
+            manifest[str(page['page_id'])] = {
+                'sha256': digest,
+                'title': page['title'],
+                'uploaded_at': attempted_at.isoformat(),
+            }
+
+    if any(digest for _, digest, _ in results):
+        try:
+            save_manifest(path, manifest)
+        except OSError as e:
+            # Bez manifestu se příště jen nahraje znovu
+            print(f"⚠️ Failed to save Confluence manifest: {e}")
+
+    total_count = len(pages)
     print("\n" + "=" * 70)
-    print(f"📋 Summary: {success_count}/{total_count} tables uploaded successfully")
+    print(
+        f"📋 Summary: {success_count}/{total_count} tables uploaded successfully"
+        f" ({skipped_count} unchanged)"
+    )
 
     try:
         persist_notification_deliveries(
@@ -423,7 +483,7 @@ def main():
         print(f"❌ Failed to persist publication outcomes: {e}")
         return False
 
-    return total_count == 2 and success_count == total_count
+    return success_count == total_count
 
 
 if __name__ == '__main__':
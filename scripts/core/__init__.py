@@ -5,33 +5,50 @@ AI Log Analyzer - Core Components
 Základní komponenty pro sběr a zpracování dat.
 """
 
+import importlib
+
 from .fetch_unlimited import fetch_unlimited
-from .problem_registry import (
-    ProblemRegistry,
-    ProblemEntry,
-    PeakEntry,
-    FingerprintEntry,
-    compute_problem_key,
-    extract_flow,
-    extract_error_class,
-    extract_deployment_label,
-    extract_app_version,
-    migrate_old_registry,
-)
-from .telemetry_context import (
-    IncidentTelemetryContext,
-    TraceContext,
-    PropagationInfo,
-    Environment,
-    create_telemetry_context,
-    extract_application_version,
-    extract_environment,
-    extract_trace_id,
-    extract_span_id,
-    extract_parent_span_id,
-    aggregate_trace_contexts,
-    detect_propagation,
-)
+
+# Registry a telemetry se načítají líně (PEP 562) — import core.fetch_unlimited
+# nemá platit za problem_registry, dokud ho běh opravdu nepotřebuje.
+_LAZY_EXPORTS = {
+    'ProblemRegistry': '.problem_registry',
+    'ProblemEntry': '.problem_registry',
+    'PeakEntry': '.problem_registry',
+    'FingerprintEntry': '.problem_registry',
+    'compute_problem_key': '.problem_registry',
+    'extract_flow': '.problem_registry',
+    'extract_error_class': '.problem_registry',
+    'extract_deployment_label': '.problem_registry',
+    'extract_app_version': '.problem_registry',
+    'migrate_old_registry': '.problem_registry',
+    'IncidentTelemetryContext': '.telemetry_context',
+    'TraceContext': '.telemetry_context',
+    'PropagationInfo': '.telemetry_context',
+    'Environment': '.telemetry_context',
+    'create_telemetry_context': '.telemetry_context',
+    'extract_application_version': '.telemetry_context',
+    'extract_environment': '.telemetry_context',
+    'extract_trace_id': '.telemetry_context',
+    'extract_span_id': '.telemetry_context',
+    'extract_parent_span_id': '.telemetry_context',
+    'aggregate_trace_contexts': '.telemetry_context',
+    'detect_propagation': '.telemetry_context',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
 
 __all__ = [
     'fetch_unlimited',
@@ -4,7 +4,7 @@
 import psycopg2
 import psycopg2.extras
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from collections import defaultdict
 
 
@@ -37,8 +37,32 @@ class BaselineLoader:
         if window_minutes != 15:
             raise ValueError('authoritative facts currently use fixed 15-minute buckets')
 
-        fingerprints = sorted(set(fingerprints))
         cutoff_time = analysis_window_start - timedelta(days=lookback_days)
+        rows = self.load_dense_counts(fingerprints, cutoff_time, analysis_window_start)
+        if not rows:
+            return {}
+
+        rates_by_fingerprint: Dict[str, List[float]] = defaultdict(list)
+        for fingerprint, _, error_count in rows:
+            rates_by_fingerprint[fingerprint].append(float(error_count))
+
+        result = {
+            fingerprint: rates
+            for fingerprint, rates in rates_by_fingerprint.items()
+            if len(rates) >= min_samples
+        }
+        for fingerprint, rates in result.items():
+            print(f"✓ {fingerprint}: {len(rates)} dense historical rates")
+        return result
+
+    def load_dense_counts(
+        self,
+        fingerprints: List[str],
+        range_start: datetime,
+        range_end: datetime,
+    ) -> List[Tuple[str, datetime, int]]:
+        """(fingerprint, window_start, count) pro každý complete bucket v [start, end), nuly včetně."""
+        fingerprints = sorted(set(fingerprints))
         try:
             cursor = self.db_conn.cursor()
             query = """
@@ -71,31 +95,16 @@ class BaselineLoader:
             ORDER BY requested.fingerprint, complete.window_start
             """
             cursor.execute(query, (
-                cutoff_time,
-                analysis_window_start,
+                range_start,
+                range_end,
                 fingerprints,
                 fingerprints,
-                cutoff_time,
-                analysis_window_start,
+                range_start,
+                range_end,
             ))
             rows = cursor.fetchall()
             cursor.close()
-
-            if not rows:
-                return {}
-
-            rates_by_fingerprint: Dict[str, List[float]] = defaultdict(list)
-            for fingerprint, _, error_count in rows:
-                rates_by_fingerprint[fingerprint].append(float(error_count))
-
-            result = {
-                fingerprint: rates
-                for fingerprint, rates in rates_by_fingerprint.items()
-                if len(rates) >= min_samples
-            }
-            for fingerprint, rates in result.items():
-                print(f"✓ {fingerprint}: {len(rates)} dense historical rates")
-            return result
+            return rows
 
         except Exception as e:
             print(f"❌ BaselineLoader error: {e}")
@@ -183,6 +192,118 @@ class BaselineLoader:
 
 
 # CLI pro testování
+class BaselineCache:
+    """
+    Rezidentní baseline pro regular daemon.
+
+    Drží husté řady (fingerprint → {window_start: count}) a seznam complete
+    bucketů v lookbacku. Při posunu okna dotáhne jen buckety mezi minulým a
+    novým as-of (a jen pro už známé fingerprinty); nové fingerprinty se
+    načtou s plným lookbackem. Buckety za lookbackem se odřežou. Výsledek je
+    stejný jako ``BaselineLoader.load_fingerprint_rates``.
+
+    Zpětně doplněná/replayovaná okna uvnitř už načteného rozsahu se projeví
+    až po plném reloadu (``full_refresh_minutes``, default 6 h).
+    """
+
+    def __init__(
+        self,
+        lookback_days: int = 7,
+        full_refresh_minutes: int = 360,
+        evict_after_minutes: int = 1440,
+    ):
+        self.lookback = timedelta(days=lookback_days)
+        self.full_refresh = timedelta(minutes=full_refresh_minutes)
+        self.evict_after = timedelta(minutes=evict_after_minutes)
+        self._windows: List[datetime] = []
+        self._counts: Dict[str, Dict[datetime, float]] = {}
+        self._last_used: Dict[str, datetime] = {}
+        self._as_of: Optional[datetime] = None
+        self._full_as_of: Optional[datetime] = None
+        self.stats = {'full_loads': 0, 'incremental_loads': 0, 'new_fingerprint_loads': 0}
+
+    def clear(self) -> None:
+        self._windows = []
+        self._counts.clear()
+        self._last_used.clear()
+        self._as_of = None
+        self._full_as_of = None
+
+    def _ingest(self, rows: List[Tuple[str, datetime, int]], fingerprints: List[str]) -> None:
+        windows = set(self._windows)
+        for fingerprint in fingerprints:
+            self._counts.setdefault(fingerprint, {})
+        for fingerprint, window_start, error_count in rows:
+            windows.add(window_start)
+            if error_count:
+                self._counts[fingerprint][window_start] = float(error_count)
+        self._windows = sorted(windows)
+
+    def load_fingerprint_rates(
+        self,
+        loader: BaselineLoader,
+        fingerprints: List[str],
+        analysis_window_start: datetime,
+        min_samples: int = 3,
+    ) -> Dict[str, List[float]]:
+        if not fingerprints:
+            return {}
+        if analysis_window_start is None or analysis_window_start.utcoffset() is None:
+            raise ValueError('analysis_window_start must be timezone-aware')
+
+        requested = sorted(set(fingerprints))
+        cutoff = analysis_window_start - self.lookback
+        stale = (
+            self._as_of is None
+            or analysis_window_start < self._as_of
+            or analysis_window_start - self._full_as_of >= self.full_refresh
+        )
+        # Nejdřív všechny dotazy, pak teprve změna stavu: chyba DB (výjimka
+        # z load_dense_counts) nesmí zapsat fingerprinty/rozsahy jako načtené
+        # ani posunout _as_of — jinak by díry vydržely do plného reloadu.
+        if stale:
+            rows = loader.load_dense_counts(requested, cutoff, analysis_window_start)
+            self.clear()
+            self._ingest(rows, requested)
+            self._full_as_of = analysis_window_start
+            self.stats['full_loads'] += 1
+        else:
+            new = [fp for fp in requested if fp not in self._counts]
+            loads = []
+            if analysis_window_start > self._as_of and self._counts:
+                # Nové buckety pro všechny držené fingerprinty (ne jen požadované),
+                # aby řady zůstaly husté i pro fingerprinty z minulých oken
+                held = sorted(self._counts)
+                loads.append(('incremental_loads', held,
+                              loader.load_dense_counts(held, self._as_of, analysis_window_start)))
+            if new:
+                loads.append(('new_fingerprint_loads', new,
+                              loader.load_dense_counts(new, cutoff, analysis_window_start)))
+            for stat, fingerprints, rows in loads:
+                self._ingest(rows, fingerprints)
+                self.stats[stat] += 1
+
+        self._as_of = analysis_window_start
+        self._windows = [window for window in self._windows if window >= cutoff]
+        for fingerprint in requested:
+            self._last_used[fingerprint] = analysis_window_start
+        for fingerprint, last_used in list(self._last_used.items()):
+            series = self._counts.get(fingerprint)
+            if analysis_window_start - last_used > self.evict_after:
+                self._counts.pop(fingerprint, None)
+                del self._last_used[fingerprint]
+            elif series:
+                for window in [window for window in series if window < cutoff]:
+                    del series[window]
+
+        if len(self._windows) < min_samples:
+            return {}
+        return {
+            fingerprint: [self._counts[fingerprint].get(window, 0.0) for window in self._windows]
+            for fingerprint in requested
+        }
+
+
 if __name__ == '__main__':
     import argparse
     import os
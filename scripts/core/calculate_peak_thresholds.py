@@ -23,6 +23,7 @@ Usage:
 import os
 import sys
 import argparse
+import math
 import uuid
 from datetime import datetime, timedelta, timezone
 from collections import defaultdict
@@ -57,7 +58,13 @@ def percentile(values: list, p: float) -> float:
     """Calculate percentile from list of values"""
     if not values:
         return 0.0
-    s = sorted(values)
+    return percentile_sorted(sorted(values), p)
+
+
+def percentile_sorted(s: list, p: float) -> float:
+    """Percentile z už seřazeného listu (sorted_floor_n_times_p: s[floor(n*p)])"""
+    if not s:
+        return 0.0
     idx = int(len(s) * p)
     idx = min(idx, len(s) - 1)  # Ensure we don't go out of bounds
     return float(s[idx])
@@ -96,7 +103,9 @@ def fetch_raw_data(conn, weeks: int = None, as_of: datetime = None) -> dict:
         query += " AND window_start >= %s"
         params.append(start_date)
     
-    query += " ORDER BY namespace, day_of_week"
+    # error_count v ORDER BY → každá skupina přijde seřazená a sorted() v
+    # calculate_p93_thresholds je jen lineární průchod (timsort nad runem)
+    query += " ORDER BY namespace, day_of_week, error_count"
     
     print(f"📊 Fetching dense data from v_complete_namespace_error_counts...")
     cur.execute(query, params)
@@ -106,14 +115,14 @@ def fetch_raw_data(conn, weeks: int = None, as_of: datetime = None) -> dict:
     
     # Group by (namespace, day_of_week)
     data = defaultdict(list)
-    date_range = {'min': None, 'max': None}
-    
-    for ns, dow, value, ts in rows:
+    for ns, dow, value, _ts in rows:
         data[(ns, dow)].append(float(value))
-        if date_range['min'] is None or ts < date_range['min']:
-            date_range['min'] = ts
-        if date_range['max'] is None or ts > date_range['max']:
-            date_range['max'] = ts
+
+    # Rozsah přes min/max built-iny (C smyčka) místo dvou porovnání na řádek
+    date_range = {
+        'min': min((row[3] for row in rows), default=None),
+        'max': max((row[3] for row in rows), default=None),
+    }
     
     print(f"   Unique (namespace, dow) combinations: {len(data)}")
     if date_range['min'] and date_range['max']:
@@ -135,15 +144,16 @@ def calculate_p93_thresholds(data: dict, percentile_level: float = 0.93) -> dict
         if not values:
             continue
         
+        # Jeden sort na skupinu: percentil, medián i max čteme z téhož listu
         s = sorted(values)
         n = len(s)
         
         thresholds[(ns, dow)] = {
-            'p93': percentile(values, percentile_level),
+            'p93': percentile_sorted(s, percentile_level),
             'count': n,
             'median': s[n // 2],
-            'mean': sum(values) / n,
-            'max': max(values),
+            'mean': math.fsum(values) / n,  # fsum je přesně zaokrouhlený → nezávisí na pořadí řádků z ORDER BY
+            'max': s[-1],
         }
     
     return thresholds
@@ -179,8 +189,8 @@ def calculate_cap_values(thresholds: dict) -> dict:
             'cap': (median_p93 + avg_p93) / 2,
             'median_p93': median_p93,
             'avg_p93': avg_p93,
-            'min_p93': min(p93_values),
-            'max_p93': max(p93_values),
+            'min_p93': s[0],
+            'max_p93': s[-1],
             'total_samples': samples_by_ns[ns],
         }
     
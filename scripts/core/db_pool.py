@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+DB Pool - znovupoužití psycopg2 spojení v rezidentním procesu
+=============================================================
+
+Regular daemon volá ``get_db_connection()`` mnohokrát za okno (peak detector,
+baseline, persistence, deliveries) a volající spojení vždy zavírají. Pool
+vrací proxy, jejíž ``close()`` spojení nezavře, ale po rollbacku ho vrátí do
+poolu. Před vydáním se spojení ověří ``prepare`` callbackem (ping / SET ROLE);
+mrtvé spojení se zahodí a otevře se nové.
+
+Použití:
+    pool = ConnectionPool(connect=_connect_db, prepare=_prepare_connection, max_idle=2)
+    conn = pool.acquire(read_only=True)
+    ...
+    conn.close()   # → zpět do poolu
+"""
+
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+class PooledConnection:
+    """Proxy nad psycopg2 connection; ``close()`` vrací spojení do poolu."""
+
+    def __init__(self, pool: 'ConnectionPool', key: Any, connection):
+        self._pool = pool
+        self._key = key
+        self._connection = connection
+
+    def __getattr__(self, name):
+        connection = self.__dict__.get('_connection')
+        if connection is None:
+            raise AttributeError(f"pooled connection already returned ({name})")
+        return getattr(connection, name)
+
+    def __enter__(self):
+        self._connection.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._connection.__exit__(*exc)
+
+    def close(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool.release(self._key, connection)
+
+
+class ConnectionPool:
+    """Idle spojení per klíč (read_only / write); thread-safe, bez limitu aktivních."""
+
+    def __init__(
+        self,
+        connect: Callable[[Any], Any],
+        prepare: Optional[Callable[[Any, Any], None]] = None,
+        max_idle: int = 2,
+    ):
+        self._connect = connect
+        self._prepare = prepare
+        self.max_idle = max(0, int(max_idle))
+        self._idle: Dict[Any, List[Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'opened': 0, 'reused': 0, 'discarded': 0}
+
+    def acquire(self, key: Any) -> PooledConnection:
+        while True:
+            with self._lock:
+                idle = self._idle.get(key) or []
+                connection = idle.pop() if idle else None
+            if connection is None:
+                connection = self._connect(key)
+                self.stats['opened'] += 1
+                if self._prepare is not None:
+                    self._prepare(connection, key)
+                return PooledConnection(self, key, connection)
+            if getattr(connection, 'closed', 0):
+                self.stats['discarded'] += 1
+                continue
+            try:
+                if self._prepare is not None:
+                    self._prepare(connection, key)
+            except Exception:
+                self._discard(connection)
+                continue
+            self.stats['reused'] += 1
+            return PooledConnection(self, key, connection)
+
+    def release(self, key: Any, connection) -> None:
+        if getattr(connection, 'closed', 0):
+            self.stats['discarded'] += 1
+            return
+        try:
+            # Nedokončená transakce volajícího se nesmí přenést na dalšího
+            connection.rollback()
+        except Exception:
+            self._discard(connection)
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        self._discard(connection)
+
+    def _discard(self, connection) -> None:
+        self.stats['discarded'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                self._discard(connection)
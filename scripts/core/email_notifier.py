@@ -21,19 +21,26 @@ import requests
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timezone
-from typing import Optional, List, Dict, Any
+from typing import Optional, Iterable, List, Dict, Any
 from zoneinfo import ZoneInfo
 
 
 class EmailNotifier:
     """Sends notifications via email and/or Teams incoming webhook."""
     
-    def __init__(self):
+    def __init__(self, destinations: Optional[Iterable[str]] = None):
+        """``destinations`` omezí kanály (``teams_webhook`` / ``teams_email``); None = všechny."""
         self.teams_email = os.getenv('TEAMS_EMAIL', '').strip()
         self.smtp_host = os.getenv('SMTP_HOST', 'localhost')
         self.smtp_port = int(os.getenv('SMTP_PORT', '25'))
         self.from_email = os.getenv('EMAIL_FROM', 'ai-log-analyzer@kb.cz')
         self.webhook_url = os.getenv('TEAMS_WEBHOOK_URL', '').strip()
+        if destinations is not None:
+            destinations = set(destinations)
+            if 'teams_email' not in destinations:
+                self.teams_email = ''
+            if 'teams_webhook' not in destinations:
+                self.webhook_url = ''
         self.master_enabled = os.getenv('TEAMS_ENABLED', 'false').lower() in ('true', '1', 'yes')
         self.enabled = self.master_enabled and (bool(self.teams_email) or bool(self.webhook_url))
         self.last_delivery_results: List[Dict[str, Any]] = []
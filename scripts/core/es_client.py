@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+ES Client - sdílená HTTP session pro všechny ES cesty
+=====================================================
+
+fetch_unlimited, count/pre-pass a fetch_trace_context dřív stavěly vlastní
+``requests.Session`` na každé volání → nový TLS handshake a prázdný pool pro
+každý dotaz. Tady je jedna session na proces (na dvojici user/heslo) s:
+
+    - HTTPAdapter poolem (ES_POOL_CONNECTIONS / ES_POOL_MAXSIZE), aby souběžné
+      dotazy (trace context, daemon) nesdílely jediné spojení
+    - ``Accept-Encoding: gzip`` — ES odpověď zkomprimuje, pokud má zapnuté
+      ``http.compression`` (na HTTPS clusterech je default vypnuté!)
+    - gzip request body (``Content-Encoding: gzip``) od ES_GZIP_MIN_BYTES;
+      menší dotazy jdou nekomprimované, kde by komprese jen stála CPU
+
+Session se zavírá při ukončení procesu (atexit), ne po každém dotazu.
+
+Použití:
+    session = get_session(ES_USER, ES_PASSWORD)
+    resp = post_json(session, f"{BASE_URL}/{INDICES}/_search", query, timeout=120)
+"""
+
+import atexit
+import gzip
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+
+ES_POOL_CONNECTIONS = int(os.getenv('ES_POOL_CONNECTIONS', '4'))
+ES_POOL_MAXSIZE = int(os.getenv('ES_POOL_MAXSIZE', '16'))
+ES_GZIP_REQUESTS = os.getenv('ES_GZIP_REQUESTS', '1').strip().lower() not in {'0', 'false', 'no', 'off'}
+ES_GZIP_MIN_BYTES = int(os.getenv('ES_GZIP_MIN_BYTES', '1024'))
+# Level 1: dotazy jsou JSON s opakujícími se klíči, vyšší level už skoro nic nepřidá
+ES_GZIP_LEVEL = int(os.getenv('ES_GZIP_LEVEL', '1'))
+
+_session: Optional[requests.Session] = None
+_session_key: Optional[Tuple[str, str]] = None
+_lock = threading.Lock()
+
+# Kumulativně za proces (pro logy / benchmark)
+CLIENT_STATS = {
+    'sessions_opened': 0,
+    'gzip_requests': 0,
+    'request_bytes_raw': 0,
+    'request_bytes_sent': 0,
+}
+
+
+def _new_session(user: str, password: str) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=ES_POOL_CONNECTIONS,
+        pool_maxsize=ES_POOL_MAXSIZE,
+        max_retries=0,  # retry řídí volající (auth 401/403 backoff)
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.auth = HTTPBasicAuth(user, password)
+    session.verify = False
+    session.trust_env = True
+    session.headers['Accept-Encoding'] = 'gzip'
+    return session
+
+
+def get_session(user: str, password: str) -> requests.Session:
+    """Sdílená session pro dané credentials (změna credentials → nová session)."""
+    global _session, _session_key
+    key = (user or '', password or '')
+    with _lock:
+        if _session is None or _session_key != key:
+            if _session is not None:
+                _session.close()
+            _session = _new_session(user, password)
+            _session_key = key
+            CLIENT_STATS['sessions_opened'] += 1
+        return _session
+
+
+def close_session() -> None:
+    global _session, _session_key
+    with _lock:
+        session, _session, _session_key = _session, None, None
+    if session is not None:
+        session.close()
+
+
+atexit.register(close_session)
+
+
+def encode_body(body: Dict[str, Any]) -> Tuple[bytes, Dict[str, str]]:
+    """JSON body → (bytes, headers); od ES_GZIP_MIN_BYTES gzip."""
+    payload = json.dumps(body, separators=(',', ':')).encode('utf-8')
+    headers = {'Content-Type': 'application/json'}
+    CLIENT_STATS['request_bytes_raw'] += len(payload)
+    if ES_GZIP_REQUESTS and len(payload) >= ES_GZIP_MIN_BYTES:
+        payload = gzip.compress(payload, compresslevel=ES_GZIP_LEVEL)
+        headers['Content-Encoding'] = 'gzip'
+        CLIENT_STATS['gzip_requests'] += 1
+    CLIENT_STATS['request_bytes_sent'] += len(payload)
+    return payload, headers
+
+
+def post_json(session, url: str, body: Optional[Dict[str, Any]] = None, timeout: float = 120):
+    """POST s JSON body; posílá už zakódované bytes z ``encode_body`` (velká body gzip)."""
+    if body is None:
+        return session.post(url, timeout=timeout)
+    payload, headers = encode_body(body)
+    return session.post(url, data=payload, headers=headers, timeout=timeout)
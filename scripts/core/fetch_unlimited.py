@@ -6,17 +6,21 @@ No artificial limits - fetches ALL records in date range
 """
 
 import requests
-from requests.auth import HTTPBasicAuth
 import json
 import os
 import time
 import urllib3
 import argparse
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 from dotenv import load_dotenv
 import yaml
 
+try:
+    from . import es_client
+except ImportError:  # spuštěno přímo ze scripts/core (collect_peak_detailed)
+    import es_client
+
 urllib3.disable_warnings()
 load_dotenv()
 
@@ -25,6 +29,34 @@ ES_USER = os.getenv('ES_USER', 'XX_PCBS_ES_READ')
 ES_PASSWORD = os.getenv('ES_PASSWORD')  # Required: Set in .env file
 INDICES = os.getenv('ES_INDEX', 'cluster-app_pcb-*,cluster-app_pca-*,cluster-app_pcb-ch-*')
 
+# ============================================================================
+# SHARED PIT (hlavní fetch → trace context téhož okna)
+# ============================================================================
+# fetch_unlimited(keep_pit=True) po úspěšném fetchi PIT nezavře, ale nechá ho
+# pro fetch_trace_context, který pak hledá nad stejným snapshotem indexů bez
+# dalšího open/close. PIT byl otevřen až po konci okna, takže pokrývá celý
+# rozsah trace contextu. Volající ho uvolní přes release_shared_pit().
+# ``opened_at`` (epoch před otevřením PIT) = okamžik snapshotu; eventy
+# zaindexované později v PIT nejsou (TraceContextCache podle něj krátí pokrytí).
+SHARED_PIT_KEEP_ALIVE = os.getenv('ES_SHARED_PIT_KEEP_ALIVE', '10m')
+_SHARED_PIT = {'id': None, 'keep_alive': None, 'opened_at': None}
+
+
+def _es_session():
+    return es_client.get_session(ES_USER, ES_PASSWORD)
+
+
+def release_shared_pit():
+    """Zavře PIT ponechaný fetch_unlimited(keep_pit=True); bezpečné volat opakovaně."""
+    pit_id = _SHARED_PIT['id']
+    _SHARED_PIT.update({'id': None, 'keep_alive': None, 'opened_at': None})
+    if not pit_id:
+        return
+    try:
+        _es_session().delete(f"{BASE_URL}/_pit", json={"id": pit_id}, timeout=30)
+    except Exception:
+        pass
+
 # ============================================================================
 # OOM PROTECTION (extrémní okna s miliony logů)
 # ============================================================================
@@ -202,6 +234,153 @@ def _build_error_query(date_from, date_to, batch_size, namespaces):
     }
 
 
+# ============================================================================
+# AGGREGATION PRE-PASS (namespace × 15min totals bez stahování dokumentů)
+# ============================================================================
+# P93/CAP potřebuje jen součty namespace × bucket. Composite agregace nad stejným
+# filtrem jako _build_error_query je vrátí na pár requestů, takže peak okna jdou
+# vyhodnotit dřív, než doběhne plný fetch, a součet slouží jako nezávislá
+# kontrola úplnosti proti fetched_count.
+NAMESPACE_BUCKET_PAGE_SIZE = int(os.getenv('ES_AGG_PAGE_SIZE', '1000'))
+
+
+def _build_namespace_bucket_query(
+    date_from,
+    date_to,
+    namespaces,
+    interval_minutes=15,
+    page_size=NAMESPACE_BUCKET_PAGE_SIZE,
+    after_key=None,
+):
+    query = _build_error_query(date_from, date_to, 0, namespaces)
+    query.pop('sort')
+    query.pop('_source')
+    query['track_total_hits'] = True
+    composite = {
+        'size': page_size,
+        'sources': [
+            {'namespace': {'terms': {'field': 'kubernetes.namespace'}}},
+            {'bucket': {'date_histogram': {
+                'field': '@timestamp',
+                'fixed_interval': f'{interval_minutes}m',
+                'time_zone': 'UTC',
+            }}},
+        ],
+    }
+    if after_key:
+        composite['after'] = after_key
+    query['aggs'] = {'namespace_buckets': {'composite': composite}}
+    return query
+
+
+def _parse_namespace_buckets(aggregation, totals):
+    """Merge one composite page into totals[namespace][bucket_start]; returns page sum."""
+    page_total = 0
+    for bucket in aggregation.get('buckets', []):
+        key = bucket.get('key', {})
+        bucket_start = datetime.fromtimestamp(int(key['bucket']) / 1000, tz=timezone.utc)
+        count = int(bucket.get('doc_count', 0))
+        namespace_totals = totals.setdefault(key['namespace'], {})
+        namespace_totals[bucket_start] = namespace_totals.get(bucket_start, 0) + count
+        page_total += count
+    return page_total
+
+
+def fetch_namespace_bucket_totals(date_from, date_to, interval_minutes=15, retry=3):
+    """Exact ERROR counts per namespace × bucket via ES composite aggregation.
+
+    Returns ``{'totals': {namespace: {bucket_start: count}}, 'total': int,
+    'hits_total': int, 'requests': int}`` or None when ES is unavailable; the
+    caller treats the pre-pass as optional.
+    """
+    if not ES_PASSWORD:
+        return None
+    namespaces = _load_monitored_namespaces()
+    if not namespaces:
+        return None
+
+    session = _es_session()
+    totals = {}
+    total = 0
+    hits_total = None
+    requests_made = 0
+    after_key = None
+    while True:
+        query = _build_namespace_bucket_query(
+            date_from, date_to, namespaces, interval_minutes, after_key=after_key
+        )
+        resp = None
+        for attempt in range(retry):
+            try:
+                resp = es_client.post_json(session, f"{BASE_URL}/{INDICES}/_search", query, timeout=120)
+            except requests.RequestException as e:
+                if attempt < retry - 1:
+                    time.sleep(1)
+                    continue
+                print(f"   ⚠️ aggregation pre-pass exception: {e}")
+                return None
+            if resp.status_code == 200:
+                break
+            if resp.status_code in (401, 403) and attempt < retry - 1:
+                time.sleep(2)
+                continue
+            print(f"   ⚠️ aggregation pre-pass error {resp.status_code}")
+            return None
+        requests_made += 1
+        data = resp.json()
+        if hits_total is None:
+            total_obj = data.get('hits', {}).get('total', 0)
+            hits_total = int(
+                total_obj.get('value', 0) if isinstance(total_obj, dict) else total_obj or 0
+            )
+        aggregation = data.get('aggregations', {}).get('namespace_buckets', {})
+        total += _parse_namespace_buckets(aggregation, totals)
+        after_key = aggregation.get('after_key')
+        if not after_key or not aggregation.get('buckets'):
+            break
+
+    return {
+        'totals': totals,
+        'total': total,
+        'hits_total': hits_total or 0,
+        'requests': requests_made,
+    }
+
+
+def count_errors(date_from, date_to, retry=2):
+    """Exact ERROR count for the window via ``_count`` (same filter as fetch).
+
+    Lets the regular phase exit before registry load and pipeline imports when
+    the window is empty. Returns None when ES is unavailable or the namespace
+    config is missing; the caller then falls back to the full fetch.
+    """
+    if not ES_PASSWORD:
+        return None
+    namespaces = _load_monitored_namespaces()
+    if not namespaces:
+        return None
+
+    query = {"query": _build_error_query(date_from, date_to, 0, namespaces)["query"]}
+    session = _es_session()
+    for attempt in range(retry):
+        try:
+            resp = es_client.post_json(session, f"{BASE_URL}/{INDICES}/_count", query, timeout=60)
+        except requests.RequestException as e:
+            if attempt < retry - 1:
+                time.sleep(1)
+                continue
+            print(f"   ⚠️ ES count exception: {e}")
+            return None
+        if resp.status_code == 200:
+            return int(resp.json().get('count', 0))
+        if resp.status_code in (401, 403) and attempt < retry - 1:
+            time.sleep(2)
+            continue
+        print(f"   ⚠️ ES count error {resp.status_code}")
+        return None
+    return None
+
+
 def _detect_cgroup_memory_limit_mb():
     """Přečte memory limit podu/kontejneru z cgroup (v2, pak v1). None = neomezeno."""
     for path in (
@@ -302,11 +481,14 @@ def fetch_unlimited(
     page_consumer=None,
     collect_results=True,
     stats_out=None,
+    keep_pit=False,
 ):
     """Fetch ERROR logs using search_after pagination.
 
     ``page_consumer`` receives each parsed page. Set ``collect_results=False``
-    for bounded-memory callers that consume pages incrementally.
+    for bounded-memory callers that consume pages incrementally. With
+    ``keep_pit=True`` a successful fetch leaves its PIT open for
+    ``fetch_trace_context`` (see ``release_shared_pit``).
     """
     
     all_errors = []
@@ -356,13 +538,14 @@ def fetch_unlimited(
     print(f"   Batch size: {batch_size:,}")
     print()
 
-    session = requests.Session()
-    session.auth = HTTPBasicAuth(ES_USER, ES_PASSWORD)
-    session.verify = False
-    session.trust_env = True
+    # PIT z minulého okna (daemon / chybový běh) už nikdo nepoužije
+    release_shared_pit()
+    session = _es_session()
 
     pit_id = None
-    pit_keep_alive = '5m'
+    pit_keep_alive = SHARED_PIT_KEEP_ALIVE if keep_pit else '5m'
+    pit_opened_at = time.time()
+    fetch_finished = False
 
     try:
         pit_resp = session.post(f"{BASE_URL}/{INDICES}/_pit?keep_alive={pit_keep_alive}", timeout=120)
@@ -393,9 +576,10 @@ def fetch_unlimited(
             success = False
             for attempt in range(retry):
                 try:
-                    resp = session.post(
+                    resp = es_client.post_json(
+                        session,
                         f"{BASE_URL}/_search",
-                        json=query,
+                        query,
                         timeout=120,
                     )
                     
@@ -486,14 +670,15 @@ def fetch_unlimited(
                 break
             
             search_after = hits[-1]['sort']
+        fetch_finished = True
     finally:
-        if pit_id:
+        if pit_id and keep_pit and fetch_finished:
+            _SHARED_PIT.update({'id': pit_id, 'keep_alive': pit_keep_alive, 'opened_at': pit_opened_at})
+        elif pit_id:
             try:
                 session.delete(f"{BASE_URL}/_pit", json={"id": pit_id}, timeout=30)
             except Exception:
                 pass
-    
-        session.close()
 
     print()
     print(f"✅ Total fetched: {fetched_count:,} errors")
@@ -528,10 +713,180 @@ def fetch_unlimited(
                 'complete': False,
                 'reason': 'fetched count does not match hits.total',
             })
+            release_shared_pit()
             return None
     return all_errors
 
-def fetch_trace_context(trace_ids, date_from, date_to, max_events=3000, retry=2):
+# ============================================================================
+# TRACE CONTEXT (všechny levely pro reprezentativní trace)
+# ============================================================================
+# Trace ids jdou po dávkách (TRACE_CONTEXT_BATCH_SIZE) souběžně přes sdílenou
+# session (TRACE_CONTEXT_WORKERS). Každá dávka je jeden dotaz s terms agregací
+# na traceId + top_hits → každý trace dostane vlastní strop eventů (nejstarší
+# první), takže jeden ukecaný trace nevyčerpá rozpočet ostatním. top_hits je
+# limitováno index.max_inner_result_window (ES default 100).
+TRACE_CONTEXT_BATCH_SIZE = int(os.getenv('TRACE_CONTEXT_BATCH_SIZE', '10'))
+TRACE_CONTEXT_WORKERS = int(os.getenv('TRACE_CONTEXT_WORKERS', '4'))
+TRACE_CONTEXT_PER_TRACE = int(os.getenv('TRACE_CONTEXT_PER_TRACE', '100'))
+TRACE_CONTEXT_MAX_IDS = int(os.getenv('TRACE_CONTEXT_MAX_IDS', '1000'))
+
+_TRACE_CONTEXT_SOURCE = [
+    "message", "application", "application.name", "application.version",
+    "@timestamp", "traceId", "trace.id", "spanId", "span.id",
+    "parentId", "parent.id",
+    "level", "kubernetes.namespace",
+    "exception", "exception.type", "error", "error.type",
+    "error_type", "errorType", "http.status_code", "stack_trace",
+    "context.originatorApplication",
+]
+
+# Poslední iter_trace_context běh (jako LAST_FETCH_STATS)
+LAST_TRACE_CONTEXT_STATS = {
+    'batches': 0,
+    'failed_batches': 0,
+    'traces': 0,
+    'events': 0,
+    'truncated_ids': [],
+    'per_trace_cap': 0,
+    'snapshot_at': None,
+}
+
+
+def _build_trace_context_query(trace_ids, date_from, date_to, namespaces, per_trace):
+    return {
+        "query": {"bool": {"must": [
+            {"range": {"@timestamp": {"gte": date_from, "lt": date_to}}},
+            {"terms": {"traceId": trace_ids}},
+        ], "filter": [
+            {"terms": {"kubernetes.namespace": namespaces}},
+        ]}},
+        "size": 0,
+        "aggs": {"traces": {
+            "terms": {"field": "traceId", "size": len(trace_ids)},
+            "aggs": {"events": {"top_hits": {
+                "size": per_trace,
+                "sort": [{"@timestamp": {"order": "asc"}}],
+                "_source": _TRACE_CONTEXT_SOURCE,
+            }}},
+        }},
+    }
+
+
+def _search_trace_batch(session, query, retry):
+    """Jeden dávkový dotaz (přes sdílený PIT, pokud je); None = chyba."""
+    resp = None
+    for attempt in range(retry):
+        try:
+            pit_id, keep_alive = _SHARED_PIT['id'], _SHARED_PIT['keep_alive']
+            if pit_id:
+                pit = {"id": pit_id, "keep_alive": keep_alive}
+                resp = es_client.post_json(session, f"{BASE_URL}/_search", dict(query, pit=pit), timeout=120)
+                if resp.status_code in (400, 404):
+                    # PIT mezitím expiroval → bez PIT nad indexy
+                    print(f"   ⚠️ shared PIT unusable ({resp.status_code}), querying indices")
+                    _SHARED_PIT.update({'id': None, 'keep_alive': None, 'opened_at': None})
+                    pit_id = None
+            if not pit_id:
+                resp = es_client.post_json(session, f"{BASE_URL}/{INDICES}/_search", query, timeout=120)
+            if resp.status_code == 200:
+                return resp.json()
+            if resp.status_code in (401, 403) and attempt < retry - 1:
+                time.sleep(2)
+                continue
+            print(f"   ⚠️ trace context fetch error {resp.status_code}")
+            return None
+        except requests.RequestException as e:
+            if attempt < retry - 1:
+                time.sleep(1)
+                continue
+            print(f"   ⚠️ trace context fetch exception: {e}")
+            return None
+    return None
+
+
+def _parse_trace_batch(data):
+    """terms/top_hits odpověď → [(trace_id, events, doc_count)]."""
+    parsed = []
+    for bucket in data.get('aggregations', {}).get('traces', {}).get('buckets', []):
+        events = []
+        for hit in bucket.get('events', {}).get('hits', {}).get('hits', []):
+            source = hit.get('_source', {})
+            event = _source_to_error(source, message_limit=1000)
+            event['level'] = _source_value(source, 'level', default='') or ''
+            events.append(event)
+        parsed.append((bucket.get('key'), events, int(bucket.get('doc_count', len(events)))))
+    return parsed
+
+
+def iter_trace_context(
+    trace_ids,
+    date_from,
+    date_to,
+    max_events=3000,
+    retry=2,
+    batch_size=None,
+    workers=None,
+    per_trace=None,
+):
+    """Generátor (trace_id, events) v pořadí dokončení dávek.
+
+    Per-trace strop = min(TRACE_CONTEXT_PER_TRACE, max_events // počet trace),
+    takže celkový rozpočet ``max_events`` zůstává. Statistiky (včetně dávek,
+    které selhaly) jsou v LAST_TRACE_CONTEXT_STATS.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    LAST_TRACE_CONTEXT_STATS.update({
+        'batches': 0, 'failed_batches': 0, 'traces': 0,
+        'events': 0, 'truncated_ids': [], 'per_trace_cap': 0,
+        # Snapshot dat: otevření sdíleného PIT, jinak start dotazu. Pád PITu
+        # v průběhu → živý dotaz, dřívější čas je pak jen konzervativnější.
+        'snapshot_at': _SHARED_PIT['opened_at'] or time.time(),
+    })
+    ids = [t for t in dict.fromkeys(trace_ids or []) if t][:TRACE_CONTEXT_MAX_IDS]
+    if not ids:
+        return
+    if not ES_PASSWORD:
+        LAST_TRACE_CONTEXT_STATS['failed_batches'] = 1
+        return
+    namespaces = _load_monitored_namespaces()
+    if not namespaces:
+        print("   ⚠️ trace context fetch aborted: no monitored namespaces configured")
+        LAST_TRACE_CONTEXT_STATS['failed_batches'] = 1
+        return
+
+    batch_size = max(1, batch_size or TRACE_CONTEXT_BATCH_SIZE)
+    per_trace = max(1, min(per_trace or TRACE_CONTEXT_PER_TRACE, max_events // len(ids)))
+    batches = [ids[offset:offset + batch_size] for offset in range(0, len(ids), batch_size)]
+    LAST_TRACE_CONTEXT_STATS.update({'batches': len(batches), 'per_trace_cap': per_trace})
+    session = _es_session()
+
+    def run(batch):
+        query = _build_trace_context_query(batch, date_from, date_to, namespaces, per_trace)
+        return _search_trace_batch(session, query, retry)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers or TRACE_CONTEXT_WORKERS, len(batches)))) as pool:
+        futures = [pool.submit(run, batch) for batch in batches]
+        try:
+            for future in as_completed(futures):
+                data = future.result()
+                if data is None:
+                    LAST_TRACE_CONTEXT_STATS['failed_batches'] += 1
+                    continue
+                for trace_id, events, doc_count in _parse_trace_batch(data):
+                    if not trace_id or not events:
+                        continue
+                    LAST_TRACE_CONTEXT_STATS['traces'] += 1
+                    LAST_TRACE_CONTEXT_STATS['events'] += len(events)
+                    if doc_count > len(events):
+                        LAST_TRACE_CONTEXT_STATS['truncated_ids'].append(trace_id)
+                    yield trace_id, events
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def fetch_trace_context(trace_ids, date_from, date_to, max_events=3000, retry=2, **batch_options):
     """Fetch ALL levels (ne jen ERROR) pro konkrétní trace_ids.
 
     Účel (#3): primární sběr běží jen na ERROR (fetch_unlimited), ale pro
@@ -539,74 +894,18 @@ def fetch_trace_context(trace_ids, date_from, date_to, max_events=3000, retry=2)
     VŠECH levelů (WARN/INFO/DEBUG). Skutečná příčina totiž často PŘEDCHÁZÍ prvnímu
     ERRORu – tady ji zachytíme.
 
+    Když hlavní fetch nechal otevřený PIT (keep_pit=True), dotaz jde nad něj —
+    stejný snapshot indexů, bez dalšího PIT open/close. Expirovaný PIT → běžný
+    dotaz nad indexy. Dávkování/souběh/per-trace strop viz iter_trace_context.
+
     Returns: dict[trace_id] -> list[event dict] (message, application, namespace,
-    timestamp, trace_id, level, error_type). Časově NEseřazeno (řadí konzument).
+    timestamp, trace_id, level, error_type). Eventy trace jsou seřazené podle času.
+    None = ES nedostupné / některá dávka selhala (TraceContextCache pak
+    nezapíše pokrytí).
     """
-    if not trace_ids or not ES_PASSWORD:
-        return {}
-    ids = [t for t in dict.fromkeys(trace_ids) if t][:200]  # dedup + cap
-    if not ids:
-        return {}
-
-    session = requests.Session()
-    session.auth = HTTPBasicAuth(ES_USER, ES_PASSWORD)
-    session.verify = False
-    session.trust_env = True
-
-    out = {}
-    try:
-        namespaces = _load_monitored_namespaces()
-        if not namespaces:
-            print("   ⚠️ trace context fetch aborted: no monitored namespaces configured")
-            return {}
-        query = {
-            "query": {"bool": {"must": [
-                {"range": {"@timestamp": {"gte": date_from, "lt": date_to}}},
-                {"terms": {"traceId": ids}},
-            ], "filter": [
-                {"terms": {"kubernetes.namespace": namespaces}},
-            ]}},
-            "sort": [{"@timestamp": {"order": "asc"}}],
-            "size": max_events,
-            "_source": [
-                "message", "application", "application.name", "application.version",
-                "@timestamp", "traceId", "trace.id", "spanId", "span.id",
-                "parentId", "parent.id",
-                "level", "kubernetes.namespace",
-                "exception", "exception.type", "error", "error.type",
-                "error_type", "errorType", "http.status_code", "stack_trace",
-                "context.originatorApplication",
-            ],
-        }
-        resp = None
-        for attempt in range(retry):
-            try:
-                resp = session.post(f"{BASE_URL}/{INDICES}/_search", json=query, timeout=120)
-                if resp.status_code == 200:
-                    break
-                if resp.status_code in (401, 403) and attempt < retry - 1:
-                    time.sleep(2)
-                    continue
-                print(f"   ⚠️ trace context fetch error {resp.status_code}")
-                return {}
-            except requests.RequestException as e:
-                if attempt < retry - 1:
-                    time.sleep(1)
-                    continue
-                print(f"   ⚠️ trace context fetch exception: {e}")
-                return {}
-        if resp is None or resp.status_code != 200:
-            return {}
-        for hit in resp.json().get('hits', {}).get('hits', []):
-            s = hit.get('_source', {})
-            tid = _source_value(s, 'traceId', 'trace.id', default='') or ''
-            if not tid:
-                continue
-            event = _source_to_error(s, message_limit=1000)
-            event['level'] = _source_value(s, 'level', default='') or ''
-            out.setdefault(tid, []).append(event)
-    finally:
-        session.close()
+    out = dict(iter_trace_context(trace_ids, date_from, date_to, max_events, retry, **batch_options))
+    if LAST_TRACE_CONTEXT_STATS['failed_batches']:
+        return None
     return out
 
 
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Notification Dispatch - souběžné odeslání notifikací s deadlinem na destinaci
+=============================================================================
+
+Regular phase dřív posílal peak alerty sekvenčně: digest → (fallback) každý
+payload zvlášť, a v rámci jednoho odeslání webhook a SMTP za sebou. Pomalý
+SMTP relay / webhook tak natahoval 15min běh (10 s timeout × destinace ×
+payloady) a hrozil překryv s dalším oknem.
+
+Dispatch stage:
+    - každá destinace má vlastní omezený pool (NOTIFY_MAX_WORKERS vláken
+      na destinaci, default 4) — zaseklý SMTP relay neblokuje webhook
+    - deadline se počítá od spuštění odeslání (NOTIFY_DEADLINE_SEC,
+      default 20; override NOTIFY_DEADLINE_<DEST>_SEC, např.
+      NOTIFY_DEADLINE_TEAMS_EMAIL_SEC). Po deadlinu se úloha zapíše jako
+      ``failed`` ("Deadline exceeded"), nespuštěné úlohy téže destinace se
+      zruší a běh pokračuje. Vlákna jsou daemon, takže ani exit procesu na
+      zaseklý socket nečeká.
+    - výsledky se vrací ve stejném pořadí jako úlohy → deterministický audit
+      (persist_notification_deliveries) nezávisle na pořadí dokončení.
+
+Outbox (opt-in, NOTIFY_OUTBOX_ENABLED=true):
+    Payloady, které nedošly na ŽÁDNOU destinaci, se uloží do JSON outboxu
+    v registry adresáři a příští běh je zkusí znovu (max
+    NOTIFY_OUTBOX_MAX_ATTEMPTS pokusů, default 3; starší než
+    NOTIFY_OUTBOX_MAX_AGE_MIN, default 120, se zahodí — alert o peaku
+    starém hodiny už nemá cenu). Retry položky jen pronajme a smaže je až
+    po doručení, takže pád běhu uprostřed retry je neztratí. Doručení je
+    at-least-once: úloha, která doběhla až po deadlinu (nebo běh spadl po
+    odeslání), mohla zprávu doručit a retry ji pošle znovu.
+"""
+
+import fcntl
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+SendResult = Tuple[bool, List[Dict[str, Any]]]
+
+OUTBOX_FILENAME = 'notification_outbox_regular_phase.json'
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def outbox_enabled() -> bool:
+    return os.getenv('NOTIFY_OUTBOX_ENABLED', 'false').strip().lower() in {'true', '1', 'yes'}
+
+
+def destination_deadline(destination: Optional[str]) -> float:
+    """Deadline (s) pro destinaci: NOTIFY_DEADLINE_<DEST>_SEC nebo NOTIFY_DEADLINE_SEC."""
+    default = _env_float('NOTIFY_DEADLINE_SEC', 20.0)
+    if destination:
+        return _env_float(f"NOTIFY_DEADLINE_{destination.upper()}_SEC", default)
+    return default
+
+
+# =============================================================================
+# CONCURRENT DISPATCH
+# =============================================================================
+
+@dataclass
+class DispatchTask:
+    """Jedno odeslání: ``send()`` vrací (success, per-destination outcomes)."""
+    key: Any
+    destination: Optional[str]
+    send: Callable[[], SendResult]
+
+
+@dataclass
+class DispatchResult:
+    task: DispatchTask
+    success: bool
+    outcomes: List[Dict[str, Any]] = field(default_factory=list)
+    timed_out: bool = False
+    elapsed_sec: float = 0.0
+
+
+def _failed_outcome(destination: Optional[str], message: str) -> Dict[str, Any]:
+    return {
+        'destination': destination or 'notification_runtime',
+        'status': 'failed',
+        'provider_message': message,
+        'attempted_at': datetime.now(timezone.utc),
+    }
+
+
+@dataclass
+class _Slot:
+    """Stav jedné úlohy mezi worker vláknem a čekající dispatch smyčkou."""
+    task: DispatchTask
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancelled: bool = False
+    result: Optional[SendResult] = None
+    error: Optional[BaseException] = None
+
+
+def _destination_worker(slots: 'queue.Queue[_Slot]', changed: threading.Event) -> None:
+    while True:
+        try:
+            slot = slots.get_nowait()
+        except queue.Empty:
+            return
+        with slot.lock:
+            if slot.cancelled:
+                continue
+            slot.started_at = time.monotonic()
+        changed.set()
+        try:
+            slot.result = slot.task.send()
+        except BaseException as e:  # noqa: BLE001 - chyba notifieru = failed outcome
+            slot.error = e
+        slot.finished_at = time.monotonic()
+        changed.set()
+
+
+def dispatch_concurrently(
+    tasks: Iterable[DispatchTask],
+    max_workers: Optional[int] = None,
+    deadline_for: Callable[[Optional[str]], float] = destination_deadline,
+) -> List[DispatchResult]:
+    """
+    Spustí úlohy souběžně, každou destinaci v jejím vlastním omezeném poolu.
+
+    Deadline běží od chvíle, kdy se odeslání opravdu spustí (ne od startu
+    stage) — úloha čekající ve frontě za pomalou destinací tak nepropadne.
+    Když úloha destinace deadline překročí, destinace se bere jako zaseklá:
+    její ještě nespuštěné úlohy se zruší (failed, "Destination ... timed
+    out") a čekání končí. Ostatní destinace běží dál nezávisle.
+
+    Worker vlákna jsou daemon — proces po konci běhu na zaseklé vlákno
+    nečeká (ThreadPoolExecutor by je při exitu joinoval).
+
+    Returns:
+        DispatchResult pro každou úlohu, ve stejném pořadí jako ``tasks``
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return []
+
+    per_destination = max(1, max_workers or _env_int('NOTIFY_MAX_WORKERS', 4))
+    slots = [_Slot(task) for task in tasks]
+    queues: Dict[Optional[str], 'queue.Queue[_Slot]'] = {}
+    for slot in slots:
+        queues.setdefault(slot.task.destination, queue.Queue()).put(slot)
+
+    changed = threading.Event()
+    for destination, dest_queue in queues.items():
+        for index in range(min(per_destination, dest_queue.qsize())):
+            threading.Thread(
+                target=_destination_worker,
+                args=(dest_queue, changed),
+                name=f"notify-{destination or 'notifier'}-{index}",
+                daemon=True,
+            ).start()
+
+    deadlines = {destination: deadline_for(destination) for destination in queues}
+    timed_out_destinations: Dict[Optional[str], float] = {}
+    results: List[Optional[DispatchResult]] = [None] * len(slots)
+    pending = set(range(len(slots)))
+
+    while pending:
+        changed.clear()
+        now = time.monotonic()
+        next_wake: Optional[float] = None
+        for index in sorted(pending):
+            slot = slots[index]
+            task = slot.task
+            deadline = deadlines[task.destination]
+            if slot.finished_at is not None:
+                elapsed = slot.finished_at - slot.started_at
+                if slot.error is not None:
+                    message = " | ".join(str(slot.error).splitlines()) or slot.error.__class__.__name__
+                    results[index] = DispatchResult(
+                        task, False, [_failed_outcome(task.destination, message)], elapsed_sec=elapsed,
+                    )
+                else:
+                    success, outcomes = slot.result
+                    results[index] = DispatchResult(task, bool(success), list(outcomes), elapsed_sec=elapsed)
+                pending.discard(index)
+            elif slot.started_at is not None:
+                expires = slot.started_at + deadline
+                if now >= expires:
+                    print(f"⚠️ Notification to {task.destination or 'notifier'} exceeded {deadline:g}s deadline")
+                    timed_out_destinations.setdefault(task.destination, deadline)
+                    results[index] = DispatchResult(
+                        task, False, [_failed_outcome(task.destination, f'Deadline exceeded ({deadline:g}s)')],
+                        timed_out=True, elapsed_sec=now - slot.started_at,
+                    )
+                    pending.discard(index)
+                else:
+                    next_wake = expires if next_wake is None else min(next_wake, expires)
+            elif task.destination in timed_out_destinations:
+                with slot.lock:
+                    if slot.started_at is None:
+                        slot.cancelled = True
+                if slot.cancelled:
+                    message = (
+                        f"Destination {task.destination or 'notifier'} timed out "
+                        f"({timed_out_destinations[task.destination]:g}s), send not started"
+                    )
+                    results[index] = DispatchResult(
+                        task, False, [_failed_outcome(task.destination, message)], timed_out=True,
+                    )
+                    pending.discard(index)
+                else:
+                    next_wake = now  # právě se spustila — přepočítat hned
+        if pending:
+            timeout = None if next_wake is None else max(0.0, next_wake - time.monotonic())
+            changed.wait(timeout)
+
+    return results
+
+
+# =============================================================================
+# OUTBOX
+# =============================================================================
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return str(value)
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if set(obj) == {'__datetime__'}:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+class NotificationOutbox:
+    """
+    Trvalý outbox nedoručených payloadů (JSON v registry adresáři).
+
+    Zámek a atomický zápis jako alert_state_regular_phase.json — backfill a
+    regular mohou běžet souběžně.
+    """
+
+    def __init__(self, registry_dir: str, filename: str = OUTBOX_FILENAME):
+        self.path = Path(registry_dir) / filename
+        self.lock_path = self.path.with_suffix('.json.lock')
+
+    def _load_unlocked(self) -> List[Dict[str, Any]]:
+        if not self.path.exists():
+            return []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f, object_hook=_decode)
+            if isinstance(data, dict) and isinstance(data.get('entries'), list):
+                return data['entries']
+        except Exception as e:
+            print(f"⚠️ Notification outbox load failed: {e}")
+        return []
+
+    def _save_unlocked(self, entries: List[Dict[str, Any]]) -> None:
+        tmp_path = self.path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'entries': entries}, f, ensure_ascii=False, indent=2, default=_encode)
+        tmp_path.replace(self.path)
+
+    def _locked(self, mode: int):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_fd = open(self.lock_path, 'w')
+        fcntl.flock(lock_fd.fileno(), mode)
+        return lock_fd
+
+    def pending(self) -> List[Dict[str, Any]]:
+        lock_fd = self._locked(fcntl.LOCK_SH)
+        try:
+            return self._load_unlocked()
+        finally:
+            fcntl.flock(lock_fd.fileno(), fcntl.LOCK_UN)
+            lock_fd.close()
+
+    def enqueue(
+        self,
+        dedup_key: str,
+        payload: Dict[str, Any],
+        last_error: str = '',
+        attempts: int = 1,
+        first_failed_at: Optional[datetime] = None,
+    ) -> None:
+        """Přidá / přepíše položku (jedna na dedup_key); retry jde na aktuálně nakonfigurované destinace."""
+        entry = {
+            'dedup_key': dedup_key,
+            'payload': payload,
+            'attempts': attempts,
+            'first_failed_at': first_failed_at or datetime.now(timezone.utc),
+            'last_error': last_error[:500],
+        }
+        lock_fd = self._locked(fcntl.LOCK_EX)
+        try:
+            entries = [e for e in self._load_unlocked() if e.get('dedup_key') != dedup_key]
+            entries.append(entry)
+            self._save_unlocked(entries)
+        finally:
+            fcntl.flock(lock_fd.fileno(), fcntl.LOCK_UN)
+            lock_fd.close()
+
+    def take_due(
+        self,
+        now: Optional[datetime] = None,
+        max_attempts: Optional[int] = None,
+        max_age_min: Optional[int] = None,
+        lease_sec: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Pronajme položky k opakování; v souboru zůstávají až do ``ack`` / ``release``.
+
+        Pronajatá položka má ``attempts`` + 1 a ``leased_until``; souběžný běh
+        ji do té doby přeskočí. Když běh během retry spadne, lease vyprší
+        (NOTIFY_OUTBOX_LEASE_SEC, default 600) a další běh ji zkusí znovu —
+        at-least-once i přes pád procesu.
+
+        Returns:
+            (due, expired) — ``due`` k opakování, ``expired`` překročily
+            pokusy / stáří; ty se z outboxu rovnou odstraní.
+        """
+        now = now or datetime.now(timezone.utc)
+        max_attempts = max_attempts if max_attempts is not None else _env_int('NOTIFY_OUTBOX_MAX_ATTEMPTS', 3)
+        max_age = timedelta(minutes=max_age_min if max_age_min is not None else _env_int('NOTIFY_OUTBOX_MAX_AGE_MIN', 120))
+        lease = timedelta(seconds=lease_sec if lease_sec is not None else _env_int('NOTIFY_OUTBOX_LEASE_SEC', 600))
+
+        due, expired, kept = [], [], []
+        lock_fd = self._locked(fcntl.LOCK_EX)
+        try:
+            entries = self._load_unlocked()
+            for entry in entries:
+                leased_until = entry.get('leased_until')
+                if isinstance(leased_until, datetime) and leased_until > now:
+                    kept.append(entry)
+                    continue
+                first_failed = entry.get('first_failed_at')
+                too_old = isinstance(first_failed, datetime) and now - first_failed > max_age
+                if too_old or int(entry.get('attempts', 0) or 0) >= max_attempts:
+                    expired.append(entry)
+                    continue
+                entry['attempts'] = int(entry.get('attempts', 0) or 0) + 1
+                entry['leased_until'] = now + lease
+                due.append(entry)
+                kept.append(entry)
+            if due or expired:
+                self._save_unlocked(kept)
+        finally:
+            fcntl.flock(lock_fd.fileno(), fcntl.LOCK_UN)
+            lock_fd.close()
+        return due, expired
+
+    def ack(self, dedup_keys: Iterable[str]) -> None:
+        """Odstraní doručené (pronajaté) položky."""
+        self._settle(set(dedup_keys), {})
+
+    def release(self, failures: Dict[str, str]) -> None:
+        """Vrátí pronajaté položky do fronty (dedup_key → poslední chyba); pokus už je započtený."""
+        self._settle(set(), failures)
+
+    def _settle(self, delivered: Set[str], failures: Dict[str, str]) -> None:
+        if not delivered and not failures:
+            return
+        lock_fd = self._locked(fcntl.LOCK_EX)
+        try:
+            entries = []
+            for entry in self._load_unlocked():
+                key = entry.get('dedup_key')
+                if key in delivered:
+                    continue
+                if key in failures:
+                    entry.pop('leased_until', None)
+                    if failures[key]:
+                        entry['last_error'] = failures[key][:500]
+                entries.append(entry)
+            self._save_unlocked(entries)
+        finally:
+            fcntl.flock(lock_fd.fileno(), fcntl.LOCK_UN)
+            lock_fd.close()
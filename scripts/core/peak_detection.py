@@ -133,17 +133,21 @@ class PeakDetector:
             raise RuntimeError("Database connection not set. Call set_connection() first.")
         
         cur = self._conn.cursor()
-        
-        cur.execute("""
-            SELECT snapshot_id, namespace, day_of_week, percentile_value,
-                   cap_value, sample_count
-            FROM ailog_peak.v_latest_threshold_values
-        """)
+        try:
+            cur.execute("""
+                SELECT snapshot_id, namespace, day_of_week, percentile_value,
+                       cap_value, sample_count
+                FROM ailog_peak.v_latest_threshold_values
+            """)
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+            self._end_read()
 
         self._thresholds_cache = {}
         self._caps_cache = {}
         snapshot_ids = set()
-        for snapshot_id, ns, dow, value, cap, samples in cur.fetchall():
+        for snapshot_id, ns, dow, value, cap, samples in rows:
             snapshot_ids.add(str(snapshot_id))
             self._thresholds_cache[(ns, dow)] = {
                 'value': float(value),
@@ -153,12 +157,43 @@ class PeakDetector:
                 'value': float(cap),
                 'samples': samples,
             }
-        cur.close()
         if len(snapshot_ids) > 1:
             raise RuntimeError(f'latest threshold view mixed snapshots: {sorted(snapshot_ids)}')
         self._threshold_snapshot_id = next(iter(snapshot_ids), None)
         self._cache_loaded_at = datetime.now()
     
+    def _end_read(self):
+        """
+        Ukončí read transakci detektoru. Spojení žije celý daemon a není
+        autocommit — bez rollbacku by session zůstala "idle in transaction"
+        a držela AccessShareLock na tabulkách prahů (blokuje retrain/migrace).
+        """
+        self._conn.rollback()
+
+    def refresh(self) -> bool:
+        """
+        Rezidentní proces (regular daemon): místo plného reloadu po TTL ověří
+        jen ID posledního snapshotu prahů. Vrací True, pokud se prahy načetly znovu.
+        """
+        if self._thresholds_cache is None:
+            self._load_thresholds_from_db()
+            return True
+        if self._conn is None:
+            raise RuntimeError("Database connection not set. Call set_connection() first.")
+        cur = self._conn.cursor()
+        try:
+            cur.execute("SELECT snapshot_id FROM ailog_peak.v_latest_threshold_snapshot")
+            row = cur.fetchone()
+        finally:
+            cur.close()
+            self._end_read()
+        latest_snapshot_id = str(row[0]) if row and row[0] is not None else None
+        if latest_snapshot_id == self._threshold_snapshot_id:
+            self._cache_loaded_at = datetime.now()
+            return False
+        self._load_thresholds_from_db()
+        return True
+
     def _ensure_cache_loaded(self):
         """Ensure threshold cache is loaded and valid"""
         if not self._is_cache_valid():
@@ -33,6 +33,7 @@ Datum: 2026-01-26
 
 import os
 import re
+import json
 import yaml
 import tempfile
 import shutil
@@ -53,6 +54,19 @@ MAX_FINGERPRINTS_PER_PROBLEM = 500  # Warning above this
 MAX_SAMPLE_MESSAGES_PER_FP = 5
 MAX_PROBLEMS_WARNING = 5000
 MAX_FINGERPRINTS_WARNING = 100000
+MAX_PROBLEM_KEY_CACHE_ENTRIES = 2 * MAX_FINGERPRINTS_WARNING
+# Soubory, jejichž změna (jiným procesem) vynutí reload rezidentního registry
+REGISTRY_SNAPSHOT_FILES = ('known_problems.yaml', 'known_peaks.yaml', 'problem_key_cache.json')
+# Čítače jednoho update běhu — při reuse snapshotu se nulují jako po load()
+PER_RUN_STATS = (
+    'new_problems_added',
+    'problems_updated',
+    'new_peaks_added',
+    'peaks_updated',
+    'problem_key_cache_hits',
+    'problem_key_cache_misses',
+    'problem_key_cache_mismatches',
+)
 TEST_PEAK_ORIGINATORS = tuple(
     item.strip().lower()
     for item in os.getenv('TEST_PEAK_ORIGINATORS', 'MochaXTestApp').split(',')
@@ -156,7 +170,7 @@ def is_test_peak_counts(originator_counts: Optional[Dict[str, int]], total_count
 # DATA MODELS
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class FingerprintEntry:
     """Technický záznam fingerprintu - mapuje na problem_key"""
     fingerprint: str
@@ -168,7 +182,7 @@ class FingerprintEntry:
     occurrence_count: int = 0
 
 
-@dataclass 
+@dataclass(slots=True)
 class ProblemEntry:
     """Provozní záznam problému - hrubá identita"""
     id: str                          # KP-000001 (Known Problem)
@@ -191,6 +205,12 @@ class ProblemEntry:
     # Parallel list: error count per occurrence_times entry (volume tracking)
     occurrence_counts: List[int] = field(default_factory=list)
 
+    # In-memory index minutových bucketů z occurrence_times (neserializuje se).
+    # Staví se jednou při vytvoření / loadu a udržuje při append; změnu listu
+    # zvenku (trim, přiřazení) pozná _minute_index_state a index přestaví.
+    _minute_index: Set[Any] = field(default_factory=set, init=False, repr=False, compare=False)
+    _minute_index_state: Tuple[Any, ...] = field(default=(), init=False, repr=False, compare=False)
+
     # Linked fingerprints (1:N)
     fingerprints: List[str] = field(default_factory=list)
 
@@ -225,6 +245,37 @@ class ProblemEntry:
     jira: Optional[str] = None
     notes: Optional[str] = None
     
+    def __post_init__(self):
+        self._rebuild_minute_index()
+
+    @staticmethod
+    def _minute_bucket(ts: Any) -> Any:
+        if not isinstance(ts, datetime) or (ts.second == 0 and ts.microsecond == 0):
+            return ts  # už zarovnaný → sdílet objekt z occurrence_times, ne kopii
+        return ts.replace(second=0, microsecond=0)
+
+    def _index_state(self) -> Tuple[Any, ...]:
+        times = self.occurrence_times
+        if not times:
+            return (0,)
+        return (len(times), id(times), times[0], times[-1])
+
+    def _rebuild_minute_index(self) -> None:
+        self._minute_index = {self._minute_bucket(ts) for ts in self.occurrence_times}
+        self._minute_index_state = self._index_state()
+
+    def has_occurrence_minute(self, ts: datetime) -> bool:
+        """Je minuta ``ts`` už v occurrence_times? O(1) nad indexem."""
+        if self._minute_index_state != self._index_state():
+            self._rebuild_minute_index()
+        return self._minute_bucket(ts) in self._minute_index
+
+    def record_occurrence(self, ts: datetime, count: int) -> None:
+        self.occurrence_times.append(ts)
+        self.occurrence_counts.append(count)
+        self._minute_index.add(self._minute_bucket(ts))
+        self._minute_index_state = self._index_state()
+
     def to_dict(self) -> dict:
         """Serializace pro YAML"""
         return {
@@ -295,6 +346,7 @@ class ProblemEntry:
             entry.occurrence_counts = [int(c) for c in raw_counts]
         else:
             entry.occurrence_counts = [1] * len(entry.occurrence_times)
+        entry._rebuild_minute_index()
         
         entry.fingerprints = data.get('fingerprints', [])
         entry.sample_messages = data.get('sample_messages', [])
@@ -324,7 +376,7 @@ class ProblemEntry:
         return entry
 
 
-@dataclass
+@dataclass(slots=True)
 class PeakEntry:
     """Záznam detekovaného peaku"""
     id: str                          # PK-000001 (Peak Known)
@@ -610,6 +662,22 @@ def compute_problem_key(
         DATABASE:batch_processing:connection_pool
         AUTH:card_opening:access_denied
     """
+    return resolve_problem_key(
+        category, app_names, error_type, normalized_message, namespaces
+    )[0]
+
+
+def resolve_problem_key(
+    category: str,
+    app_names: List[str],
+    error_type: str = "",
+    normalized_message: str = "",
+    namespaces: List[str] = None,
+) -> Tuple[str, str, str, str]:
+    """
+    Jako compute_problem_key(), ale vrací i části klíče:
+    (problem_key, flow, error_class, CATEGORY).
+    """
     # DEFENSIVE: Sanitize all inputs
     safe_apps = []
     if app_names:
@@ -625,7 +693,52 @@ def compute_problem_key(
     # Normalize category
     cat = category.upper() if category else 'UNKNOWN'
     
-    return f"{cat}:{flow}:{error_class}"
+    return f"{cat}:{flow}:{error_class}", flow, error_class, cat
+
+
+# Ruční revize pravidel mimo sekci PROBLEM KEY COMPUTATION (např. změna
+# sanitizace vstupů ve volajících) — zvýšit → persistovaná cache se zahodí
+PROBLEM_KEY_RULES_REVISION = 1
+
+
+def _problem_key_rules_version() -> str:
+    """
+    Hash pravidel pro problem_key: zdrojový text celé sekce PROBLEM KEY
+    COMPUTATION (pattern tabulky, extract_*, resolve_problem_key i pomocné
+    funkce a konstanty v sekci) + PROBLEM_KEY_RULES_REVISION.
+
+    Jakákoli změna v sekci → nová verze → persistovaná problem_key cache se
+    zahodí. Bez zdrojového souboru (např. jen .pyc) se hashují tabulky a
+    bytecode extract_* / resolve_problem_key.
+    """
+    digest = hashlib.sha256(f"rev{PROBLEM_KEY_RULES_REVISION}".encode('utf-8'))
+    try:
+        source = Path(__file__).read_text(encoding='utf-8')
+        section = source[source.index('# PROBLEM KEY COMPUTATION'):source.index('\ndef _problem_key_rules_version')]
+        digest.update(section.encode('utf-8'))
+        return digest.hexdigest()[:16]
+    except (OSError, ValueError):
+        pass
+
+    digest.update(repr(list(FLOW_PATTERNS.items())).encode('utf-8'))
+    digest.update(repr(list(ERROR_CLASS_PATTERNS.items())).encode('utf-8'))
+
+    def add_code(code) -> None:
+        digest.update(code.co_code)
+        for const in code.co_consts:
+            if hasattr(const, 'co_code'):
+                add_code(const)  # vnořené comprehension (repr obsahuje adresu)
+            elif isinstance(const, frozenset):
+                digest.update(repr(sorted(const, key=repr)).encode('utf-8'))
+            else:
+                digest.update(repr(const).encode('utf-8'))
+
+    for func in (extract_flow, extract_error_class, resolve_problem_key):
+        add_code(func.__code__)
+    return digest.hexdigest()[:16]
+
+
+PROBLEM_KEY_RULES_VERSION = _problem_key_rules_version()
 
 
 def extract_deployment_label(app_name: str) -> str:
@@ -710,10 +823,28 @@ class ProblemRegistry:
         
         # Fingerprint index (fingerprint → problem_key)
         self.fingerprint_index: Dict[str, str] = {}
+
+        # Problem key cache ("fingerprint|signature" → (problem_key, flow, error_class, CATEGORY))
+        # Persistuje vedle fingerprint indexu, platí jen pro PROBLEM_KEY_RULES_VERSION.
+        # Pořadí = LRU (hit přesune klíč na konec); zapisuje se jen když přibyl /
+        # změnil se záznam — pořadí hitů se uloží s nejbližším takovým zápisem
+        # (rezidentní daemon ho drží v paměti i mezi okny).
+        self.problem_key_cache: Dict[str, Tuple[str, str, str, str]] = {}
+        self._problem_key_cache_dirty = False
+        # Verify mode: i při hitu přepočítá klíč a hlásí rozdíly
+        self.verify_problem_key_cache = os.getenv(
+            'PROBLEM_KEY_CACHE_VERIFY', ''
+        ).strip().lower() in ('1', 'true', 'yes')
         
         # Counters for ID generation
         self._problem_counter = 0
         self._peak_counter = 0
+
+        # Rezidentní proces (regular daemon): update_and_save/refresh nepřečte
+        # YAML znovu, pokud se soubory od posledního load/save nezměnily.
+        self.reuse_unchanged_snapshot = False
+        self._snapshot_signature: Optional[Tuple] = None
+        self.last_refresh_reused = False
         
         # Stats
         self.stats = {
@@ -724,6 +855,9 @@ class ProblemRegistry:
             'problems_updated': 0,
             'new_peaks_added': 0,
             'peaks_updated': 0,
+            'problem_key_cache_hits': 0,
+            'problem_key_cache_misses': 0,
+            'problem_key_cache_mismatches': 0,
         }
     
     # =========================================================================
@@ -734,15 +868,43 @@ class ProblemRegistry:
         self.problems.clear()
         self.peaks.clear()
         self.fingerprint_index.clear()
+        self.problem_key_cache.clear()
+        self._problem_key_cache_dirty = False
         self._problem_counter = 0
         self._peak_counter = 0
         for key in self.stats:
             self.stats[key] = 0
 
+    def _files_signature(self) -> Tuple:
+        """(inode, mtime_ns, size) registry souborů — atomic rename mění inode."""
+        signature = []
+        for name in REGISTRY_SNAPSHOT_FILES:
+            try:
+                st = (self.registry_dir / name).stat()
+            except FileNotFoundError:
+                signature.append((name, None))
+                continue
+            signature.append((name, st.st_ino, st.st_mtime_ns, st.st_size))
+        return tuple(signature)
+
+    def _refresh_unlocked(self) -> bool:
+        """Reload jen když soubory změnil jiný proces (backfill); jinak reset per-run stats."""
+        self.last_refresh_reused = (
+            self.reuse_unchanged_snapshot
+            and self._snapshot_signature is not None
+            and self._snapshot_signature == self._files_signature()
+        )
+        if not self.last_refresh_reused:
+            return self._load_unlocked()
+        for key in PER_RUN_STATS:
+            self.stats[key] = 0
+        return True
+
     def _load_unlocked(self) -> bool:
         """Load all registry files while the caller owns the transaction lock."""
         self.registry_dir.mkdir(parents=True, exist_ok=True)
         self._reset_loaded_state()
+        self._snapshot_signature = None
         
         # Load problems
         problems_file = self.registry_dir / 'known_problems.yaml'
@@ -803,6 +965,9 @@ class ProblemRegistry:
                 
             except Exception as e:
                 print(f"⚠️ Error loading peaks: {e}")
+
+        self._load_problem_key_cache()
+        self._snapshot_signature = self._files_signature()
         
         return True
 
@@ -820,6 +985,22 @@ class ProblemRegistry:
         except Exception as e:
             print(f"⚠️ Error loading registry: {e}")
             return False
+
+    def refresh(self) -> bool:
+        """Like load(), but keeps the in-memory snapshot when files are unchanged
+        (requires ``reuse_unchanged_snapshot``)."""
+        self.registry_dir.mkdir(parents=True, exist_ok=True)
+        transaction_lock = self.registry_dir / '.registry.transaction.lock'
+        try:
+            with open(transaction_lock, 'w') as lock_fd:
+                fcntl.flock(lock_fd.fileno(), fcntl.LOCK_SH)
+                try:
+                    return self._refresh_unlocked()
+                finally:
+                    fcntl.flock(lock_fd.fileno(), fcntl.LOCK_UN)
+        except Exception as e:
+            print(f"⚠️ Error refreshing registry: {e}")
+            return False
     
     def _save_unlocked(self) -> bool:
         """
@@ -872,10 +1053,12 @@ class ProblemRegistry:
                 
                 # Save fingerprint index (atomic)
                 self._save_fingerprint_index()
+                self._save_problem_key_cache()
                 
                 # Check health warnings
                 self._check_health_warnings()
-                
+
+                self._snapshot_signature = self._files_signature()
                 return True
                 
             finally:
@@ -916,7 +1099,7 @@ class ProblemRegistry:
             with open(transaction_lock, 'w') as lock_fd:
                 fcntl.flock(lock_fd.fileno(), fcntl.LOCK_EX)
                 try:
-                    if not self._load_unlocked():
+                    if not self._refresh_unlocked():
                         return False
                     self.update_from_incidents(incidents, event_timestamps)
                     return self._save_unlocked()
@@ -938,7 +1121,7 @@ class ProblemRegistry:
             with open(transaction_lock, 'w') as lock_fd:
                 fcntl.flock(lock_fd.fileno(), fcntl.LOCK_EX)
                 try:
-                    if not self._load_unlocked():
+                    if not self._refresh_unlocked():
                         return False
                     for problem_key, updates in problem_updates.items():
                         entry = self.problems.get(problem_key)
@@ -1142,6 +1325,121 @@ class ProblemRegistry:
         # Atomic write
         self._atomic_write_yaml(filepath, dict(by_problem))
     
+    def _load_problem_key_cache(self):
+        """Načte problem_key cache; jiná verze pravidel / poškozený soubor → prázdná."""
+        filepath = self.registry_dir / 'problem_key_cache.json'
+        if not filepath.exists():
+            return
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Error loading problem key cache: {e}")
+            return
+        if data.get('rules_version') != PROBLEM_KEY_RULES_VERSION:
+            return
+        for key, value in (data.get('entries') or {}).items():
+            if isinstance(value, list) and len(value) == 4:
+                self.problem_key_cache[key] = tuple(value)
+
+    def _save_problem_key_cache(self):
+        """
+        Uloží problem_key cache jako JSON (atomic) — jen když přibyl / změnil se
+        záznam. Nad limit zahodí nejdéle nepoužité (začátek dict = LRU).
+        """
+        if not self._problem_key_cache_dirty:
+            return
+        filepath = self.registry_dir / 'problem_key_cache.json'
+        overflow = len(self.problem_key_cache) - MAX_PROBLEM_KEY_CACHE_ENTRIES
+        if overflow > 0:
+            for key in list(self.problem_key_cache)[:overflow]:
+                del self.problem_key_cache[key]
+
+        tmp_path = filepath.with_suffix('.json.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(
+                    {
+                        'rules_version': PROBLEM_KEY_RULES_VERSION,
+                        'entries': self.problem_key_cache,
+                    },
+                    f,
+                    ensure_ascii=False,
+                    separators=(',', ':'),
+                )
+            os.replace(tmp_path, filepath)
+            self._problem_key_cache_dirty = False
+        except Exception:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            raise
+
+    @staticmethod
+    def _problem_key_cache_key(
+        fingerprint: str,
+        category: str,
+        apps: List[str],
+        namespaces: List[str],
+        error_type: str,
+        normalized_message: str,
+    ) -> str:
+        """fingerprint + hash všech vstupů compute_problem_key (pořadí apps je významné)."""
+        def join(values) -> str:
+            return '\x1e'.join(
+                v if isinstance(v, str) else '\x00' + repr(v) for v in values or ()
+            )
+
+        signature = hashlib.sha1('\x1f'.join((
+            category or '', join(apps), join(namespaces),
+            error_type or '', normalized_message or '',
+        )).encode('utf-8', 'surrogatepass')).hexdigest()[:20]
+        return f"{fingerprint}|{signature}"
+
+    def resolve_problem_key(
+        self,
+        fingerprint: str,
+        category: str,
+        apps: List[str],
+        namespaces: List[str],
+        error_type: str,
+        normalized_message: str,
+    ) -> Tuple[str, str, str, str]:
+        """
+        (problem_key, flow, error_class, CATEGORY) přes persistovanou cache.
+
+        Hit = jeden dict lookup místo extract_flow/extract_error_class.
+        Verify mode (PROBLEM_KEY_CACHE_VERIFY=1) přepočítá i hity a rozdíly
+        vypíše + opraví v cache.
+        """
+        key = self._problem_key_cache_key(
+            fingerprint, category, apps, namespaces, error_type, normalized_message
+        )
+        cached = self.problem_key_cache.pop(key, None)
+        if cached is not None and not self.verify_problem_key_cache:
+            self.stats['problem_key_cache_hits'] += 1
+            # Re-insert → konec dict = naposledy použitý (eviction podle LRU)
+            self.problem_key_cache[key] = cached
+            return cached
+
+        resolved = resolve_problem_key(
+            category=category,
+            app_names=apps,
+            error_type=error_type,
+            normalized_message=normalized_message,
+            namespaces=namespaces,
+        )
+        if cached is None:
+            self.stats['problem_key_cache_misses'] += 1
+            self._problem_key_cache_dirty = True
+        elif tuple(cached) != resolved:
+            self.stats['problem_key_cache_mismatches'] += 1
+            self._problem_key_cache_dirty = True
+            print(f"⚠️ problem_key cache mismatch for {fingerprint}: {cached[0]} != {resolved[0]}")
+        else:
+            self.stats['problem_key_cache_hits'] += 1
+        self.problem_key_cache[key] = resolved
+        return resolved
+
     def _check_health_warnings(self):
         """Kontroluje zdraví registry a vypisuje varování."""
         warnings = []
@@ -1252,14 +1550,10 @@ class ProblemRegistry:
                 first_ts = datetime.utcnow()
                 last_ts = first_ts
             
-            # Compute problem_key
-            problem_key = compute_problem_key(
-                category=category,
-                app_names=apps,
-                error_type=error_type,
-                normalized_message=normalized_message,
-                namespaces=namespaces,
-            )
+            # Compute problem_key (cache hit pro známé fingerprinty)
+            problem_key = self.resolve_problem_key(
+                fingerprint, category, apps, namespaces, error_type, normalized_message,
+            )[0]
             
             # Update or create problem
             if problem_key in self.problems:
@@ -1318,16 +1612,10 @@ class ProblemRegistry:
         # Without this, repeated backfill runs (--force) for the same window
         # would accumulate occurrences and duplicate timestamps each run.
         if last_ts:
-            ts_bucket = last_ts.replace(second=0, microsecond=0)
-            existing_buckets = {
-                t.replace(second=0, microsecond=0) if hasattr(t, "replace") else t
-                for t in problem.occurrence_times
-            }
-            if ts_bucket not in existing_buckets:
+            if not problem.has_occurrence_minute(last_ts):
                 # Genuinely new window — count it
                 problem.occurrences += count
-                problem.occurrence_times.append(last_ts)
-                problem.occurrence_counts.append(count)
+                problem.record_occurrence(last_ts, count)
             # else: same minute already recorded -> idempotent re-run, skip
         else:
             # No timestamp -> always count (e.g. regular phase rows)
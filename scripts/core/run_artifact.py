@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Run Artifact - strojově čitelný výstup jednoho běhu
+===================================================
+
+Každý backfill / regular běh vedle textových reportů uloží JEDEN verzovaný
+artefakt ``run_artifact_<kind>_<YYYYmmdd_HHMMSS>.json`` se vším, co čtou
+downstream exportéry a publishery:
+
+    - incident_analysis   denní operational souhrn (severity, top incidenty)
+    - problem_report      executive summary, bloky PROBLEM DETAILS, top problémy
+    - peaks               řádky peaks tabulky (PeakTableRow)
+
+Publishery tak nemusí regexem parsovat textové reporty ani nic přepočítávat.
+Backfill i regular mohou psát do stejného reports/ adresáře, proto čtenáři
+vybírají podle ``kind`` (denní publishery/exportér čtou ``backfill``) a berou
+jen nejnovější artefakt; když chybí sekce nebo je starší než textový report,
+spadnou na text. Oba běhy drží jen posledních N artefaktů
+(RUN_ARTIFACT_KEEP_REGULAR / RUN_ARTIFACT_KEEP_BACKFILL).
+
+Formát:
+    RUN_ARTIFACT_FORMAT=json (default) | msgpack | both
+    msgpack je volitelná závislost; bez ní se vždy zapíše JSON.
+
+Kompatibilita:
+    ``schema_version`` se zvyšuje jen při nekompatibilní změně struktury.
+    Přidání nové sekce / klíče verzi nemění — čtenáři musí neznámé klíče
+    ignorovat. Artefakt novější verze než ``SCHEMA_VERSION`` loader odmítne
+    (``RunArtifactError``) a publisher spadne na legacy text.
+"""
+
+import json
+import os
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    msgpack = None
+    HAS_MSGPACK = False
+
+SCHEMA = 'ai-log-analyzer.run-artifact'
+SCHEMA_VERSION = 1
+ARTIFACT_PREFIX = 'run_artifact'
+SECTIONS = ('incident_analysis', 'problem_report', 'peaks')
+_SUFFIXES = ('.msgpack', '.json')
+
+
+class RunArtifactError(ValueError):
+    """Artefakt nejde načíst (poškozený soubor / nepodporovaná verze schématu)."""
+
+
+def _artifact_format() -> str:
+    fmt = os.getenv('RUN_ARTIFACT_FORMAT', 'json').strip().lower()
+    return fmt if fmt in ('json', 'msgpack', 'both') else 'json'
+
+
+def to_plain(value: Any) -> Any:
+    """Převede hodnotu na JSON/msgpack-kompatibilní strukturu (oba formáty stejně)."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return to_plain(value.value)
+    if isinstance(value, dict):
+        return {str(key): to_plain(item) for key, item in value.items()}
+    if isinstance(value, (set, frozenset)):
+        return sorted(to_plain(item) for item in value)
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    if is_dataclass(value) and not isinstance(value, type):
+        return to_plain(asdict(value))
+    if hasattr(value, 'to_dict'):
+        return to_plain(value.to_dict())
+    return str(value)
+
+
+def build_run_artifact(
+    kind: str,
+    run_id: str = '',
+    period_start: Optional[datetime] = None,
+    period_end: Optional[datetime] = None,
+    incident_analysis: Optional[Dict[str, Any]] = None,
+    problem_report: Optional[Dict[str, Any]] = None,
+    peaks: Optional[List[Dict[str, Any]]] = None,
+    generated_at: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Sestaví artefakt; chybějící sekce jsou ``None`` (ne vynechané)."""
+    return to_plain({
+        'schema': SCHEMA,
+        'schema_version': SCHEMA_VERSION,
+        'kind': kind,
+        'run_id': run_id,
+        'generated_at': generated_at or datetime.now(),
+        'period': {'start': period_start, 'end': period_end},
+        'incident_analysis': incident_analysis,
+        'problem_report': problem_report,
+        'peaks': peaks,
+    })
+
+
+def _write_atomic(path: Path, payload: bytes) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def write_run_artifact(
+    artifact: Dict[str, Any],
+    output_dir: str,
+    fmt: Optional[str] = None,
+    timestamp: Optional[str] = None,
+    keep: Optional[int] = None,
+) -> Dict[str, str]:
+    """
+    Uloží artefakt (atomicky — publisher může číst souběžně).
+
+    ``keep`` ponechá jen N nejnovějších artefaktů stejného ``kind`` (15min
+    regular běhy by jinak plnily reports/ 96 soubory denně).
+
+    Returns:
+        Dict[format, filepath]
+    """
+    fmt = fmt or _artifact_format()
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+    stem = f"{ARTIFACT_PREFIX}_{artifact.get('kind', 'run')}_{timestamp}"
+    files = {}
+
+    if fmt in ('msgpack', 'both') and HAS_MSGPACK:
+        path = output_path / f"{stem}.msgpack"
+        _write_atomic(path, msgpack.packb(artifact, use_bin_type=True))
+        files['msgpack'] = str(path)
+
+    if fmt in ('json', 'both') or not files:
+        path = output_path / f"{stem}.json"
+        _write_atomic(path, json.dumps(artifact, indent=2, ensure_ascii=False).encode('utf-8'))
+        files['json'] = str(path)
+
+    if keep is not None:
+        prune_run_artifacts(output_dir, artifact.get('kind', 'run'), keep)
+
+    return files
+
+
+def prune_run_artifacts(reports_dir: str, kind: str, keep: int) -> int:
+    """Smaže všechny kromě ``keep`` nejnovějších artefaktů daného kind (všechny formáty)."""
+    stems = sorted(
+        {path.stem for suffix in _SUFFIXES
+         for path in Path(reports_dir).glob(f"{ARTIFACT_PREFIX}_{kind}_*{suffix}")},
+        key=lambda stem: _artifact_sort_key(Path(stem)),
+        reverse=True,
+    )
+    removed = 0
+    for stem in stems[max(keep, 1):]:
+        for suffix in _SUFFIXES:
+            path = Path(reports_dir) / f"{stem}{suffix}"
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                continue
+    return removed
+
+
+def load_run_artifact(path: str) -> Dict[str, Any]:
+    """Načte artefakt z .json / .msgpack a ověří schéma."""
+    path = Path(path)
+    is_msgpack = path.suffix == '.msgpack'
+    if is_msgpack and not HAS_MSGPACK:
+        raise RunArtifactError(f"msgpack not installed, cannot read {path.name}")
+    try:
+        if is_msgpack:
+            artifact = msgpack.unpackb(path.read_bytes(), raw=False)
+        else:
+            artifact = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError) as e:
+        raise RunArtifactError(f"Cannot read run artifact {path}: {e}") from e
+
+    if not isinstance(artifact, dict) or artifact.get('schema') != SCHEMA:
+        raise RunArtifactError(f"{path.name} is not a run artifact")
+    version = artifact.get('schema_version')
+    if not isinstance(version, int) or version > SCHEMA_VERSION:
+        raise RunArtifactError(
+            f"{path.name}: unsupported schema_version {version} (supported <= {SCHEMA_VERSION})"
+        )
+    return artifact
+
+
+def _artifact_sort_key(path: Path) -> str:
+    # run_artifact_<kind>_<YYYYmmdd>_<HHMMSS> → řazení podle času napříč kind
+    return '_'.join(path.stem.rsplit('_', 2)[-2:])
+
+
+def find_run_artifacts(reports_dir: str, kind: Optional[str] = None) -> List[Path]:
+    """Artefakty v adresáři, nejnovější první (pro jeden stem preferuje msgpack)."""
+    reports_path = Path(reports_dir)
+    if not reports_path.is_dir():
+        return []
+
+    by_stem: Dict[str, Path] = {}
+    for suffix in _SUFFIXES:
+        if suffix == '.msgpack' and not HAS_MSGPACK:
+            continue
+        for path in reports_path.glob(f"{ARTIFACT_PREFIX}_{kind or '*'}_*{suffix}"):
+            by_stem.setdefault(path.stem, path)
+    return sorted(by_stem.values(), key=_artifact_sort_key, reverse=True)
+
+
+def load_latest_run_artifact(
+    reports_dir: str,
+    kind: Optional[str] = None,
+    require: Iterable[str] = (),
+    text_glob: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Nejnovější artefakt, pokud je čitelný a má všechny sekce z ``require``.
+
+    Starší artefakty se nezkoušejí — publikovala by se data předchozího běhu.
+    S ``text_glob`` (textové reporty, které by četl fallback) se artefakt
+    použije jen když není starší než nejnovější z nich: zápis artefaktu mohl
+    selhat, zatímco text report novějšího běhu vznikl. None → volající použije
+    legacy textový report.
+    """
+    artifacts = find_run_artifacts(reports_dir, kind)
+    if not artifacts:
+        return None
+    path = artifacts[0]
+    try:
+        artifact = load_run_artifact(path)
+    except RunArtifactError as e:
+        print(f"⚠️ Ignoring run artifact: {e}")
+        return None
+    missing = [section for section in require if not artifact.get(section)]
+    if missing:
+        print(f"⚠️ Ignoring run artifact {path.name}: missing {', '.join(missing)}")
+        return None
+    if text_glob:
+        newest_text = max(
+            (report for report in Path(reports_dir).glob(text_glob)),
+            key=lambda report: report.stat().st_mtime,
+            default=None,
+        )
+        if newest_text is not None and path.stat().st_mtime < newest_text.stat().st_mtime:
+            print(f"⚠️ Ignoring run artifact {path.name}: older than {newest_text.name}")
+            return None
+    artifact['_path'] = str(path)
+    return artifact
@@ -6,15 +6,24 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import re
 import sys
 import uuid
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 
 import psycopg2
+from psycopg2 import sql
 
 
 ADVISORY_LOCK_KEY = 781_190_315
 DEFAULT_RETENTION_DAYS = 90
+FUTURE_PARTITION_MONTHS = 3
+# Fact tables with monthly partitions dropped by retention → deleted_* metric
+RETENTION_PARTITIONED_TABLES = (
+    ("deleted_fact_rows", "error_kind_counts"),
+    ("deleted_namespace_rows", "namespace_error_counts"),
+)
+ROLLUP_TABLES = ("daily_error_kind_rollups", "daily_namespace_rollups")
 
 
 def emit(event: str, **fields) -> None:
@@ -47,7 +56,64 @@ def connect():
     )
 
 
-def _create_rollup_staging(cursor, cutoff_at: datetime) -> tuple[int, int, int, int]:
+def _load_high_water_mark(cursor) -> date | None:
+    """First day not yet rolled up into every rollup table (None = never rolled up)."""
+    cursor.execute(
+        """
+        SELECT rollup_table, rolled_up_before
+        FROM ailog_peak.rollup_watermarks
+        WHERE rollup_table = ANY(%s)
+        FOR UPDATE
+        """,
+        (list(ROLLUP_TABLES),),
+    )
+    marks = dict(cursor.fetchall())
+    if any(table not in marks for table in ROLLUP_TABLES):
+        return None
+    return min(marks.values())
+
+
+def _pending_rollup_days(
+    cursor, cutoff_at: datetime, high_water_mark: date | None
+) -> tuple[list[date], list[date]]:
+    """Days before the cutoff that still have data, split into (new, late).
+
+    Retention drops facts, authority windows and legacy rows once their day is
+    rolled up, so anything left below the high-water mark was written by a
+    replay after the mark moved and its day has to be re-aggregated.
+    """
+    cursor.execute(
+        """
+        SELECT (window_start AT TIME ZONE 'UTC')::DATE AS rollup_date
+        FROM ailog_peak.authoritative_run_windows
+        WHERE window_start < %s
+        UNION
+        SELECT (timestamp AT TIME ZONE 'UTC')::DATE
+        FROM ailog_peak.peak_raw_data
+        WHERE timestamp < %s
+        ORDER BY rollup_date
+        """,
+        (cutoff_at, cutoff_at),
+    )
+    days = [row[0] for row in cursor.fetchall()]
+    if high_water_mark is None:
+        return days, []
+    return (
+        [day for day in days if day >= high_water_mark],
+        [day for day in days if day < high_water_mark],
+    )
+
+
+def _day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def _create_rollup_staging(
+    cursor, cutoff_at: datetime, rollup_days: list[date]
+) -> tuple[int, int, int, int]:
+    # Spodní mez nechá PostgreSQL ořezat partitions, ANY() přeskočí mezery mezi dny
+    lower_at = _day_start(rollup_days[0]) if rollup_days else cutoff_at
+    day_filter = (lower_at, cutoff_at, rollup_days)
     cursor.execute(
         """
         CREATE TEMP TABLE staged_error_kind_rollups ON COMMIT DROP AS
@@ -64,7 +130,9 @@ def _create_rollup_staging(cursor, cutoff_at: datetime) -> tuple[int, int, int,
             MIN(first_event_at) AS first_event_at,
             MAX(last_event_at) AS last_event_at
         FROM ailog_peak.v_complete_error_kind_counts
-        WHERE window_start < %s
+        WHERE window_start >= %s
+          AND window_start < %s
+          AND (window_start AT TIME ZONE 'UTC')::DATE = ANY(%s::DATE[])
         GROUP BY
             (window_start AT TIME ZONE 'UTC')::DATE,
             namespace,
@@ -74,7 +142,7 @@ def _create_rollup_staging(cursor, cutoff_at: datetime) -> tuple[int, int, int,
             category,
             subcategory
         """,
-        (cutoff_at,),
+        day_filter,
     )
     cursor.execute(
         """
@@ -86,10 +154,17 @@ def _create_rollup_staging(cursor, cutoff_at: datetime) -> tuple[int, int, int,
             error_count::BIGINT AS error_count,
             'authoritative_facts'::VARCHAR(30) AS source_kind
         FROM ailog_peak.v_complete_namespace_error_counts
-        WHERE window_start < %s
+        WHERE window_start >= %s
+          AND window_start < %s
+          AND (window_start AT TIME ZONE 'UTC')::DATE = ANY(%s::DATE[])
         """,
-        (cutoff_at,),
+        day_filter,
+    )
+    # Temp tabulka nemá statistiky; bez indexu+ANALYZE plánovač volí nested loop
+    cursor.execute(
+        "CREATE INDEX ON staged_namespace_windows (window_start, namespace)"
     )
+    cursor.execute("ANALYZE staged_namespace_windows")
     cursor.execute(
         """
         INSERT INTO staged_namespace_windows (
@@ -102,7 +177,9 @@ def _create_rollup_staging(cursor, cutoff_at: datetime) -> tuple[int, int, int,
             COALESCE(raw_row.error_count, 0)::BIGINT,
             'legacy_peak_raw_data'
         FROM ailog_peak.peak_raw_data raw_row
-        WHERE raw_row.timestamp < %s
+        WHERE raw_row.timestamp >= %s
+          AND raw_row.timestamp < %s
+          AND (raw_row.timestamp AT TIME ZONE 'UTC')::DATE = ANY(%s::DATE[])
           AND NOT EXISTS (
               SELECT 1
               FROM staged_namespace_windows authoritative
@@ -110,7 +187,7 @@ def _create_rollup_staging(cursor, cutoff_at: datetime) -> tuple[int, int, int,
                 AND authoritative.namespace = raw_row.namespace
           )
         """,
-        (cutoff_at,),
+        day_filter,
     )
     cursor.execute(
         """
@@ -135,9 +212,11 @@ def _create_rollup_staging(cursor, cutoff_at: datetime) -> tuple[int, int, int,
         """
         SELECT COUNT(*), COALESCE(SUM(error_count), 0)
         FROM ailog_peak.v_complete_error_kind_counts
-        WHERE window_start < %s
+        WHERE window_start >= %s
+          AND window_start < %s
+          AND (window_start AT TIME ZONE 'UTC')::DATE = ANY(%s::DATE[])
         """,
-        (cutoff_at,),
+        day_filter,
     )
     source_fact_rows, source_events = cursor.fetchone()
     cursor.execute(
@@ -232,9 +311,10 @@ def _upsert_rollups(cursor) -> int:
 
 
 def _assert_rollup_reconciliation(cursor) -> None:
+    """Compare staged and persisted rollups day by day; fail listing bad days."""
     cursor.execute(
         """
-        SELECT COUNT(*)
+        SELECT staged.rollup_date, COUNT(*)
         FROM staged_error_kind_rollups staged
         LEFT JOIN ailog_peak.daily_error_kind_rollups persisted
           USING (
@@ -246,12 +326,15 @@ def _assert_rollup_reconciliation(cursor) -> None:
            OR persisted.complete_window_count <> staged.complete_window_count
            OR persisted.first_event_at <> staged.first_event_at
            OR persisted.last_event_at <> staged.last_event_at
+        GROUP BY staged.rollup_date
         """
     )
-    error_kind_mismatches = cursor.fetchone()[0]
+    mismatches: dict[date, list[int]] = {}
+    for rollup_date, count in cursor.fetchall():
+        mismatches.setdefault(rollup_date, [0, 0])[0] = int(count)
     cursor.execute(
         """
-        SELECT COUNT(*)
+        SELECT staged.rollup_date, COUNT(*)
         FROM staged_namespace_rollups staged
         LEFT JOIN ailog_peak.daily_namespace_rollups persisted
           USING (rollup_date, namespace)
@@ -259,19 +342,109 @@ def _assert_rollup_reconciliation(cursor) -> None:
            OR persisted.error_count <> staged.error_count
            OR persisted.complete_window_count <> staged.complete_window_count
            OR persisted.source_kind <> staged.source_kind
+        GROUP BY staged.rollup_date
         """
     )
-    namespace_mismatches = cursor.fetchone()[0]
-    if error_kind_mismatches or namespace_mismatches:
-        raise RuntimeError(
-            "Rollup reconciliation failed: "
-            f"error_kind_mismatches={error_kind_mismatches}, "
-            f"namespace_mismatches={namespace_mismatches}"
+    for rollup_date, count in cursor.fetchall():
+        mismatches.setdefault(rollup_date, [0, 0])[1] = int(count)
+    if mismatches:
+        days = ", ".join(
+            f"{rollup_date.isoformat()} (error_kind_mismatches={error_kind}, "
+            f"namespace_mismatches={namespace})"
+            for rollup_date, (error_kind, namespace) in sorted(mismatches.items())
+        )
+        raise RuntimeError(f"Rollup reconciliation failed for {len(mismatches)} day(s): {days}")
+
+
+def _advance_high_water_mark(
+    cursor, maintenance_id: str, cutoff_at: datetime
+) -> date:
+    rolled_up_before = cutoff_at.date()
+    cursor.execute(
+        """
+        INSERT INTO ailog_peak.rollup_watermarks (
+            rollup_table, rolled_up_before, maintenance_id, updated_at
+        )
+        SELECT rollup_table, %s, %s, NOW()
+        FROM UNNEST(%s::VARCHAR[]) AS rollup_table
+        ON CONFLICT (rollup_table) DO UPDATE SET
+            rolled_up_before = GREATEST(
+                ailog_peak.rollup_watermarks.rolled_up_before,
+                EXCLUDED.rolled_up_before
+            ),
+            maintenance_id = EXCLUDED.maintenance_id,
+            updated_at = EXCLUDED.updated_at
+        """,
+        (rolled_up_before, maintenance_id, list(ROLLUP_TABLES)),
+    )
+    return rolled_up_before
+
+
+def _add_months(month_start: date, months: int) -> date:
+    month_index = month_start.year * 12 + month_start.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _ensure_partitions(cursor, current_time: datetime) -> int:
+    """Create monthly fact partitions from the current month through the horizon."""
+    month_start = current_time.astimezone(timezone.utc).date().replace(day=1)
+    cursor.execute(
+        "SELECT ailog_peak.ensure_fact_partitions(%s, %s)",
+        (month_start, _add_months(month_start, FUTURE_PARTITION_MONTHS + 1)),
+    )
+    row = cursor.fetchone()
+    return int(row[0] or 0) if row else 0
+
+
+def _partition_upper_bound(parent: str, child: str) -> datetime | None:
+    match = re.fullmatch(re.escape(parent) + r"_p(\d{4})(\d{2})", child)
+    if not match:
+        return None
+    month_start = date(int(match.group(1)), int(match.group(2)), 1)
+    upper = _add_months(month_start, 1)
+    return datetime(upper.year, upper.month, upper.day, tzinfo=timezone.utc)
+
+
+def _drop_expired_partitions(cursor, cutoff_at: datetime) -> dict[str, int]:
+    """Detach and drop monthly partitions that lie entirely before the cutoff.
+
+    Runs only after rollup reconciliation; the boundary month and the default
+    partition are left to the row-level DELETE in _delete_expired_rows().
+    """
+    metrics = dict((table, metric) for metric, table in RETENTION_PARTITIONED_TABLES)
+    dropped = {metric: 0 for metric in metrics.values()}
+    dropped["dropped_partitions"] = 0
+    cursor.execute(
+        """
+        SELECT parent.relname, child.relname
+        FROM pg_inherits inheritance
+        JOIN pg_class parent ON parent.oid = inheritance.inhparent
+        JOIN pg_class child ON child.oid = inheritance.inhrelid
+        JOIN pg_namespace schema_row ON schema_row.oid = parent.relnamespace
+        WHERE schema_row.nspname = 'ailog_peak'
+          AND parent.relname = ANY(%s)
+        ORDER BY parent.relname, child.relname
+        """,
+        (list(metrics),),
+    )
+    for parent, child in cursor.fetchall():
+        upper_bound = _partition_upper_bound(parent, child)
+        if upper_bound is None or upper_bound > cutoff_at:
+            continue
+        parent_table = sql.Identifier("ailog_peak", parent)
+        child_table = sql.Identifier("ailog_peak", child)
+        cursor.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(child_table))
+        dropped[metrics[parent]] += int(cursor.fetchone()[0])
+        cursor.execute(
+            sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(parent_table, child_table)
         )
+        cursor.execute(sql.SQL("DROP TABLE {}").format(child_table))
+        dropped["dropped_partitions"] += 1
+    return dropped
 
 
 def _delete_expired_rows(cursor, cutoff_at: datetime) -> dict[str, int]:
-    deleted = {}
+    deleted = _drop_expired_partitions(cursor, cutoff_at)
     for metric, table, column in (
         ("deleted_fact_rows", "error_kind_counts", "window_start"),
         ("deleted_namespace_rows", "namespace_error_counts", "window_start"),
@@ -280,13 +453,20 @@ def _delete_expired_rows(cursor, cutoff_at: datetime) -> dict[str, int]:
             f"DELETE FROM ailog_peak.{table} WHERE {column} < %s",
             (cutoff_at,),
         )
-        deleted[metric] = cursor.rowcount
+        deleted[metric] += cursor.rowcount
 
     cursor.execute(
         "DELETE FROM ailog_peak.peak_raw_data WHERE timestamp < %s",
         (cutoff_at,),
     )
     deleted["deleted_peak_raw_rows"] = cursor.rowcount
+
+    # Bez namespace faktů by okno v baseline vypadalo jako nulový bucket
+    cursor.execute(
+        "DELETE FROM ailog_peak.authoritative_run_windows WHERE window_start < %s",
+        (cutoff_at,),
+    )
+    deleted["deleted_authority_windows"] = cursor.rowcount
     return deleted
 
 
@@ -327,16 +507,24 @@ def run_maintenance(
                 """,
                 (maintenance_id, cutoff_at),
             )
+            created_partitions = _ensure_partitions(cursor, current_time)
+            high_water_mark = _load_high_water_mark(cursor)
+            new_days, late_days = _pending_rollup_days(cursor, cutoff_at, high_water_mark)
             (
                 source_fact_rows,
                 source_events,
                 legacy_raw_rows,
                 legacy_raw_events,
-            ) = _create_rollup_staging(cursor, cutoff_at)
+            ) = _create_rollup_staging(cursor, cutoff_at, sorted(late_days + new_days))
             rolled_up_rows = _upsert_rollups(cursor)
             _assert_rollup_reconciliation(cursor)
+            rolled_up_before = _advance_high_water_mark(cursor, maintenance_id, cutoff_at)
             deleted = _delete_expired_rows(cursor, cutoff_at)
             result.update(
+                created_partitions=created_partitions,
+                rollup_days=len(new_days),
+                late_rollup_days=len(late_days),
+                rolled_up_before=rolled_up_before.isoformat(),
                 source_fact_rows=source_fact_rows,
                 source_events=source_events,
                 legacy_raw_rows=legacy_raw_rows,
@@ -354,6 +542,8 @@ def run_maintenance(
                     deleted_fact_rows = %s,
                     deleted_namespace_rows = %s,
                     deleted_peak_raw_rows = %s,
+                    rollup_days = %s,
+                    late_rollup_days = %s,
                     completed_at = NOW()
                 WHERE maintenance_id = %s
                 """,
@@ -364,6 +554,8 @@ def run_maintenance(
                     deleted["deleted_fact_rows"],
                     deleted["deleted_namespace_rows"],
                     deleted["deleted_peak_raw_rows"],
+                    len(new_days),
+                    len(late_days),
                     maintenance_id,
                 ),
             )
@@ -404,6 +596,27 @@ def run_maintenance(
         connection.close()
 
 
+def ensure_partitions(connection_factory=connect, now: datetime | None = None) -> int:
+    """Partition-only maintenance mode: create upcoming monthly fact partitions."""
+    current_time = now or datetime.now(timezone.utc)
+    if current_time.tzinfo is None:
+        raise ValueError("now must be timezone-aware")
+    connection = connection_factory()
+    try:
+        connection.autocommit = False
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (ADVISORY_LOCK_KEY,))
+            created = _ensure_partitions(cursor, current_time)
+        connection.commit()
+        emit("partitions_ensured", created_partitions=created)
+        return created
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
 def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument(
@@ -413,12 +626,20 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         help="Days of fine-grained facts to retain (default: %(default)s)",
     )
     parser.add_argument("--dry-run", action="store_true", help="Roll back all changes after validation")
+    parser.add_argument(
+        "--partitions-only",
+        action="store_true",
+        help="Only create upcoming monthly fact partitions (no rollup/retention)",
+    )
     return parser.parse_args(argv)
 
 
 def main(argv: list[str] | None = None) -> int:
     args = parse_args(argv)
     try:
+        if args.partitions_only:
+            ensure_partitions()
+            return 0
         run_maintenance(retention_days=args.retention_days, dry_run=args.dry_run)
     except Exception as exc:
         print(f"Data maintenance failed: {exc}", file=sys.stderr)
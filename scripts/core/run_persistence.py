@@ -12,6 +12,8 @@ from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tupl
 
 
 WINDOW_MINUTES = 15
+# Serializuje přepočet authoritative_run_windows mezi souběžnými běhy
+AUTHORITY_LOCK_KEY = 781_190_316
 
 
 class PersistenceInvariantError(RuntimeError):
@@ -273,6 +275,52 @@ def _default_execute_values(cursor, statement: str, rows: Sequence[tuple], page_
     execute_values(cursor, statement, rows, page_size=page_size)
 
 
+def refresh_authoritative_windows(cursor, run_id: str) -> int:
+    """Recompute the authoritative run for windows touched by run_id or runs it superseded.
+
+    Same ranking as the former v_authoritative_run_windows view (latest
+    completed, non-superseded run wins), but limited to the affected windows.
+    """
+    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (AUTHORITY_LOCK_KEY,))
+    cursor.execute(
+        """
+        SELECT DISTINCT fact_row.window_start
+        FROM ailog_peak.namespace_error_counts fact_row
+        JOIN ailog_peak.analysis_runs run_row ON run_row.run_id = fact_row.run_id
+        WHERE run_row.run_id = %s OR run_row.superseded_by_run_id = %s
+        """,
+        (run_id, run_id),
+    )
+    window_starts = [row[0] for row in cursor.fetchall()]
+    if not window_starts:
+        return 0
+    cursor.execute(
+        "DELETE FROM ailog_peak.authoritative_run_windows WHERE window_start = ANY(%s)",
+        (window_starts,),
+    )
+    cursor.execute(
+        """
+        INSERT INTO ailog_peak.authoritative_run_windows (window_start, run_id)
+        SELECT DISTINCT ON (candidate.window_start)
+            candidate.window_start, candidate.run_id
+        FROM (
+            SELECT DISTINCT run_id, window_start
+            FROM ailog_peak.namespace_error_counts
+            WHERE window_start = ANY(%s)
+        ) candidate
+        JOIN ailog_peak.analysis_runs run_row ON run_row.run_id = candidate.run_id
+        WHERE run_row.status = 'complete'
+          AND run_row.superseded_by_run_id IS NULL
+        ORDER BY candidate.window_start,
+                 run_row.completed_at DESC NULLS LAST,
+                 run_row.started_at DESC,
+                 run_row.run_id DESC
+        """,
+        (window_starts,),
+    )
+    return cursor.rowcount
+
+
 def persist_analysis_run(
     connection_factory: Callable[[], Any],
     collection,
@@ -523,6 +571,7 @@ def persist_analysis_run(
         )
         if cursor.rowcount != 1:
             raise PersistenceInvariantError('running ledger row was not completed exactly once')
+        authoritative_windows = refresh_authoritative_windows(cursor, run_id)
         connection.commit()
         return {
             'persisted_events': persisted_event_count,
@@ -530,6 +579,7 @@ def persist_analysis_run(
             'namespace_rows': len(namespace_rows),
             'incident_rows': len(incident_rows),
             'detection_rows': len(detection_rows),
+            'authoritative_windows': authoritative_windows,
         }
     except Exception as exc:
         connection.rollback()
@@ -550,4 +600,60 @@ def persist_analysis_run(
         raise
     finally:
         cursor.close()
-        connection.close()
\ No newline at end of file
+        connection.close()
+
+
+def persist_phase_metrics(
+    connection_factory: Callable[[], Any],
+    run_id: str,
+    phase_metrics: Iterable[Dict[str, Any]],
+    execute_values_fn: Optional[Callable[..., None]] = None,
+) -> int:
+    """Upsert per-phase spans (PhaseSpans.as_dicts()) for an already persisted run."""
+    rows = [
+        (
+            run_id,
+            str(metric['phase'])[:60],
+            int(metric['seq']),
+            max(0.0, float(metric.get('wall_ms') or 0.0)),
+            metric.get('rss_start_mb'),
+            metric.get('rss_delta_mb'),
+            metric.get('records'),
+            metric.get('fingerprints'),
+        )
+        for metric in phase_metrics
+    ]
+    if not rows:
+        return 0
+    execute_values_fn = execute_values_fn or _default_execute_values
+
+    connection = connection_factory()
+    cursor = connection.cursor()
+    try:
+        execute_values_fn(
+            cursor,
+            """
+            INSERT INTO ailog_peak.run_phase_metrics (
+                run_id, phase, seq, wall_ms, rss_start_mb, rss_delta_mb,
+                record_count, fingerprint_count
+            ) VALUES %s
+            ON CONFLICT (run_id, phase) DO UPDATE SET
+                seq = EXCLUDED.seq,
+                wall_ms = EXCLUDED.wall_ms,
+                rss_start_mb = EXCLUDED.rss_start_mb,
+                rss_delta_mb = EXCLUDED.rss_delta_mb,
+                record_count = EXCLUDED.record_count,
+                fingerprint_count = EXCLUDED.fingerprint_count,
+                recorded_at = NOW()
+            """,
+            rows,
+            page_size=500,
+        )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+    return len(rows)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Run Profiler - opt-in profilování jednoho běhu přes env
+======================================================
+
+PROFILE_RUN=cpu    → vzorkovací profiler (vlákno čte sys._current_frames()
+                     každých PROFILE_INTERVAL_MS, default 10 ms), výstup je
+                     collapsed-stack soubor pro flamegraph.pl / speedscope
+PROFILE_RUN=alloc  → tracemalloc (PROFILE_TRACEMALLOC_FRAMES, default 16):
+                     collapsed stack živých alokací (bajty) + top report.
+                     Snapshot se bere na hranicích fází (``alloc_checkpoint``
+                     z PhaseSpans) a drží se ten s nejvyšší traced pamětí —
+                     na konci běhu už aggregator / pipeline stav neexistuje.
+
+Režijní náklady: cpu vzorkování je levné (jednotky % při 10 ms). alloc je
+drahé — tracemalloc s 16 rámci zpomalí alokačně náročné fáze řádově (~10×
+na streaming finalize benchi) a každý živý blok nese traceback navíc, takže
+RSS výrazně roste. alloc proto jen pro jednorázový diagnostický běh s
+rezervou v limitech podu a v 15min okně, ne trvale zapnutý.
+
+Bez PROFILE_RUN je ``profile_run()`` no-op. Výstupy jdou na registry volume
+(``$REGISTRY_DIR/profiles``, vedle exports), aby přežily restart podu.
+Chyba při zápisu profilu běh nikdy neshodí.
+
+Použití:
+    with profile_run('regular_phase'):
+        result = run_regular_phase(...)
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+PROFILE_MODES = ('cpu', 'alloc')
+DEFAULT_INTERVAL_MS = 10.0
+DEFAULT_TRACEMALLOC_FRAMES = 16
+TOP_REPORT_LIMIT = 30
+
+
+def _profile_mode() -> Optional[str]:
+    mode = os.getenv('PROFILE_RUN', '').strip().lower()
+    if not mode or mode in {'0', 'false', 'no', 'off'}:
+        return None
+    if mode not in PROFILE_MODES:
+        print(f"   ⚠️ PROFILE_RUN={mode!r} not supported (use cpu|alloc), profiling disabled")
+        return None
+    return mode
+
+
+def default_profile_dir() -> Path:
+    registry_base = os.getenv('REGISTRY_DIR') or str(Path(__file__).resolve().parents[2] / 'registry')
+    return Path(registry_base) / 'profiles'
+
+
+def _frame_label(filename: str, name: str, lineno: int) -> str:
+    # ';' je oddělovač rámců v collapsed formátu
+    return f"{name} ({os.path.basename(filename)}:{lineno})".replace(';', ':')
+
+
+# =============================================================================
+# CPU: sampling profiler
+# =============================================================================
+
+class SamplingProfiler:
+    """Vzorkuje zásobníky všech vláken (kromě sebe) do collapsed-stack čítače."""
+
+    def __init__(self, interval_ms: float = DEFAULT_INTERVAL_MS):
+        self.interval = max(1.0, float(interval_ms)) / 1000.0
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        own_ident = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(_frame_label(code.co_filename, code.co_name, code.co_firstlineno))
+                frame = frame.f_back
+            stack.append(names.get(ident, f'thread-{ident}').replace(';', ':'))
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> 'SamplingProfiler':
+        self._thread = threading.Thread(target=self._loop, name='run-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write_collapsed(self, path: Path) -> None:
+        with open(path, 'w', encoding='utf-8') as handle:
+            for stack, count in self.stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+
+    def top_report(self, limit: int = TOP_REPORT_LIMIT) -> str:
+        """Self/total vzorky per funkce (leaf = self)."""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')[1:]  # bez jména vlákna
+            if not frames:
+                continue
+            self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        total = sum(self.stacks.values()) or 1
+        lines = [
+            f"CPU samples: {self.samples} ticks, {total} stacks, interval {self.interval * 1000:.0f} ms",
+            '',
+            f"{'self%':>7} {'total%':>7}  function",
+        ]
+        for frame, count in self_counts.most_common(limit):
+            lines.append(f"{100 * count / total:6.1f}% {100 * total_counts[frame] / total:6.1f}%  {frame}")
+        return '\n'.join(lines) + '\n'
+
+
+# =============================================================================
+# ALLOC: tracemalloc snapshot
+# =============================================================================
+
+def _write_alloc_collapsed(snapshot: tracemalloc.Snapshot, path: Path) -> None:
+    by_stack: Dict[str, int] = Counter()
+    for stat in snapshot.statistics('traceback'):
+        # tracemalloc drží traceback od nejnovějšího rámce → otočit na root-first
+        frames = [
+            f"{os.path.basename(frame.filename)}:{frame.lineno}".replace(';', ':')
+            for frame in stat.traceback
+        ]
+        by_stack[';'.join(reversed(frames))] += stat.size
+    with open(path, 'w', encoding='utf-8') as handle:
+        for stack, size in sorted(by_stack.items(), key=lambda item: -item[1]):
+            handle.write(f"{stack} {size}\n")
+
+
+class _AllocCheckpoints:
+    """Snapshot z checkpointu s nejvyšší traced pamětí (aktivní jen v profile_run alloc)."""
+
+    def __init__(self):
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.label = ''
+        self.traced_bytes = -1
+        self.count = 0
+
+
+_ALLOC_CHECKPOINTS: Optional[_AllocCheckpoints] = None
+
+
+def alloc_checkpoint(label: str) -> None:
+    """
+    Hranice fáze (PhaseSpans): když je traced paměť zatím nejvyšší, podrží
+    si snapshot. Mimo PROFILE_RUN=alloc no-op. Snapshot sám se netrasuje,
+    takže držený snapshot další měření nezkresluje.
+    """
+    checkpoints = _ALLOC_CHECKPOINTS
+    if checkpoints is None or not tracemalloc.is_tracing():
+        return
+    checkpoints.count += 1
+    traced = tracemalloc.get_traced_memory()[0]
+    if traced > checkpoints.traced_bytes:
+        checkpoints.snapshot = tracemalloc.take_snapshot()
+        checkpoints.traced_bytes = traced
+        checkpoints.label = label
+
+
+def _alloc_report(
+    snapshot: tracemalloc.Snapshot,
+    peak_bytes: int,
+    label: str = 'end of run',
+    checkpoints: int = 1,
+    limit: int = TOP_REPORT_LIMIT,
+) -> str:
+    stats = snapshot.statistics('lineno')
+    total = sum(stat.size for stat in stats)
+    lines = [
+        f"Live allocations at '{label}' (highest of {checkpoints} checkpoint(s)): "
+        f"{total / 1024 / 1024:.1f} MB (traced peak {peak_bytes / 1024 / 1024:.1f} MB)",
+        '',
+        f"{'size_kb':>10} {'count':>9}  location",
+    ]
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:10.1f} {stat.count:9d}  {frame.filename}:{frame.lineno}")
+    return '\n'.join(lines) + '\n'
+
+
+# =============================================================================
+# ENTRYPOINT
+# =============================================================================
+
+@contextmanager
+def profile_run(label: str, output_dir: Optional[str] = None) -> Iterator[Optional[str]]:
+    """Obalí běh profilerem dle PROFILE_RUN; yield = režim (nebo None)."""
+    mode = _profile_mode()
+    if mode is None:
+        yield None
+        return
+
+    global _ALLOC_CHECKPOINTS
+    started = time.perf_counter()
+    profiler: Optional[SamplingProfiler] = None
+    started_tracemalloc = False
+    if mode == 'cpu':
+        profiler = SamplingProfiler(float(os.getenv('PROFILE_INTERVAL_MS', DEFAULT_INTERVAL_MS))).start()
+    else:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(int(os.getenv('PROFILE_TRACEMALLOC_FRAMES', DEFAULT_TRACEMALLOC_FRAMES)))
+            started_tracemalloc = True
+        _ALLOC_CHECKPOINTS = _AllocCheckpoints()
+    print(f"🔬 Profiling run ({mode})")
+
+    try:
+        yield mode
+    finally:
+        checkpoints = _ALLOC_CHECKPOINTS
+        snapshot = None
+        peak_bytes = 0
+        if profiler is not None:
+            profiler.stop()
+        elif tracemalloc.is_tracing():
+            alloc_checkpoint('end of run')
+            snapshot = checkpoints.snapshot
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            if started_tracemalloc:
+                tracemalloc.stop()
+        _ALLOC_CHECKPOINTS = None
+        try:
+            target_dir = Path(output_dir) if output_dir else default_profile_dir()
+            target_dir.mkdir(parents=True, exist_ok=True)
+            stem = f"{label}-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}.{mode}"
+            collapsed_path = target_dir / f"{stem}.collapsed"
+            report_path = target_dir / f"{stem}.txt"
+            if profiler is not None:
+                profiler.write_collapsed(collapsed_path)
+                report_path.write_text(profiler.top_report(), encoding='utf-8')
+            elif snapshot is not None:
+                snapshot = snapshot.filter_traces((
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, __file__),
+                ))
+                _write_alloc_collapsed(snapshot, collapsed_path)
+                report_path.write_text(
+                    _alloc_report(snapshot, peak_bytes, checkpoints.label, checkpoints.count),
+                    encoding='utf-8',
+                )
+            print(
+                f"🔬 Profile ({mode}, {time.perf_counter() - started:.1f}s) → "
+                f"{collapsed_path.name}, {report_path.name} in {target_dir}"
+            )
+        except Exception as e:
+            print(f"   ⚠️ Profile write failed (non-blocking): {type(e).__name__}: {e}")
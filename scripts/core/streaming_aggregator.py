@@ -20,6 +20,11 @@ BIT-IDENTICKÉ výsledky jako `pipeline.run()` nad stejnými logy:
   - první record fp = nejstarší (ES vzestupně) → normalized_message/error_type
   - bounded raw_samples (první 3), versions set
 
+Kompaktní stav: namespace / app / originator stringy a bucket datetimy jsou
+dictionary-encoded (int id, ``_Interner``), per-fp dicty a error_kind_facts
+nesou jen inty (fakty v ``array('q')``). Veřejné atributy se dekódují zpět na
+původní struktury při čtení (viz bench/aggregator_memory_bench.py).
+
 Robustnost vůči pořadí: bucket je ABSOLUTNÍ (floor na WINDOW_MINUTES), takže
 window_idx se dopočítá až ve finalize z globálního minima — nezávisí na tom,
 v jakém pořadí stránky dorazí.
@@ -33,9 +38,15 @@ import gc
 import sqlite3
 import tempfile
 import time
+from array import array
 from collections import Counter, deque
 from datetime import datetime, timedelta
-from typing import Any, Dict, Iterator, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from .trace_sketches import BoundedTraceCounter
+except ImportError:  # importováno holé ze scripts/core (testy, collect skripty)
+    from trace_sketches import BoundedTraceCounter
 
 
 def _ensure_pipeline_on_path() -> None:
@@ -50,38 +61,95 @@ def _floor_bucket(ts: datetime, window_minutes: int) -> datetime:
     return ts.replace(minute=minute, second=0, microsecond=0)
 
 
+def _bucket_end(bucket: datetime, window_minutes: int) -> datetime:
+    # Bucket nepřekročí hodinu (_floor_bucket floruje minutu v rámci hodiny)
+    if bucket.minute + window_minutes >= 60:
+        return bucket.replace(minute=0) + timedelta(hours=1)
+    return bucket + timedelta(minutes=window_minutes)
+
+
+# Packed int klíče: id pole po 32 bitech (ns_bucket: ns|bucket, fakty: bucket|ns|app|fp)
+_ID_BITS = 32
+_ID_MASK = (1 << _ID_BITS) - 1
+_US = timedelta(microseconds=1)
+
+
+class _Interner:
+    """Dictionary encoding hodnota ↔ malé int id (id přidělené v pořadí příchodu).
+
+    Každý namespace / app / originator / bucket se tak v paměti drží jednou
+    a per-fp struktury i error_kind_facts nesou jen inty.
+    """
+
+    __slots__ = ('ids', 'values')
+
+    def __init__(self):
+        self.ids: Dict[Any, int] = {}
+        self.values: List[Any] = []
+
+    def id(self, value: Any) -> int:
+        ident = self.ids.get(value)
+        if ident is None:
+            ident = len(self.values)
+            self.ids[value] = ident
+            self.values.append(value)
+        return ident
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def _decode_counts(counts: Dict[int, int], values: List[Any]) -> Counter:
+    # Counter zachová pořadí vložení → most_common() tie order == pořadí příchodu
+    return Counter({values[ident]: count for ident, count in counts.items()})
+
+
 class _FingerprintAcc:
-    """Bounded per-fingerprint akumulátor. Roste s počtem NS/trace, ne s počtem logů."""
+    """Bounded per-fingerprint akumulátor. Roste s počtem NS/trace, ne s počtem logů.
+
+    Interně kompaktní (int id místo stringů/datetime, viz ``_Interner``);
+    veřejné atributy (window_counts, ns_bucket_counts, *_meas, *_counts) se
+    dekódují na původní struktury při čtení — pipeline.run_streaming je čte
+    jednou per fingerprint.
+    """
 
     __slots__ = (
-        'fingerprint', 'error_type', 'normalized_message',
-        'window_counts', 'ns_bucket_counts', 'ns_meas', 'apps_meas',
+        'fingerprint', 'fp_id', 'error_type', 'normalized_message',
+        '_strings', '_buckets',
+        '_window', '_ns_buckets', '_ns_meas', '_apps_meas',
         'first_seen', 'last_seen',
         'raw_samples',
-        'app_counts', 'ns_counts', 'trace_counts', 'originator_counts',
+        '_app_counts', '_ns_counts', 'trace_counts', '_originator_counts',
         'versions',
         'burst_window', 'burst_max', 'burst_sum', 'burst_n', 'burst_ts_events',
     )
 
-    def __init__(self, fingerprint: str):
+    def __init__(self, fingerprint: str, fp_id: int = 0,
+                 strings: Optional[_Interner] = None, buckets: Optional[_Interner] = None):
         self.fingerprint = fingerprint
+        self.fp_id = fp_id
         self.error_type = ''
         self.normalized_message = ''
-        # Phase B: per-bucket count přes VŠECHNY timestamped recordy (nezávislé na ns)
-        self.window_counts: Dict[datetime, int] = {}
-        # Phase C P93: ns -> {bucket_datetime -> count}, jen truthy namespace
-        self.ns_bucket_counts: Dict[str, Dict[datetime, int]] = {}
-        # Phase B measurement sety (timestamped recordy, raw hodnota vč. None)
-        self.ns_meas: set = set()
-        self.apps_meas: set = set()
+        # Sdílené slovníky agregátoru (ns/app/originator stringy, bucket datetimy)
+        self._strings = strings if strings is not None else _Interner()
+        self._buckets = buckets if buckets is not None else _Interner()
+        # Phase B: bucket_id -> count přes VŠECHNY timestamped recordy (nezávislé na ns)
+        self._window: Dict[int, int] = {}
+        # Phase C P93: (ns_id << 32 | bucket_id) -> count, jen truthy namespace
+        self._ns_buckets: Dict[int, int] = {}
+        # Phase B measurement sety (timestamped recordy, raw hodnota vč. None) — id
+        self._ns_meas: set = set()
+        self._apps_meas: set = set()
         self.first_seen: Optional[datetime] = None
         self.last_seen: Optional[datetime] = None
         self.raw_samples: List[str] = []
-        # Incident Countery (VŠECHNY recordy, jen truthy hodnoty)
-        self.app_counts: Counter = Counter()
-        self.ns_counts: Counter = Counter()
+        # Incident Countery (VŠECHNY recordy, jen truthy hodnoty): id -> count v pořadí příchodu.
+        # trace_id je téměř vždy unikátní → interning by nic neušetřil, zůstává Counter
+        # (nebo BoundedTraceCounter v bounded módu, viz StreamingAggregator.trace_top_k).
+        self._app_counts: Dict[int, int] = {}
+        self._ns_counts: Dict[int, int] = {}
         self.trace_counts: Counter = Counter()
-        self.originator_counts: Counter = Counter()
+        self._originator_counts: Dict[int, int] = {}
         self.versions: set = set()
         # Burst stav (trailing okno) — identické s Phase C _detect_burst
         self.burst_window: deque = deque()
@@ -90,6 +158,77 @@ class _FingerprintAcc:
         self.burst_n: int = 0
         self.burst_ts_events: int = 0  # počet eventů s timestampem (guard < 2)
 
+    # ------------------------------------------------------------ dekódování
+    @property
+    def window_counts(self) -> Dict[datetime, int]:
+        buckets = self._buckets.values
+        return {buckets[bucket_id]: count for bucket_id, count in self._window.items()}
+
+    @property
+    def ns_bucket_counts(self) -> Dict[str, Dict[datetime, int]]:
+        strings, buckets = self._strings.values, self._buckets.values
+        decoded: Dict[str, Dict[datetime, int]] = {}
+        for key, count in self._ns_buckets.items():
+            ns_buckets = decoded.setdefault(strings[key >> _ID_BITS], {})
+            ns_buckets[buckets[key & _ID_MASK]] = count
+        return decoded
+
+    @property
+    def ns_meas(self) -> set:
+        strings = self._strings.values
+        return {strings[ident] for ident in self._ns_meas}
+
+    @property
+    def apps_meas(self) -> set:
+        strings = self._strings.values
+        return {strings[ident] for ident in self._apps_meas}
+
+    @property
+    def app_counts(self) -> Counter:
+        return _decode_counts(self._app_counts, self._strings.values)
+
+    @property
+    def ns_counts(self) -> Counter:
+        return _decode_counts(self._ns_counts, self._strings.values)
+
+    @property
+    def originator_counts(self) -> Counter:
+        return _decode_counts(self._originator_counts, self._strings.values)
+
+
+class _FactTable:
+    """error_kind_facts v kompaktní podobě.
+
+    Klíč (bucket_id, ns_id, app_id, fp_id) je zabalený do jednoho intu,
+    hodnoty leží v ``array('q')``: count a first/last jako µs od začátku
+    bucketu (místo 4-tuple s datetime + 3-prvkového listu na fakt).
+    """
+
+    __slots__ = ('rows', 'counts', 'first_us', 'last_us')
+
+    def __init__(self):
+        self.rows: Dict[int, int] = {}
+        self.counts = array('q')
+        self.first_us = array('q')
+        self.last_us = array('q')
+
+    def add(self, key: int, offset_us: int) -> None:
+        row = self.rows.get(key)
+        if row is None:
+            self.rows[key] = len(self.counts)
+            self.counts.append(1)
+            self.first_us.append(offset_us)
+            self.last_us.append(offset_us)
+            return
+        self.counts[row] += 1
+        if offset_us < self.first_us[row]:
+            self.first_us[row] = offset_us
+        if offset_us > self.last_us[row]:
+            self.last_us[row] = offset_us
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
 
 class StreamingAggregator:
     """
@@ -97,6 +236,7 @@ class StreamingAggregator:
 
     Použití:
         agg = StreamingAggregator(window_minutes=15, burst_window_sec=60)
+        # trace_top_k=1000 → bounded trace countery místo exaktních (viz trace_sketches)
         agg.ingest_page(list_of_error_dicts)   # opakovaně
         agg.finalize()
         # -> předej do pipeline.run_streaming(agg, run_id)
@@ -110,10 +250,19 @@ class StreamingAggregator:
         parser: Any = None,
         sqlite_path: Optional[str] = None,
         spill_details: bool = True,
+        trace_top_k: Optional[int] = None,
+        trace_hll_precision: Optional[int] = None,
     ):
         self.window_minutes = int(window_minutes)
         self.burst_window = timedelta(seconds=int(burst_window_sec))
         self.spill_details = spill_details
+        # Bounded trace countery (Space-Saving top-K + HLL); 0 = exaktní Counter (golden parity)
+        if trace_top_k is None:
+            trace_top_k = int(os.getenv('STREAMING_TRACE_TOPK', '0'))
+        if trace_hll_precision is None:
+            trace_hll_precision = int(os.getenv('STREAMING_TRACE_HLL_PRECISION', '12'))
+        self.trace_top_k = max(0, int(trace_top_k))
+        self.trace_hll_precision = int(trace_hll_precision)
 
         if parser is None:
             _ensure_pipeline_on_path()
@@ -129,8 +278,13 @@ class StreamingAggregator:
         self.min_ts: Optional[datetime] = None
         self.max_ts: Optional[datetime] = None
         self.total_records: int = 0
-        # (15m bucket, namespace, application, fingerprint) -> [count, first, last]
-        self.error_kind_facts: Dict[tuple, List[Any]] = {}
+        # Dictionary encoding sdílené všemi akumulátory + kompaktní fakty
+        # (15m bucket, namespace, application, fingerprint) -> count, first, last
+        self._strings = _Interner()
+        self._buckets = _Interner()
+        self._facts = _FactTable()
+        # Poslední bucket (start, end, id): ES stránky jdou vzestupně → většinou hit
+        self._bucket_cache: Optional[tuple] = None
 
         # Finalizované hodnoty
         self.current_window_start: Optional[datetime] = None
@@ -214,7 +368,9 @@ class StreamingAggregator:
         fp = rec.fingerprint
         acc = self.acc.get(fp)
         if acc is None:
-            acc = _FingerprintAcc(fp)
+            acc = _FingerprintAcc(fp, len(self.fp_order), self._strings, self._buckets)
+            if self.trace_top_k:
+                acc.trace_counts = BoundedTraceCounter(self.trace_top_k, self.trace_hll_precision)
             acc.error_type = getattr(rec, 'error_type', '') or ''
             acc.normalized_message = getattr(rec, 'normalized_message', '') or ''
             self.acc[fp] = acc
@@ -223,18 +379,25 @@ class StreamingAggregator:
         self.total_records += 1
 
         # Incident Countery přes VŠECHNY recordy (i bez timestampu) — jako pipeline.run
+        intern = self._strings.id
         app_name = getattr(rec, 'app_name', None)
+        app_id = intern(app_name)
         if app_name:
-            acc.app_counts[app_name] += 1
+            acc._app_counts[app_id] = acc._app_counts.get(app_id, 0) + 1
         ns = getattr(rec, 'namespace', None)
+        ns_id = intern(ns)
         if ns:
-            acc.ns_counts[ns] += 1
+            acc._ns_counts[ns_id] = acc._ns_counts.get(ns_id, 0) + 1
         trace_id = getattr(rec, 'trace_id', None)
         if trace_id:
-            acc.trace_counts[trace_id] += 1
+            if self.trace_top_k:
+                acc.trace_counts.add(trace_id)
+            else:
+                acc.trace_counts[trace_id] += 1
         originator = getattr(rec, 'originator_application', None)
         if originator:
-            acc.originator_counts[originator] += 1
+            originator_id = intern(originator)
+            acc._originator_counts[originator_id] = acc._originator_counts.get(originator_id, 0) + 1
         version = getattr(rec, 'app_version', None)
         if version and version != 'unknown':
             acc.versions.add(version)
@@ -261,29 +424,29 @@ class StreamingAggregator:
             acc.last_seen = ts
 
         # Phase B measurement sety (timestamped, raw hodnota vč. None) + window count
-        acc.apps_meas.add(app_name)         # match Phase B fp_apps.add(r.app_name)
-        acc.ns_meas.add(ns)                 # match Phase B fp_namespaces.add(r.namespace)
-        bucket = _floor_bucket(ts, self.window_minutes)
-        acc.window_counts[bucket] = acc.window_counts.get(bucket, 0) + 1
-
-        fact_key = (bucket, ns or 'unknown', app_name or 'unknown', fp)
-        fact = self.error_kind_facts.get(fact_key)
-        if fact is None:
-            self.error_kind_facts[fact_key] = [1, ts, ts]
+        acc._apps_meas.add(app_id)          # match Phase B fp_apps.add(r.app_name)
+        acc._ns_meas.add(ns_id)             # match Phase B fp_namespaces.add(r.namespace)
+        cached = self._bucket_cache
+        if cached is not None and ts.tzinfo is cached[0].tzinfo and cached[0] <= ts < cached[1]:
+            bucket, bucket_id = cached[0], cached[2]
         else:
-            fact[0] += 1
-            if ts < fact[1]:
-                fact[1] = ts
-            if ts > fact[2]:
-                fact[2] = ts
+            bucket = _floor_bucket(ts, self.window_minutes)
+            bucket_id = self._buckets.id(bucket)
+            bucket = self._buckets.values[bucket_id]
+            self._bucket_cache = (bucket, _bucket_end(bucket, self.window_minutes), bucket_id)
+        acc._window[bucket_id] = acc._window.get(bucket_id, 0) + 1
+
+        fact_ns = ns_id if ns else intern('unknown')
+        fact_app = app_id if app_name else intern('unknown')
+        self._facts.add(
+            ((bucket_id << _ID_BITS | fact_ns) << _ID_BITS | fact_app) << _ID_BITS | acc.fp_id,
+            (ts - bucket) // _US,
+        )
 
         # Phase C P93: per-ns per-bucket count — jen truthy namespace (== Phase C)
         if ns:
-            ns_buckets = acc.ns_bucket_counts.get(ns)
-            if ns_buckets is None:
-                ns_buckets = {}
-                acc.ns_bucket_counts[ns] = ns_buckets
-            ns_buckets[bucket] = ns_buckets.get(bucket, 0) + 1
+            key = ns_id << _ID_BITS | bucket_id
+            acc._ns_buckets[key] = acc._ns_buckets.get(key, 0) + 1
 
         # Burst inkrementálně (trailing okno, identické s Phase C)
         acc.burst_ts_events += 1
@@ -336,6 +499,64 @@ class StreamingAggregator:
     def fingerprint_count(self) -> int:
         return len(self.acc)
 
+    @property
+    def fact_count(self) -> int:
+        return len(self._facts)
+
+    @property
+    def error_kind_facts(self) -> Dict[tuple, List[Any]]:
+        """(bucket, namespace, application, fingerprint) -> [count, first_ts, last_ts].
+
+        Plně dekódovaná kopie (testy, bench); pipeline čte líně přes
+        iter_error_kind_facts().
+        """
+        return dict(self.iter_error_kind_facts())
+
+    def iter_error_kind_facts(self) -> Iterator[Tuple[tuple, List[Any]]]:
+        """
+        Dekóduje ``_FactTable`` po jednom řádku, seřazeno podle
+        (bucket, namespace, application, fingerprint) — stejně jako
+        ``sorted(error_kind_facts.items())``.
+
+        Řadí se packed int klíče přes ranky id (pořadí hodnot v interneru),
+        takže se nikdy nedrží dekódované tuply / datetime všech faktů naráz.
+        """
+        strings, buckets, facts = self._strings.values, self._buckets.values, self._facts
+        fp_order = self.fp_order
+
+        def ranks(values: List[Any], key=None) -> List[int]:
+            rank = [0] * len(values)
+            for position, ident in enumerate(sorted(range(len(values)), key=key or values.__getitem__)):
+                rank[ident] = position
+            return rank
+
+        # _strings drží i None (namespace bez hodnoty) — ve faktech nikdy není
+        # ('unknown'), jen nesmí rozbít porovnání při řazení
+        bucket_rank, fp_rank = ranks(buckets), ranks(fp_order)
+        string_rank = ranks(strings, key=lambda ident: (strings[ident] is None, strings[ident] or ''))
+
+        def sort_key(key: int) -> int:
+            return (
+                bucket_rank[key >> (3 * _ID_BITS)] << (3 * _ID_BITS)
+                | string_rank[(key >> (2 * _ID_BITS)) & _ID_MASK] << (2 * _ID_BITS)
+                | string_rank[(key >> _ID_BITS) & _ID_MASK] << _ID_BITS
+                | fp_rank[key & _ID_MASK]
+            )
+
+        for key in sorted(facts.rows, key=sort_key):
+            row = facts.rows[key]
+            bucket = buckets[key >> (3 * _ID_BITS)]
+            yield (
+                bucket,
+                strings[(key >> (2 * _ID_BITS)) & _ID_MASK],
+                strings[(key >> _ID_BITS) & _ID_MASK],
+                fp_order[key & _ID_MASK],
+            ), [
+                facts.counts[row],
+                bucket + timedelta(microseconds=facts.first_us[row]),
+                bucket + timedelta(microseconds=facts.last_us[row]),
+            ]
+
     def day_of_week(self) -> int:
         return self.min_ts.weekday() if self.min_ts else 0
 
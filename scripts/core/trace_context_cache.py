@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Trace Context Cache - perzistentní cache pro fetch_trace_context
+================================================================
+
+S REP_TRACE_CONTEXT=1 regular phase každé okno dotahuje všechny levely pro
+reprezentativní trace top patternů. Dlouhé / opakující se trace se tak
+stahovaly okno po okně znovu. Cache (SQLite na registry volume) drží per
+trace_id eventy a pokrytý rozsah [covered_from, covered_to):
+
+    - požadavek uvnitř pokrytí      → hit, bez ES dotazu
+    - požadavek přesahuje doprava   → stáhne se jen delta [covered_to, to)
+      (typicky další okno) a připojí se k uloženým eventům
+    - jinak (nepokryto / mezera)    → plný fetch, záznam se přepíše
+
+Pokrytí končí nejpozději ``snapshot - settle_seconds``: eventy s timestampem
+těsně před koncem okna mohou do ES dorazit se zpožděním, proto se okraj stáhne
+znovu a uložené eventy za covered_to se zahazují (žádné duplicity při merge).
+``snapshot`` je okamžik, ke kterému data dotazu odpovídají — při dotazu nad
+sdíleným PIT hlavního fetche čas otevření PIT (``snapshot_at_fn``), ne čas
+zápisu do cache; jinak by eventy zaindexované po otevření PIT byly vedené jako
+pokryté a delta dalších oken by je už nikdy nestáhla.
+
+Selhání ES (fetch_fn vrátí None) ani trace oříznuté per-trace stropem
+(``truncated_ids_fn``) se do pokrytí nezapisují. Eviction: podle stáří
+(last_used) a celkové velikosti (LRU).
+
+Použití:
+    cache = TraceContextCache(truncated_ids_fn=lambda: LAST_TRACE_CONTEXT_STATS['truncated_ids'])
+    ctx = cache.fetch(fetch_trace_context, trace_ids, date_from, date_to)
+    cache.close()
+"""
+
+import json
+import os
+import sqlite3
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_MAX_MB = float(os.getenv('TRACE_CONTEXT_CACHE_MAX_MB', '64'))
+DEFAULT_MAX_AGE_HOURS = float(os.getenv('TRACE_CONTEXT_CACHE_MAX_AGE_HOURS', '48'))
+DEFAULT_SETTLE_SEC = int(os.getenv('TRACE_CONTEXT_CACHE_SETTLE_SEC', '120'))
+
+FetchFn = Callable[[List[str], str, str], Optional[Dict[str, List[Dict[str, Any]]]]]
+
+
+def default_cache_path() -> Path:
+    registry_base = os.getenv('REGISTRY_DIR') or str(Path(__file__).resolve().parents[2] / 'registry')
+    return Path(registry_base) / 'trace_context_cache.sqlite'
+
+
+def _epoch(value: Any) -> Optional[float]:
+    """ISO string / datetime → epoch sekundy (UTC); None pro neparsovatelné."""
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    else:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _in_range(event: Dict[str, Any], start: float, end: float) -> bool:
+    ts = _epoch(event.get('timestamp'))
+    return ts is not None and start <= ts < end
+
+
+class TraceContextCache:
+    """SQLite cache trace_id → (pokrytý rozsah, eventy všech levelů)."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_mb: float = DEFAULT_MAX_MB,
+        max_age_hours: float = DEFAULT_MAX_AGE_HOURS,
+        settle_seconds: int = DEFAULT_SETTLE_SEC,
+        truncated_ids_fn: Optional[Callable[[], Iterable[str]]] = None,
+        snapshot_at_fn: Optional[Callable[[], Optional[float]]] = None,
+    ):
+        self.path = Path(path) if path else default_cache_path()
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_hours * 3600
+        self.settle_seconds = settle_seconds
+        # Trace, které poslední fetch_fn volání ořízlo (neúplné → nekešovat)
+        self.truncated_ids_fn = truncated_ids_fn
+        # Epoch snapshotu, nad kterým běžel poslední fetch_fn (PIT); None = živý dotaz
+        self.snapshot_at_fn = snapshot_at_fn
+        self.stats = {
+            'hits': 0,
+            'partial_hits': 0,
+            'misses': 0,
+            'es_queries': 0,
+            'bytes_saved': 0,
+            'evicted': 0,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # backfill a regular můžou sdílet volume → čekat na zámek, ne padat
+        self._conn = sqlite3.connect(str(self.path), timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS trace_context ('
+            'trace_id TEXT PRIMARY KEY, covered_from REAL NOT NULL, covered_to REAL NOT NULL, '
+            'events BLOB NOT NULL, raw_bytes INTEGER NOT NULL, last_used REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+    # ------------------------------------------------------------------ storage
+    def _load(self, trace_ids: List[str]) -> Dict[str, Tuple[float, float, List[Dict[str, Any]], int]]:
+        entries = {}
+        for offset in range(0, len(trace_ids), 500):
+            chunk = trace_ids[offset:offset + 500]
+            rows = self._conn.execute(
+                'SELECT trace_id, covered_from, covered_to, events, raw_bytes FROM trace_context '
+                f'WHERE trace_id IN ({",".join("?" * len(chunk))})',
+                chunk,
+            ).fetchall()
+            for trace_id, covered_from, covered_to, blob, raw_bytes in rows:
+                try:
+                    events = json.loads(zlib.decompress(blob))
+                except (zlib.error, ValueError):
+                    continue  # poškozený záznam → chová se jako miss
+                entries[trace_id] = (covered_from, covered_to, events, raw_bytes)
+        return entries
+
+    def _store(self, rows: List[Tuple[str, float, float, List[Dict[str, Any]]]], now: float) -> None:
+        payload = []
+        for trace_id, covered_from, covered_to, events in rows:
+            raw = json.dumps(events, separators=(',', ':'), default=str).encode('utf-8')
+            payload.append((trace_id, covered_from, covered_to, zlib.compress(raw, 6), len(raw), now))
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO trace_context VALUES (?,?,?,?,?,?)', payload
+        )
+
+    def _touch(self, trace_ids: List[str], now: float) -> None:
+        self._conn.executemany(
+            'UPDATE trace_context SET last_used = ? WHERE trace_id = ?',
+            [(now, trace_id) for trace_id in trace_ids],
+        )
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Smaže záznamy starší než max_age a pak LRU, dokud se nevejde do max_bytes."""
+        now = time.time() if now is None else now
+        removed = self._conn.execute(
+            'DELETE FROM trace_context WHERE last_used < ?', (now - self.max_age_seconds,)
+        ).rowcount
+        total = self._conn.execute(
+            'SELECT COALESCE(SUM(LENGTH(events)), 0) FROM trace_context'
+        ).fetchone()[0]
+        if total > self.max_bytes:
+            victims = []
+            for trace_id, size in self._conn.execute(
+                'SELECT trace_id, LENGTH(events) FROM trace_context ORDER BY last_used ASC'
+            ):
+                if total <= self.max_bytes:
+                    break
+                victims.append((trace_id,))
+                total -= size
+            self._conn.executemany('DELETE FROM trace_context WHERE trace_id = ?', victims)
+            removed += len(victims)
+        self._conn.commit()
+        self.stats['evicted'] += removed
+        return removed
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ------------------------------------------------------------------ fetch
+    def fetch(self, fetch_fn: FetchFn, trace_ids: List[str], date_from: Any, date_to: Any) -> Dict[str, List[Dict[str, Any]]]:
+        """Stejný kontrakt jako ``fetch_trace_context``; ES se ptá jen na nepokryté rozsahy."""
+        start, end = _epoch(date_from), _epoch(date_to)
+        ids = [trace_id for trace_id in dict.fromkeys(trace_ids or []) if trace_id]
+        if not ids or start is None or end is None or start >= end:
+            return fetch_fn(trace_ids, date_from, date_to) or {}
+
+        now = time.time()
+        cached = self._load(ids)
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        kept: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+        # (od, do) → trace_ids, které v tom rozsahu potřebují ES
+        pending: Dict[Tuple[float, float], List[str]] = defaultdict(list)
+        touched = []
+        for trace_id in ids:
+            entry = cached.get(trace_id)
+            if entry and entry[0] <= start and end <= entry[1]:
+                covered_from, covered_to, events, raw_bytes = entry
+                out[trace_id] = [event for event in events if _in_range(event, start, end)]
+                self.stats['hits'] += 1
+                self.stats['bytes_saved'] += raw_bytes
+                touched.append(trace_id)
+            elif entry and entry[0] <= start <= entry[1] < end:
+                covered_from, covered_to, events, raw_bytes = entry
+                kept[trace_id] = (covered_from, events)
+                pending[(covered_to, end)].append(trace_id)
+                self.stats['partial_hits'] += 1
+                self.stats['bytes_saved'] += raw_bytes
+            else:
+                pending[(start, end)].append(trace_id)
+                self.stats['misses'] += 1
+
+        writes = []
+        for (range_from, range_to), range_ids in pending.items():
+            fetched = fetch_fn(range_ids, _iso(range_from), _iso(range_to))
+            self.stats['es_queries'] += 1
+            failed = fetched is None
+            truncated = set(self.truncated_ids_fn() or ()) if self.truncated_ids_fn and not failed else set()
+            snapshot_at = self.snapshot_at_fn() if self.snapshot_at_fn else None
+            settled_to = min(now, snapshot_at or now) - self.settle_seconds
+            fetched = fetched or {}
+            for trace_id in range_ids:
+                covered_from, previous = kept.get(trace_id, (range_from, []))
+                events = previous + [event for event in fetched.get(trace_id, []) if _in_range(event, range_from, range_to)]
+                out[trace_id] = [event for event in events if _in_range(event, start, end)]
+                if failed or trace_id in truncated:
+                    continue
+                covered_to = min(range_to, settled_to)
+                if covered_to <= covered_from:
+                    continue
+                writes.append((
+                    trace_id,
+                    covered_from,
+                    covered_to,
+                    [event for event in events if _in_range(event, covered_from, covered_to)],
+                ))
+
+        if writes:
+            self._store(writes, now)
+        if touched:
+            self._touch(touched, now)
+        self._conn.commit()
+        self.evict(now)
+        return {trace_id: events for trace_id, events in out.items() if events}
+
+    def summary(self) -> str:
+        s = self.stats
+        return (
+            f"{s['hits']} hit / {s['partial_hits']} delta / {s['misses']} miss, "
+            f"{s['es_queries']} ES queries, {s['bytes_saved'] / 1024:.0f} KB reused, "
+            f"{s['evicted']} evicted"
+        )
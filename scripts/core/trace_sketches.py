@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Trace Sketches - omezená paměť pro per-fingerprint trace countery
+=================================================================
+
+``_FingerprintAcc.trace_counts`` je v exaktním módu Counter všech trace_id,
+které fingerprint viděl. U fingerprintů s miliony unikátních trace je to
+největší položka stavu, přitom downstream se čte jen ``most_common(10)``,
+heavy-hitter mapa pro overlap (``_problems_share_event_traces``) a počet.
+
+Opt-in bounded mód (STREAMING_TRACE_TOPK > 0) nahradí Counter
+``BoundedTraceCounter``:
+
+    - Space-Saving top-K (Metwally et al. 2005): ``capacity`` monitorovaných
+      trace. Pro N eventů fingerprintu platí
+          skutečný_počet <= odhad <= skutečný_počet + error,  error <= N / K
+      a každý trace se skutečným počtem > N / K v top-K JE.
+    - HyperLogLog (Flajolet et al. 2007) pro počet unikátních trace:
+      relativní standardní chyba 1.04 / sqrt(2^precision) (p=12 → ~1.6 %,
+      4 KB registrů); malé kardinality přes linear counting.
+
+Dokud fingerprint nepřekročí ``capacity`` unikátních trace, nic se nevyhodí
+a výsledek je EXAKTNÍ (HLL se založí až při prvním vyhození) — malé
+fingerprinty tak dávají stejné výstupy jako exaktní mód. Pro golden-parity
+běhy zůstává default exaktní Counter (STREAMING_TRACE_TOPK=0).
+"""
+
+import hashlib
+import heapq
+import math
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class SpaceSaving:
+    """Space-Saving top-K: ``counts`` jsou horní odhady, ``errors`` jejich max. přecenění."""
+
+    __slots__ = ('capacity', 'counts', 'errors', 'total', '_heap')
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self.counts: Dict[Any, int] = {}
+        self.errors: Dict[Any, int] = {}
+        self.total = 0
+        # (count, item) — jedna položka na monitorovaný item, count může být
+        # zastaralý (nižší); srovná se líně až při hledání minima
+        self._heap: List[Tuple[int, Any]] = []
+
+    def add(self, item: Any) -> Optional[Any]:
+        """Započítá item; vrací vyhozený item (nebo None)."""
+        self.total += 1
+        counts = self.counts
+        count = counts.get(item)
+        if count is not None:
+            counts[item] = count + 1
+            return None
+        if len(counts) < self.capacity:
+            counts[item] = 1
+            heapq.heappush(self._heap, (1, item))
+            return None
+
+        heap = self._heap
+        while True:
+            stale, victim = heap[0]
+            current = counts[victim]
+            if current == stale:
+                break
+            heapq.heapreplace(heap, (current, victim))
+        del counts[victim]
+        self.errors.pop(victim, None)
+        # Nový item zdědí minimum: přecení nejvýš o ``current``
+        counts[item] = current + 1
+        self.errors[item] = current
+        heapq.heapreplace(heap, (current + 1, item))
+        return victim
+
+    @property
+    def max_error(self) -> int:
+        """Horní mez přecenění kteréhokoli odhadu (<= total / capacity)."""
+        return max(self.errors.values(), default=0)
+
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[Any, int]]:
+        # Stabilní sort → při shodě pořadí prvního monitorování (jako Counter)
+        ranked = sorted(self.counts.items(), key=lambda item: -item[1])
+        return ranked if n is None else ranked[:n]
+
+
+class HyperLogLog:
+    """HyperLogLog nad 64bit blake2b hashem (deterministický napříč procesy)."""
+
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 16:
+            raise ValueError('HyperLogLog precision must be between 4 and 16')
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, item: Any) -> None:
+        value = int.from_bytes(
+            hashlib.blake2b(str(item).encode('utf-8'), digest_size=8).digest(), 'big'
+        )
+        p = self.precision
+        index = value >> (64 - p)
+        rest_bits = 64 - p
+        rank = rest_bits - (value & ((1 << rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting pro malé kardinality
+        return int(round(estimate))
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+
+class BoundedTraceCounter:
+    """Counter-like náhrada ``trace_counts``: top-K (Space-Saving) + distinct (HLL).
+
+    Podporuje to, co čte pipeline.run_streaming: ``most_common(n)``,
+    ``dict(counter)`` (jen monitorované trace s horními odhady) a ``len``.
+    Počet unikátních trace vrací ``distinct_count()``.
+    """
+
+    __slots__ = ('top', 'precision', 'hll')
+
+    exact = False
+
+    def __init__(self, capacity: int, precision: int = 12):
+        self.top = SpaceSaving(capacity)
+        self.precision = precision
+        self.hll: Optional[HyperLogLog] = None
+
+    def add(self, trace_id: str) -> None:
+        if self.hll is not None:
+            self.hll.add(trace_id)
+        victim = self.top.add(trace_id)
+        if victim is not None and self.hll is None:
+            # První vyhození: do té doby byla množina trace známá přesně
+            self.hll = HyperLogLog(self.precision)
+            for known in self.top.counts:
+                self.hll.add(known)
+            self.hll.add(victim)
+
+    @property
+    def truncated(self) -> bool:
+        return self.hll is not None
+
+    def distinct_count(self) -> int:
+        if self.hll is None:
+            return len(self.top.counts)
+        return max(self.hll.count(), len(self.top.counts))
+
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        return self.top.most_common(n)
+
+    def keys(self):
+        return self.top.counts.keys()
+
+    def items(self):
+        return self.top.counts.items()
+
+    def __getitem__(self, trace_id: str) -> int:
+        return self.top.counts.get(trace_id, 0)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.top.counts)
+
+    def __len__(self) -> int:
+        return len(self.top.counts)
+
+    def __bool__(self) -> bool:
+        return bool(self.top.counts)
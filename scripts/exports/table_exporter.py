@@ -23,6 +23,10 @@ Struktura:
 
 NIKDY negenerovat timestamped soubory při 15min bězích!
 
+Řádky errors/peaks se počítají 1× per exporter a všechny formáty se z nich
+renderují paralelně. Artefakt, jehož obsah (bez času generování) se od
+minulého běhu nezměnil, se nepřepisuje — viz `.export_manifest.json`.
+
 Použití:
     from exports import TableExporter
 
@@ -40,10 +44,15 @@ import csv
 import json
 import argparse
 import tempfile
+import hashlib
+import fcntl
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Any, Tuple
-from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, asdict, field
 from zoneinfo import ZoneInfo
 
 # Add paths
@@ -126,6 +135,21 @@ class PeakTableRow:
     peak_id: str
 
 
+@dataclass
+class _ProblemLookupIndex:
+    """Sekundární indexy nad registry.problems pro jeden export peaků.
+
+    Staví se jednou per get_peaks_rows() místo full scanu registry pro každý
+    peak. ``order`` drží pořadí v registry, aby tie-break při výběru related
+    problému zůstal stejný jako u sekvenčního průchodu.
+    """
+    by_flow: Dict[str, List[ProblemEntry]]
+    by_namespace: Dict[str, List[ProblemEntry]]
+    order: Dict[int, int]
+    contributing: Dict[int, List[Tuple[Any, int]]] = field(default_factory=dict)
+    problem_text: Dict[int, Tuple[str, str]] = field(default_factory=dict)
+
+
 # =============================================================================
 # TABLE EXPORTER
 # =============================================================================
@@ -146,6 +170,14 @@ class TableExporter:
         self.trend_change_threshold_pct = float(os.getenv('TREND_CHANGE_THRESHOLD_PCT', '200'))
         self.trend_display_cap_pct = float(os.getenv('TREND_DISPLAY_CAP_PCT', '200'))
         self.display_timezone = ZoneInfo(os.getenv('DISPLAY_TIMEZONE', 'Europe/Prague'))
+        # Per-export lookup state (viz _build_problem_index / _export_rows)
+        self._problem_index: Optional[_ProblemLookupIndex] = None
+        self._errors_rows_cache: Optional[List[ErrorTableRow]] = None
+        self._peaks_rows_cache: Optional[List[PeakTableRow]] = None
+        self._rows_lock = threading.Lock()
+        self.export_workers = max(1, int(os.getenv('EXPORT_WORKERS', '4')))
+        # Cesty zapsaných / přeskočených (nezměněných) artefaktů
+        self.export_stats: Dict[str, List[str]] = {'written': [], 'unchanged': []}
 
     def _format_display_timestamp(self, value: Optional[datetime]) -> str:
         aware = self._ensure_aware(value)
@@ -541,6 +573,12 @@ class TableExporter:
         contrib = getattr(peak, 'contributing_problems', None) or {}
         if not contrib:
             return []
+        # Behavior i root cause resolvují stejný peak — v rámci jednoho
+        # exportu se řazení a lookup dělá jen jednou.
+        index = self._problem_index
+        if index is not None and id(peak) in index.contributing:
+            return index.contributing[id(peak)][:limit]
+
         ranked: List[Tuple[Any, int]] = []
         problems_index = self.registry.problems if self.registry is not None else {}
         for pkey, count in sorted(contrib.items(), key=lambda kv: -int(kv[1] or 0)):
@@ -552,9 +590,9 @@ class TableExporter:
             except (TypeError, ValueError):
                 cnt = 0
             ranked.append((problem, cnt))
-            if len(ranked) >= limit:
-                break
-        return ranked
+        if index is not None:
+            index.contributing[id(peak)] = ranked
+        return ranked[:limit]
 
     def _format_peak_behavior(
         self,
@@ -821,28 +859,71 @@ class TableExporter:
 
         return long_trend, short_trend, current_24h, current_2h
 
+    def _build_problem_index(self) -> _ProblemLookupIndex:
+        """Postaví flow → problems a namespace → problems indexy (1× per export)."""
+        by_flow: Dict[str, List[ProblemEntry]] = {}
+        by_namespace: Dict[str, List[ProblemEntry]] = {}
+        order: Dict[int, int] = {}
+        for position, problem in enumerate(self.registry.problems.values()):
+            order[id(problem)] = position
+            by_flow.setdefault(problem.flow, []).append(problem)
+            for namespace in set(problem.affected_namespaces):
+                by_namespace.setdefault(namespace, []).append(problem)
+        return _ProblemLookupIndex(by_flow=by_flow, by_namespace=by_namespace, order=order)
+
     def _find_related_problem_for_peak(self, peak: PeakEntry, flow: str) -> Optional[ProblemEntry]:
-        candidates: List[ProblemEntry] = []
-        for problem in self.registry.problems.values():
-            if flow and problem.flow != flow:
-                continue
-            if peak.affected_namespaces and not (set(peak.affected_namespaces) & set(problem.affected_namespaces)):
-                continue
-            candidates.append(problem)
+        index = self._problem_index
+        if index is None:
+            index = self._problem_index = self._build_problem_index()
+
+        peak_namespaces = set(peak.affected_namespaces)
+        peak_apps = set(peak.affected_apps)
+
+        if peak_namespaces:
+            # Kandidáti = problémy sdílející aspoň jeden namespace; počet
+            # sdílených namespaces rovnou z indexu.
+            ns_overlap: Dict[int, int] = {}
+            by_id: Dict[int, ProblemEntry] = {}
+            for namespace in peak_namespaces:
+                for problem in index.by_namespace.get(namespace, ()):
+                    if flow and problem.flow != flow:
+                        continue
+                    ns_overlap[id(problem)] = ns_overlap.get(id(problem), 0) + 1
+                    by_id[id(problem)] = problem
+            candidates = [
+                by_id[key] for key in sorted(by_id, key=index.order.__getitem__)
+            ]
+        else:
+            ns_overlap = {}
+            if flow:
+                candidates = index.by_flow.get(flow, [])
+            else:
+                candidates = list(self.registry.problems.values())
 
         if not candidates:
             return None
 
-        candidates.sort(
+        # max() vrací první maximální prvek v pořadí registry — stejně jako
+        # dřívější stabilní sort(reverse=True)[0].
+        return max(
+            candidates,
             key=lambda p: (
-                len(set(peak.affected_namespaces) & set(p.affected_namespaces)),
-                len(set(peak.affected_apps) & set(p.affected_apps)),
+                ns_overlap.get(id(p), 0),
+                len(peak_apps.intersection(p.affected_apps)),
                 p.occurrences,
                 p.last_seen or datetime.min,
             ),
-            reverse=True,
         )
-        return candidates[0]
+
+    def _related_problem_text(self, problem: ProblemEntry) -> Tuple[str, str]:
+        """(root_cause, behavior) related problému, cachované per export."""
+        index = self._problem_index
+        if index is not None and id(problem) in index.problem_text:
+            return index.problem_text[id(problem)]
+        text = (self._problem_root_cause(problem), self._problem_behavior(problem))
+        if index is not None:
+            index.problem_text[id(problem)] = text
+        return text
 
     @staticmethod
     def _ensure_aware(value: Optional[datetime]) -> Optional[datetime]:
@@ -1190,48 +1271,47 @@ class TableExporter:
 
         return [row for *_, row in rows_with_sort_key]
 
-    def export_errors_csv(self, output_path: str) -> str:
-        """Export errors jako CSV ."""
-        rows = self.get_errors_rows()
-
-        path = Path(output_path)
-        path.parent.mkdir(parents=True, exist_ok=True)
-
-        # Column order: timing → trend (2h,24h) → count (2h,24h,total) → severity
-        # → root cause → scope → meta. 2h před 24h (recency-first), per uživatele.
-        fieldnames = [
-            'first_seen', 'last_seen',
-            'trend_2h', 'trend_24h',
-            'occurrence_2h', 'occurrence_24h', 'occurrence_total', 'severity',
-            'root_cause', 'behavior',
-            'affected_namespaces', 'affected_apps', 'problem_key', 'scope',
-            'category', 'status',
-            'problem_id', 'flow', 'error_class', 'detail', 'score', 'ratio'
-        ]
-
-        with open(path, 'w', newline='', encoding='utf-8') as f:
-            if rows:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                for row in rows:
-                    row_dict = asdict(row)
-                    # Seřaď dle fieldnames
-                    ordered = {k: row_dict.get(k, '') for k in fieldnames}
-                    writer.writerow(ordered)
-            else:
-                # Empty file with headers 
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
+    def _errors_rows(self) -> List[ErrorTableRow]:
+        """Řádky errors tabulky sdílené všemi formáty a módy tohoto exportu.
 
-        return str(path)
-
-    def export_errors_markdown(self, output_path: str) -> str:
-        """Export errors jako Markdown tabulka."""
-        rows = self.get_errors_rows()
+        Exporter je snapshot registry (viz ``generated_at``) — CSV/MD/JSON
+        a latest/daily/weekly výstupy proto čtou jednu sadu řádků.
+        """
+        with self._rows_lock:
+            if self._errors_rows_cache is None:
+                self._errors_rows_cache = self.get_errors_rows()
+        return self._errors_rows_cache
+
+    # Column order: timing → trend (2h,24h) → count (2h,24h,total) → severity
+    # → root cause → scope → meta. 2h před 24h (recency-first), per uživatele.
+    ERRORS_CSV_FIELDS = [
+        'first_seen', 'last_seen',
+        'trend_2h', 'trend_24h',
+        'occurrence_2h', 'occurrence_24h', 'occurrence_total', 'severity',
+        'root_cause', 'behavior',
+        'affected_namespaces', 'affected_apps', 'problem_key', 'scope',
+        'category', 'status',
+        'problem_id', 'flow', 'error_class', 'detail', 'score', 'ratio'
+    ]
+
+    def _render_errors_csv(self, rows: List[ErrorTableRow]) -> str:
+        fieldnames = self.ERRORS_CSV_FIELDS
+        buffer = io.StringIO(newline='')
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            row_dict = asdict(row)
+            # Seřaď dle fieldnames
+            writer.writerow({k: row_dict.get(k, '') for k in fieldnames})
+        return buffer.getvalue()
 
-        path = Path(output_path)
-        path.parent.mkdir(parents=True, exist_ok=True)
+    def export_errors_csv(self, output_path: str) -> str:
+        """Export errors jako CSV ."""
+        return self._export_artifacts({
+            'errors_csv': (Path(output_path), self._table_sinks()['errors_csv']),
+        })['errors_csv']
 
+    def _render_errors_markdown(self, rows: List[ErrorTableRow]) -> str:
         lines = [
             f"# Error Problems Table",
             f"",
@@ -1310,18 +1390,15 @@ class TableExporter:
         else:
             lines.append("*No problems in registry.*")
 
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write("\n".join(lines))
-
-        return str(path)
-
-    def export_errors_json(self, output_path: str) -> str:
-        """Export errors jako JSON."""
-        rows = self.get_errors_rows()
+        return "\n".join(lines)
 
-        path = Path(output_path)
-        path.parent.mkdir(parents=True, exist_ok=True)
+    def export_errors_markdown(self, output_path: str) -> str:
+        """Export errors jako Markdown tabulka."""
+        return self._export_artifacts({
+            'errors_md': (Path(output_path), self._table_sinks()['errors_md']),
+        })['errors_md']
 
+    def _render_errors_json(self, rows: List[ErrorTableRow]) -> str:
         data = {
             'generated_at': self.generated_at.isoformat(),
             'total_problems': len(rows),
@@ -1339,10 +1416,13 @@ class TableExporter:
             data['summary']['by_scope'][row.scope] = data['summary']['by_scope'].get(row.scope, 0) + 1
             data['summary']['by_status'][row.status] = data['summary']['by_status'].get(row.status, 0) + 1
 
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        return json.dumps(data, indent=2, ensure_ascii=False)
 
-        return str(path)
+    def export_errors_json(self, output_path: str) -> str:
+        """Export errors jako JSON."""
+        return self._export_artifacts({
+            'errors_json': (Path(output_path), self._table_sinks()['errors_json']),
+        })['errors_json']
 
     # =========================================================================
     # PEAKS TABLE
@@ -1356,6 +1436,7 @@ class TableExporter:
         """
         rows_with_sort_key = []
         now = datetime.now(timezone.utc)
+        self._problem_index = self._build_problem_index()
 
         # Retention cutoff: relative to the newest peak (not wall-clock)
         # This prevents data loss when the pipeline hasn't run recently
@@ -1386,13 +1467,9 @@ class TableExporter:
             related_problem = self._find_related_problem_for_peak(peak, flow)
 
             # Resolve fallback values from related ProblemEntry once.
-            related_root_cause = (
-                self._problem_root_cause(related_problem)
-                if related_problem is not None else ""
-            )
-            related_behavior = (
-                self._problem_behavior(related_problem)
-                if related_problem is not None else ""
+            related_root_cause, related_behavior = (
+                self._related_problem_text(related_problem)
+                if related_problem is not None else ("", "")
             )
 
             # Pick a fallback service: dominant app (by count) or first affected app
@@ -1469,39 +1546,40 @@ class TableExporter:
 
         return [row for _, row in rows_with_sort_key]
 
+    def _peaks_rows(self) -> List[PeakTableRow]:
+        """Řádky peaks tabulky sdílené všemi formáty a módy tohoto exportu."""
+        with self._rows_lock:
+            if self._peaks_rows_cache is None:
+                self._peaks_rows_cache = self.get_peaks_rows()
+        return self._peaks_rows_cache
+
+    # Column order: timing → frequency → trend → root cause → scope → meta
+    PEAKS_CSV_FIELDS = [
+        'first_seen', 'last_seen',
+        'total_errors', 'occurrence_count', 'avg_errors_per_peak',
+        'trend_7d', 'periodicity',
+        'root_cause', 'behavior',
+        'affected_namespaces', 'affected_apps',
+        'test', 'activity', 'peak_id'
+    ]
+
+    def _render_peaks_csv(self, rows: List[PeakTableRow]) -> str:
+        fieldnames = self.PEAKS_CSV_FIELDS
+        buffer = io.StringIO(newline='')
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            row_dict = asdict(row)
+            writer.writerow({k: row_dict.get(k, '') for k in fieldnames})
+        return buffer.getvalue()
+
     def export_peaks_csv(self, output_path: str) -> str:
         """Export peaks jako CSV."""
-        rows = self.get_peaks_rows()
-
-        path = Path(output_path)
-        path.parent.mkdir(parents=True, exist_ok=True)
-
-        # Column order: timing → frequency → trend → root cause → scope → meta
-        fieldnames = [
-            'first_seen', 'last_seen',
-            'total_errors', 'occurrence_count', 'avg_errors_per_peak',
-            'trend_7d', 'periodicity',
-            'root_cause', 'behavior',
-            'affected_namespaces', 'affected_apps',
-            'test', 'activity', 'peak_id'
-        ]
-
-        with open(path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in rows:
-                row_dict = asdict(row)
-                writer.writerow({k: row_dict.get(k, '') for k in fieldnames})
-
-        return str(path)
-
-    def export_peaks_markdown(self, output_path: str) -> str:
-        """Export peaks jako Markdown."""
-        rows = self.get_peaks_rows()
-
-        path = Path(output_path)
-        path.parent.mkdir(parents=True, exist_ok=True)
+        return self._export_artifacts({
+            'peaks_csv': (Path(output_path), self._table_sinks()['peaks_csv']),
+        })['peaks_csv']
 
+    def _render_peaks_markdown(self, rows: List[PeakTableRow]) -> str:
         lines = [
             f"# Peak Events Table",
             f"",
@@ -1532,28 +1610,32 @@ class TableExporter:
         else:
             lines.append("*No peaks in registry.*")
 
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write("\n".join(lines))
-
-        return str(path)
+        return "\n".join(lines)
 
-    def export_peaks_json(self, output_path: str) -> str:
-        """Export peaks jako JSON."""
-        rows = self.get_peaks_rows()
+    def export_peaks_markdown(self, output_path: str) -> str:
+        """Export peaks jako Markdown."""
+        return self._export_artifacts({
+            'peaks_md': (Path(output_path), self._table_sinks()['peaks_md']),
+        })['peaks_md']
 
-        path = Path(output_path)
-        path.parent.mkdir(parents=True, exist_ok=True)
+    def peaks_table(self) -> List[Dict[str, Any]]:
+        """Řádky peaks tabulky jako dicty (run artifact); sdílí cache s exporty."""
+        return [asdict(row) for row in self._peaks_rows()]
 
+    def _render_peaks_json(self, rows: List[PeakTableRow]) -> str:
         data = {
             'generated_at': self.generated_at.isoformat(),
             'total_peaks': len(rows),
             'peaks': [asdict(row) for row in rows],
         }
 
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        return json.dumps(data, indent=2, ensure_ascii=False)
 
-        return str(path)
+    def export_peaks_json(self, output_path: str) -> str:
+        """Export peaks jako JSON."""
+        return self._export_artifacts({
+            'peaks_json': (Path(output_path), self._table_sinks()['peaks_json']),
+        })['peaks_json']
 
     # =========================================================================
     # ATOMIC WRITE HELPER
@@ -1569,21 +1651,205 @@ class TableExporter:
         # Write to temp file in same directory (same filesystem for atomic rename)
         fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
         try:
-            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            # newline='' → zapsané bajty odpovídají obsahu (CSV \r\n i hash v manifestu)
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
                 f.write(content)
+            os.chmod(tmp_path, 0o644)  # mkstemp zakládá 0600; exporty čtou i uploadery
             os.replace(tmp_path, path)  # Atomic on POSIX
         except Exception:
             if os.path.exists(tmp_path):
                 os.unlink(tmp_path)
             raise
 
+    # =========================================================================
+    # EXPORT ENGINE (řádky 1×, všechny sinky, skip nezměněných)
+    # =========================================================================
+
+    MANIFEST_NAME = '.export_manifest.json'
+
+    # Řádky s časem generování se do content hashe nepočítají — jinak by se
+    # každý MD/JSON artefakt přepsal při každém běhu.
+    _VOLATILE_LINE_PREFIXES = ('**Generated:**', '"generated_at":')
+
+    @classmethod
+    def _content_digest(cls, content: str) -> str:
+        stable = [
+            line for line in content.split('\n')
+            if not line.lstrip().startswith(cls._VOLATILE_LINE_PREFIXES)
+        ]
+        return hashlib.sha256('\n'.join(stable).encode('utf-8')).hexdigest()
+
+    def _load_manifest(self, directory: Path) -> Dict[str, Dict[str, Any]]:
+        manifest_path = directory / self.MANIFEST_NAME
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _table_sinks(self) -> Dict[str, Callable[[], str]]:
+        """Renderery všech tabulkových formátů nad sdílenými řádky."""
+        return {
+            'errors_csv': lambda: self._render_errors_csv(self._errors_rows()),
+            'errors_md': lambda: self._render_errors_markdown(self._errors_rows()),
+            'errors_json': lambda: self._render_errors_json(self._errors_rows()),
+            'peaks_csv': lambda: self._render_peaks_csv(self._peaks_rows()),
+            'peaks_md': lambda: self._render_peaks_markdown(self._peaks_rows()),
+            'peaks_json': lambda: self._render_peaks_json(self._peaks_rows()),
+            'summary': self._render_weekly_summary,
+        }
+
+    def _export_artifacts(
+        self,
+        artifacts: Dict[str, Tuple[Path, Callable[[], str]]],
+    ) -> Dict[str, str]:
+        """
+        Vyrenderuje a zapíše artefakty paralelně (bounded thread pool).
+
+        Každý artefakt jde přes _write_atomic. Pokud se jeho content hash
+        (bez řádku s časem generování) shoduje s manifestem v cílové složce
+        a soubor na disku má zaznamenanou velikost, zápis se přeskočí —
+        mtime zůstane a CSV/Confluence upload nevidí falešnou změnu.
+
+        Returns: {key: path} pro všechny artefakty (zapsané i nezměněné).
+        """
+        if not artifacts:
+            return {}
+
+        # Regular i backfill exportér mohou psát do stejné exports/ složky →
+        # load + zápis + save manifestu pod exkluzivním zámkem (jako registry
+        # transaction lock), jinak by si navzájem přepsaly záznamy
+        directories = sorted({path.parent for path, _render in artifacts.values()})
+        lock_fds = []
+        try:
+            for directory in directories:
+                directory.mkdir(parents=True, exist_ok=True)
+                lock_fd = open(directory / f"{self.MANIFEST_NAME}.lock", 'w')
+                lock_fds.append(lock_fd)
+                fcntl.flock(lock_fd.fileno(), fcntl.LOCK_EX)
+            return self._export_artifacts_locked(artifacts, directories)
+        finally:
+            for lock_fd in lock_fds:
+                fcntl.flock(lock_fd.fileno(), fcntl.LOCK_UN)
+                lock_fd.close()
+
+    def _export_artifacts_locked(
+        self,
+        artifacts: Dict[str, Tuple[Path, Callable[[], str]]],
+        directories: List[Path],
+    ) -> Dict[str, str]:
+        manifests: Dict[Path, Dict[str, Dict[str, Any]]] = {
+            directory: self._load_manifest(directory) for directory in directories
+        }
+
+        def _run(path: Path, render: Callable[[], str]) -> Tuple[str, int, bool]:
+            content = render()
+            digest = self._content_digest(content)
+            size = len(content.encode('utf-8'))
+            known = manifests[path.parent].get(path.name) or {}
+            if known.get('sha256') == digest and path.exists():
+                on_disk = path.stat().st_size
+                if on_disk == known.get('size'):
+                    # Přeskočeno → manifest drží velikost souboru na disku, ne nově
+                    # vyrenderovaného obsahu (liší se v řádku Generated, který
+                    # digest ignoruje) — jinak by příští běh přepsal zbytečně
+                    return digest, on_disk, False
+            self._write_atomic(path, content)
+            return digest, size, True
+
+        results: Dict[str, str] = {}
+        errors: List[Exception] = []
+        workers = max(1, min(self.export_workers, len(artifacts)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_run, path, render): (key, path)
+                for key, (path, render) in artifacts.items()
+            }
+            for future, (key, path) in futures.items():
+                try:
+                    digest, size, written = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                manifests[path.parent][path.name] = {'sha256': digest, 'size': size}
+                self.export_stats['written' if written else 'unchanged'].append(str(path))
+                results[key] = str(path)
+
+        for directory, manifest in manifests.items():
+            self._write_atomic(
+                directory / self.MANIFEST_NAME,
+                json.dumps(manifest, indent=2, sort_keys=True),
+            )
+
+        if errors:
+            raise errors[0]
+        return results
+
+    def export(
+        self,
+        output_dir: str,
+        modes: Tuple[str, ...] = ('latest',),
+        force: bool = False,
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        Jeden průchod exportu přes všechny požadované módy.
+
+        Řádky errors/peaks se spočítají jednou a všechny sinky (CSV, MD,
+        JSON, weekly summary) z nich renderují paralelně. Pravidla módů
+        zůstávají: latest vždy (nezměněný obsah se nepřepisuje), daily/weekly
+        jen pokud soubor neexistuje nebo force=True.
+
+        Returns: {mode: {key: path}}
+        """
+        root = Path(output_dir)
+        sinks = self._table_sinks()
+        date_str = self.generated_at.strftime('%Y-%m-%d')
+        week_str = self.generated_at.strftime('%Y-W%W')
+
+        layout: Dict[str, List[Tuple[str, Path]]] = {
+            'latest': [
+                ('errors_csv', root / 'latest' / 'errors_table.csv'),
+                ('errors_md', root / 'latest' / 'errors_table.md'),
+                ('errors_json', root / 'latest' / 'errors_table.json'),
+                ('peaks_csv', root / 'latest' / 'peaks_table.csv'),
+                ('peaks_md', root / 'latest' / 'peaks_table.md'),
+                ('peaks_json', root / 'latest' / 'peaks_table.json'),
+            ],
+            'daily': [
+                ('errors_csv', root / 'daily' / f'{date_str}-errors.csv'),
+                ('errors_md', root / 'daily' / f'{date_str}-errors.md'),
+                ('peaks_csv', root / 'daily' / f'{date_str}-peaks.csv'),
+                ('peaks_md', root / 'daily' / f'{date_str}-peaks.md'),
+            ],
+            'weekly': [
+                ('summary', root / 'weekly' / f'{week_str}-summary.md'),
+            ],
+        }
+
+        plan: Dict[str, Tuple[Path, Callable[[], str]]] = {}
+        for mode in modes:
+            if mode not in layout:
+                raise ValueError(f"Unknown export mode: {mode}")
+            (root / mode).mkdir(parents=True, exist_ok=True)
+            for key, path in layout[mode]:
+                if mode != 'latest' and not force and path.exists():
+                    continue
+                plan[f'{mode}:{key}'] = (path, sinks[key])
+
+        result: Dict[str, Dict[str, str]] = {mode: {} for mode in modes}
+        for qualified_key, path in self._export_artifacts(plan).items():
+            mode, key = qualified_key.split(':', 1)
+            result[mode][key] = path
+        return result
+
     # =========================================================================
     # LATEST EXPORTS (OVERWRITE)
     # =========================================================================
 
     def export_latest(self, output_dir: str) -> Dict[str, str]:
         """
-        Exportuje do latest/ složky - VŽDY přepíše.
+        Exportuje do latest/ složky - VŽDY přepíše (kromě nezměněného obsahu).
 
         Toto je DEFAULT pro 15-min běhy.
         Odpovídá na otázku: "Jaký je stav TEĎ?"
@@ -1597,22 +1863,7 @@ class TableExporter:
             ├── peaks_table.md
             └── peaks_table.json
         """
-        latest_dir = Path(output_dir) / 'latest'
-        latest_dir.mkdir(parents=True, exist_ok=True)
-
-        files = {}
-
-        # Errors - atomic overwrite
-        files['errors_csv'] = self.export_errors_csv(latest_dir / 'errors_table.csv')
-        files['errors_md'] = self.export_errors_markdown(latest_dir / 'errors_table.md')
-        files['errors_json'] = self.export_errors_json(latest_dir / 'errors_table.json')
-
-        # Peaks - atomic overwrite
-        files['peaks_csv'] = self.export_peaks_csv(latest_dir / 'peaks_table.csv')
-        files['peaks_md'] = self.export_peaks_markdown(latest_dir / 'peaks_table.md')
-        files['peaks_json'] = self.export_peaks_json(latest_dir / 'peaks_table.json')
-
-        return files
+        return self.export(output_dir, modes=('latest',))['latest']
 
     # =========================================================================
     # DAILY EXPORTS (ONCE PER DAY)
@@ -1632,31 +1883,7 @@ class TableExporter:
             ├── 2026-01-26-peaks.csv
             └── 2026-01-26-peaks.md
         """
-        daily_dir = Path(output_dir) / 'daily'
-        daily_dir.mkdir(parents=True, exist_ok=True)
-
-        date_str = self.generated_at.strftime('%Y-%m-%d')
-        files = {}
-
-        # Errors
-        errors_csv = daily_dir / f'{date_str}-errors.csv'
-        errors_md = daily_dir / f'{date_str}-errors.md'
-
-        if force or not errors_csv.exists():
-            files['errors_csv'] = self.export_errors_csv(errors_csv)
-        if force or not errors_md.exists():
-            files['errors_md'] = self.export_errors_markdown(errors_md)
-
-        # Peaks
-        peaks_csv = daily_dir / f'{date_str}-peaks.csv'
-        peaks_md = daily_dir / f'{date_str}-peaks.md'
-
-        if force or not peaks_csv.exists():
-            files['peaks_csv'] = self.export_peaks_csv(peaks_csv)
-        if force or not peaks_md.exists():
-            files['peaks_md'] = self.export_peaks_markdown(peaks_md)
-
-        return files
+        return self.export(output_dir, modes=('daily',), force=force)['daily']
 
     # =========================================================================
     # WEEKLY EXPORTS (ONCE PER WEEK)
@@ -1670,29 +1897,28 @@ class TableExporter:
             exports/weekly/
             └── 2026-W04-summary.md
         """
-        weekly_dir = Path(output_dir) / 'weekly'
-        weekly_dir.mkdir(parents=True, exist_ok=True)
+        return self.export(output_dir, modes=('weekly',), force=force)['weekly']
 
-        week_str = self.generated_at.strftime('%Y-W%W')
-        files = {}
-
-        summary_path = weekly_dir / f'{week_str}-summary.md'
-
-        if force or not summary_path.exists():
-            files['summary'] = self._export_weekly_summary(summary_path)
-
-        return files
+    def _is_recent_display_timestamp(self, value: str, since: datetime) -> bool:
+        """Porovná display timestamp řádku (DD-MM-YYYY HH:MM, display TZ) s `since`."""
+        if not value:
+            return False
+        try:
+            parsed = datetime.strptime(value, "%d-%m-%Y %H:%M")
+        except ValueError:
+            return False
+        return parsed.replace(tzinfo=self.display_timezone) > since
 
-    def _export_weekly_summary(self, output_path: Path) -> str:
+    def _render_weekly_summary(self) -> str:
         """Generuje týdenní summary report."""
-        errors_rows = self.get_errors_rows()
-        peaks_rows = self.get_peaks_rows()
+        errors_rows = self._errors_rows()
+        peaks_rows = self._peaks_rows()
 
         # Filter to last 7 days
         week_ago = self.generated_at - timedelta(days=7)
         recent_errors = [r for r in errors_rows if r.last_seen]  # Filter rows with timestamps
         recent_peaks = [r for r in peaks_rows
-                        if r.last_seen and datetime.strptime(r.last_seen, "%Y-%m-%d %H:%M").replace(tzinfo=None) > week_ago.replace(tzinfo=None)]
+                        if self._is_recent_display_timestamp(r.last_seen, week_ago)]
 
         lines = [
             f"# Weekly Summary - {self.generated_at.strftime('%Y-W%W')}",
@@ -1727,15 +1953,12 @@ class TableExporter:
         if recent_errors:
             lines.append("## Top 10 Most Frequent (This Week)")
             lines.append("")
-            top10 = sorted(recent_errors, key=lambda r: r.occurrences, reverse=True)[:10]
+            top10 = sorted(recent_errors, key=lambda r: r.occurrence_total, reverse=True)[:10]
             for i, r in enumerate(top10, 1):
-                lines.append(f"{i}. **{r.problem_key}** - {r.occurrences:,} occurrences")
+                lines.append(f"{i}. **{r.problem_key}** - {r.occurrence_total:,} occurrences")
             lines.append("")
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write("\n".join(lines))
-
-        return str(output_path)
+        return "\n".join(lines)
 
     # =========================================================================
     # EXPORT ALL (BACKWARD COMPAT - NOW CALLS LATEST)
@@ -1750,6 +1973,7 @@ class TableExporter:
         - export_latest()  pro 15-min běhy
         - export_daily()   pro denní snapshot
         - export_weekly()  pro týdenní report
+        - export()         pro více módů v jednom průchodu
         """
         return self.export_latest(output_dir)
 
@@ -1852,33 +2076,27 @@ Examples:
     print(f"   Problems: {len(registry.problems)}")
     print(f"   Peaks: {len(registry.peaks)}")
 
-    # Export
+    # Export — všechny módy v jednom průchodu (řádky se počítají 1×)
     exporter = TableExporter(registry)
     all_files = {}
+    modes = ('latest', 'daily', 'weekly') if args.mode == 'all' else (args.mode,)
+    labels = {
+        'latest': 'latest/ (overwrite)',
+        'daily': 'daily/ (once per day)',
+        'weekly': 'weekly/ (once per week)',
+    }
 
-    if args.mode in ('latest', 'all'):
-        print(f"\nExporting to latest/ (overwrite)...")
-        files = exporter.export_latest(args.output)
-        all_files.update({f'latest_{k}': v for k, v in files.items()})
-        print(f"   {len(files)} files written")
-
-    if args.mode in ('daily', 'all'):
-        print(f"\nExporting to daily/ (once per day)...")
-        files = exporter.export_daily(args.output, force=args.force)
-        if files:
-            all_files.update({f'daily_{k}': v for k, v in files.items()})
-            print(f"   {len(files)} files written")
-        else:
-            print(f"   Skipped (already exists, use --force to overwrite)")
-
-    if args.mode in ('weekly', 'all'):
-        print(f"\nExporting to weekly/ (once per week)...")
-        files = exporter.export_weekly(args.output, force=args.force)
+    results = exporter.export(args.output, modes=modes, force=args.force)
+    for mode in modes:
+        files = results[mode]
+        print(f"\nExporting to {labels[mode]}...")
         if files:
-            all_files.update({f'weekly_{k}': v for k, v in files.items()})
+            all_files.update({f'{mode}_{k}': v for k, v in files.items()})
             print(f"   {len(files)} files written")
         else:
             print(f"   Skipped (already exists, use --force to overwrite)")
+    if exporter.export_stats['unchanged']:
+        print(f"   {len(exporter.export_stats['unchanged'])} files unchanged (content hash match, not rewritten)")
 
     print(f"\nDone. Total: {len(all_files)} files")
 
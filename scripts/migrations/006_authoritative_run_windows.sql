@@ -0,0 +1,53 @@
+-- Materialized authoritative run per 15-minute window.
+--
+-- v_authoritative_run_windows used to rank SELECT DISTINCT run_id, window_start
+-- over the whole namespace_error_counts table on every query. The winner is now
+-- maintained by persist_analysis_run() in the same transaction that marks a run
+-- complete (and supersedes older runs), so readers only do an indexed join.
+
+CREATE TABLE IF NOT EXISTS ailog_peak.authoritative_run_windows (
+    window_start TIMESTAMP WITH TIME ZONE PRIMARY KEY,
+    run_id VARCHAR(160) NOT NULL REFERENCES ailog_peak.analysis_runs(run_id) ON DELETE CASCADE,
+    refreshed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_authoritative_run_windows_run
+ON ailog_peak.authoritative_run_windows (run_id, window_start);
+
+CREATE INDEX IF NOT EXISTS idx_namespace_error_counts_run_window
+ON ailog_peak.namespace_error_counts (run_id, window_start);
+
+INSERT INTO ailog_peak.authoritative_run_windows (window_start, run_id)
+SELECT DISTINCT ON (namespace_window.window_start)
+        namespace_window.window_start,
+        namespace_window.run_id
+FROM (
+        SELECT DISTINCT run_id, window_start
+        FROM ailog_peak.namespace_error_counts
+) namespace_window
+JOIN ailog_peak.analysis_runs run_row ON run_row.run_id = namespace_window.run_id
+WHERE run_row.status = 'complete'
+    AND run_row.superseded_by_run_id IS NULL
+ORDER BY namespace_window.window_start,
+                 run_row.completed_at DESC NULLS LAST,
+                 run_row.started_at DESC,
+                 run_row.run_id DESC
+ON CONFLICT (window_start) DO NOTHING;
+
+CREATE OR REPLACE VIEW ailog_peak.v_authoritative_run_windows AS
+SELECT authority.run_id, authority.window_start
+FROM ailog_peak.authoritative_run_windows authority;
+
+CREATE OR REPLACE VIEW ailog_peak.v_complete_error_kind_counts AS
+SELECT fact_row.*
+FROM ailog_peak.error_kind_counts fact_row
+JOIN ailog_peak.authoritative_run_windows authority
+    ON authority.run_id = fact_row.run_id
+ AND authority.window_start = fact_row.window_start;
+
+CREATE OR REPLACE VIEW ailog_peak.v_complete_namespace_error_counts AS
+SELECT fact_row.*
+FROM ailog_peak.namespace_error_counts fact_row
+JOIN ailog_peak.authoritative_run_windows authority
+    ON authority.run_id = fact_row.run_id
+ AND authority.window_start = fact_row.window_start;
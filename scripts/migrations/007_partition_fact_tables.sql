@@ -0,0 +1,228 @@
+-- Monthly range partitions (UTC) on window_start for the run fact tables.
+--
+-- Retention in run_data_maintenance.py detaches and drops whole expired
+-- partitions instead of row-level DELETEs, and windowed readers get partition
+-- pruning. Rows outside every monthly partition land in <table>_default;
+-- ensure_fact_partitions() moves them into the month partition when it is
+-- created. peak_investigation stays a heap table: its SERIAL id is referenced
+-- by foreign keys and legacy rows have no window_start.
+
+CREATE OR REPLACE FUNCTION ailog_peak.ensure_fact_partitions(p_from DATE, p_to DATE)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    fact_table TEXT;
+    month_start DATE;
+    lower_bound TIMESTAMP WITH TIME ZONE;
+    upper_bound TIMESTAMP WITH TIME ZONE;
+    partition_name TEXT;
+    created_count INTEGER := 0;
+BEGIN
+    FOREACH fact_table IN ARRAY ARRAY[
+        'error_kind_counts', 'namespace_error_counts', 'detection_events'
+    ] LOOP
+        month_start := DATE_TRUNC('month', p_from)::DATE;
+        WHILE month_start < p_to LOOP
+            partition_name := format('%s_p%s', fact_table, TO_CHAR(month_start, 'YYYYMM'));
+            lower_bound := month_start::TIMESTAMP AT TIME ZONE 'UTC';
+            upper_bound := (month_start + INTERVAL '1 month')::TIMESTAMP AT TIME ZONE 'UTC';
+            IF to_regclass(format('ailog_peak.%I', partition_name)) IS NULL THEN
+                EXECUTE format(
+                    'CREATE TABLE ailog_peak.%I '
+                    '(LIKE ailog_peak.%I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                    partition_name, fact_table
+                );
+                EXECUTE format(
+                    'WITH moved AS ('
+                    '    DELETE FROM ailog_peak.%I'
+                    '    WHERE window_start >= %L AND window_start < %L'
+                    '    RETURNING *'
+                    ') INSERT INTO ailog_peak.%I SELECT * FROM moved',
+                    fact_table || '_default', lower_bound, upper_bound, partition_name
+                );
+                EXECUTE format(
+                    'ALTER TABLE ailog_peak.%I ATTACH PARTITION ailog_peak.%I '
+                    'FOR VALUES FROM (%L) TO (%L)',
+                    fact_table, partition_name, lower_bound, upper_bound
+                );
+                created_count := created_count + 1;
+            END IF;
+            month_start := (month_start + INTERVAL '1 month')::DATE;
+        END LOOP;
+    END LOOP;
+    RETURN created_count;
+END $$;
+
+DROP VIEW IF EXISTS ailog_peak.v_metadata_quality_health;
+DROP VIEW IF EXISTS ailog_peak.v_complete_error_kind_counts;
+DROP VIEW IF EXISTS ailog_peak.v_complete_namespace_error_counts;
+
+ALTER TABLE ailog_peak.error_kind_counts RENAME TO error_kind_counts_heap;
+ALTER INDEX ailog_peak.error_kind_counts_pkey RENAME TO error_kind_counts_heap_pkey;
+ALTER INDEX ailog_peak.idx_error_kind_counts_window_namespace
+    RENAME TO idx_error_kind_counts_heap_window_namespace;
+ALTER INDEX ailog_peak.idx_error_kind_counts_fingerprint_window
+    RENAME TO idx_error_kind_counts_heap_fingerprint_window;
+
+ALTER TABLE ailog_peak.namespace_error_counts RENAME TO namespace_error_counts_heap;
+ALTER INDEX ailog_peak.namespace_error_counts_pkey RENAME TO namespace_error_counts_heap_pkey;
+ALTER INDEX ailog_peak.idx_namespace_error_counts_window
+    RENAME TO idx_namespace_error_counts_heap_window;
+ALTER INDEX ailog_peak.idx_namespace_error_counts_run_window
+    RENAME TO idx_namespace_error_counts_heap_run_window;
+
+ALTER TABLE ailog_peak.detection_events RENAME TO detection_events_heap;
+ALTER INDEX ailog_peak.detection_events_pkey RENAME TO detection_events_heap_pkey;
+ALTER INDEX ailog_peak.idx_detection_events_window
+    RENAME TO idx_detection_events_heap_window;
+
+CREATE TABLE ailog_peak.error_kind_counts (
+    run_id VARCHAR(160) NOT NULL REFERENCES ailog_peak.analysis_runs(run_id) ON DELETE CASCADE,
+    window_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    namespace VARCHAR(255) NOT NULL,
+    application VARCHAR(255) NOT NULL,
+    fingerprint VARCHAR(64) NOT NULL,
+    error_type VARCHAR(255) NOT NULL,
+    category VARCHAR(100) NOT NULL,
+    subcategory VARCHAR(100) NOT NULL,
+    error_count BIGINT NOT NULL CHECK (error_count > 0),
+    first_event_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_event_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    sample_message TEXT,
+    metadata_quality VARCHAR(20) NOT NULL DEFAULT 'unknown',
+    PRIMARY KEY (run_id, window_start, namespace, application, fingerprint),
+    CONSTRAINT ck_error_kind_event_bounds CHECK (last_event_at >= first_event_at),
+    CONSTRAINT ck_error_kind_metadata_quality CHECK (
+        metadata_quality IN ('structured', 'derived', 'unknown')
+    )
+) PARTITION BY RANGE (window_start);
+
+CREATE TABLE ailog_peak.error_kind_counts_default
+PARTITION OF ailog_peak.error_kind_counts DEFAULT;
+
+CREATE INDEX idx_error_kind_counts_window_namespace
+ON ailog_peak.error_kind_counts (window_start DESC, namespace);
+
+CREATE INDEX idx_error_kind_counts_fingerprint_window
+ON ailog_peak.error_kind_counts (fingerprint, window_start DESC);
+
+CREATE TABLE ailog_peak.namespace_error_counts (
+    run_id VARCHAR(160) NOT NULL REFERENCES ailog_peak.analysis_runs(run_id) ON DELETE CASCADE,
+    window_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    namespace VARCHAR(255) NOT NULL,
+    error_count BIGINT NOT NULL CHECK (error_count >= 0),
+    PRIMARY KEY (run_id, window_start, namespace)
+) PARTITION BY RANGE (window_start);
+
+CREATE TABLE ailog_peak.namespace_error_counts_default
+PARTITION OF ailog_peak.namespace_error_counts DEFAULT;
+
+CREATE INDEX idx_namespace_error_counts_window
+ON ailog_peak.namespace_error_counts (window_start DESC, namespace);
+
+CREATE INDEX idx_namespace_error_counts_run_window
+ON ailog_peak.namespace_error_counts (run_id, window_start);
+
+CREATE TABLE ailog_peak.detection_events (
+        run_id VARCHAR(160) NOT NULL REFERENCES ailog_peak.analysis_runs(run_id) ON DELETE CASCADE,
+        window_start TIMESTAMP WITH TIME ZONE NOT NULL,
+        namespace VARCHAR(255) NOT NULL,
+        fingerprint VARCHAR(64) NOT NULL,
+        detector_type VARCHAR(100) NOT NULL,
+        detector_version VARCHAR(100) NOT NULL,
+        evaluated_value NUMERIC,
+        threshold_value NUMERIC,
+        threshold_snapshot_id UUID REFERENCES ailog_peak.threshold_snapshot_runs(snapshot_id),
+        flags JSONB NOT NULL,
+        explanation TEXT NOT NULL,
+        evidence JSONB NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (run_id, window_start, namespace, fingerprint, detector_type)
+) PARTITION BY RANGE (window_start);
+
+CREATE TABLE ailog_peak.detection_events_default
+PARTITION OF ailog_peak.detection_events DEFAULT;
+
+CREATE INDEX idx_detection_events_window
+ON ailog_peak.detection_events (window_start DESC, detector_type);
+
+-- Month partitions from the oldest existing fact through three months ahead
+SELECT ailog_peak.ensure_fact_partitions(
+    (LEAST(
+        (SELECT MIN(window_start) FROM ailog_peak.error_kind_counts_heap),
+        (SELECT MIN(window_start) FROM ailog_peak.namespace_error_counts_heap),
+        (SELECT MIN(window_start) FROM ailog_peak.detection_events_heap),
+        NOW()
+    ) AT TIME ZONE 'UTC')::DATE,
+    ((NOW() + INTERVAL '3 months') AT TIME ZONE 'UTC')::DATE
+);
+
+INSERT INTO ailog_peak.error_kind_counts (
+    run_id, window_start, namespace, application, fingerprint, error_type,
+    category, subcategory, error_count, first_event_at, last_event_at,
+    sample_message, metadata_quality
+)
+SELECT
+    run_id, window_start, namespace, application, fingerprint, error_type,
+    category, subcategory, error_count, first_event_at, last_event_at,
+    sample_message, metadata_quality
+FROM ailog_peak.error_kind_counts_heap;
+
+INSERT INTO ailog_peak.namespace_error_counts (run_id, window_start, namespace, error_count)
+SELECT run_id, window_start, namespace, error_count
+FROM ailog_peak.namespace_error_counts_heap;
+
+INSERT INTO ailog_peak.detection_events (
+    run_id, window_start, namespace, fingerprint, detector_type,
+    detector_version, evaluated_value, threshold_value, threshold_snapshot_id,
+    flags, explanation, evidence, created_at
+)
+SELECT
+    run_id, window_start, namespace, fingerprint, detector_type,
+    detector_version, evaluated_value, threshold_value, threshold_snapshot_id,
+    flags, explanation, evidence, created_at
+FROM ailog_peak.detection_events_heap;
+
+DROP TABLE ailog_peak.error_kind_counts_heap;
+DROP TABLE ailog_peak.namespace_error_counts_heap;
+DROP TABLE ailog_peak.detection_events_heap;
+
+CREATE OR REPLACE VIEW ailog_peak.v_complete_error_kind_counts AS
+SELECT fact_row.*
+FROM ailog_peak.error_kind_counts fact_row
+JOIN ailog_peak.authoritative_run_windows authority
+    ON authority.run_id = fact_row.run_id
+ AND authority.window_start = fact_row.window_start;
+
+CREATE OR REPLACE VIEW ailog_peak.v_complete_namespace_error_counts AS
+SELECT fact_row.*
+FROM ailog_peak.namespace_error_counts fact_row
+JOIN ailog_peak.authoritative_run_windows authority
+    ON authority.run_id = fact_row.run_id
+ AND authority.window_start = fact_row.window_start;
+
+CREATE OR REPLACE VIEW ailog_peak.v_metadata_quality_health AS
+SELECT
+    run_id,
+    window_start,
+    SUM(error_count)::BIGINT AS total_event_count,
+    SUM(error_count) FILTER (WHERE metadata_quality = 'structured')::BIGINT
+        AS structured_event_count,
+    SUM(error_count) FILTER (WHERE metadata_quality = 'derived')::BIGINT
+        AS derived_event_count,
+    SUM(error_count) FILTER (WHERE metadata_quality = 'unknown')::BIGINT
+        AS unknown_metadata_event_count,
+    SUM(error_count) FILTER (WHERE application = 'unknown')::BIGINT
+        AS unknown_application_event_count,
+    SUM(error_count) FILTER (WHERE error_type = 'UnknownError')::BIGINT
+        AS unknown_error_type_event_count,
+    SUM(error_count) FILTER (WHERE subcategory = 'unclassified')::BIGINT
+        AS unclassified_event_count,
+    ROUND(
+        100.0 * SUM(error_count) FILTER (WHERE metadata_quality = 'unknown')
+        / NULLIF(SUM(error_count), 0),
+        2
+    ) AS unknown_metadata_pct
+FROM ailog_peak.v_complete_error_kind_counts
+GROUP BY run_id, window_start;
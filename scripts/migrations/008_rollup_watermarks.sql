@@ -0,0 +1,34 @@
+-- High-water mark per daily rollup table.
+--
+-- run_data_maintenance.py records the first day that is NOT yet rolled up
+-- (the retention cutoff of the last committed run). Staging then covers only
+-- days at or after the mark plus older days that still have authoritative
+-- windows or legacy rows. Retention removes those once they are rolled up, so
+-- anything left below the mark was written by a later (superseding) replay.
+
+CREATE TABLE IF NOT EXISTS ailog_peak.rollup_watermarks (
+    rollup_table VARCHAR(100) PRIMARY KEY,
+    rolled_up_before DATE NOT NULL,
+    maintenance_id UUID REFERENCES ailog_peak.maintenance_runs(maintenance_id) ON DELETE SET NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    CONSTRAINT ck_rollup_watermark_table CHECK (
+        rollup_table IN ('daily_error_kind_rollups', 'daily_namespace_rollups')
+    )
+);
+
+-- Existing deployments: everything before the newest persisted rollup day is done
+INSERT INTO ailog_peak.rollup_watermarks (rollup_table, rolled_up_before)
+SELECT 'daily_error_kind_rollups', MAX(rollup_date) + 1
+FROM ailog_peak.daily_error_kind_rollups
+HAVING MAX(rollup_date) IS NOT NULL
+ON CONFLICT (rollup_table) DO NOTHING;
+
+INSERT INTO ailog_peak.rollup_watermarks (rollup_table, rolled_up_before)
+SELECT 'daily_namespace_rollups', MAX(rollup_date) + 1
+FROM ailog_peak.daily_namespace_rollups
+HAVING MAX(rollup_date) IS NOT NULL
+ON CONFLICT (rollup_table) DO NOTHING;
+
+ALTER TABLE ailog_peak.maintenance_runs
+    ADD COLUMN IF NOT EXISTS rollup_days INTEGER NOT NULL DEFAULT 0 CHECK (rollup_days >= 0),
+    ADD COLUMN IF NOT EXISTS late_rollup_days INTEGER NOT NULL DEFAULT 0 CHECK (late_rollup_days >= 0);
@@ -0,0 +1,60 @@
+-- Per-phase wall time and RSS delta for each analysis run.
+--
+-- regular_phase.py records spans (fetch, Phase B-E, incident build, trace
+-- patterns, persistence, registry, export, notification) with
+-- pipeline.spans.PhaseSpans and writes them after the run. v_pipeline_health
+-- exposes the per-run breakdown next to code_version, so regressions can be
+-- compared across image tags.
+
+CREATE TABLE IF NOT EXISTS ailog_peak.run_phase_metrics (
+    run_id VARCHAR(160) NOT NULL REFERENCES ailog_peak.analysis_runs(run_id) ON DELETE CASCADE,
+    phase VARCHAR(60) NOT NULL,
+    seq SMALLINT NOT NULL,
+    wall_ms NUMERIC(14, 3) NOT NULL CHECK (wall_ms >= 0),
+    rss_start_mb NUMERIC(10, 1),
+    rss_delta_mb NUMERIC(10, 1),
+    record_count BIGINT CHECK (record_count IS NULL OR record_count >= 0),
+    fingerprint_count INTEGER CHECK (fingerprint_count IS NULL OR fingerprint_count >= 0),
+    recorded_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (run_id, phase)
+);
+
+CREATE OR REPLACE VIEW ailog_peak.v_pipeline_health AS
+SELECT
+    run_row.run_id,
+    run_row.run_type,
+    run_row.window_start,
+    run_row.window_end,
+    run_row.status,
+    run_row.expected_count,
+    run_row.fetched_count,
+    run_row.processed_count,
+    run_row.persisted_event_count,
+    run_row.fact_row_count,
+    run_row.incident_count,
+    run_row.query_hash,
+    run_row.code_version,
+    run_row.replay_of_run_id,
+    run_row.superseded_by_run_id,
+    run_row.started_at,
+    run_row.completed_at,
+    EXTRACT(EPOCH FROM (COALESCE(run_row.completed_at, NOW()) - run_row.started_at)) AS duration_seconds,
+    CASE
+        WHEN run_row.expected_count IS NULL THEN NULL
+        ELSE run_row.expected_count - run_row.fetched_count
+    END AS source_count_delta,
+    run_row.fetched_count - run_row.persisted_event_count AS persistence_count_delta,
+    phase_summary.phase_wall_ms,
+    phase_summary.phase_rss_delta_mb,
+    phase_summary.slowest_phase,
+    phase_summary.max_rss_delta_mb
+FROM ailog_peak.analysis_runs run_row
+LEFT JOIN LATERAL (
+    SELECT
+        JSONB_OBJECT_AGG(metric.phase, metric.wall_ms ORDER BY metric.seq) AS phase_wall_ms,
+        JSONB_OBJECT_AGG(metric.phase, metric.rss_delta_mb ORDER BY metric.seq) AS phase_rss_delta_mb,
+        (ARRAY_AGG(metric.phase ORDER BY metric.wall_ms DESC, metric.seq))[1] AS slowest_phase,
+        MAX(metric.rss_delta_mb) AS max_rss_delta_mb
+    FROM ailog_peak.run_phase_metrics metric
+    WHERE metric.run_id = run_row.run_id
+) phase_summary ON TRUE;
@@ -19,27 +19,59 @@ Použití:
     collection = pipeline.run(errors)
 """
 
-from .incident import (
-    Incident,
-    IncidentCollection,
-    IncidentCategory,
-    IncidentSeverity,
-    TimeInfo,
-    Stats,
-    Flags,
-    ScoreBreakdown,
-    Evidence,
-    generate_incident_id,
-    generate_fingerprint,
-)
+import importlib
+
+# Exporty se načítají líně (PEP 562): ``from pipeline.spans import PhaseSpans``
+# nebo okno bez errorů nemá platit import všech fází a kompilaci pravidel.
+_LAZY_EXPORTS = {
+    # Incident
+    "Incident": ".incident",
+    "IncidentCollection": ".incident",
+    "IncidentCategory": ".incident",
+    "IncidentSeverity": ".incident",
+    "TimeInfo": ".incident",
+    "Stats": ".incident",
+    "Flags": ".incident",
+    "ScoreBreakdown": ".incident",
+    "Evidence": ".incident",
+    "generate_incident_id": ".incident",
+    "generate_fingerprint": ".incident",
+    # Phases
+    "PhaseA_Parser": ".phase_a_parse",
+    "NormalizedRecord": ".phase_a_parse",
+    "group_by_fingerprint": ".phase_a_parse",
+    "PhaseB_Measure": ".phase_b_measure",
+    "MeasurementResult": ".phase_b_measure",
+    "BaselineStats": ".phase_b_measure",
+    "PhaseC_Detect": ".phase_c_detect",
+    "DetectionResult": ".phase_c_detect",
+    "PhaseD_Score": ".phase_d_score",
+    "ScoreResult": ".phase_d_score",
+    "ScoreWeights": ".phase_d_score",
+    "score_to_severity": ".phase_d_score",
+    "PhaseE_Classify": ".phase_e_classify",
+    "ClassificationRule": ".phase_e_classify",
+    "ClassificationResult": ".phase_e_classify",
+    "PhaseF_Report": ".phase_f_report",
+    # Pipeline
+    "Pipeline": ".pipeline",
+    "load_batch_files": ".pipeline",
+    "PhaseSpans": ".spans",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
 
-from .phase_a_parse import PhaseA_Parser, NormalizedRecord, group_by_fingerprint
-from .phase_b_measure import PhaseB_Measure, MeasurementResult, BaselineStats
-from .phase_c_detect import PhaseC_Detect, DetectionResult
-from .phase_d_score import PhaseD_Score, ScoreResult, ScoreWeights, score_to_severity
-from .phase_e_classify import PhaseE_Classify, ClassificationRule, ClassificationResult
-from .phase_f_report import PhaseF_Report
-from .pipeline import Pipeline, load_batch_files
 
 __version__ = "1.0.0"
 __all__ = [
@@ -67,4 +99,5 @@ __all__ = [
     # Pipeline
     "Pipeline",
     "load_batch_files",
+    "PhaseSpans",
 ]
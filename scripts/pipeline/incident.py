@@ -39,7 +39,7 @@ class IncidentSeverity(Enum):
     INFO = "info"          # score < 20
 
 
-@dataclass
+@dataclass(slots=True)
 class TimeInfo:
     """Časové informace o incidentu"""
     first_seen: Optional[datetime] = None
@@ -49,7 +49,7 @@ class TimeInfo:
     window_end: Optional[datetime] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Stats:
     """Měřené statistiky (FÁZE B)"""
     # Baseline
@@ -71,7 +71,7 @@ class Stats:
     trend_ratio: float = 1.0
 
 
-@dataclass
+@dataclass(slots=True)
 class Evidence:
     """Důkaz pro flag (FÁZE C)"""
     rule: str                        # Název pravidla
@@ -94,7 +94,7 @@ class Evidence:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Flags:
     """Boolean flags z detekce (FÁZE C)"""
     is_new: bool = False             # Nikdy předtím neviděno
@@ -106,7 +106,7 @@ class Flags:
     is_cross_namespace: bool = False # Objevuje se ve více namespaces
 
 
-@dataclass
+@dataclass(slots=True)
 class ScoreBreakdown:
     """Rozklad skóre (FÁZE D)"""
     base_score: float = 0.0
@@ -132,7 +132,7 @@ class ScoreBreakdown:
         ))
 
 
-@dataclass
+@dataclass(slots=True)
 class PropagationInfo:
     """
     Informace o propagaci incidentu.
@@ -155,7 +155,7 @@ class PropagationInfo:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class TraceInfo:
     """
     Agregované trace informace pro incident.
@@ -176,7 +176,7 @@ class TraceInfo:
         }
 
 
-@dataclass 
+@dataclass(slots=True)
 class Incident:
     """
     Hlavní Incident Object - prochází celým pipeline.
@@ -455,6 +455,9 @@ class IncidentCollection:
 
     # Exact observed facts at (15m, namespace, application, fingerprint) grain
     error_kind_facts: List[Dict[str, Any]] = field(default_factory=list)
+
+    # Per-phase wall time / RSS delta (pipeline.spans.PhaseSpans.as_dicts())
+    phase_metrics: List[Dict[str, Any]] = field(default_factory=list)
     
     # Summary
     total_incidents: int = 0
@@ -491,6 +494,7 @@ class IncidentCollection:
                 "by_category": self.by_category,
             },
             "error_kind_facts": self.error_kind_facts,
+            "phase_metrics": self.phase_metrics,
             "incidents": [inc.to_dict() for inc in self.incidents],
         }
     
@@ -514,6 +518,7 @@ class IncidentCollection:
         collection.input_file = data.get("input_file", "")
         collection.input_records = data.get("input_records", 0)
         collection.error_kind_facts = data.get("error_kind_facts", [])
+        collection.phase_metrics = data.get("phase_metrics", [])
         
         for inc_data in data.get("incidents", []):
             collection.add_incident(Incident.from_dict(inc_data))
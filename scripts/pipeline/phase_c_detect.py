@@ -12,10 +12,13 @@ Detekce anomálií s registry integrací.
 Složitost: O(n) místo O(n × fingerprints)
 """
 
-from typing import Dict, List, Set, Optional, Tuple
+from typing import Dict, Iterable, List, Set, Optional, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import Counter, defaultdict
+from bisect import bisect_left
+from itertools import repeat
+from operator import attrgetter, sub
 import sys
 import os
 
@@ -75,6 +78,32 @@ except ImportError:
         PeakDetector = None
 
 
+def evaluate_namespace_peaks(
+    peak_detector: 'PeakDetector',
+    namespace_totals: Dict[str, Dict[datetime, int]],
+    min_value: int = 1,
+) -> List[Tuple[str, datetime, int, Dict]]:
+    """P93/CAP nad namespace × bucket součty → [(namespace, bucket, total, check)] jen pro peaky.
+
+    Phase C ji volá nad součty z fingerprintů; stejně funguje i nad součty
+    z ES agregace (fetch_namespace_bucket_totals).
+    """
+    peaks = []
+    if not peak_detector:
+        return peaks
+    for namespace, bucket_counts in namespace_totals.items():
+        for bucket, namespace_total in bucket_counts.items():
+            if namespace_total < min_value:
+                continue
+            try:
+                check = peak_detector.is_peak(float(namespace_total), namespace, bucket.weekday())
+            except Exception:
+                continue
+            if check.get('is_peak'):
+                peaks.append((namespace, bucket, namespace_total, check))
+    return peaks
+
+
 @dataclass
 class DetectionResult:
     """Výstup z FÁZE C pro jeden fingerprint"""
@@ -254,7 +283,8 @@ class PhaseC_Detect:
         self,
         measurement: MeasurementResult,
         fp_records: List,
-        result: DetectionResult
+        result: DetectionResult,
+        timestamps: List[datetime] = None,
     ) -> bool:
         """Detekuje burst: max_count / avg_count > threshold (per spec).
 
@@ -264,35 +294,23 @@ class PhaseC_Detect:
         Nezávisí na historickém baseline (EWMA) — pouze porovnává
         distribuci eventů uvnitř aktuálního okna.
         Viz README_DETAILED.md, Phase C: Burst Detection.
-        """
-        if len(fp_records) < 2:
-            return False
 
-        sorted_records = sorted(
-            [r for r in fp_records if r.timestamp],
-            key=lambda r: r.timestamp
-        )
+        timestamps: už seřazené timestampy (z detect_batch), jinak se seřadí zde.
+        """
+        if timestamps is None:
+            if len(fp_records) < 2:
+                return False
+            timestamps = [r.timestamp for r in self._sort_by_timestamp(fp_records)]
 
-        if len(sorted_records) < 2:
+        if len(timestamps) < 2:
             return False
 
         # Capture event timestamps
-        result.first_event_ts = sorted_records[0].timestamp
-        result.last_event_ts = sorted_records[-1].timestamp
-
-        # Compute sliding window counts (O(n))
-        window = timedelta(seconds=self.burst_window_sec)
-        window_start_idx = 0
-        window_counts = []
-
-        for i, record in enumerate(sorted_records):
-            while (window_start_idx < i and
-                   sorted_records[window_start_idx].timestamp < record.timestamp - window):
-                window_start_idx += 1
-            window_counts.append(i - window_start_idx + 1)
-
-        max_count = max(window_counts)
-        avg_count = sum(window_counts) / len(window_counts)
+        result.first_event_ts = timestamps[0]
+        result.last_event_ts = timestamps[-1]
+
+        max_count, total_count = self._window_counts(timestamps, self.burst_window_sec)
+        avg_count = total_count / len(timestamps)
         ratio = max_count / avg_count if avg_count > 0 else 0
 
         if ratio > self.burst_threshold:
@@ -308,6 +326,69 @@ class PhaseC_Detect:
             return True
 
         return False
+
+    @staticmethod
+    def _sort_by_timestamp(fp_records: List) -> List:
+        """Records s timestampem, stabilně seřazené podle času."""
+        return sorted((r for r in fp_records if r.timestamp), key=attrgetter('timestamp'))
+
+    @staticmethod
+    def _window_counts(timestamps: List[datetime], window_sec: int) -> Tuple[int, int]:
+        """
+        Počty eventů v okně (t - window, t] pro každý event → (max, součet).
+
+        Začátek okna je bisect_left nad seřazenými timestampy (ekvivalent
+        dvou ukazatelů: první event >= t - window). Vše běží přes map() v C,
+        bez Python smyčky per record.
+        """
+        n = len(timestamps)
+        window = timedelta(seconds=window_sec)
+        starts = list(map(bisect_left, repeat(timestamps, n), map(sub, timestamps, repeat(window, n))))
+        max_count = max(map(sub, range(n), starts)) + 1
+        total_count = n * (n + 1) // 2 - sum(starts)
+        return max_count, total_count
+
+    @staticmethod
+    def _namespace_buckets(
+        timed_records: List,
+        timestamps: List[datetime],
+        window_minutes: int,
+    ) -> Dict[str, Dict[datetime, int]]:
+        """
+        Počty per namespace × bucket (window_minutes) ze seřazených records.
+
+        Hranice bucketu se najdou bisectem, namespace v rámci bucketu spočítá
+        Counter — Python práce je per bucket, ne per record.
+        """
+        namespace_windows: Dict[str, Dict[datetime, int]] = defaultdict(dict)
+        if not timestamps:
+            return namespace_windows
+
+        def floor(ts: datetime) -> datetime:
+            return ts.replace(minute=(ts.minute // window_minutes) * window_minutes,
+                              second=0, microsecond=0)
+
+        namespaces = [r.namespace for r in timed_records]
+        if len({ts.tzinfo for ts in timestamps}) > 1:
+            # Smíšené timezone: porovnání jde přes UTC, bucket přes lokální čas
+            slices = [(floor(ts), i, i + 1) for i, ts in enumerate(timestamps)]
+        else:
+            slices = []
+            i, n = 0, len(timestamps)
+            while i < n:
+                bucket = floor(timestamps[i])
+                end = min(bucket + timedelta(minutes=window_minutes),
+                          bucket.replace(minute=0) + timedelta(hours=1))
+                j = bisect_left(timestamps, end, i + 1)
+                slices.append((bucket, i, j))
+                i = j
+
+        for bucket, i, j in slices:
+            for namespace, count in Counter(namespaces[i:j]).items():
+                if namespace:
+                    bucket_counts = namespace_windows[namespace]
+                    bucket_counts[bucket] = bucket_counts.get(bucket, 0) + count
+        return namespace_windows
     
     def _detect_new(
         self,
@@ -453,16 +534,20 @@ class PhaseC_Detect:
 
     def prepare_namespace_peak_results(
         self,
-        fingerprint_namespace_windows: Dict[str, Dict[str, Dict[datetime, int]]],
+        fingerprint_namespace_windows: Iterable[Tuple[str, Dict[str, Dict[datetime, int]]]],
     ) -> None:
-        """Evaluate P93/CAP over namespace-total 15-minute buckets."""
+        """Evaluate P93/CAP over namespace-total 15-minute buckets.
+
+        Vstup jsou dvojice (fingerprint, {namespace: {bucket: count}}) —
+        run_streaming je dekóduje líně po jednom fingerprintu.
+        """
         self._fingerprint_peak_results = {}
         if not self.peak_detector:
             return
 
         namespace_totals: Dict[str, Dict[datetime, int]] = defaultdict(lambda: defaultdict(int))
         contributors: Dict[Tuple[str, datetime], Dict[str, int]] = defaultdict(dict)
-        for fingerprint, namespace_windows in fingerprint_namespace_windows.items():
+        for fingerprint, namespace_windows in fingerprint_namespace_windows:
             for namespace, bucket_counts in namespace_windows.items():
                 if not namespace:
                     continue
@@ -470,42 +555,32 @@ class PhaseC_Detect:
                     namespace_totals[namespace][bucket] += count
                     contributors[(namespace, bucket)][fingerprint] = count
 
-        for namespace, bucket_counts in namespace_totals.items():
-            for bucket, namespace_total in bucket_counts.items():
-                if namespace_total < self.min_namespace_peak_value:
-                    continue
-                try:
-                    check = self.peak_detector.is_peak(
-                        float(namespace_total), namespace, bucket.weekday()
-                    )
-                except Exception:
-                    continue
-                if not check.get('is_peak'):
-                    continue
-
-                bucket_contributors = contributors[(namespace, bucket)]
-                owner = min(
-                    bucket_contributors,
-                    key=lambda fingerprint: (-bucket_contributors[fingerprint], fingerprint),
-                )
-                trigger_score = max(
-                    namespace_total / check.get('p93_threshold', 1.0)
-                    if check.get('p93_threshold') else 0.0,
-                    namespace_total / check.get('cap_threshold', 1.0)
-                    if check.get('cap_threshold') else 0.0,
-                )
-                candidate = {
-                    **check,
-                    'namespace': namespace,
-                    'value': float(namespace_total),
-                    'fingerprint_contribution': bucket_contributors[owner],
-                    'contributing_fingerprints': len(bucket_contributors),
-                    'peak_identifier': f"SPIKE:NS:{namespace}:{bucket.isoformat()}",
-                    '_trigger_score': trigger_score,
-                }
-                current = self._fingerprint_peak_results.get(owner)
-                if current is None or trigger_score > current.get('_trigger_score', -1):
-                    self._fingerprint_peak_results[owner] = candidate
+        for namespace, bucket, namespace_total, check in evaluate_namespace_peaks(
+            self.peak_detector, namespace_totals, self.min_namespace_peak_value
+        ):
+            bucket_contributors = contributors[(namespace, bucket)]
+            owner = min(
+                bucket_contributors,
+                key=lambda fingerprint: (-bucket_contributors[fingerprint], fingerprint),
+            )
+            trigger_score = max(
+                namespace_total / check.get('p93_threshold', 1.0)
+                if check.get('p93_threshold') else 0.0,
+                namespace_total / check.get('cap_threshold', 1.0)
+                if check.get('cap_threshold') else 0.0,
+            )
+            candidate = {
+                **check,
+                'namespace': namespace,
+                'value': float(namespace_total),
+                'fingerprint_contribution': bucket_contributors[owner],
+                'contributing_fingerprints': len(bucket_contributors),
+                'peak_identifier': f"SPIKE:NS:{namespace}:{bucket.isoformat()}",
+                '_trigger_score': trigger_score,
+            }
+            current = self._fingerprint_peak_results.get(owner)
+            if current is None or trigger_score > current.get('_trigger_score', -1):
+                self._fingerprint_peak_results[owner] = candidate
 
         for candidate in self._fingerprint_peak_results.values():
             candidate.pop('_trigger_score', None)
@@ -519,21 +594,23 @@ class PhaseC_Detect:
         error_type: str = "",
         normalized_message: str = "",
         namespaces: List[str] = None,
+        timestamps: List[datetime] = None,
     ) -> DetectionResult:
-        """Aplikuje všechna detekční pravidla"""
+        """Aplikuje všechna detekční pravidla
+
+        timestamps: seřazené timestampy fp_records (detect_batch je předpočítá).
+        """
         result = DetectionResult(fingerprint=measurement.fingerprint)
         
         self.stats['total_processed'] += 1
         
         # Capture event timestamps from records if available
         if fp_records:
-            sorted_records = sorted(
-                [r for r in fp_records if r.timestamp],
-                key=lambda r: r.timestamp
-            )
-            if sorted_records:
-                result.first_event_ts = sorted_records[0].timestamp
-                result.last_event_ts = sorted_records[-1].timestamp
+            if timestamps is None:
+                timestamps = [r.timestamp for r in self._sort_by_timestamp(fp_records)]
+            if timestamps:
+                result.first_event_ts = timestamps[0]
+                result.last_event_ts = timestamps[-1]
         
         # Apply detection rules
         self._detect_spike(measurement, result)
@@ -548,7 +625,7 @@ class PhaseC_Detect:
         self._detect_silence(measurement, result)
         
         if fp_records:
-            self._detect_burst(measurement, fp_records, result)
+            self._detect_burst(measurement, fp_records, result, timestamps)
         
         if current_version:
             self._detect_regression(measurement, current_version, result)
@@ -590,18 +667,18 @@ class PhaseC_Detect:
                         ),
                     }
 
+        # Seřadit JEDNOU per fingerprint — sdílí burst detekce i namespace buckety
         window_minutes = int(os.getenv('WINDOW_MINUTES', '15'))
+        timestamps_by_fp: Dict[str, List[datetime]] = {}
         fingerprint_namespace_windows = {}
         for fingerprint, fp_records in records_by_fp.items():
-            namespace_windows: Dict[str, Dict[datetime, int]] = defaultdict(lambda: defaultdict(int))
-            for record in fp_records:
-                if not record.timestamp or not record.namespace:
-                    continue
-                minute = (record.timestamp.minute // window_minutes) * window_minutes
-                bucket = record.timestamp.replace(minute=minute, second=0, microsecond=0)
-                namespace_windows[record.namespace][bucket] += 1
-            fingerprint_namespace_windows[fingerprint] = namespace_windows
-        self.prepare_namespace_peak_results(fingerprint_namespace_windows)
+            timed_records = self._sort_by_timestamp(fp_records)
+            timestamps = [r.timestamp for r in timed_records]
+            timestamps_by_fp[fingerprint] = timestamps
+            fingerprint_namespace_windows[fingerprint] = self._namespace_buckets(
+                timed_records, timestamps, window_minutes
+            )
+        self.prepare_namespace_peak_results(fingerprint_namespace_windows.items())
 
         # ==================================================================
         # Per-fingerprint detection (O(fingerprints))
@@ -622,6 +699,7 @@ class PhaseC_Detect:
                 error_type=meta.get('error_type', ''),
                 normalized_message=meta.get('normalized_message', ''),
                 namespaces=meta.get('namespaces', []),
+                timestamps=timestamps_by_fp.get(fp),
             )
 
         return results
@@ -45,6 +45,164 @@ class ClassificationResult:
     confidence: float = 1.0          # Pro pattern match vždy 1.0
 
 
+# Max. počet (error_type, normalized_message) → výsledek v memo cache
+CLASSIFY_CACHE_SIZE = 50000
+
+
+def _literal_fragments(pattern: str) -> Optional[Tuple[List[str], bool]]:
+    """
+    Rozloží regex na povinné literální fragmenty (lowercase) + příznak mezer.
+
+    Podporuje jen podmnožinu syntaxe, kterou používají pravidla: běžné znaky,
+    escapovanou interpunkci, case třídy typu ``[Tt]`` a mezery ``.``/``.*``/
+    ``.+``/``.?``. Cokoliv jiného (alternace, skupiny, kvantifikátory na
+    znacích, \\d...) → None a pattern se vyhodnocuje jen regexem.
+
+        'SQL.*error'  → (['sql', 'error'], True)
+        '[Tt]imeout'  → (['timeout'], False)
+    """
+    fragments: List[str] = []
+    current: List[str] = []
+    has_gap = False
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '\\':
+            if i + 1 >= n or pattern[i + 1].isalnum():
+                return None
+            current.append(pattern[i + 1])
+            i += 2
+        elif c == '[':
+            end = pattern.find(']', i)
+            chars = pattern[i + 1:end] if end != -1 else ''
+            if not (len(chars) == 2 and chars.isascii() and chars.isalpha()
+                    and chars[0].lower() == chars[1].lower()):
+                return None
+            current.append(chars[0])
+            i = end + 1
+        elif c == '.':
+            fragments.append(''.join(current))
+            current = []
+            has_gap = True
+            i += 1
+            if i < n and pattern[i] in '*+?':
+                i += 1
+            continue
+        elif c in '()|?*+{}^$':
+            return None
+        else:
+            current.append(c)
+            i += 1
+        if i < n and pattern[i] in '*+?{':
+            return None
+    fragments.append(''.join(current))
+    result = [f.lower() for f in fragments if f]
+    if not result or not all(f.isascii() for f in result):
+        return None
+    return result, has_gap
+
+
+class _CompiledRuleSet:
+    """
+    Zkompilovaná sada pravidel — všichni kandidáti v jednom průchodu.
+
+    Každý pattern se rozloží na literální fragmenty. Pro ASCII text se
+    nejdřív jedním průchodem přes unikátní literály (C-level substring
+    search nad lowercase textem) zjistí, které fragmenty jsou přítomné:
+      - čistý literál → match bez regexu,
+      - literály s mezerami (``a.*b``) → regex jen když jsou všechny přítomné,
+      - ostatní patterny → jeden kombinovaný regex per pravidlo.
+    Z kandidátů vyhrává první pravidlo v pořadí priority — stejně jako
+    sekvenční first-match. Ne-ASCII text jde přímo přes sekvenční regexy
+    (IGNORECASE pro Unicode nemusí odpovídat str.lower()).
+    """
+
+    def __init__(self, compiled_rules: List[Tuple['ClassificationRule', List[re.Pattern]]]):
+        self.compiled_rules = compiled_rules
+        literal_ids: Dict[str, int] = {}
+        # literal id → index nejvýše postaveného pravidla, kde je literál celým patternem
+        exact_rule: Dict[int, int] = {}
+        # (index pravidla, povinné literal ids nebo None, regex) — v pořadí priority
+        self._checks: List[Tuple[int, Optional[Tuple[int, ...]], re.Pattern]] = []
+
+        for rule_idx, (_rule, compiled_patterns) in enumerate(compiled_rules):
+            leftovers: List[re.Pattern] = []
+            for compiled in compiled_patterns:
+                parsed = _literal_fragments(compiled.pattern)
+                if parsed is None:
+                    leftovers.append(compiled)
+                    continue
+                fragments, has_gap = parsed
+                ids = tuple(literal_ids.setdefault(f, len(literal_ids)) for f in fragments)
+                if not has_gap:
+                    exact_rule.setdefault(ids[0], rule_idx)
+                else:
+                    self._checks.append((rule_idx, ids, compiled))
+            combined = self._combine(leftovers)
+            if combined is not None:
+                self._checks.append((rule_idx, None, combined))
+
+        self._literals = sorted(literal_ids, key=literal_ids.__getitem__)
+        self._no_rule = len(compiled_rules)
+        self._exact_rule = [exact_rule.get(i, self._no_rule) for i in range(len(self._literals))]
+
+    @staticmethod
+    def _combine(patterns: List[re.Pattern]) -> Optional[re.Pattern]:
+        if not patterns:
+            return None
+        sources = [p.pattern for p in patterns]
+        # Backreference by se v alternaci přečísloval — takové nechat samostatně
+        if len(sources) > 1 and not any(re.search(r'\\\d|\(\?P=', src) for src in sources):
+            try:
+                return re.compile('|'.join(f'(?:{src})' for src in sources), re.IGNORECASE)
+            except re.error:
+                pass
+        if len(patterns) == 1:
+            return patterns[0]
+        return _AnyPattern(patterns)
+
+    def first_match(self, text: str) -> Optional['ClassificationRule']:
+        if not text.isascii():
+            for rule, compiled_patterns in self.compiled_rules:
+                if any(pattern.search(text) for pattern in compiled_patterns):
+                    return rule
+            return None
+
+        lowered = text.lower()
+        hits = {i for i, literal in enumerate(self._literals) if literal in lowered}
+        exact_rule = self._exact_rule
+        best = min((exact_rule[i] for i in hits), default=self._no_rule)
+
+        # Regex jen pro pravidla s vyšší prioritou než nejlepší literální hit
+        for rule_idx, ids, compiled in self._checks:
+            if rule_idx >= best:
+                break
+            if ids is not None and not hits.issuperset(ids):
+                continue
+            if compiled.search(text):
+                best = rule_idx
+                break
+
+        if best == self._no_rule:
+            return None
+        return self.compiled_rules[best][0]
+
+
+class _AnyPattern:
+    """search() přes více regexů, když je nelze bezpečně spojit do alternace."""
+
+    def __init__(self, patterns: List[re.Pattern]):
+        self.patterns = patterns
+
+    def search(self, text: str):
+        for pattern in self.patterns:
+            match = pattern.search(text)
+            if match:
+                return match
+        return None
+
+
 class PhaseE_Classify:
     """
     FÁZE E: Classify
@@ -304,11 +462,31 @@ class PhaseE_Classify:
         # Sort by priority (highest first)
         self.rules.sort(key=lambda r: r.priority, reverse=True)
         
-        # Compile patterns
-        self._compiled_rules = []
-        for rule in self.rules:
-            compiled_patterns = [re.compile(p, re.IGNORECASE) for p in rule.patterns]
-            self._compiled_rules.append((rule, compiled_patterns))
+        # Patterny se kompilují až při první klasifikaci — Pipeline se staví
+        # i pro běhy, které nakonec nic neklasifikují (okno bez errorů).
+        self._compiled: Optional[List[Tuple[ClassificationRule, List[re.Pattern]]]] = None
+        self._rebuild_matcher()
+
+    @property
+    def _compiled_rules(self) -> List[Tuple[ClassificationRule, List[re.Pattern]]]:
+        if self._compiled is None:
+            self._compiled = [
+                (rule, [re.compile(p, re.IGNORECASE) for p in rule.patterns])
+                for rule in self.rules
+            ]
+        return self._compiled
+
+    @property
+    def _matcher(self) -> _CompiledRuleSet:
+        if self._matcher_instance is None:
+            self._matcher_instance = _CompiledRuleSet(self._compiled_rules)
+        return self._matcher_instance
+
+    def _rebuild_matcher(self):
+        """Zahodí multi-pattern matcher (sestaví se líně znovu) a memo cache."""
+        self._matcher_instance: Optional[_CompiledRuleSet] = None
+        # (error_type, normalized_message) → (category, subcategory, matched_rule, confidence)
+        self._cache: Dict[Tuple[str, str], Tuple[IncidentCategory, str, Optional[str], float]] = {}
     
     def classify(
         self,
@@ -320,27 +498,36 @@ class PhaseE_Classify:
         Klasifikuje incident na základě message a error type.
         
         Prochází pravidla podle priority, první match vyhrává.
+
+        Výsledek závisí jen na (error_type, normalized_message), proto se
+        memoizuje — opakované fingerprinty napříč okny se neklasifikují znovu.
         """
-        text_to_match = f"{error_type} {normalized_message}"
-        
-        for rule, compiled_patterns in self._compiled_rules:
-            for pattern in compiled_patterns:
-                if pattern.search(text_to_match):
-                    return ClassificationResult(
-                        fingerprint=fingerprint,
-                        category=rule.category,
-                        subcategory=rule.subcategory,
-                        matched_rule=f"{rule.category.value}/{rule.subcategory}",
-                        confidence=1.0,
-                    )
-        
-        # No match - unknown
+        key = (error_type, normalized_message)
+        cached = self._cache.get(key)
+        if cached is None:
+            text_to_match = f"{error_type} {normalized_message}"
+            rule = self._matcher.first_match(text_to_match)
+            if rule is not None:
+                cached = (
+                    rule.category,
+                    rule.subcategory,
+                    f"{rule.category.value}/{rule.subcategory}",
+                    1.0,
+                )
+            else:
+                # No match - unknown
+                cached = (IncidentCategory.UNKNOWN, "unclassified", None, 0.5)
+            if len(self._cache) >= CLASSIFY_CACHE_SIZE:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[key] = cached
+
+        category, subcategory, matched_rule, confidence = cached
         return ClassificationResult(
             fingerprint=fingerprint,
-            category=IncidentCategory.UNKNOWN,
-            subcategory="unclassified",
-            matched_rule=None,
-            confidence=0.5,
+            category=category,
+            subcategory=subcategory,
+            matched_rule=matched_rule,
+            confidence=confidence,
         )
     
     def classify_batch(
@@ -360,10 +547,12 @@ class PhaseE_Classify:
         self.rules.append(rule)
         self.rules.sort(key=lambda r: r.priority, reverse=True)
         
-        # Recompile
-        compiled_patterns = [re.compile(p, re.IGNORECASE) for p in rule.patterns]
-        self._compiled_rules.append((rule, compiled_patterns))
-        self._compiled_rules.sort(key=lambda x: x[0].priority, reverse=True)
+        # Recompile (jen pokud už byla pravidla zkompilovaná)
+        if self._compiled is not None:
+            compiled_patterns = [re.compile(p, re.IGNORECASE) for p in rule.patterns]
+            self._compiled.append((rule, compiled_patterns))
+            self._compiled.sort(key=lambda x: x[0].priority, reverse=True)
+        self._rebuild_matcher()
 
 
 # ============================================================================
@@ -34,7 +34,7 @@ import argparse
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from dataclasses import asdict
 from collections import Counter
 
@@ -52,6 +52,7 @@ from phase_c_detect import PhaseC_Detect, DetectionResult
 from phase_d_score import PhaseD_Score, ScoreResult, score_to_severity
 from phase_e_classify import PhaseE_Classify, ClassificationResult
 from phase_f_report import PhaseF_Report
+from spans import PhaseSpans
 
 
 class Pipeline:
@@ -123,11 +124,12 @@ class Pipeline:
     @staticmethod
     def _populate_error_kind_facts(
         collection: IncidentCollection,
-        fact_rows: Dict[tuple, List[Any]],
+        fact_rows: Iterable[Tuple[tuple, List[Any]]],
         fingerprint_metadata: Dict[str, Dict[str, str]],
         classifications: Dict[str, ClassificationResult],
     ) -> None:
-        for (bucket, namespace, application, fingerprint), values in sorted(fact_rows.items()):
+        """fact_rows: ((bucket, namespace, application, fingerprint), [count, first, last]), seřazené."""
+        for (bucket, namespace, application, fingerprint), values in fact_rows:
             count, first_seen, last_seen = values
             metadata = fingerprint_metadata[fingerprint]
             classification = classifications.get(fingerprint)
@@ -325,7 +327,7 @@ class Pipeline:
             fact[2] = max(fact[2], record.timestamp)
         self._populate_error_kind_facts(
             collection,
-            fact_rows,
+            sorted(fact_rows.items()),
             {
                 fingerprint: {
                     'error_type': group_records[0].error_type,
@@ -472,6 +474,7 @@ class Pipeline:
         aggregator,
         run_id: str = None,
         input_records: int = None,
+        spans: Optional[PhaseSpans] = None,
     ) -> IncidentCollection:
         """
         Streaming varianta run() (r87).
@@ -480,9 +483,16 @@ class Pipeline:
         recordů v RAM. Produkuje BIT-IDENTICKÉ výsledky jako run() nad stejnými logy
         (viz golden regression test) — reuse Phase B math helperů, Phase C detect(),
         Phase D/E a stejné incident-building logiky.
+
+        spans: volající může předat svůj PhaseSpans (regular/backfill), aby
+        fáze pipeline navazovaly na fetch/persistence; změřené fáze jsou vždy
+        i v ``collection.phase_metrics``.
         """
         from datetime import timedelta
 
+        spans = spans if spans is not None else PhaseSpans()
+        first_seq = len(spans)
+
         agg = aggregator
         if not agg._finalized:
             agg.finalize()
@@ -506,6 +516,7 @@ class Pipeline:
         # FÁZE B: Measure (replikace KROK 3 z phase_b_measure.py nad agregáty)
         # =====================================================================
         print(f"\n📊 PHASE B: Measure (streaming)")
+        span = spans.start('phase_b', records=input_records)
         measurements: Dict[str, MeasurementResult] = {}
         for fp in agg.fp_order:
             acc = agg.acc[fp]
@@ -581,17 +592,20 @@ class Pipeline:
                 last_seen=last_seen,
                 duration_sec=duration_sec,
             )
+        span.stop(fingerprints=len(measurements))
         print(f"   ✅ Measured {len(measurements)} fingerprints")
 
         # =====================================================================
         # FÁZE C: Detect (P93/CAP + reuse detect() + inkrementální burst)
         # =====================================================================
         print(f"\n🔍 PHASE C: Detect (streaming)")
+        span = spans.start('phase_c', fingerprints=len(measurements))
 
-        self.phase_c.prepare_namespace_peak_results({
-            fingerprint: agg.acc[fingerprint].ns_bucket_counts
+        # Generátor: ns_bucket_counts se dekóduje po jednom fingerprintu
+        self.phase_c.prepare_namespace_peak_results(
+            (fingerprint, agg.acc[fingerprint].ns_bucket_counts)
             for fingerprint in measurements
-        })
+        )
 
         # --- Per-fingerprint detekce (reuse detect(); burst inkrementálně) ---
         detections: Dict[str, DetectionResult] = {}
@@ -635,13 +649,15 @@ class Pipeline:
             'burst': sum(1 for d in detections.values() if d.flags.is_burst),
             'cross_ns': sum(1 for d in detections.values() if d.flags.is_cross_namespace),
         }
+        span.stop()
         print(f"   ✅ Detected flags: new={flag_counts['new']}, spike={flag_counts['spike']}, burst={flag_counts['burst']}, cross_ns={flag_counts['cross_ns']}")
 
         # =====================================================================
         # FÁZE D: Score
         # =====================================================================
         print(f"\n📈 PHASE D: Score (streaming)")
-        scores = self.phase_d.score_batch(detections, measurements)
+        with spans.span('phase_d', fingerprints=len(detections)):
+            scores = self.phase_d.score_batch(detections, measurements)
 
         # =====================================================================
         # FÁZE E: Classify
@@ -651,12 +667,14 @@ class Pipeline:
             (fp, agg.acc[fp].normalized_message, agg.acc[fp].error_type)
             for fp in measurements.keys()
         ]
-        classifications = self.phase_e.classify_batch(classify_input)
+        with spans.span('phase_e', fingerprints=len(classify_input)):
+            classifications = self.phase_e.classify_batch(classify_input)
 
         # =====================================================================
         # BUILD INCIDENTS (mirror run())
         # =====================================================================
         print(f"\n🔨 Building Incident Objects (streaming)")
+        span = spans.start('build_incidents')
         collection = IncidentCollection(
             run_id=run_id,
             run_timestamp=datetime.utcnow(),
@@ -669,7 +687,7 @@ class Pipeline:
 
         self._populate_error_kind_facts(
             collection,
-            agg.error_kind_facts,
+            agg.iter_error_kind_facts(),  # líně — plný dekód faktů se nedrží
             {
                 fingerprint: {
                     'error_type': accumulator.error_type,
@@ -717,6 +735,9 @@ class Pipeline:
             inc.originator_application_counts = dict(originator_counts)
             if hasattr(inc.trace_info, 'trace_ids'):
                 inc.trace_info.trace_ids = inc.trace_ids.copy()
+            if getattr(trace_counts, 'truncated', False) and hasattr(inc.trace_info, 'trace_count'):
+                # Bounded mód: trace_event_counts = jen top-K → počet unikátních z HLL
+                inc.trace_info.trace_count = trace_counts.distinct_count()
 
             inc.time.first_seen = measurement.first_seen
             inc.time.last_seen = measurement.last_seen
@@ -743,6 +764,7 @@ class Pipeline:
 
             collection.add_incident(inc)
 
+        span.stop(fingerprints=collection.total_incidents)
         print(f"   ✅ Built {collection.total_incidents} incidents")
 
         # =====================================================================
@@ -752,6 +774,7 @@ class Pipeline:
         collection.trace_pattern_index = {}
         collection.trace_timelines = {}
         if self.build_trace_patterns:
+            span = spans.start('trace_patterns')
             try:
                 from analysis.trace_timeline import (
                     build_trace_timelines, group_traces_by_signature,
@@ -769,7 +792,11 @@ class Pipeline:
                 print(f"   ✅ Built {len(patterns)} trace patterns from {len(timelines)} traces")
             except Exception as e:
                 print(f"   ⚠️ Trace pattern build failed (non-blocking): {e}")
+            span.stop(records=len(collection.trace_timelines))
 
+        collection.phase_metrics = [
+            metric for metric in spans.as_dicts() if metric['seq'] > first_seq
+        ]
         return collection
 
     def replay_and_compare(
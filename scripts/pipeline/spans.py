@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Phase spans - lehké měření času a paměti per fáze běhu
+======================================================
+
+Monotonní časovač (``time.perf_counter``), RSS delta přes ``_process_rss_mb()``
+z fetch_unlimited (live VmRSS, ne peak) a volitelné čítače records/fingerprints.
+Konec spanu je i checkpoint alloc profilu (core.run_profiler.alloc_checkpoint).
+Výsledek je seznam dictů, který se připojí na ``IncidentCollection.phase_metrics``
+a zapíše do ``ailog_peak.run_phase_metrics`` (viz v_pipeline_health).
+
+Použití:
+    spans = PhaseSpans()
+    with spans.span('fetch') as span:
+        ...
+        span.counters['records'] = n
+
+    span = spans.start('phase_b', records=n)   # pro dlouhé sekvenční bloky
+    ...
+    span.stop(fingerprints=len(measurements))
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    from core.fetch_unlimited import _process_rss_mb
+except ImportError:
+    try:
+        from fetch_unlimited import _process_rss_mb
+    except ImportError:
+        _process_rss_mb = None
+
+
+try:
+    from core.run_profiler import alloc_checkpoint
+except ImportError:
+    try:
+        from run_profiler import alloc_checkpoint
+    except ImportError:
+        alloc_checkpoint = None
+
+
+def _rss_mb() -> float:
+    return float(_process_rss_mb()) if _process_rss_mb is not None else 0.0
+
+
+class Span:
+    """Jedna změřená fáze; ``stop()`` je idempotentní."""
+
+    __slots__ = ('name', 'seq', 'counters', '_started', '_rss_start', 'wall_ms', 'rss_delta_mb')
+
+    def __init__(self, name: str, seq: int, counters: Dict[str, int]):
+        self.name = name
+        self.seq = seq
+        self.counters = dict(counters)
+        self._rss_start = _rss_mb()
+        self._started = time.perf_counter()
+        self.wall_ms: Optional[float] = None
+        self.rss_delta_mb: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.wall_ms is not None
+
+    def stop(self, **counters: int) -> 'Span':
+        if not self.finished:
+            self.wall_ms = (time.perf_counter() - self._started) * 1000.0
+            self.rss_delta_mb = _rss_mb() - self._rss_start
+            if alloc_checkpoint is not None:
+                # PROFILE_RUN=alloc: snapshot na hranici fáze (jinak no-op)
+                alloc_checkpoint(self.name)
+        self.counters.update(counters)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'phase': self.name,
+            'seq': self.seq,
+            'wall_ms': round(self.wall_ms or 0.0, 3),
+            'rss_start_mb': round(self._rss_start, 1),
+            'rss_delta_mb': round(self.rss_delta_mb or 0.0, 1),
+            'records': self.counters.get('records'),
+            'fingerprints': self.counters.get('fingerprints'),
+        }
+
+
+class PhaseSpans:
+    """Sekvence spanů jednoho běhu (fetch, Phase A–F, persistence, registry, ...)."""
+
+    def __init__(self):
+        self._spans: List[Span] = []
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def start(self, name: str, **counters: int) -> Span:
+        span = Span(name, len(self._spans) + 1, counters)
+        self._spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **counters: int) -> Iterator[Span]:
+        span = self.start(name, **counters)
+        try:
+            yield span
+        finally:
+            span.stop()
+
+    def extend(self, metrics: List[Dict[str, Any]], prefix: str = '') -> None:
+        """Převezme už změřené spany (např. collection.phase_metrics z Pipeline)."""
+        for metric in metrics or []:
+            span = Span(prefix + metric['phase'], len(self._spans) + 1, {
+                key: metric[key] for key in ('records', 'fingerprints')
+                if metric.get(key) is not None
+            })
+            span._rss_start = metric.get('rss_start_mb') or 0.0
+            span.wall_ms = metric.get('wall_ms') or 0.0
+            span.rss_delta_mb = metric.get('rss_delta_mb') or 0.0
+            self._spans.append(span)
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        return [span.to_dict() for span in self._spans if span.finished]
+
+    def summary(self) -> str:
+        return ' | '.join(
+            f"{metric['phase']} {metric['wall_ms'] / 1000:.2f}s {metric['rss_delta_mb']:+.0f}MB"
+            for metric in self.as_dicts()
+        )
@@ -3,10 +3,14 @@
 Recent Incidents Exporter - Extract TOP incidents from daily report
 ====================================================================
 
-Vezme nejnovější incident_analysis_daily report a extrahuje:
+Vezme nejnovější backfill run artifact (run_artifact_backfill_*.json,
+sekce incident_analysis) a extrahuje:
 - TOP operational incidents (ordered by severity + raw incident count)
 - Struktura: aplikace, severity, root cause, affected apps, actions
 
+Starší běhy bez artefaktu: fallback na regex parsování textového
+incident_analysis_daily reportu.
+
 Exportuje jako CSV vhodný pro Confluence.
 
 Použití:
@@ -24,6 +28,9 @@ from dataclasses import dataclass
 
 SCRIPT_DIR = Path(__file__).parent
 sys.path.insert(0, str(SCRIPT_DIR.parent))
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from core.run_artifact import load_latest_run_artifact, load_run_artifact
 
 @dataclass
 class IncidentRow:
@@ -138,8 +145,15 @@ def parse_incident_block(block: str) -> Optional[Dict]:
     
     return incident if incident['application'] else None
 
-def export_recent_incidents_csv(report_file: str, output_dir: str = None) -> str:
-    """Exportuje recent incidents jako CSV."""
+def load_report_data(report_file: str) -> Dict[str, any]:
+    """Report data z run artifactu (.json/.msgpack) nebo legacy textového reportu."""
+    if Path(report_file).suffix in ('.json', '.msgpack'):
+        return load_run_artifact(report_file).get('incident_analysis') or {'top_incidents': []}
+    return parse_daily_report(report_file)
+
+def export_recent_incidents_csv(report_file: str = None, output_dir: str = None,
+                                report_data: Dict[str, any] = None) -> str:
+    """Exportuje recent incidents jako CSV (z ``report_data`` nebo souboru)."""
     
     if output_dir is None:
         output_dir = SCRIPT_DIR / 'exports' / 'latest'
@@ -148,8 +162,8 @@ def export_recent_incidents_csv(report_file: str, output_dir: str = None) -> str
     
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Parsuj report
-    report_data = parse_daily_report(report_file)
+    if report_data is None:
+        report_data = load_report_data(report_file)
     
     # Seřaď incidenty: critical > high > medium > low, pak by raw_incidents DESC
     severity_order = {'Critical': 0, 'High': 1, 'Medium': 2, 'Low': 3}
@@ -199,8 +213,20 @@ def export_recent_incidents_csv(report_file: str, output_dir: str = None) -> str
     return str(csv_path)
 
 def main():
-    # Najdi nejnovější daily report
     reports_dir = SCRIPT_DIR / 'reports'
+
+    # Preferuj strukturovaný run artifact (bez regex parsování)
+    artifact = load_latest_run_artifact(
+        str(reports_dir), kind='backfill', require=('incident_analysis',),
+        text_glob='incident_analysis_daily_*.txt',
+    )
+    if artifact is not None:
+        print(f"📦 Using run artifact: {Path(artifact['_path']).name}")
+        csv_path = export_recent_incidents_csv(report_data=artifact['incident_analysis'])
+        print(f"📊 CSV file: {csv_path}")
+        return 0
+
+    # Fallback: nejnovější textový daily report
     daily_reports = list(reports_dir.glob('incident_analysis_daily_*.txt'))
     
     if not daily_reports:
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """
 Publish Recent Incidents Report to Confluence
-Extracts problem analysis report and uploads to Recent Incidents page
+Loads the problem_report section of the latest backfill run artifact
+(run_artifact_backfill_*.json) and uploads it to Recent Incidents page.
+Falls back to parsing the text problem_report_*.txt for runs without an artifact.
 """
 
 import os
@@ -29,6 +31,39 @@ def get_latest_problem_report(reports_dir: Path = REPORTS_DIR):
         return None
     return reports[0]
 
+def load_artifact_report(artifact_path: Optional[str] = None, reports_dir: Path = REPORTS_DIR):
+    """Run artifact s problem_report sekcí (explicitní cesta nebo nejnovější), jinak None."""
+    try:
+        from core.run_artifact import RunArtifactError, load_latest_run_artifact, load_run_artifact
+    except ImportError:
+        return None
+
+    if not artifact_path:
+        return load_latest_run_artifact(
+            str(reports_dir), kind='backfill', require=('problem_report',),
+            text_glob='problem_report_*.txt',
+        )
+    try:
+        artifact = load_run_artifact(artifact_path)
+    except RunArtifactError as e:
+        print(f"⚠️ {e}")
+        return None
+    artifact['_path'] = str(artifact_path)
+    return artifact if artifact.get('problem_report') else None
+
+def report_data_from_artifact(artifact, max_problems: int = 20):
+    """Same structure as extract_report_content(), built from the run artifact"""
+    section = artifact['problem_report']
+    header = section.get('header') or {}
+    details = section.get('problem_details') or []
+    return {
+        'header': (header.get('period', ''), header.get('generated', ''), header.get('run_id', '')),
+        'executive_summary': section.get('executive_summary', ''),
+        'has_summary': 'executive_summary' in section,
+        'problem_details': '\n\n'.join(details[:max_problems]),
+        'has_details': 'problem_details' in section,
+    }
+
 def extract_report_content(report_path):
     """Extract EXECUTIVE SUMMARY and PROBLEM DETAILS from report"""
     try:
@@ -226,26 +261,35 @@ def upload_via_confluence_api(html_content):
         print(f"❌ Error uploading to Confluence: {e}")
         return False
 
-def main(report_path: Optional[str] = None, reports_dir: Optional[str] = None):
+def main(report_path: Optional[str] = None, reports_dir: Optional[str] = None,
+         artifact_path: Optional[str] = None):
     """Main workflow"""
     print("📋 Publishing Recent Incidents Report to Confluence...")
+    reports_root = Path(reports_dir) if reports_dir else REPORTS_DIR
 
-    # Get report
-    if report_path:
-        report_path = Path(report_path)
-        if not report_path.exists():
-            print(f"❌ Report file not found: {report_path}")
-            return False
+    # Structured run artifact first (explicit artifact, or latest when no text report given)
+    artifact = None
+    if artifact_path or not report_path:
+        artifact = load_artifact_report(artifact_path, reports_root)
+
+    if artifact is not None:
+        print(f"📦 Using run artifact: {Path(artifact['_path']).name}")
+        report_data = report_data_from_artifact(artifact)
     else:
-        reports_root = Path(reports_dir) if reports_dir else REPORTS_DIR
-        report_path = get_latest_problem_report(reports_root)
-    if not report_path:
-        return False
-    
-    print(f"📄 Using report: {report_path.name}")
-    
-    # Extract content
-    report_data = extract_report_content(report_path)
+        # Legacy text report
+        if report_path:
+            report_path = Path(report_path)
+            if not report_path.exists():
+                print(f"❌ Report file not found: {report_path}")
+                return False
+        else:
+            report_path = get_latest_problem_report(reports_root)
+        if not report_path:
+            return False
+
+        print(f"📄 Using report: {report_path.name}")
+        report_data = extract_report_content(report_path)
+
     if not report_data:
         print("❌ Failed to extract report content")
         return False
@@ -281,8 +325,9 @@ if __name__ == '__main__':
 
     parser = argparse.ArgumentParser(description='Publish Recent Incidents report to Confluence')
     parser.add_argument('--report', type=str, help='Path to problem report file')
-    parser.add_argument('--reports-dir', type=str, help='Directory with problem_report_*.txt files')
+    parser.add_argument('--reports-dir', type=str, help='Directory with run_artifact_*.json / problem_report_*.txt files')
+    parser.add_argument('--artifact', type=str, help='Path to run artifact (run_artifact_*.json)')
     args = parser.parse_args()
 
-    success = main(report_path=args.report, reports_dir=args.reports_dir)
+    success = main(report_path=args.report, reports_dir=args.reports_dir, artifact_path=args.artifact)
     exit(0 if success else 1)
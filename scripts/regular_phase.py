@@ -12,6 +12,7 @@ Použití:
     python regular_phase.py                    # Poslední 15 min
     python regular_phase.py --window 30        # Posledních 30 min
     python regular_phase.py --dry-run          # Bez ukládání
+    python regular_phase.py --daemon           # Rezidentní, každé 15min okno
 """
 
 import os
@@ -24,8 +25,10 @@ import signal
 import re
 import uuid
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Dict, Tuple, Optional, Any, List
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Dict, Tuple, Optional, Any, List
 from zoneinfo import ZoneInfo
 
 _DISPLAY_TZ = ZoneInfo(os.getenv('DISPLAY_TIMEZONE', 'Europe/Prague'))
@@ -39,77 +42,90 @@ sys.path.insert(0, str(SCRIPT_DIR.parent))
 from core.fetch_unlimited import (
     INDICES,
     LAST_FETCH_STATS,
+    LAST_TRACE_CONTEXT_STATS,
     _load_monitored_namespaces,
+    count_errors,
+    fetch_namespace_bucket_totals,
     fetch_trace_context,
     fetch_unlimited,
+    iter_trace_context,
+    release_shared_pit,
 )
-from core.problem_registry import ProblemRegistry
-from core.problem_registry import dominant_count_entry, extract_flow, is_test_peak_counts
-from core.streaming_aggregator import StreamingAggregator
-from core.baseline_loader import BaselineLoader
-from core.delivery_persistence import persist_notification_deliveries
-from core.run_persistence import persist_analysis_run
-from pipeline import Pipeline
-from pipeline.incident import IncidentCollection
-
-# Table exports
-try:
-    from exports import TableExporter
-    HAS_EXPORTS = True
-except ImportError:
-    HAS_EXPORTS = False
-
-# DB
-try:
-    import psycopg2
-    HAS_DB = True
-except ImportError:
-    HAS_DB = False
+from core.run_profiler import profile_run
+from pipeline.spans import PhaseSpans
+
+# Pipeline fáze, registry, psycopg2 a reportovací moduly se importují až při
+# prvním použití (viz LAZY IMPORTS níže) — okno bez errorů končí po ES _count
+# a jejich import ani kompilaci pravidel neplatí.
+if TYPE_CHECKING:
+    from core.problem_registry import ProblemRegistry
+    from pipeline.incident import IncidentCollection
 
 from dotenv import load_dotenv
 load_dotenv()
 load_dotenv(SCRIPT_DIR.parent / 'config' / '.env')
 
-# Incident Analysis (legacy)
-try:
-    from incident_analysis import (
-        IncidentAnalysisEngine,
-        IncidentReportFormatter,
-        IncidentAnalysisResult,
+
+# =============================================================================
+# LAZY IMPORTS
+# =============================================================================
+
+@lru_cache(maxsize=None)
+def _incident_analysis() -> Optional[SimpleNamespace]:
+    """Incident Analysis (legacy) nebo None, když modul není k dispozici."""
+    try:
+        from incident_analysis import (
+            IncidentAnalysisEngine,
+            IncidentReportFormatter,
+            IncidentAnalysisResult,
+        )
+        from incident_analysis.knowledge_base import KnowledgeBase
+        from incident_analysis.knowledge_matcher import KnowledgeMatcher
+    except ImportError:
+        return None
+    return SimpleNamespace(
+        IncidentAnalysisEngine=IncidentAnalysisEngine,
+        IncidentReportFormatter=IncidentReportFormatter,
+        IncidentAnalysisResult=IncidentAnalysisResult,
+        KnowledgeBase=KnowledgeBase,
+        KnowledgeMatcher=KnowledgeMatcher,
     )
-    from incident_analysis.knowledge_base import KnowledgeBase
-    from incident_analysis.knowledge_matcher import KnowledgeMatcher
-    from incident_analysis.models import calculate_priority
-    HAS_INCIDENT_ANALYSIS = True
-except ImportError as e:
-    HAS_INCIDENT_ANALYSIS = False
-
-# Problem-Centric Analysis
-try:
-    from analysis import (
-        aggregate_by_problem_key,
-        ProblemReportGenerator,
-        ProblemExporter,
-        get_representative_traces,
+
+
+@lru_cache(maxsize=None)
+def _problem_analysis() -> Optional[SimpleNamespace]:
+    """Problem-Centric Analysis nebo None, když import selže."""
+    try:
+        from analysis import (
+            aggregate_by_problem_key,
+            ProblemReportGenerator,
+            get_representative_traces,
+        )
+    except ImportError as e:
+        print(f"⚠️ Problem Analysis import failed: {e}")
+        return None
+    return SimpleNamespace(
+        aggregate_by_problem_key=aggregate_by_problem_key,
+        ProblemReportGenerator=ProblemReportGenerator,
+        get_representative_traces=get_representative_traces,
     )
-    HAS_PROBLEM_ANALYSIS = True
-except ImportError as e:
-    HAS_PROBLEM_ANALYSIS = False
-    print(f"⚠️ Problem Analysis import failed: {e}")
 
-# Teams Notifications
-try:
-    from core.teams_notifier import TeamsNotifier
-    HAS_TEAMS = True
-except ImportError:
-    HAS_TEAMS = False
+
+@lru_cache(maxsize=None)
+def _table_exporter():
+    """Table exports (TableExporter) nebo None."""
+    try:
+        from exports import TableExporter
+    except ImportError:
+        return None
+    return TableExporter
 
 
 # =============================================================================
 # GLOBALS
 # =============================================================================
 
-_registry: Optional[ProblemRegistry] = None
+_registry: Optional['ProblemRegistry'] = None
 
 
 def _floor_to_window(ts: datetime, window_minutes: int) -> datetime:
@@ -138,7 +154,7 @@ def _fmt_prague(ts: Optional[datetime], fmt: str = '%Y-%m-%d %H:%M') -> str:
     return aware.astimezone(_DISPLAY_TZ).strftime(fmt)
 
 
-def _registry_snapshot(registry: ProblemRegistry) -> Dict[str, int]:
+def _registry_snapshot(registry: 'ProblemRegistry') -> Dict[str, int]:
     """Small registry snapshot for validator delta logs."""
     total_occurrences = sum(int(getattr(p, 'occurrences', 0) or 0) for p in registry.problems.values())
     return {
@@ -552,11 +568,11 @@ def _merge_peak_clusters(
     return list(clusters_map.values())
 
 
-def _alert_state_path(registry: ProblemRegistry) -> Path:
+def _alert_state_path(registry: 'ProblemRegistry') -> Path:
     return Path(registry.registry_dir) / 'alert_state_regular_phase.json'
 
 
-def _load_alert_state_unlocked(registry: ProblemRegistry) -> Dict[str, Any]:
+def _load_alert_state_unlocked(registry: 'ProblemRegistry') -> Dict[str, Any]:
     path = _alert_state_path(registry)
     if not path.exists():
         return {'peaks': {}}
@@ -571,7 +587,7 @@ def _load_alert_state_unlocked(registry: ProblemRegistry) -> Dict[str, Any]:
     return {'peaks': {}}
 
 
-def _load_alert_state(registry: ProblemRegistry) -> Dict[str, Any]:
+def _load_alert_state(registry: 'ProblemRegistry') -> Dict[str, Any]:
     path = _alert_state_path(registry)
     path.parent.mkdir(parents=True, exist_ok=True)
     lock_path = path.with_suffix('.json.lock')
@@ -583,7 +599,7 @@ def _load_alert_state(registry: ProblemRegistry) -> Dict[str, Any]:
             fcntl.flock(lock_fd.fileno(), fcntl.LOCK_UN)
 
 
-def _save_alert_state_unlocked(registry: ProblemRegistry, state: Dict[str, Any]) -> None:
+def _save_alert_state_unlocked(registry: 'ProblemRegistry', state: Dict[str, Any]) -> None:
     path = _alert_state_path(registry)
     tmp_path = path.with_suffix('.json.tmp')
     with open(tmp_path, 'w', encoding='utf-8') as f:
@@ -592,7 +608,7 @@ def _save_alert_state_unlocked(registry: ProblemRegistry, state: Dict[str, Any])
 
 
 def _record_delivered_peak_alerts(
-    registry: ProblemRegistry,
+    registry: 'ProblemRegistry',
     delivered_payloads: List[Dict[str, Any]],
     now_utc: datetime,
     cooldown_min: int,
@@ -723,6 +739,7 @@ def _build_peak_alert_payload(
 ) -> Optional[Dict[str, Any]]:
     if not problem:
         return None
+    from core.problem_registry import dominant_count_entry, extract_flow, is_test_peak_counts
 
     # Calculate peak metadata aligned to actual trigger incident
     peak_incidents = [
@@ -1083,6 +1100,7 @@ def _build_cluster_payload(
     """
     if not cluster:
         return None
+    from core.problem_registry import dominant_count_entry, is_test_peak_counts
     
     # Primary = first (highest score)
     primary = cluster[0]
@@ -1247,13 +1265,27 @@ class PeakDispatchResult(list):
         self,
         delivered_payloads: List[Dict[str, Any]],
         delivery_outcomes: List[Dict[str, Any]],
+        undelivered: Optional[List[Tuple[Dict[str, Any], str]]] = None,
     ) -> None:
         super().__init__(delivered_payloads)
         self.delivery_outcomes = delivery_outcomes
+        # (payload, last_error) — payloady s failed pokusem a bez doručení (outbox)
+        self.undelivered = undelivered or []
+
+
+def _dispatch_destinations() -> List[Optional[str]]:
+    """Destinace pro souběžné per-destination úlohy; [None] = jedna úloha přes notifier
+    (notifikace vypnuté / nenakonfigurované → notifier vrátí 'skipped' outcomes)."""
+    destinations = [
+        destination for destination in _notification_destinations()
+        if destination in ('teams_webhook', 'teams_email')
+    ]
+    return destinations or [None]
 
 
 def _send_peak_alert_email(
     payload: Dict[str, Any],
+    destination: Optional[str] = None,
 ) -> Tuple[bool, List[Dict[str, Any]]]:
     if not payload:
         return False, []
@@ -1261,7 +1293,7 @@ def _send_peak_alert_email(
     try:
         from core.email_notifier import EmailNotifier
 
-        email_notifier = EmailNotifier()
+        email_notifier = EmailNotifier(destinations=[destination] if destination else None)
         if not email_notifier.is_enabled():
             print("⚠️ Email notifier not enabled")
             return False, [{
@@ -1313,6 +1345,7 @@ def _send_peak_alert_digest(
     window_end: datetime,
     alerts: List[Dict[str, Any]],
     summary: Dict[str, Any],
+    destination: Optional[str] = None,
 ) -> Tuple[bool, List[Dict[str, Any]]]:
     if not alerts:
         return False, []
@@ -1320,7 +1353,7 @@ def _send_peak_alert_digest(
     try:
         from core.email_notifier import EmailNotifier
 
-        email_notifier = EmailNotifier()
+        email_notifier = EmailNotifier(destinations=[destination] if destination else None)
         if not email_notifier.is_enabled():
             print("⚠️ Email notifier not enabled")
             return False, [{
@@ -1352,37 +1385,178 @@ def _dispatch_peak_alerts(
     digest_enabled: bool,
     digest_summary: Dict[str, Any],
 ) -> PeakDispatchResult:
+    """
+    Odešle peak alerty: digest, při neúspěchu jednotlivě.
+
+    Každá destinace má vlastní pool a deadline od spuštění odeslání
+    (core.notification_dispatch) — pomalý SMTP neblokuje webhook a zaseklá
+    destinace neprodlužuje běh nad deadline. Outcomes jsou v pořadí payloadů.
+    """
     if not payloads:
         return PeakDispatchResult([], [])
 
+    from core.notification_dispatch import dispatch_concurrently
+
+    destinations = _dispatch_destinations()
     delivery_outcomes: List[Dict[str, Any]] = []
     if digest_enabled:
-        digest_success, digest_results = _normalize_send_result(
-            _send_peak_alert_digest(
-                window_start, window_end, payloads, digest_summary
-            )
+        digest_results = dispatch_concurrently(
+            _digest_tasks(window_start, window_end, payloads, digest_summary, destinations)
         )
+        digest_outcomes = [outcome for res in digest_results for outcome in res.outcomes]
         for payload in payloads:
             delivery_outcomes.extend(
-                _payload_delivery_outcomes(payload, digest_results, 'digest')
+                _payload_delivery_outcomes(payload, digest_outcomes, 'digest')
             )
-        if digest_success:
+        if any(res.success for res in digest_results):
             return PeakDispatchResult(list(payloads), delivery_outcomes)
 
     if digest_enabled:
         print("⚠️ Digest send failed, falling back to individual alerts")
 
-    delivered = []
-    for payload in payloads:
-        success, individual_results = _normalize_send_result(
-            _send_peak_alert_email(payload)
-        )
+    delivered, undelivered, outcomes = _dispatch_individual_alerts(payloads, destinations, 'individual')
+    delivery_outcomes.extend(outcomes)
+    return PeakDispatchResult(delivered, delivery_outcomes, undelivered)
+
+
+def _digest_tasks(window_start, window_end, payloads, digest_summary, destinations):
+    from core.notification_dispatch import DispatchTask
+
+    return [
+        DispatchTask('digest', destination, lambda destination=destination: _normalize_send_result(
+            _send_peak_alert_digest(
+                window_start, window_end, payloads, digest_summary, destination=destination
+            )
+        ))
+        for destination in destinations
+    ]
+
+
+def _dispatch_individual_alerts(
+    payloads: List[Dict[str, Any]],
+    destinations: List[Optional[str]],
+    attempt_kind: str,
+) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], str]], List[Dict[str, Any]]]:
+    """Souběžně pošle každý payload na každou destinaci → (delivered, undelivered, outcomes)."""
+    from core.notification_dispatch import DispatchTask, dispatch_concurrently
+
+    results = dispatch_concurrently(
+        DispatchTask(index, destination, lambda payload=payload, destination=destination: _normalize_send_result(
+            _send_peak_alert_email(payload, destination=destination)
+        ))
+        for index, payload in enumerate(payloads)
+        for destination in destinations
+    )
+
+    delivered: List[Dict[str, Any]] = []
+    undelivered: List[Tuple[Dict[str, Any], str]] = []
+    delivery_outcomes: List[Dict[str, Any]] = []
+    for index, payload in enumerate(payloads):
+        payload_results = [res for res in results if res.task.key == index]
+        payload_outcomes = [outcome for res in payload_results for outcome in res.outcomes]
         delivery_outcomes.extend(
-            _payload_delivery_outcomes(payload, individual_results, 'individual')
+            _payload_delivery_outcomes(payload, payload_outcomes, attempt_kind)
         )
-        if success:
+        if any(res.success for res in payload_results):
             delivered.append(payload)
-    return PeakDispatchResult(delivered, delivery_outcomes)
+            continue
+        errors = [
+            f"{outcome.get('destination')}: {outcome.get('provider_message', '')}"
+            for outcome in payload_outcomes
+            if outcome.get('status') == 'failed'
+        ]
+        if errors:
+            undelivered.append((payload, '; '.join(errors)))
+    return delivered, undelivered, delivery_outcomes
+
+
+def _retry_notification_outbox(
+    registry: 'ProblemRegistry',
+    run_id: str,
+    window_start: datetime,
+) -> Dict[str, int]:
+    """Zopakuje nedoručené peak alerty z minulých běhů (NOTIFY_OUTBOX_ENABLED)."""
+    from core.delivery_persistence import persist_notification_deliveries
+    from core.notification_dispatch import NotificationOutbox
+
+    outbox = NotificationOutbox(registry.registry_dir)
+    due, expired = outbox.take_due()
+    stats = {'retried': len(due), 'delivered': 0, 'requeued': 0, 'expired': len(expired)}
+    if not due and not expired:
+        return stats
+
+    print(f"\n📮 Notification outbox: {len(due)} to retry, {len(expired)} expired")
+    delivery_outcomes: List[Dict[str, Any]] = []
+    for entry in expired:
+        delivery_outcomes.extend(_payload_delivery_outcomes(entry['payload'], [{
+            'destination': 'notification_outbox',
+            'status': 'skipped',
+            'provider_message': (
+                f"Outbox entry dropped after {entry.get('attempts', 0)} attempt(s): "
+                f"{entry.get('last_error', '')}"
+            ),
+        }], 'outbox_expired'))
+
+    payloads = [entry['payload'] for entry in due]
+    delivered, undelivered, outcomes = _dispatch_individual_alerts(
+        payloads, _dispatch_destinations(), 'outbox_retry'
+    )
+    delivery_outcomes.extend(outcomes)
+
+    # Pronajaté položky: doručené pryč, ostatní zpět do fronty (pokus už je
+    # započtený v take_due). Do té doby zůstávají v outboxu pro případ pádu.
+    outbox_keys = {_delivery_dedup_key(entry['payload']): entry['dedup_key'] for entry in due}
+    delivered_keys = {outbox_keys[_delivery_dedup_key(payload)] for payload in delivered}
+    failures = {key: '' for key in outbox_keys.values() if key not in delivered_keys}
+    for payload, last_error in undelivered:
+        failures[outbox_keys[_delivery_dedup_key(payload)]] = last_error
+    outbox.ack(delivered_keys)
+    outbox.release(failures)
+
+    if delivery_outcomes:
+        persist_notification_deliveries(
+            get_db_connection,
+            delivery_outcomes,
+            notification_type='regular_peak',
+            run_id=run_id,
+            window_start=window_start,
+        )
+    # Cooldown jako u běžného doručení → aktuální okno alert nezdvojí
+    _record_delivered_peak_alerts(
+        registry,
+        delivered,
+        datetime.now(timezone.utc),
+        int(os.getenv('ALERT_COOLDOWN_MIN', '45')),
+    )
+    stats['delivered'] = len(delivered)
+    stats['requeued'] = len(failures)
+    print(f"   Outbox: delivered {len(delivered)}, requeued {len(failures)}, dropped {len(expired)}")
+    return stats
+
+
+def _maybe_retry_notification_outbox(
+    registry: Optional['ProblemRegistry'],
+    run_id: str,
+    window_start: datetime,
+    result: dict,
+    dry_run: bool,
+) -> None:
+    """Outbox retry v každém okně (i bez dat), jinak položky v klidném období vyexpirují.
+
+    Retry potřebuje z registry jen ``registry_dir`` (outbox, alert state), takže
+    early exit bez načteného registry ho nenačítá.
+    """
+    if dry_run:
+        return
+    from core.notification_dispatch import outbox_enabled
+    if not outbox_enabled():
+        return
+    if registry is None:
+        registry = SimpleNamespace(registry_dir=_registry_dir())
+    try:
+        result['notification_outbox'] = _retry_notification_outbox(registry, run_id, window_start)
+    except Exception as e:
+        print(f"⚠️ Notification outbox retry failed: {_one_line_error(e)}")
 
 
 def _build_peak_notification(
@@ -1506,6 +1680,10 @@ def _build_peak_notification(
 # DB CONNECTION
 # =============================================================================
 
+# Daemon mode: spojení se vrací do poolu místo zavření (viz enable_db_pool)
+_DB_POOL = None
+
+
 def get_db_connection(read_only: bool = False):
     """Get database connection.
 
@@ -1515,6 +1693,12 @@ def get_db_connection(read_only: bool = False):
     CRITICAL: DDL user (ailog_analyzer_ddl_user_d1) must execute SET ROLE role_ailog_analyzer_ddl
     to gain permissions on ailog_peak schema. This is mandatory.
     """
+    if _DB_POOL is not None:
+        return _DB_POOL.acquire(read_only)
+    return _connect_db(read_only)
+
+
+def _connect_db(read_only: bool):
     if read_only:
         user = os.getenv('DB_USER') or os.getenv('DB_DDL_USER')
         password = os.getenv('DB_PASSWORD') or os.getenv('DB_DDL_PASSWORD')
@@ -1522,6 +1706,8 @@ def get_db_connection(read_only: bool = False):
         user = os.getenv('DB_DDL_USER') or os.getenv('DB_USER')
         password = os.getenv('DB_DDL_PASSWORD') or os.getenv('DB_PASSWORD')
     
+    import psycopg2
+
     conn = psycopg2.connect(
         host=os.getenv('DB_HOST'),
         port=int(os.getenv('DB_PORT', 5432)),
@@ -1541,6 +1727,30 @@ def get_db_connection(read_only: bool = False):
     return conn
 
 
+def _prepare_pooled_connection(conn, read_only: bool) -> None:
+    """Ping idle spojení; zápisové znovu SET ROLE (rollback volajícího ho mohl vrátit)."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        if not read_only:
+            set_db_role(cursor)
+    finally:
+        cursor.close()
+
+
+def enable_db_pool(max_idle: int = 2):
+    """Zapne pooling pro get_db_connection() (regular daemon)."""
+    global _DB_POOL
+    if _DB_POOL is None:
+        from core.db_pool import ConnectionPool
+        _DB_POOL = ConnectionPool(
+            connect=_connect_db,
+            prepare=_prepare_pooled_connection,
+            max_idle=max_idle,
+        )
+    return _DB_POOL
+
+
 def set_db_role(cursor) -> None:
     """Set DDL role after login - REQUIRED for schema access.
     
@@ -1559,14 +1769,30 @@ def set_db_role(cursor) -> None:
 # REGISTRY
 # =============================================================================
 
-def init_registry() -> Optional[ProblemRegistry]:
+def _load_peak_detector():
+    """P93/CAP peak detector (replaces EWMA/MAD for spike detection), None = EWMA fallback."""
+    try:
+        from core.peak_detection import PeakDetector
+        peak_db_conn = get_db_connection(read_only=True)
+        peak_detector = PeakDetector(conn=peak_db_conn)
+        print("   P93/CAP peak detector loaded")
+        return peak_detector
+    except Exception as e:
+        print(f"   P93/CAP peak detector unavailable (falling back to EWMA): {_one_line_error(e)}")
+        return None
+
+
+def _registry_dir() -> str:
+    # IMPORTANT: Registry MUST be on persistence volume!
+    return os.getenv('REGISTRY_DIR') or str(SCRIPT_DIR.parent / 'registry')
+
+
+def init_registry() -> Optional['ProblemRegistry']:
     """Initialize registry"""
     global _registry
+    from core.problem_registry import ProblemRegistry
     
-    # IMPORTANT: Registry MUST be on persistence volume!
-    registry_base = os.getenv('REGISTRY_DIR') or str(SCRIPT_DIR.parent / 'registry')
-    registry_dir = Path(registry_base)
-    _registry = ProblemRegistry(str(registry_dir))
+    _registry = ProblemRegistry(_registry_dir())
     _registry.load()
     
     return _registry
@@ -1577,19 +1803,20 @@ def init_registry() -> Optional[ProblemRegistry]:
 # =============================================================================
 
 def run_incident_analysis(
-    collection: IncidentCollection,
+    collection: 'IncidentCollection',
     window_start: datetime,
     window_end: datetime,
     output_dir: str = None,
 ) -> str:
     """Run incident analysis and generate report"""
-    if not HAS_INCIDENT_ANALYSIS:
+    incident_analysis = _incident_analysis()
+    if incident_analysis is None:
         return "⚠️ Incident Analysis module not available"
     
-    formatter = IncidentReportFormatter()
+    formatter = incident_analysis.IncidentReportFormatter()
     
     if not collection.incidents:
-        result = IncidentAnalysisResult(
+        result = incident_analysis.IncidentAnalysisResult(
             incidents=[],
             total_incidents=0,
             analysis_start=window_start,
@@ -1598,7 +1825,7 @@ def run_incident_analysis(
         return formatter.format_15min(result)
     
     try:
-        engine = IncidentAnalysisEngine()
+        engine = incident_analysis.IncidentAnalysisEngine()
         result = engine.analyze(
             collection.incidents,
             analysis_start=window_start,
@@ -1608,10 +1835,10 @@ def run_incident_analysis(
         # Knowledge matching
         kb_path = SCRIPT_DIR.parent / 'config' / 'known_issues'
         if kb_path.exists():
-            kb = KnowledgeBase(str(kb_path))
+            kb = incident_analysis.KnowledgeBase(str(kb_path))
             kb.load()
             
-            matcher = KnowledgeMatcher(kb)
+            matcher = incident_analysis.KnowledgeMatcher(kb)
             result = matcher.enrich_incidents(result)
         
         report = formatter.format_15min(result)
@@ -1641,21 +1868,108 @@ def run_incident_analysis(
 # MAIN
 # =============================================================================
 
+def _new_run_id(window_start: datetime) -> str:
+    return f"regular-{window_start.strftime('%Y%m%d-%H%M')}-{uuid.uuid4().hex[:8]}"
+
+
+def _finish_no_data_run(
+    result: dict,
+    now: datetime,
+    window_start: datetime,
+    window_end: datetime,
+    expected_count: Optional[int],
+    dry_run: bool,
+    registry: Optional['ProblemRegistry'] = None,
+) -> dict:
+    """Zapíše úplný nulový běh (okno bez errorů) a vrátí result se status no_data.
+
+    Zopakuje i notification outbox — v klidném období by jinak nedoručené
+    alerty jen vyexpirovaly.
+    """
+    from core.run_persistence import persist_analysis_run
+    from pipeline.incident import IncidentCollection
+
+    run_id = result.setdefault('run_id', _new_run_id(window_start))
+    collection = IncidentCollection(
+        run_id=run_id,
+        run_timestamp=now,
+        pipeline_version=os.getenv('IMAGE_TAG', '1.0'),
+        input_records=0,
+        time_range_start=window_start,
+        time_range_end=window_end,
+    )
+    if not dry_run:
+        try:
+            persistence = persist_analysis_run(
+                connection_factory=get_db_connection,
+                collection=collection,
+                run_type='regular',
+                window_start=window_start,
+                window_end=window_end,
+                monitored_namespaces=_load_monitored_namespaces(),
+                expected_count=expected_count,
+                fetched_count=0,
+                source_index=INDICES,
+            )
+            result.update(persistence)
+        except Exception as e:
+            print(f"❌ No-data run persistence failed: {_one_line_error(e)}")
+            result['status'] = 'error'
+            result['error'] = str(e)
+            return result
+    print("⚪ No errors in window; complete zero facts persisted")
+    result['status'] = 'no_data'
+    _maybe_retry_notification_outbox(registry, run_id, window_start, result, dry_run)
+    return result
+
+
 def run_regular_phase(
     window_minutes: int = 15,
     dry_run: bool = False,
     output_dir: str = None,
+    state: Optional['ResidentState'] = None,
+    window_end: Optional[datetime] = None,
 ) -> dict:
     """
     Main regular phase function.
     
     Processes last N minutes of data and updates registry.
+    Per-phase spans (wall time, RSS delta) jdou do result['phase_metrics']
+    a do ailog_peak.run_phase_metrics. ``state`` (daemon) drží registry,
+    prahy, pravidla a baseline mezi okny; ``window_end`` přebije okno z hodin.
     """
+    spans = PhaseSpans()
+    try:
+        result = _run_regular_phase(window_minutes, dry_run, output_dir, spans, state, window_end)
+    finally:
+        # PIT ponechaný pro trace context nesmí přežít okno (chybové návraty)
+        release_shared_pit()
+    result['phase_metrics'] = spans.as_dicts()
+    if spans:
+        print(f"\n⏱️  Phases: {spans.summary()}")
+    # FK na analysis_runs → jen pokud se běh opravdu zapsal
+    if not dry_run and 'persisted_events' in result and result['phase_metrics']:
+        try:
+            from core.run_persistence import persist_phase_metrics
+            persist_phase_metrics(get_db_connection, result['run_id'], result['phase_metrics'])
+        except Exception as e:
+            print(f"   ⚠️ Phase metrics persistence failed (non-blocking): {_one_line_error(e)}")
+    return result
+
+
+def _run_regular_phase(
+    window_minutes: int,
+    dry_run: bool,
+    output_dir: Optional[str],
+    spans: PhaseSpans,
+    state: Optional['ResidentState'] = None,
+    window_end: Optional[datetime] = None,
+) -> dict:
     now = datetime.now(timezone.utc)
     
     # Calculate window (align to quarter hours)
-    quarter = (now.minute // 15) * 15
-    window_end = now.replace(minute=quarter, second=0, microsecond=0)
+    if window_end is None:
+        window_end = _floor_to_window(now, 15)
     window_start = window_end - timedelta(minutes=window_minutes)
     
     print("=" * 70)
@@ -1674,28 +1988,77 @@ def run_regular_phase(
         'incidents': 0,
         'saved': 0,
     }
-    
+    window_from = window_start.strftime("%Y-%m-%dT%H:%M:%SZ")
+    window_to = window_end.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    # ==========================================================================
+    # EARLY EXIT: ES _count == 0
+    # ==========================================================================
+    # Okno bez errorů nepotřebuje registry, peak detector ani pipeline — zapíše
+    # se jen úplný nulový běh. None (ES nedostupný) → pokračuje plná cesta.
+    if os.getenv('ES_COUNT_PRECHECK', '1').strip().lower() in {'1', 'true', 'yes', 'on'}:
+        with spans.span('es_count') as count_span:
+            source_count = count_errors(window_from, window_to)
+        if source_count == 0:
+            count_span.counters['records'] = 0
+            print("   ES count: 0 errors in window → skipping fetch and pipeline")
+            return _finish_no_data_run(
+                result, now, window_start, window_end, expected_count=0, dry_run=dry_run,
+            )
+
+    from core.baseline_loader import BaselineLoader
+    from core.delivery_persistence import persist_notification_deliveries
+    from core.run_persistence import persist_analysis_run
+    from core.streaming_aggregator import StreamingAggregator
+    from pipeline import Pipeline
+
     # ==========================================================================
     # LOAD REGISTRY
     # ==========================================================================
-    registry = init_registry()
+    registry = state.refresh_registry() if state is not None else init_registry()
     print(f"📋 Registry: {len(registry.fingerprint_index)} known fingerprints")
     registry_before = _registry_snapshot(registry)
     
+    # P93/CAP peak detection (replaces EWMA/MAD for spike detection)
+    if state is not None:
+        peak_detector = state.refresh_peak_detector()
+    else:
+        peak_detector = _load_peak_detector()
+
+    # ==========================================================================
+    # AGGREGATION PRE-PASS (namespace × 15min součty z ES, souběžně s fetchem)
+    # ==========================================================================
+    # Opt-in (ES_AGG_PREPASS=1), jen kontrola úplnosti: součet agregace vs.
+    # stažené dokumenty. Peaky z pre-passu se nevyhodnocují — alert potřebuje
+    # problémy z pipeline, takže by dřív neodešel, a namespace peaky nad stejnými
+    # součty počítá Phase C (evaluate_namespace_peaks) z fetche.
+    prepass = None
+    prepass_future = None
+    if os.getenv('ES_AGG_PREPASS', '0').strip().lower() in {'1', 'true', 'yes', 'on'}:
+        from concurrent.futures import ThreadPoolExecutor
+        prepass_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='es-prepass')
+        prepass_future = prepass_executor.submit(fetch_namespace_bucket_totals, window_from, window_to)
+        prepass_executor.shutdown(wait=False)
+
     # ==========================================================================
     # FETCH DATA
     # ==========================================================================
     aggregator = StreamingAggregator()
+    # #3 trace context (opt-in) hledá nad PIT hlavního fetche
+    trace_context_enabled = os.getenv('REP_TRACE_CONTEXT', '0').strip().lower() in {'1', 'true', 'yes', 'on'}
+    fetch_span = spans.start('fetch')
     try:
         errors = fetch_unlimited(
-            window_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
-            window_end.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            window_from,
+            window_to,
             page_consumer=aggregator.ingest_page,
             collect_results=False,
+            keep_pit=trace_context_enabled,
         )
     except Exception:
         aggregator.close()
         raise
+    fetch_span.stop(records=aggregator.total_records, fingerprints=len(aggregator.acc))
     
     if errors is None:
         aggregator.close()
@@ -1712,44 +2075,39 @@ def run_regular_phase(
         result['error'] = f'Fetch incomplete: {reason}'
         return result
 
+    if prepass_future is not None:
+        try:
+            prepass = prepass_future.result()
+        except Exception as e:
+            print(f"   ⚠️ Aggregation pre-pass failed (non-blocking): {_one_line_error(e)}")
+
+    if prepass is not None:
+        result['prepass_total'] = prepass['total']
+        print(
+            f"   ⚡ Pre-pass: {prepass['total']:,} errors in "
+            f"{sum(len(b) for b in prepass['totals'].values())} namespace buckets "
+            f"({prepass['requests']} requests)"
+        )
+
+        # Nezávislá kontrola úplnosti: agregace vs. skutečně stažené dokumenty
+        result['prepass_matches_fetch'] = prepass['total'] == aggregator.total_records
+        if not result['prepass_matches_fetch']:
+            print(
+                f"   ⚠️ Pre-pass cross-check: aggregation {prepass['total']:,} "
+                f"vs fetched {aggregator.total_records:,} (late-arriving documents?)"
+            )
+
     monitored_namespaces = _load_monitored_namespaces()
-    run_id = (
-        f"regular-{window_start.strftime('%Y%m%d-%H%M')}-"
-        f"{uuid.uuid4().hex[:8]}"
-    )
+    run_id = _new_run_id(window_start)
+    result['run_id'] = run_id
     
     if aggregator.total_records == 0:
         aggregator.close()
-        collection = IncidentCollection(
-            run_id=run_id,
-            run_timestamp=now,
-            pipeline_version=os.getenv('IMAGE_TAG', '1.0'),
-            input_records=0,
-            time_range_start=window_start,
-            time_range_end=window_end,
+        return _finish_no_data_run(
+            result, now, window_start, window_end,
+            expected_count=LAST_FETCH_STATS.get('expected'), dry_run=dry_run,
+            registry=registry,
         )
-        if not dry_run:
-            try:
-                persistence = persist_analysis_run(
-                    connection_factory=get_db_connection,
-                    collection=collection,
-                    run_type='regular',
-                    window_start=window_start,
-                    window_end=window_end,
-                    monitored_namespaces=monitored_namespaces,
-                    expected_count=LAST_FETCH_STATS.get('expected'),
-                    fetched_count=0,
-                    source_index=INDICES,
-                )
-                result.update(persistence)
-            except Exception as e:
-                print(f"❌ No-data run persistence failed: {_one_line_error(e)}")
-                result['status'] = 'error'
-                result['error'] = str(e)
-                return result
-        print("⚪ No errors in window; complete zero facts persisted")
-        result['status'] = 'no_data'
-        return result
     
     result['error_count'] = aggregator.total_records
     print(f"   📥 Fetched {aggregator.total_records:,} errors")
@@ -1766,6 +2124,7 @@ def run_regular_phase(
     # LOAD HISTORICAL BASELINE FROM DB
     # ==========================================================================
     historical_baseline = {}
+    db_conn = None
     try:
         db_conn = get_db_connection(read_only=True)
         baseline_loader = BaselineLoader(db_conn)
@@ -1773,32 +2132,35 @@ def run_regular_phase(
         if aggregator.total_records:
             fingerprints = list(aggregator.acc)
             if fingerprints:
-                historical_baseline = baseline_loader.load_fingerprint_rates(
-                    fingerprints=fingerprints,
-                    analysis_window_start=window_start,
-                    lookback_days=7,
-                    min_samples=3
-                )
+                if state is not None:
+                    historical_baseline = state.baselines.load_fingerprint_rates(
+                        baseline_loader,
+                        fingerprints,
+                        analysis_window_start=window_start,
+                        min_samples=3,
+                    )
+                else:
+                    historical_baseline = baseline_loader.load_fingerprint_rates(
+                        fingerprints=fingerprints,
+                        analysis_window_start=window_start,
+                        lookback_days=7,
+                        min_samples=3
+                    )
                 print(f"   📊 Loaded baseline for {len(historical_baseline)}/{len(fingerprints)} fingerprints")
-        
-        db_conn.close()
     except Exception as e:
         print(f"   ⚠️ Baseline loading failed (non-blocking): {_one_line_error(e)}")
         historical_baseline = {}
+    finally:
+        # Pooled spojení se musí vrátit i po chybě, jinak daemon leakuje jedno za okno
+        if db_conn is not None:
+            try:
+                db_conn.close()
+            except Exception:
+                pass
 
     # ==========================================================================
     # RUN PIPELINE
     # ==========================================================================
-    # P93/CAP peak detection (replaces EWMA/MAD for spike detection)
-    peak_detector = None
-    try:
-        from core.peak_detection import PeakDetector
-        peak_db_conn = get_db_connection(read_only=True)
-        peak_detector = PeakDetector(conn=peak_db_conn)
-        print("   P93/CAP peak detector loaded")
-    except Exception as e:
-        print(f"   P93/CAP peak detector unavailable (falling back to EWMA): {_one_line_error(e)}")
-
     try:
         pipeline = Pipeline(
             ewma_alpha=float(os.getenv('EWMA_ALPHA', 0.3)),
@@ -1807,15 +2169,19 @@ def run_regular_phase(
         )
 
         pipeline.phase_b.historical_baseline = historical_baseline
+        if state is not None:
+            # Zkompilovaná pravidla + memo cache klasifikace přežívají mezi okny
+            pipeline.phase_e = state.classifier
 
         # ← KRITICKÉ: Inject registry do Phase C (aby mohl dělat is_problem_key_known lookup!)
         pipeline.phase_c.registry = registry
         pipeline.phase_c.known_fingerprints = registry.get_all_known_fingerprints().copy()
 
-        collection = pipeline.run_streaming(aggregator, run_id=run_id)
+        collection = pipeline.run_streaming(aggregator, run_id=run_id, spans=spans)
     finally:
         aggregator.close()
 
+    persistence_span = spans.start('persistence', records=collection.input_records)
     if not dry_run:
         try:
             persistence = persist_analysis_run(
@@ -1842,27 +2208,56 @@ def run_regular_phase(
             result['status'] = 'error'
             result['error'] = str(e)
             return result
+    persistence_span.stop(fingerprints=collection.total_incidents)
 
     # #3: pro reprezentativní trace top problémů dotáhni VŠECHNY levely (WARN/INFO
     # před ERROR) a přepočítej root cause/propagaci z bohatší časové osy. Opt-in
     # (REP_TRACE_CONTEXT=1) – dělá extra ES dotaz jen na pár reprezentativních trace.
-    if os.getenv('REP_TRACE_CONTEXT', '0').strip().lower() in {'1', 'true', 'yes', 'on'}:
+    if trace_context_enabled:
         _patterns = getattr(collection, 'trace_patterns', None)
         if _patterns:
+            _trace_cache = None
             try:
                 from analysis.trace_timeline import enrich_patterns_with_trace_context
                 _lookback = int(os.getenv('REP_TRACE_CONTEXT_LOOKBACK_MIN', '5'))
                 _ctx_from = window_start - timedelta(minutes=max(0, _lookback))
+                # Bez cache jdou dávky rovnou do timeline, jak doběhnou
+                _fetch_fn = iter_trace_context
+                # Perzistentní cache (registry volume): ES jen pro nepokrytý rozsah
+                if os.getenv('TRACE_CONTEXT_CACHE', '1').strip().lower() in {'1', 'true', 'yes', 'on'}:
+                    try:
+                        from core.trace_context_cache import TraceContextCache
+                        _trace_cache = TraceContextCache(
+                            truncated_ids_fn=lambda: LAST_TRACE_CONTEXT_STATS['truncated_ids'],
+                            snapshot_at_fn=lambda: LAST_TRACE_CONTEXT_STATS.get('snapshot_at'),
+                        )
+                        _fetch_fn = partial(_trace_cache.fetch, fetch_trace_context)
+                    except Exception as e:
+                        print(f"   ⚠️ Trace context cache unavailable: {_one_line_error(e)}")
                 enrich_patterns_with_trace_context(
                     _patterns,
-                    fetch_trace_context,
+                    _fetch_fn,
                     _ctx_from.strftime("%Y-%m-%dT%H:%M:%SZ"),
                     window_end.strftime("%Y-%m-%dT%H:%M:%SZ"),
                     top_n=int(os.getenv('REP_TRACE_CONTEXT_TOPN', '10')),
                 )
                 print("   ✅ Enriched representative traces with full-level context (#3)")
+                if _trace_cache is None:
+                    print(
+                        f"      {LAST_TRACE_CONTEXT_STATS['traces']} traces, "
+                        f"{LAST_TRACE_CONTEXT_STATS['events']} events in "
+                        f"{LAST_TRACE_CONTEXT_STATS['batches']} batch(es), "
+                        f"{len(LAST_TRACE_CONTEXT_STATS['truncated_ids'])} capped at "
+                        f"{LAST_TRACE_CONTEXT_STATS['per_trace_cap']}/trace"
+                    )
             except Exception as e:
                 print(f"   ⚠️ Trace context enrichment failed (non-blocking): {_one_line_error(e)}")
+            finally:
+                if _trace_cache is not None:
+                    print(f"   🗃️ Trace context cache: {_trace_cache.summary()}")
+                    result['trace_context_cache'] = dict(_trace_cache.stats)
+                    _trace_cache.close()
+        release_shared_pit()
     
     result['incidents'] = collection.total_incidents
     
@@ -1889,6 +2284,7 @@ def run_regular_phase(
     # UPDATE REGISTRY
     # ==========================================================================
     if collection.incidents and not dry_run:
+        registry_span = spans.start('registry_update', fingerprints=len(collection.incidents))
         if not registry.update_and_save(collection.incidents, event_timestamps):
             print("❌ Registry update failed after database commit")
             result['status'] = 'error'
@@ -1899,6 +2295,7 @@ def run_regular_phase(
         print(f"\n📝 Registry updated:")
         print(f"   New problems: {stats['new_problems_added']}")
         print(f"   New peaks: {stats['new_peaks_added']}")
+        registry_span.stop()
 
         registry_after = _registry_snapshot(registry)
         print("\n✅ VALIDATOR - Added data in this regular run:")
@@ -1910,27 +2307,29 @@ def run_regular_phase(
         print(f"   Registry peaks delta: +{registry_after['peaks'] - registry_before['peaks']:,}")
     
     problem_report_text = None
+    problem_report_section = None
     enriched_problems = None
     peak_trace_flows = None
 
     # ==========================================================================
     # PROBLEM-CENTRIC ANALYSIS
     # ==========================================================================
-    if collection.incidents and HAS_PROBLEM_ANALYSIS:
+    problem_analysis = _problem_analysis() if collection.incidents else None
+    if problem_analysis is not None:
         print("\n🔍 Running Problem Analysis...")
 
         # 1. Agreguj incidenty do problémů
-        problems = aggregate_by_problem_key(collection.incidents)
+        problems = problem_analysis.aggregate_by_problem_key(collection.incidents)
         print(f"   Aggregated {len(collection.incidents)} incidents into {len(problems)} problems")
 
         # 2. Získej reprezentativní traces
-        trace_flows = get_representative_traces(problems)
+        trace_flows = problem_analysis.get_representative_traces(problems)
         peak_trace_flows = trace_flows
 
         # 3. Generuj problem-centric report
         report_dir = output_dir or str(SCRIPT_DIR / 'reports')
 
-        generator = ProblemReportGenerator(
+        generator = problem_analysis.ProblemReportGenerator(
             problems=problems,
             trace_flows=trace_flows,
             analysis_start=window_start,
@@ -1945,6 +2344,7 @@ def run_regular_phase(
         # Textový report (zkrácený pro 15-min okno)
         problem_report = generator.generate_text_report(max_problems=10)
         problem_report_text = problem_report
+        problem_report_section = generator.to_artifact_section(max_problems=10)
 
         # Print jen summary pro 15-min
         lines = problem_report.split('\n')
@@ -1958,7 +2358,7 @@ def run_regular_phase(
             print(f"   Text: {report_files.get('text')}")
             print(f"   JSON: {report_files.get('json')}")
 
-    elif collection.incidents and HAS_INCIDENT_ANALYSIS:
+    elif collection.incidents and _incident_analysis() is not None:
         # Fallback: Legacy incident analysis
         print("\n🔍 Running Incident Analysis (legacy)...")
 
@@ -2035,21 +2435,55 @@ def run_regular_phase(
     # ==========================================================================
     # EXPORT TABLES (CSV, MD, JSON)
     # ==========================================================================
-    if HAS_EXPORTS and _registry is not None and not dry_run:
+    peaks_table = None
+    TableExporter = _table_exporter() if _registry is not None and not dry_run else None
+    if TableExporter is not None:
         exports_dir = output_dir or (SCRIPT_DIR / 'exports')
         print(f"\n📊 Exporting tables to {exports_dir}...")
 
         try:
-            exporter = TableExporter(_registry)
-            exporter.export_all(str(exports_dir))
+            with spans.span('export'):
+                exporter = TableExporter(_registry)
+                exporter.export_all(str(exports_dir))
+                peaks_table = exporter.peaks_table()
             print(f"   ✅ errors_table_latest.csv/md/json")
             print(f"   ✅ peaks_table_latest.csv/md/json")
         except Exception as e:
             print(f"   ⚠️ Export error: {e}")
 
+    # Run artifact - strojově čitelný výstup běhu (vedle textových reportů);
+    # bez --output (produkční CronJob) do SCRIPT_DIR/reports jako text reporty
+    if not dry_run and (problem_report_section is not None or peaks_table is not None):
+        try:
+            from core.run_artifact import build_run_artifact, write_run_artifact
+            artifact = build_run_artifact(
+                'regular',
+                run_id=run_id,
+                period_start=window_start,
+                period_end=window_end,
+                problem_report=problem_report_section,
+                peaks=peaks_table,
+            )
+            artifact_files = write_run_artifact(
+                artifact,
+                str(output_dir or SCRIPT_DIR / 'reports'),
+                keep=int(os.getenv('RUN_ARTIFACT_KEEP_REGULAR', '96')),
+            )
+            print(f"   📦 Run artifact: {', '.join(artifact_files.values())}")
+        except Exception as e:
+            print(f"   ⚠️ Run artifact error: {e}")
+
     print("\n" + "=" * 70)
     print("✅ REGULAR PHASE COMPLETE")
     print("=" * 70)
+
+    # Jeden span přes outbox retry i dispatch peak alertů (PK run_id+phase)
+    notification_span = spans.start('notification') if not dry_run else None
+
+    # ==========================================================================
+    # RETRY NOTIFICATION OUTBOX (nedoručené alerty z minulých běhů)
+    # ==========================================================================
+    _maybe_retry_notification_outbox(_registry, run_id, window_start, result, dry_run)
     
     # ==========================================================================
     # SEND PEAKS NOTIFICATION (EMAIL ONLY)
@@ -2182,6 +2616,7 @@ def run_regular_phase(
                     print("❌ Peak registry enrichment merge failed")
                     result['status'] = 'error'
                     result['error'] = 'Peak registry enrichment merge failed'
+                    notification_span.stop()
                     return result
 
                 delivered_payloads = _dispatch_peak_alerts(
@@ -2205,8 +2640,18 @@ def run_regular_phase(
                         result['status'] = 'error'
                         result['error'] = f'Delivery audit persistence failed: {_one_line_error(e)}'
                         print(f"❌ {result['error']}")
+                        notification_span.stop()
                         return result
 
+                if delivered_payloads.undelivered:
+                    from core.notification_dispatch import NotificationOutbox, outbox_enabled
+                    if outbox_enabled():
+                        outbox = NotificationOutbox(registry.registry_dir)
+                        for payload, last_error in delivered_payloads.undelivered:
+                            outbox.enqueue(_delivery_dedup_key(payload), payload, last_error=last_error)
+                        result['outbox_queued'] = len(delivered_payloads.undelivered)
+                        print(f"📮 {len(delivered_payloads.undelivered)} undelivered alert(s) queued to notification outbox")
+
                 sent_alerts = len(delivered_payloads)
                 _record_delivered_peak_alerts(
                     registry,
@@ -2254,10 +2699,175 @@ def run_regular_phase(
                     
         except Exception as e:
             print(f"⚠️ Peak alert failed: {e}")
-    
+
+    if notification_span is not None:
+        notification_span.stop()
     return result
 
 
+# =============================================================================
+# DAEMON MODE
+# =============================================================================
+# Místo CronJobu (nový proces každých 15 min) zůstane proces rezidentní a
+# drží registry, P93/CAP prahy, Phase E pravidla a baseline mezi okny. Registry
+# se čte znovu jen když ho změnil jiný proces (backfill), prahy jen při novém
+# snapshotu, baseline dotahuje jen nové buckety. DB spojení jdou přes pool.
+# Registry/alert-state zámky se drží jen po dobu jedné operace jako dosud,
+# takže backfill může běžet souběžně; daemon sám drží jen single-instance lock.
+
+DAEMON_LOCK_NAME = '.regular_phase.daemon.lock'
+
+
+class ResidentState:
+    """Stav sdílený mezi okny regular daemonu."""
+
+    def __init__(self):
+        from core.baseline_loader import BaselineCache
+        from pipeline.phase_e_classify import PhaseE_Classify
+
+        self.registry: Optional['ProblemRegistry'] = None
+        self.peak_detector = None
+        self.classifier = PhaseE_Classify()
+        self.baselines = BaselineCache(
+            full_refresh_minutes=int(os.getenv('DAEMON_BASELINE_FULL_REFRESH_MIN', '360')),
+        )
+
+    def refresh_registry(self) -> 'ProblemRegistry':
+        global _registry
+        if self.registry is None:
+            self.registry = init_registry()
+            self.registry.reuse_unchanged_snapshot = True
+        elif self.registry.refresh() and self.registry.last_refresh_reused:
+            print("   Registry unchanged on disk → reusing in-memory snapshot")
+        _registry = self.registry
+        return self.registry
+
+    def refresh_peak_detector(self):
+        if self.peak_detector is None:
+            self.peak_detector = _load_peak_detector()
+            return self.peak_detector
+        try:
+            if self.peak_detector.refresh():
+                print("   P93/CAP thresholds reloaded (new snapshot)")
+        except Exception as e:
+            # Spojení detektoru mohlo spadnout (restart DB) → nové spojení, plný reload
+            print(f"   ⚠️ P93/CAP refresh failed, reconnecting: {_one_line_error(e)}")
+            self.peak_detector = _load_peak_detector()
+        return self.peak_detector
+
+
+def _due_window_ends(
+    last_end: datetime,
+    now: datetime,
+    delay: timedelta,
+    max_catchup: int,
+) -> Tuple[List[datetime], int]:
+    """Konce 15min oken po ``last_end``, která jsou k ``now - delay`` uzavřená.
+
+    Vrací (okna ke zpracování, počet přeskočených nad max_catchup).
+    """
+    latest = _floor_to_window(now - delay, 15)
+    due = []
+    end = last_end + timedelta(minutes=15)
+    while end <= latest:
+        due.append(end)
+        end += timedelta(minutes=15)
+    skipped = max(0, len(due) - max(1, max_catchup))
+    return due[skipped:], skipped
+
+
+def _acquire_daemon_lock(registry_dir: Path):
+    """Single-instance lock (LOCK_NB); registry transaction locks jsou nezávislé."""
+    registry_dir.mkdir(parents=True, exist_ok=True)
+    lock_fd = open(registry_dir / DAEMON_LOCK_NAME, 'w')
+    try:
+        fcntl.flock(lock_fd.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_fd.close()
+        return None
+    lock_fd.write(str(os.getpid()))
+    lock_fd.flush()
+    return lock_fd
+
+
+def run_daemon(
+    window_minutes: int = 15,
+    dry_run: bool = False,
+    output_dir: str = None,
+    max_windows: Optional[int] = None,
+) -> int:
+    """Rezidentní smyčka: zpracuje každé uzavřené 15min okno, SIGTERM = dokončit okno a skončit."""
+    import gc
+    import threading
+
+    registry_dir = Path(os.getenv('REGISTRY_DIR') or str(SCRIPT_DIR.parent / 'registry'))
+    lock_fd = _acquire_daemon_lock(registry_dir)
+    if lock_fd is None:
+        print(f"❌ Another regular daemon holds {registry_dir / DAEMON_LOCK_NAME}")
+        return 1
+
+    stop = threading.Event()
+
+    def _request_stop(signum, frame):
+        if stop.is_set():
+            signal_handler(signum, frame)
+        print(f"\n⚠️ Received signal {signum}, finishing current window then exiting...")
+        stop.set()
+
+    signal.signal(signal.SIGINT, _request_stop)
+    signal.signal(signal.SIGTERM, _request_stop)
+
+    delay = timedelta(seconds=int(os.getenv('DAEMON_START_DELAY_SEC', '0')))
+    max_catchup = int(os.getenv('DAEMON_MAX_CATCHUP_WINDOWS', '4'))
+    enable_db_pool(max_idle=int(os.getenv('DAEMON_DB_POOL_IDLE', '2')))
+    state = ResidentState()
+    # Okno, které už je uzavřené při startu, zpracoval CronJob/předchozí daemon
+    last_end = _floor_to_window(datetime.now(timezone.utc) - delay, 15)
+    runs = 0
+    failures = 0
+    print(f"🔁 Regular daemon started (pid {os.getpid()}), next window after {last_end.isoformat()}")
+
+    try:
+        while not stop.is_set() and (max_windows is None or runs < max_windows):
+            due, skipped = _due_window_ends(last_end, datetime.now(timezone.utc), delay, max_catchup)
+            if skipped:
+                print(f"⚠️ Daemon fell behind: skipping {skipped} window(s), processing last {len(due)}")
+            if not due:
+                wake_at = last_end + timedelta(minutes=15) + delay
+                stop.wait(max(1.0, (wake_at - datetime.now(timezone.utc)).total_seconds()))
+                continue
+            for end in due:
+                if stop.is_set() or (max_windows is not None and runs >= max_windows):
+                    break
+                try:
+                    result = run_regular_phase(
+                        window_minutes=window_minutes,
+                        dry_run=dry_run,
+                        output_dir=output_dir,
+                        state=state,
+                        window_end=end,
+                    )
+                    ok = result['status'] in ('success', 'no_data')
+                except Exception as e:
+                    print(f"❌ Window {end.isoformat()} failed: {_one_line_error(e)}")
+                    ok = False
+                failures = 0 if ok else failures + 1
+                last_end = end
+                runs += 1
+                gc.collect()
+            if failures >= int(os.getenv('DAEMON_MAX_CONSECUTIVE_FAILURES', '8')):
+                print(f"❌ {failures} consecutive failed windows → exiting for a clean restart")
+                return 1
+    finally:
+        if _DB_POOL is not None:
+            _DB_POOL.close_all()
+        fcntl.flock(lock_fd.fileno(), fcntl.LOCK_UN)
+        lock_fd.close()
+
+    print(f"🛑 Regular daemon stopped after {runs} window(s)")
+    return 0
+
+
 # =============================================================================
 # CLEANUP
 # =============================================================================
@@ -2289,14 +2899,25 @@ def main():
     parser.add_argument('--window', type=int, default=15, help='Window size in minutes (default: 15)')
     parser.add_argument('--dry-run', action='store_true', help='No DB writes')
     parser.add_argument('--output', type=str, help='Output directory for reports')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Stay resident and run every aligned 15-minute window')
     
     args = parser.parse_args()
+
+    if args.daemon:
+        return run_daemon(
+            window_minutes=args.window,
+            dry_run=args.dry_run,
+            output_dir=args.output,
+        )
     
-    result = run_regular_phase(
-        window_minutes=args.window,
-        dry_run=args.dry_run,
-        output_dir=args.output,
-    )
+    # PROFILE_RUN=cpu|alloc → collapsed stacks + top report do $REGISTRY_DIR/profiles
+    with profile_run('regular_phase'):
+        result = run_regular_phase(
+            window_minutes=args.window,
+            dry_run=args.dry_run,
+            output_dir=args.output,
+        )
     
     return 0 if result['status'] in ('success', 'no_data') else 1
 
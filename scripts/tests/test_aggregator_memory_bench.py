@@ -0,0 +1,77 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from scripts.bench import aggregator_memory_bench as bench
+from scripts.core.streaming_aggregator import StreamingAggregator, _floor_bucket
+
+
+def _records():
+    pages = list(bench.iter_record_pages(
+        3000, fingerprints=25, namespaces=4, applications=6, originators=3, hours=2, page_size=700,
+    ))
+    records = [record for page in pages for record in page]
+    # bez namespace / app / timestampu → 'unknown' fakty, None v meas setech, žádný bucket
+    records[10].namespace = None
+    records[11].app_name = ''
+    records[12].timestamp = None
+    # jiná tz, stejný okamžik → stejný bucket i fakt
+    records[13].timestamp = records[13].timestamp.astimezone(timezone(timedelta(hours=1)))
+    return pages, records
+
+
+def test_compact_state_decodes_to_reference_structures():
+    pages, records = _records()
+    agg = StreamingAggregator(parser=bench._PassthroughParser(), spill_details=False)
+    for page in pages:
+        agg.ingest_page(page)
+    agg.finalize()
+
+    facts = {}
+    for record in records:
+        if not record.timestamp:
+            continue
+        key = (_floor_bucket(record.timestamp, 15), record.namespace or 'unknown',
+               record.app_name or 'unknown', record.fingerprint)
+        fact = facts.setdefault(key, [0, record.timestamp, record.timestamp])
+        fact[0] += 1
+        fact[1], fact[2] = min(fact[1], record.timestamp), max(fact[2], record.timestamp)
+    assert agg.error_kind_facts == facts
+    assert list(agg.iter_error_kind_facts()) == sorted(facts.items())
+    assert agg.fact_count == len(facts)
+
+    fp = records[10].fingerprint
+    mine = [record for record in records if record.fingerprint == fp]
+    acc = agg.acc[fp]
+    assert list(acc.app_counts.items()) == list(Counter(r.app_name for r in mine if r.app_name).items())
+    assert list(acc.ns_counts.most_common()) == Counter(r.namespace for r in mine if r.namespace).most_common()
+    assert acc.originator_counts == Counter(r.originator_application for r in mine)
+    assert acc.ns_meas == {r.namespace for r in mine if r.timestamp}
+    assert acc.window_counts == Counter(_floor_bucket(r.timestamp, 15) for r in mine if r.timestamp)
+    ns_buckets = {}
+    for r in mine:
+        if r.timestamp and r.namespace:
+            bucket = _floor_bucket(r.timestamp, 15)
+            ns_buckets.setdefault(r.namespace, Counter())[bucket] += 1
+    assert acc.ns_bucket_counts == ns_buckets
+    assert all(isinstance(bucket, datetime) for bucket in acc.window_counts)
+
+
+def test_memory_benchmark_reports_state_size_and_comparison():
+    report = bench.measure_aggregator(2000, fingerprints=20, hours=1)
+
+    assert report['fingerprints'] == 20 and report['buckets'] == 4
+    assert report['retained_bytes'] == sum(report['state_bytes'].values()) > 0
+    assert report['mb_per_million'] > 0
+    before = dict(report, mb_per_million=report['mb_per_million'] * 4, retained_bytes=report['retained_bytes'] * 4)
+    comparison = bench.compare_reports(before, report)
+    assert comparison['mb_per_million']['reduction'] == comparison['retained_bytes']['reduction'] == 4.0
+    assert comparison['same_fixture'] is True
+    assert bench.compare_reports(dict(before, records=report['records'] + 1), report)['same_fixture'] is False
+
+
+def test_finalize_peak_memory_is_measured():
+    report = bench.measure_finalize_peak(1500, fingerprints=15, namespaces=3, hours=1)
+
+    assert report['peak_bytes'] >= report['retained_bytes'] > 0
+    assert report['error_kind_facts'] > 0 and report['incidents'] == 15
+
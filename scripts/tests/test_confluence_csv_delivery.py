@@ -1,5 +1,10 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
+import pytest
+
 from scripts import confluence_csv_uploader as uploader
 
 
@@ -48,4 +53,101 @@ def test_missing_expected_csv_files_are_failures(tmp_path, monkeypatch):
 
     assert uploader.main() is False
     assert len(captured['outcomes']) == 2
-    assert {outcome['status'] for outcome in captured['outcomes']} == {'failed'}
\ No newline at end of file
+    assert {outcome['status'] for outcome in captured['outcomes']} == {'failed'}
+
+
+class _MockConfluence(BaseHTTPRequestHandler):
+    """GET ?expand=version + PUT /rest/api/content/<id>; počítá requesty."""
+
+    requests = []
+    versions = {}
+    lock = threading.Lock()
+
+    def _reply(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        page_id = self.path.split('?')[0].rsplit('/', 1)[-1]
+        with self.lock:
+            self.requests.append(('GET', page_id))
+            version = self.versions.setdefault(page_id, 1)
+        self._reply({'id': page_id, 'version': {'number': version}})
+
+    def do_PUT(self):
+        page_id = self.path.rsplit('/', 1)[-1]
+        update = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with self.lock:
+            self.requests.append(('PUT', page_id))
+            self.versions[page_id] = update['version']['number']
+        self._reply({'id': page_id, 'version': update['version']})
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def confluence_server(monkeypatch):
+    _MockConfluence.requests = []
+    _MockConfluence.versions = {}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _MockConfluence)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    for name in ('http_proxy', 'HTTP_PROXY', 'https_proxy', 'HTTPS_PROXY', 'CONFLUENCE_PROXY'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(uploader, 'CONFLUENCE_URL', f'http://127.0.0.1:{server.server_port}')
+    monkeypatch.setattr(uploader, 'CONFLUENCE_TOKEN', 'test-token')
+    monkeypatch.setattr(uploader, 'persist_notification_deliveries', lambda *args, **kwargs: 0)
+    yield _MockConfluence
+    server.shutdown()
+    server.server_close()
+
+
+def test_unchanged_pages_are_not_republished(tmp_path, monkeypatch, confluence_server):
+    _write_csv(tmp_path / 'errors_table.csv')
+    _write_csv(tmp_path / 'peaks_table.csv')
+    monkeypatch.setattr(uploader, 'EXPORTS_DIR', tmp_path)
+    monkeypatch.delenv('CONFLUENCE_MANIFEST_PATH', raising=False)
+    monkeypatch.delenv('CONFLUENCE_FORCE_UPLOAD', raising=False)
+
+    assert uploader.main() is True
+    assert sorted(confluence_server.requests) == [
+        ('GET', uploader.CONFLUENCE_KNOWN_ERRORS_PAGE_ID),
+        ('GET', uploader.CONFLUENCE_KNOWN_PEAKS_PAGE_ID),
+        ('PUT', uploader.CONFLUENCE_KNOWN_ERRORS_PAGE_ID),
+        ('PUT', uploader.CONFLUENCE_KNOWN_PEAKS_PAGE_ID),
+    ]
+    manifest = json.loads((tmp_path / uploader.MANIFEST_NAME).read_text(encoding='utf-8'))
+    assert set(manifest) == {uploader.CONFLUENCE_KNOWN_ERRORS_PAGE_ID, uploader.CONFLUENCE_KNOWN_PEAKS_PAGE_ID}
+
+    # Druhý běh beze změny → žádný request
+    confluence_server.requests.clear()
+    assert uploader.main() is True
+    assert confluence_server.requests == []
+
+    # Změní se jen peaks → jen peaks stránka
+    (tmp_path / 'peaks_table.csv').write_text('name,count\nexample,2\n', encoding='utf-8')
+    assert uploader.main() is True
+    assert confluence_server.requests == [
+        ('GET', uploader.CONFLUENCE_KNOWN_PEAKS_PAGE_ID),
+        ('PUT', uploader.CONFLUENCE_KNOWN_PEAKS_PAGE_ID),
+    ]
+    assert confluence_server.versions[uploader.CONFLUENCE_KNOWN_PEAKS_PAGE_ID] == 3
+
+    confluence_server.requests.clear()
+    monkeypatch.setenv('CONFLUENCE_FORCE_UPLOAD', 'true')
+    assert uploader.main() is True
+    assert len(confluence_server.requests) == 4
+
+
+def test_streamed_digest_matches_rendered_html(tmp_path):
+    csv_file = tmp_path / 'errors_table.csv'
+    csv_file.write_text('problem_key,detail,jira\nA:B,"x\ny <z>",J-1\n', encoding='utf-8')
+    html = uploader.csv_to_html_table(csv_file)
+    assert 'A: B' in html and 'x<br/>y &lt;z&gt;' in html and 'J-1' not in html
+    expected = uploader.hashlib.sha256(b'Known Errors\0' + html.encode('utf-8')).hexdigest()
+    assert uploader.page_content_digest('Known Errors', uploader.iter_html_table(csv_file)) == expected
@@ -0,0 +1,118 @@
+import importlib
+import os
+import sys
+from unittest.mock import patch
+
+from scripts.bench.mock_es import MockElasticsearch
+
+SCRIPTS = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if SCRIPTS not in sys.path:
+    sys.path.insert(0, SCRIPTS)
+
+from core import es_client  # noqa: E402
+
+fetch_module = importlib.import_module('core.fetch_unlimited')
+
+DATE_FROM = '2026-07-31T08:00:00Z'
+DATE_TO = '2026-07-31T08:15:00Z'
+
+
+def _docs():
+    docs = []
+    for i in range(30):
+        docs.append({
+            '@timestamp': f'2026-07-31T08:{i // 6:02d}:{i % 6:02d}Z',
+            'level': 'ERROR',
+            'message': f'failure {i}',
+            'traceId': f'trace-{i % 3}',
+            'kubernetes': {'namespace': 'ns-a'},
+        })
+    return docs
+
+
+def _patched_es(mock_es):
+    return (
+        patch.object(fetch_module, 'BASE_URL', mock_es.base_url),
+        patch.object(fetch_module, 'ES_PASSWORD', 'secret'),
+        patch.object(fetch_module, '_load_monitored_namespaces', return_value=['ns-a']),
+    )
+
+
+def test_session_is_shared_pooled_and_renewed_on_credentials_change():
+    es_client.close_session()
+    first = es_client.get_session('reader', 'secret')
+
+    assert es_client.get_session('reader', 'secret') is first
+    assert first.headers['Accept-Encoding'] == 'gzip'
+    assert first.get_adapter('https://es:9500')._pool_maxsize == es_client.ES_POOL_MAXSIZE
+
+    second = es_client.get_session('reader', 'rotated')
+    assert second is not first
+    es_client.close_session()
+
+
+def test_large_request_bodies_are_gzipped():
+    small, small_headers = es_client.encode_body({'query': {'match_all': {}}})
+    assert 'Content-Encoding' not in small_headers and small.startswith(b'{')
+
+    body = {'query': {'terms': {'traceId': [f'trace-{i:032d}' for i in range(200)]}}}
+    payload, headers = es_client.encode_body(body)
+    assert headers['Content-Encoding'] == 'gzip'
+    assert len(payload) < es_client.ES_GZIP_MIN_BYTES
+
+
+def test_post_json_sends_encoded_bytes_once():
+    calls = []
+
+    class FakeSession:
+        def post(self, url, **kwargs):
+            calls.append(kwargs)
+
+    es_client.post_json(FakeSession(), 'https://es:9500/_search', {'size': 0}, timeout=5)
+    assert 'json' not in calls[0]
+    assert calls[0]['data'] == es_client.encode_body({'size': 0})[0]
+    assert calls[0]['headers'] == {'Content-Type': 'application/json'}
+    assert calls[0]['timeout'] == 5
+
+
+def test_trace_context_reuses_pit_of_main_fetch():
+    es_client.close_session()
+    pages = []
+    with MockElasticsearch(_docs()) as mock_es:
+        base_url, password, namespaces = _patched_es(mock_es)
+        with base_url, password, namespaces:
+            fetched = fetch_module.fetch_unlimited(
+                DATE_FROM, DATE_TO, batch_size=10,
+                page_consumer=pages.append, collect_results=False, keep_pit=True,
+            )
+            assert fetched == [] and sum(len(page) for page in pages) == 30
+            shared_pit = fetch_module._SHARED_PIT['id']
+            assert shared_pit in mock_es._pits
+
+            trace_ids = ['trace-1'] + [f'missing-{i:032d}' for i in range(60)]
+            context = fetch_module.fetch_trace_context(trace_ids, DATE_FROM, DATE_TO, batch_size=100)
+            assert mock_es.pit_opens == 1
+            # Snapshot trace contextu = otevření PIT, ne čas dotazu
+            assert fetch_module.LAST_TRACE_CONTEXT_STATS['snapshot_at'] == fetch_module._SHARED_PIT['opened_at']
+            assert mock_es.gzip_requests == 1
+
+            fetch_module.release_shared_pit()
+            assert mock_es._pits == set()
+
+    assert list(context) == ['trace-1']
+    assert len(context['trace-1']) == 10
+    es_client.close_session()
+
+
+def test_trace_context_falls_back_when_shared_pit_expired():
+    es_client.close_session()
+    with MockElasticsearch(_docs()) as mock_es:
+        base_url, password, namespaces = _patched_es(mock_es)
+        with base_url, password, namespaces:
+            fetch_module._SHARED_PIT.update({'id': 'expired-pit', 'keep_alive': '10m'})
+            context = fetch_module.fetch_trace_context(['trace-2'], DATE_FROM, DATE_TO)
+
+    assert len(context['trace-2']) == 10
+    assert fetch_module._SHARED_PIT['id'] is None
+    assert mock_es.search_requests == 2
+    es_client.close_session()
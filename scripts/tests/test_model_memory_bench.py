@@ -0,0 +1,33 @@
+from scripts.bench import model_memory_bench as bench
+from scripts.core.problem_registry import PeakEntry, ProblemEntry
+
+
+def test_slot_models_round_trip_through_dicts():
+    problem = bench.make_problem(7, history=12)
+    peak = bench.make_peak(7, history=6)
+    incident = bench.make_incident(7)
+
+    for entry in (problem, peak, incident, incident.stats, incident.flags, incident.time):
+        assert not hasattr(entry, '__dict__')
+
+    assert ProblemEntry.from_dict(problem.to_dict()).to_dict() == problem.to_dict()
+    assert PeakEntry.from_dict(peak.to_dict()).to_dict() == peak.to_dict()
+    restored = type(incident).from_dict(incident.to_dict()).to_dict()
+    restored.pop('created_at')  # from_dict created_at neobnovuje (nový objekt = nový čas)
+    assert restored == {key: value for key, value in incident.to_dict().items() if key != 'created_at'}
+
+
+def test_model_memory_benchmark_reports_each_model():
+    report = bench.measure_models(entries=50)
+
+    assert set(report['models']) == {'ProblemEntry', 'PeakEntry', 'Incident'}
+    assert all(row['bytes_per_entry'] > 0 for row in report['models'].values())
+    # Baseline: Incident 2× větší, PeakEntry v ní chybí
+    before = {'models': {
+        'ProblemEntry': report['models']['ProblemEntry'],
+        'Incident': {'bytes_per_entry': report['models']['Incident']['bytes_per_entry'] * 2},
+    }}
+    comparison = bench.compare_reports(before, report)
+    assert comparison['Incident']['saved_pct'] == 50.0
+    assert comparison['ProblemEntry']['saved_pct'] == 0.0
+    assert comparison['PeakEntry']['before'] is None and comparison['PeakEntry']['saved_pct'] is None
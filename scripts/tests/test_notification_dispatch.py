@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Concurrent notification dispatch: deadlines, ordering and the retry outbox."""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = os.path.normpath(os.path.join(HERE, '..'))
+sys.path.insert(0, SCRIPTS)
+
+import regular_phase as rp  # noqa: E402
+from core.notification_dispatch import (  # noqa: E402
+    DispatchTask,
+    NotificationOutbox,
+    dispatch_concurrently,
+)
+
+NOW = datetime(2026, 7, 31, 8, 15, tzinfo=timezone.utc)
+TEAMS_ENV = {
+    'TEAMS_ENABLED': 'true',
+    'TEAMS_WEBHOOK_URL': 'https://example.invalid/webhook',
+    'TEAMS_EMAIL': 'channel@example.invalid',
+    'NOTIFY_DEADLINE_SEC': '5',
+    'NOTIFY_DEADLINE_TEAMS_EMAIL_SEC': '0.2',
+}
+
+
+def _delivered(destination):
+    return True, [{'destination': destination, 'status': 'delivered', 'provider_message': 'ok'}]
+
+
+def _failed(destination):
+    return False, [{'destination': destination, 'status': 'failed', 'provider_message': 'HTTP 503'}]
+
+
+class DispatchConcurrentlyTest(unittest.TestCase):
+    def test_slow_destination_hits_deadline_without_blocking_others(self):
+        release = threading.Event()
+
+        def slow():
+            release.wait(5)
+            return _delivered('teams_email')
+
+        tasks = [
+            DispatchTask('a', 'teams_email', slow),
+            DispatchTask('a', 'teams_webhook', lambda: _delivered('teams_webhook')),
+            DispatchTask('b', 'teams_webhook', lambda: 1 / 0),
+        ]
+        started = time.monotonic()
+        results = dispatch_concurrently(
+            tasks, max_workers=3, deadline_for=lambda dest: 0.2 if dest == 'teams_email' else 5,
+        )
+        elapsed = time.monotonic() - started
+        release.set()
+
+        self.assertLess(elapsed, 2)
+        self.assertEqual([res.task for res in results], tasks)
+        self.assertTrue(results[0].timed_out)
+        self.assertEqual(results[0].outcomes[0]['status'], 'failed')
+        self.assertIn('Deadline exceeded', results[0].outcomes[0]['provider_message'])
+        self.assertTrue(results[1].success)
+        self.assertEqual(results[2].outcomes[0]['destination'], 'teams_webhook')
+        self.assertIn('division by zero', results[2].outcomes[0]['provider_message'])
+
+    def test_destinations_are_sent_concurrently(self):
+        barrier = threading.Barrier(3, timeout=2)
+
+        def send(destination):
+            barrier.wait()  # projde jen když běží všechny tři najednou
+            return _delivered(destination)
+
+        results = dispatch_concurrently(
+            [DispatchTask(i, f'd{i}', lambda i=i: send(f'd{i}')) for i in range(3)], max_workers=3,
+        )
+        self.assertTrue(all(res.success for res in results))
+
+    def test_hung_destination_does_not_starve_other_destination(self):
+        release = threading.Event()
+
+        def hung():
+            release.wait(5)
+            return _delivered('teams_email')
+
+        tasks = []
+        for index in range(10):
+            tasks.append(DispatchTask(index, 'teams_email', hung))
+            tasks.append(DispatchTask(index, 'teams_webhook', lambda: (time.sleep(0.05), _delivered('teams_webhook'))[1]))
+        started = time.monotonic()
+        results = dispatch_concurrently(
+            tasks, max_workers=4, deadline_for=lambda dest: 0.3 if dest == 'teams_email' else 5,
+        )
+        elapsed = time.monotonic() - started
+        release.set()
+
+        self.assertLess(elapsed, 2)
+        webhook = [res for res in results if res.task.destination == 'teams_webhook']
+        email = [res for res in results if res.task.destination == 'teams_email']
+        self.assertTrue(all(res.success for res in webhook))
+        self.assertTrue(all(res.timed_out and not res.success for res in email))
+        messages = [res.outcomes[0]['provider_message'] for res in email]
+        self.assertEqual(sum('Deadline exceeded' in message for message in messages), 4)
+        self.assertEqual(sum('send not started' in message for message in messages), 6)
+
+    def test_deadline_counts_from_send_start_not_stage_start(self):
+        def send():
+            time.sleep(0.15)
+            return _delivered('teams_email')
+
+        results = dispatch_concurrently(
+            [DispatchTask(i, 'teams_email', send) for i in range(3)],
+            max_workers=1, deadline_for=lambda dest: 0.3,
+        )
+        self.assertTrue(all(res.success for res in results))
+
+    def test_worker_threads_are_daemon(self):
+        names = []
+
+        def send():
+            names.append(threading.current_thread().daemon)
+            return _delivered('teams_webhook')
+
+        dispatch_concurrently([DispatchTask(0, 'teams_webhook', send)])
+        self.assertEqual(names, [True])
+
+
+class PeakDispatchTest(unittest.TestCase):
+    def test_individual_alerts_split_per_destination_with_deadline(self):
+        payloads = [
+            {'peak_key': 'peak-a', 'window_key': 'w1', 'error_count': 10},
+            {'peak_key': 'peak-b', 'window_key': 'w1', 'error_count': 20},
+        ]
+
+        def send(payload, destination=None):
+            if destination == 'teams_email':
+                time.sleep(1)
+                return _delivered(destination)
+            return _delivered(destination) if payload['peak_key'] == 'peak-a' else _failed(destination)
+
+        with patch.dict(os.environ, TEAMS_ENV), patch.object(rp, '_send_peak_alert_email', side_effect=send):
+            started = time.monotonic()
+            delivered = rp._dispatch_peak_alerts(NOW, NOW, payloads, False, {})
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 1)
+        self.assertEqual(delivered, [payloads[0]])
+        self.assertEqual(
+            [(o['metadata']['peak_key'], o['destination'], o['status']) for o in delivered.delivery_outcomes],
+            [
+                ('peak-a', 'teams_webhook', 'delivered'),
+                ('peak-a', 'teams_email', 'failed'),
+                ('peak-b', 'teams_webhook', 'failed'),
+                ('peak-b', 'teams_email', 'failed'),
+            ],
+        )
+        self.assertEqual([payload for payload, _ in delivered.undelivered], [payloads[1]])
+        self.assertIn('Deadline exceeded', delivered.undelivered[0][1])
+
+    def test_outbox_retry_delivers_requeues_and_expires(self):
+        with tempfile.TemporaryDirectory() as registry_dir:
+            registry = SimpleNamespace(registry_dir=registry_dir)
+            outbox = NotificationOutbox(registry_dir)
+            window_start = NOW - timedelta(minutes=15)
+            outbox.enqueue('ok:w1', {'peak_key': 'ok', 'window_key': 'w1', 'window_start': window_start})
+            outbox.enqueue('down:w1', {'peak_key': 'down', 'window_key': 'w1'}, attempts=1)
+            outbox.enqueue('old:w0', {'peak_key': 'old', 'window_key': 'w0'}, attempts=3)
+
+            sent = []
+
+            def send(payload, destination=None):
+                sent.append((payload['peak_key'], payload.get('window_start')))
+                return _delivered('teams_webhook') if payload['peak_key'] == 'ok' else _failed('teams_webhook')
+
+            with patch.object(rp, '_send_peak_alert_email', side_effect=send), \
+                    patch('core.delivery_persistence.persist_notification_deliveries') as persist:
+                stats = rp._retry_notification_outbox(registry, 'run-1', NOW)
+
+            self.assertEqual(stats, {'retried': 2, 'delivered': 1, 'requeued': 1, 'expired': 1})
+            self.assertIn(('ok', window_start), sent)
+            persisted = persist.call_args.args[1]
+            self.assertEqual(
+                sorted((o['metadata']['peak_key'], o['status'], o['metadata']['attempt_kind']) for o in persisted),
+                [('down', 'failed', 'outbox_retry'), ('ok', 'delivered', 'outbox_retry'),
+                 ('old', 'skipped', 'outbox_expired')],
+            )
+            remaining = outbox.pending()
+            self.assertEqual([(e['dedup_key'], e['attempts']) for e in remaining], [('down:w1', 2)])
+            state_path = rp._alert_state_path(registry)
+            self.assertIn('ok', state_path.read_text())
+
+    def test_outbox_lease_survives_crash_during_retry(self):
+        with tempfile.TemporaryDirectory() as registry_dir:
+            outbox = NotificationOutbox(registry_dir)
+            outbox.enqueue('down:w1', {'peak_key': 'down', 'window_key': 'w1'}, first_failed_at=NOW)
+
+            due, _ = outbox.take_due(now=NOW, lease_sec=600)
+            self.assertEqual([(e['dedup_key'], e['attempts']) for e in due], [('down:w1', 2)])
+            # Běh spadl před ack/release → položka zůstává, do vypršení lease se nebere
+            self.assertEqual([e['dedup_key'] for e in outbox.pending()], ['down:w1'])
+            self.assertEqual(outbox.take_due(now=NOW + timedelta(minutes=1), lease_sec=600), ([], []))
+
+            due, _ = NotificationOutbox(registry_dir).take_due(now=NOW + timedelta(minutes=11), lease_sec=600)
+            self.assertEqual([(e['dedup_key'], e['attempts']) for e in due], [('down:w1', 3)])
+            outbox.ack(['down:w1'])
+            self.assertEqual(outbox.pending(), [])
+
+    def test_no_data_window_retries_outbox(self):
+        with tempfile.TemporaryDirectory() as registry_dir, \
+                patch.dict(os.environ, {'NOTIFY_OUTBOX_ENABLED': 'true', 'REGISTRY_DIR': registry_dir}), \
+                patch('core.run_persistence.persist_analysis_run', return_value={}), \
+                patch.object(rp, '_load_monitored_namespaces', return_value=['ns-a']), \
+                patch.object(rp, '_retry_notification_outbox', return_value={'retried': 1}) as retry:
+            result = rp._finish_no_data_run(
+                {}, NOW, NOW - timedelta(minutes=15), NOW, expected_count=0, dry_run=False,
+            )
+
+        self.assertEqual(result['status'], 'no_data')
+        self.assertEqual(result['notification_outbox'], {'retried': 1})
+        self.assertEqual(retry.call_args.args[0].registry_dir, registry_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -215,8 +215,10 @@ class PeakDigestR88Tests(unittest.TestCase):
         ]
         now_utc = datetime(2026, 7, 31, 8, 15, tzinfo=timezone.utc)
 
+        # Fallback payloady jdou souběžně → výsledek podle payloadu, ne podle pořadí volání
         with patch.object(rp, '_send_peak_alert_digest', return_value=False), patch.object(
-            rp, '_send_peak_alert_email', side_effect=[False, True]
+            rp, '_send_peak_alert_email',
+            side_effect=lambda payload, **_kwargs: payload['peak_key'] == 'peak-b',
         ):
             delivered = rp._dispatch_peak_alerts(
                 now_utc, now_utc, payloads, True, {}
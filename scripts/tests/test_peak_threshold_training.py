@@ -1,3 +1,5 @@
+import math
+import random
 from datetime import datetime, timezone
 
 import pytest
@@ -19,6 +21,9 @@ class FetchCursor:
     def fetchall(self):
         return self.rows
 
+    def fetchone(self):
+        return self.rows[0][:1] if self.rows else None
+
     def close(self):
         pass
 
@@ -26,6 +31,10 @@ class FetchCursor:
 class FetchConnection:
     def __init__(self, rows):
         self.cursor_instance = FetchCursor(rows)
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
 
     def cursor(self):
         return self.cursor_instance
@@ -75,11 +84,69 @@ def test_threshold_training_reads_dense_complete_facts_with_as_of_bound():
 
     assert data == {('ns-a', 4): [0.0, 12.0]}
     assert date_range == {'min': rows[0][3], 'max': rows[1][3]}
+    assert connection.cursor_instance.query.rstrip().endswith("ORDER BY namespace, day_of_week, error_count")
     assert 'FROM ailog_peak.v_complete_namespace_error_counts' in connection.cursor_instance.query
     assert 'window_start < %s' in connection.cursor_instance.query
     assert connection.cursor_instance.params[0] == as_of
 
 
+def _reference_thresholds(data, percentile_level):
+    """Původní výpočet (dva sorty na skupinu) pro paritní test."""
+    thresholds = {}
+    for key, values in data.items():
+        s = sorted(values)
+        n = len(s)
+        thresholds[key] = {
+            'p93': thresholds_module.percentile(values, percentile_level),
+            'count': n,
+            'median': s[n // 2],
+            'mean': math.fsum(values) / n,
+            'max': max(values),
+        }
+    return thresholds
+
+
+@pytest.mark.parametrize('percentile_level', [0.5, 0.92, 0.93, 0.999, 1.0])
+def test_single_sort_training_matches_reference_percentile_semantics(percentile_level):
+    rng = random.Random(50)
+    data = {}
+    for ns_index in range(12):
+        for dow in range(7):
+            size = rng.choice([1, 2, 3, 7, 96, 1152])
+            data[(f'ns-{ns_index}', dow)] = [
+                float(rng.choice([0, 0, 1, 2, rng.randint(0, 5000)])) for _ in range(size)
+            ]
+
+    thresholds = thresholds_module.calculate_p93_thresholds(data, percentile_level)
+    assert thresholds == _reference_thresholds(data, percentile_level)
+
+    caps = thresholds_module.calculate_cap_values(thresholds)
+    for ns, cap in caps.items():
+        p93_values = [stats['p93'] for (key_ns, _), stats in thresholds.items() if key_ns == ns]
+        assert cap['min_p93'] == min(p93_values)
+        assert cap['max_p93'] == max(p93_values)
+
+
+def test_training_mean_does_not_depend_on_row_order():
+    rng = random.Random(50)
+    values = [rng.uniform(0, 5000) * 10 ** rng.randint(-6, 6) for _ in range(1152)]
+    shuffled = list(values)
+    rng.shuffle(shuffled)
+
+    by_value = thresholds_module.calculate_p93_thresholds({('ns-a', 0): sorted(values)})
+    by_time = thresholds_module.calculate_p93_thresholds({('ns-a', 0): shuffled})
+    assert by_value[('ns-a', 0)]['mean'] == by_time[('ns-a', 0)]['mean']
+    assert by_value[('ns-a', 0)]['mean'] == math.fsum(values) / len(values)
+
+
+def test_percentile_sorted_uses_floor_index_and_clamps():
+    values = [5.0, 1.0, 3.0, 2.0, 4.0]
+    assert thresholds_module.percentile(values, 0.93) == 5.0
+    assert thresholds_module.percentile_sorted(sorted(values), 0.5) == 3.0
+    assert thresholds_module.percentile_sorted(sorted(values), 1.0) == 5.0
+    assert thresholds_module.percentile_sorted([], 0.93) == 0.0
+
+
 def test_threshold_snapshot_failure_rolls_back_cache_and_marks_snapshot_failed(monkeypatch):
     connection = SnapshotConnection()
     as_of = datetime(2026, 7, 31, 8, 0, tzinfo=timezone.utc)
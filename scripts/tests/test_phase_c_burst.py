@@ -0,0 +1,104 @@
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import pytest
+
+from scripts.pipeline.phase_b_measure import MeasurementResult
+from scripts.pipeline.phase_c_detect import DetectionResult, PhaseC_Detect
+
+
+@dataclass
+class _Record:
+    fingerprint: str
+    timestamp: Optional[datetime]
+    namespace: str
+    app_name: str = 'bl-app-v1'
+
+
+def _reference_window_counts(records, window_sec):
+    """Původní dvou-ukazatelová smyčka z _detect_burst."""
+    sorted_records = sorted([r for r in records if r.timestamp], key=lambda r: r.timestamp)
+    window = timedelta(seconds=window_sec)
+    start = 0
+    counts = []
+    for i, record in enumerate(sorted_records):
+        while start < i and sorted_records[start].timestamp < record.timestamp - window:
+            start += 1
+        counts.append(i - start + 1)
+    return max(counts), sum(counts)
+
+
+def _reference_buckets(records, window_minutes):
+    """Původní per-record bucketing z detect_batch."""
+    namespace_windows = defaultdict(lambda: defaultdict(int))
+    for record in records:
+        if not record.timestamp or not record.namespace:
+            continue
+        minute = (record.timestamp.minute // window_minutes) * window_minutes
+        bucket = record.timestamp.replace(minute=minute, second=0, microsecond=0)
+        namespace_windows[record.namespace][bucket] += 1
+    return {ns: dict(buckets) for ns, buckets in namespace_windows.items()}
+
+
+def _records(seed, tz=None, mixed_tz=False):
+    rng = random.Random(seed)
+    base = datetime(2026, 3, 29, 0, 50, tzinfo=tz)
+    records = []
+    for _ in range(rng.randint(2, 400)):
+        ts = base + timedelta(seconds=rng.choice([
+            rng.randint(0, 7200), rng.randint(600, 620), 900, 3600,
+        ]))
+        if mixed_tz and rng.random() < 0.3:
+            ts = ts.astimezone(timezone(timedelta(hours=5, minutes=30)))
+        if rng.random() < 0.05:
+            ts = None
+        records.append(_Record('fp', ts, rng.choice(['ns-a', 'ns-b', '', None])))
+    return records
+
+
+@pytest.mark.parametrize('window_minutes', [15, 7, 60])
+@pytest.mark.parametrize('tz,mixed', [(None, False), (timezone.utc, False), (timezone.utc, True)])
+def test_sorted_bucket_counts_match_per_record_loop(window_minutes, tz, mixed):
+    for seed in range(30):
+        records = _records(seed, tz, mixed)
+        timed = PhaseC_Detect._sort_by_timestamp(records)
+        timestamps = [r.timestamp for r in timed]
+        buckets = PhaseC_Detect._namespace_buckets(timed, timestamps, window_minutes)
+        assert {ns: dict(b) for ns, b in buckets.items()} == _reference_buckets(records, window_minutes)
+
+
+@pytest.mark.parametrize('window_sec', [0, 1, 60, 900])
+def test_bisect_window_counts_match_two_pointer_loop(window_sec):
+    for seed in range(30):
+        records = _records(seed, timezone.utc, mixed_tz=seed % 2 == 0)
+        timestamps = [r.timestamp for r in PhaseC_Detect._sort_by_timestamp(records)]
+        if len(timestamps) < 2:
+            continue
+        assert PhaseC_Detect._window_counts(timestamps, window_sec) == (
+            _reference_window_counts(records, window_sec)
+        )
+
+
+def test_detect_batch_burst_flags_and_event_bounds():
+    detector = PhaseC_Detect()
+    base = datetime(2026, 7, 31, 8, 0, tzinfo=timezone.utc)
+    records = [_Record('burst', base + timedelta(seconds=i), 'ns-a') for i in range(20)]
+    records += [_Record('burst', base + timedelta(minutes=2 * i), 'ns-a') for i in range(1, 61)]
+    records += [_Record('flat', base + timedelta(minutes=i), 'ns-b') for i in range(10)]
+    random.Random(29).shuffle(records)
+
+    measurements = {
+        fp: MeasurementResult(fingerprint=fp, current_count=n, current_rate=float(n))
+        for fp, n in (('burst', 80), ('flat', 10))
+    }
+    results = detector.detect_batch(measurements, records)
+
+    assert isinstance(results['burst'], DetectionResult)
+    assert results['burst'].flags.is_burst
+    assert not results['flat'].flags.is_burst
+    assert results['burst'].first_event_ts == base
+    assert results['burst'].last_event_ts == base + timedelta(minutes=120)
+    assert results['flat'].last_event_ts == base + timedelta(minutes=9)
@@ -0,0 +1,105 @@
+import random
+import re
+
+from scripts.pipeline.incident import IncidentCategory
+from scripts.pipeline.phase_e_classify import (
+    ClassificationRule,
+    PhaseE_Classify,
+    _literal_fragments,
+)
+
+
+def _sequential(classifier, normalized_message, error_type):
+    """Referenční first-match přes všechna pravidla (původní chování)."""
+    text = f"{error_type} {normalized_message}"
+    for rule, patterns in classifier._compiled_rules:
+        if any(pattern.search(text) for pattern in patterns):
+            return rule.category, rule.subcategory
+    return IncidentCategory.UNKNOWN, "unclassified"
+
+
+def _corpus():
+    classifier = PhaseE_Classify()
+    words = []
+    for rule in classifier.rules:
+        for pattern in rule.patterns:
+            words.extend(re.sub(r'[\\\[\].*()]', ' ', pattern).split())
+    words += ['Tt', 'ERROR', 'UserNotFound', 'žluťoučký', 'kůň', 'K', 'ſ', '\n', 'java.lang']
+    rng = random.Random(28)
+    messages = []
+    for _ in range(3000):
+        tokens = [rng.choice(words) for _ in range(rng.randint(1, 6))]
+        if rng.random() < 0.3:
+            tokens = [t.upper() if rng.random() < 0.5 else t.lower() for t in tokens]
+        messages.append((' '.join(tokens), rng.choice(['', 'SQLException', 'ServiceException'])))
+    messages += [
+        ('Processing of case 123 rejected', ''),
+        ('processing of case\n123 rejected', ''),
+        ('FlowResult(status=REJECTED)', ''),
+        ('SQL syntax error near', 'X'),
+        ('nothing interesting here', 'UnknownError'),
+    ]
+    return messages
+
+
+def test_literal_fragments_cover_default_rules():
+    assert _literal_fragments(r'SQL.*error') == (['sql', 'error'], True)
+    assert _literal_fragments(r'[Tt]imeout') == (['timeout'], False)
+    assert _literal_fragments(r'FlowResult\(status=REJECTED') == (['flowresult(status=rejected'], False)
+    assert _literal_fragments(r'timeout|deadline') is None
+    assert _literal_fragments(r'\d+ ms') is None
+
+    for rule in PhaseE_Classify.DEFAULT_RULES:
+        for pattern in rule.patterns:
+            assert _literal_fragments(pattern) is not None, pattern
+
+
+def test_compiled_matcher_matches_sequential_first_match():
+    classifier = PhaseE_Classify()
+    for message, error_type in _corpus():
+        result = classifier.classify(message, error_type)
+        expected = _sequential(classifier, message, error_type)
+        assert (result.category, result.subcategory) == expected, (message, error_type)
+
+
+def test_custom_regex_rules_and_cache_invalidation():
+    classifier = PhaseE_Classify()
+    message = 'quota counter drifted by 42 units'
+    before = classifier.classify(message, 'QuotaWarning', 'fp-1')
+    assert before.category == IncidentCategory.UNKNOWN
+
+    classifier.add_rule(ClassificationRule(
+        category=IncidentCategory.EXTERNAL,
+        subcategory='quota_drift',
+        patterns=[r'(a)\1', r'drifted by \d+', r'\d+ units? lost'],
+        priority=1000,
+    ))
+    after = classifier.classify(message, 'QuotaWarning', 'fp-2')
+    assert (after.category, after.subcategory) == (IncidentCategory.EXTERNAL, 'quota_drift')
+    assert after.fingerprint == 'fp-2'
+    assert after.matched_rule == f'{IncidentCategory.EXTERNAL.value}/quota_drift'
+
+    for message, error_type in _corpus():
+        result = classifier.classify(message, error_type)
+        assert (result.category, result.subcategory) == _sequential(classifier, message, error_type)
+
+
+def test_classification_is_memoized_per_message():
+    classifier = PhaseE_Classify()
+    calls = []
+    first_match = classifier._matcher.first_match
+
+    def counting(text):
+        calls.append(text)
+        return first_match(text)
+
+    classifier._matcher.first_match = counting
+    batch = classifier.classify_batch([
+        ('fp-a', 'Connection refused to db', 'ConnectException'),
+        ('fp-b', 'Connection refused to db', 'ConnectException'),
+    ])
+
+    assert len(calls) == 1
+    assert batch['fp-a'].fingerprint == 'fp-a'
+    assert batch['fp-b'].fingerprint == 'fp-b'
+    assert batch['fp-a'].category == batch['fp-b'].category
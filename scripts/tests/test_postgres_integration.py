@@ -138,11 +138,21 @@ def test_migration_ledger_and_schema_postconditions():
             "to_regclass('ailog_peak.daily_error_kind_rollups'), "
             "to_regclass('ailog_peak.daily_namespace_rollups'), "
             "to_regclass('ailog_peak.notification_deliveries'), "
+            "to_regclass('ailog_peak.authoritative_run_windows'), "
+            "to_regclass('ailog_peak.rollup_watermarks'), "
+            "to_regclass('ailog_peak.run_phase_metrics'), "
             "to_regclass('ailog_peak.v_pipeline_health'), "
             "to_regclass('ailog_peak.v_notification_delivery_health'), "
             "to_regclass('ailog_peak.v_metadata_quality_health')"
         )
         schema_objects = cursor.fetchone()
+        cursor.execute(
+            "SELECT relname, relkind FROM pg_class "
+            "WHERE relnamespace = 'ailog_peak'::regnamespace "
+            "AND relname IN ('error_kind_counts', 'namespace_error_counts', 'detection_events') "
+            "ORDER BY relname"
+        )
+        fact_table_kinds = cursor.fetchall()
     connection.close()
 
     assert [row[0] for row in ledger_rows] == [
@@ -151,6 +161,11 @@ def test_migration_ledger_and_schema_postconditions():
     ]
     assert all(checksum_length == 64 and execution_ms >= 0 for _, checksum_length, execution_ms in ledger_rows)
     assert all(schema_objects)
+    assert fact_table_kinds == [
+        ('detection_events', 'p'),
+        ('error_kind_counts', 'p'),
+        ('namespace_error_counts', 'p'),
+    ]
 
 
 def test_two_fingerprints_and_replay_have_one_authoritative_run():
@@ -197,6 +212,11 @@ def test_two_fingerprints_and_replay_have_one_authoritative_run():
             (window_start,),
         )
         authoritative_facts = cursor.fetchall()
+        cursor.execute(
+            'SELECT run_id FROM ailog_peak.authoritative_run_windows WHERE window_start = %s',
+            (window_start,),
+        )
+        authority_rows = cursor.fetchall()
     connection.close()
 
     assert first['fact_rows'] == replay['fact_rows'] == 2
@@ -209,6 +229,8 @@ def test_two_fingerprints_and_replay_have_one_authoritative_run():
         ('integration-run-2', 'fp-a', 3),
         ('integration-run-2', 'fp-b', 2),
     ]
+    assert authority_rows == [('integration-run-2',)]
+    assert replay['authoritative_windows'] == 1
 
 
 def test_injected_bulk_failure_leaves_failed_run_without_facts():
@@ -350,6 +372,8 @@ def test_retention_rolls_up_authoritative_facts_before_delete():
     assert committed['deleted_fact_rows'] == 2
     assert committed['deleted_namespace_rows'] == 2
     assert committed['deleted_peak_raw_rows'] == 2
+    assert committed['late_rollup_days'] == 0
+    assert committed['rolled_up_before'] == '2026-05-02'
 
     connection = _connect()
     with connection.cursor() as cursor:
@@ -395,6 +419,14 @@ def test_retention_rolls_up_authoritative_facts_before_delete():
             "FROM ailog_peak.maintenance_runs ORDER BY started_at DESC LIMIT 1"
         )
         assert cursor.fetchone() == ('complete', 5, 2)
+        cursor.execute(
+            "SELECT rollup_table, rolled_up_before FROM ailog_peak.rollup_watermarks "
+            "ORDER BY rollup_table"
+        )
+        assert [row[0] for row in cursor.fetchall()] == [
+            'daily_error_kind_rollups',
+            'daily_namespace_rollups',
+        ]
     connection.close()
 
 
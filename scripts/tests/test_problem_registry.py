@@ -1,3 +1,4 @@
+import os
 import multiprocessing
 from datetime import datetime
 from types import SimpleNamespace
@@ -98,4 +99,136 @@ def test_enrichment_merge_preserves_concurrent_registry_update(tmp_path):
     assert problem.root_cause == 'service failure'
     assert problem.behavior == 'request rejected'
     assert problem.enriched_severity == 'high'
-    assert problem.enriched_score == 87.5
\ No newline at end of file
+    assert problem.enriched_score == 87.5
+
+def test_problem_key_cache_persists_and_resolves_known_fingerprints(tmp_path, monkeypatch):
+    from scripts.core import problem_registry
+
+    registry = ProblemRegistry(str(tmp_path))
+    assert registry.update_and_save([_incident('fp-a', 'BUSINESS', 'card-servicing')])
+    assert registry.stats['problem_key_cache_misses'] == 1
+
+    reloaded = ProblemRegistry(str(tmp_path))
+    assert reloaded.load()
+    assert len(reloaded.problem_key_cache) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError('problem_key recomputed for a cached fingerprint')
+
+    monkeypatch.setattr(problem_registry, 'resolve_problem_key', fail)
+    reloaded.update_from_incidents([_incident('fp-a', 'BUSINESS', 'card-servicing')])
+    assert reloaded.stats['problem_key_cache_hits'] == 1
+    assert set(reloaded.problems) == {'BUSINESS:card_servicing:runtime_error'}
+
+    # Jiná app signatura → miss a nový klíč
+    monkeypatch.undo()
+    reloaded.update_from_incidents([_incident('fp-a', 'BUSINESS', 'billing')])
+    assert 'BUSINESS:billing:runtime_error' in reloaded.problems
+    assert reloaded.stats['problem_key_cache_misses'] == 1
+
+
+def test_problem_key_cache_is_dropped_on_rules_change_and_verified(tmp_path, monkeypatch):
+    from scripts.core import problem_registry
+
+    registry = ProblemRegistry(str(tmp_path))
+    assert registry.update_and_save([_incident('fp-a', 'BUSINESS', 'card-servicing')])
+
+    monkeypatch.setattr(problem_registry, 'PROBLEM_KEY_RULES_VERSION', 'changed')
+    stale = ProblemRegistry(str(tmp_path))
+    assert stale.load()
+    assert stale.problem_key_cache == {}
+    monkeypatch.undo()
+
+    verifying = ProblemRegistry(str(tmp_path))
+    assert verifying.load()
+    verifying.verify_problem_key_cache = True
+    key = next(iter(verifying.problem_key_cache))
+    verifying.problem_key_cache[key] = ('BUSINESS:wrong:runtime_error', 'wrong', 'runtime_error', 'BUSINESS')
+
+    verifying.update_from_incidents([_incident('fp-a', 'BUSINESS', 'card-servicing')])
+    assert verifying.stats['problem_key_cache_mismatches'] == 1
+    assert verifying.problem_key_cache[key][0] == 'BUSINESS:card_servicing:runtime_error'
+    assert 'BUSINESS:wrong:runtime_error' not in verifying.problems
+
+
+def test_problem_key_cache_saved_only_when_dirty_and_evicted_by_last_use(tmp_path, monkeypatch):
+    from scripts.core import problem_registry
+
+    registry = ProblemRegistry(str(tmp_path))
+    assert registry.update_and_save([_incident('fp-a', 'BUSINESS', 'card-servicing')])
+    cache_file = tmp_path / 'problem_key_cache.json'
+    os.utime(cache_file, ns=(1_000_000_000, 1_000_000_000))
+
+    # Jen hity → cache se nepřepisuje
+    assert registry.update_and_save([_incident('fp-a', 'BUSINESS', 'card-servicing')])
+    assert cache_file.stat().st_mtime_ns == 1_000_000_000
+
+    monkeypatch.setattr(problem_registry, 'MAX_PROBLEM_KEY_CACHE_ENTRIES', 2)
+    assert registry.update_and_save([_incident('fp-b', 'BUSINESS', 'billing')])
+    assert registry.update_and_save([
+        _incident('fp-a', 'BUSINESS', 'card-servicing'),
+        _incident('fp-c', 'BUSINESS', 'click2pay'),
+    ])
+    assert [key.split('|')[0] for key in registry.problem_key_cache] == ['fp-a', 'fp-c']
+    assert cache_file.stat().st_mtime_ns != 1_000_000_000
+
+
+def test_problem_key_rules_version_covers_rule_section_source():
+    from scripts.core import problem_registry
+
+    source = open(problem_registry.__file__, encoding='utf-8').read()
+    assert 'FLOW_PATTERNS' in source[source.index('# PROBLEM KEY COMPUTATION'):source.index('\ndef _problem_key_rules_version')]
+    assert len(problem_registry.PROBLEM_KEY_RULES_VERSION) == 16
+
+
+def test_refresh_reuses_snapshot_until_another_process_writes(tmp_path):
+    resident = ProblemRegistry(str(tmp_path))
+    resident.reuse_unchanged_snapshot = True
+    assert resident.update_and_save([_incident('fp-a', 'BUSINESS', 'card-servicing')])
+    problems = resident.problems
+
+    assert resident.refresh() is True
+    assert resident.last_refresh_reused is True
+    assert resident.problems is problems
+
+    other = ProblemRegistry(str(tmp_path))
+    assert other.update_and_save([_incident('fp-b', 'DATABASE', 'billing')])
+
+    assert resident.refresh() is True
+    assert resident.last_refresh_reused is False
+    assert set(resident.fingerprint_index) == {'fp-a', 'fp-b'}
+
+
+def test_minute_index_tracks_load_append_and_external_trim(tmp_path):
+    registry = ProblemRegistry(str(tmp_path))
+    incident = _incident('fp-a', 'BUSINESS', 'card-servicing')
+    registry.update_from_incidents([incident])
+    registry.update_from_incidents([incident])  # re-run stejné minuty → idempotentní
+    problem = next(iter(registry.problems.values()))
+    assert problem.occurrences == 1 and len(problem.occurrence_times) == 1
+
+    later = datetime(2026, 7, 31, 8, 15, 30)
+    problem.record_occurrence(later, 2)
+    assert problem.has_occurrence_minute(later.replace(second=5))
+    assert registry.save() is True
+
+    reloaded = ProblemRegistry(str(tmp_path))
+    assert reloaded.load() is True
+    entry = reloaded.problems[problem.problem_key]
+    assert entry.has_occurrence_minute(datetime(2026, 7, 31, 8, 0, 59))
+
+    # trim zvenku (jiný kód zkrátí historii) → index se přestaví
+    del entry.occurrence_times[0], entry.occurrence_counts[0]
+    assert not entry.has_occurrence_minute(datetime(2026, 7, 31, 8, 0))
+    assert entry.has_occurrence_minute(later)
+
+
+def test_registry_occurrence_bench_matches_legacy_check():
+    from scripts.bench import registry_occurrence_bench as bench
+
+    report = bench.run_benchmark(problems=20, history=30, checks=40)
+    assert report['checks_agree'] is True
+    # Polovina kontrol míří na existující minutu, polovina na novou
+    assert report['legacy_hits'] == report['indexed_hits'] == 20
+    assert report['indexed_check_us'] > 0 and report['legacy_check_us'] > 0
+    assert report['update_problem_us'] > 0
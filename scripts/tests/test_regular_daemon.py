@@ -0,0 +1,154 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from scripts.core.baseline_loader import BaselineCache, BaselineLoader
+from scripts.core.db_pool import ConnectionPool
+
+SCRIPTS = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if SCRIPTS not in sys.path:
+    sys.path.insert(0, SCRIPTS)
+
+import regular_phase as rp  # noqa: E402
+
+T0 = datetime(2026, 7, 31, 8, 0, tzinfo=timezone.utc)
+
+
+class TableLoader(BaselineLoader):
+    """peak_raw_data v paměti: complete okna + počty per (fingerprint, okno)."""
+
+    def __init__(self, windows, counts):
+        super().__init__(None)
+        self.windows = windows
+        self.counts = counts
+        self.queries = []
+
+    def load_dense_counts(self, fingerprints, range_start, range_end):
+        self.queries.append((tuple(fingerprints), range_start, range_end))
+        return [
+            (fingerprint, window, self.counts.get((fingerprint, window), 0))
+            for window in self.windows if range_start <= window < range_end
+            for fingerprint in fingerprints
+        ]
+
+
+def test_baseline_cache_matches_full_reload_across_windows():
+    windows = [T0 - timedelta(days=7, minutes=15) + timedelta(minutes=15 * i) for i in range(700)]
+    counts = {('fp-a', window): i % 5 for i, window in enumerate(windows) if i % 3}
+    counts.update({('fp-b', window): 2 for window in windows[::7]})
+    loader = TableLoader(windows, counts)
+    cache = BaselineCache(lookback_days=7)
+
+    for step, fingerprints in enumerate([['fp-a'], ['fp-a'], ['fp-a', 'fp-b'], ['fp-b']]):
+        as_of = T0 + timedelta(minutes=15 * step)
+        expected = loader.load_fingerprint_rates(fingerprints, as_of, lookback_days=7, min_samples=3)
+        assert cache.load_fingerprint_rates(loader, fingerprints, as_of, min_samples=3) == expected
+
+    assert cache.stats == {'full_loads': 1, 'incremental_loads': 3, 'new_fingerprint_loads': 1}
+    incremental = [query for query in loader.queries if query[2] - query[1] == timedelta(minutes=15)]
+    assert len(incremental) == 3
+
+
+def test_baseline_cache_full_reload_when_stale_or_rewound():
+    loader = TableLoader([T0 - timedelta(minutes=15 * i) for i in range(1, 10)], {})
+    cache = BaselineCache(lookback_days=7, full_refresh_minutes=30)
+
+    cache.load_fingerprint_rates(loader, ['fp-a'], T0)
+    cache.load_fingerprint_rates(loader, ['fp-a'], T0 - timedelta(minutes=15))
+    cache.load_fingerprint_rates(loader, ['fp-a'], T0 + timedelta(minutes=15))
+
+    assert cache.stats['full_loads'] == 3
+
+
+def test_baseline_cache_failed_load_leaves_no_holes():
+    windows = [T0 - timedelta(minutes=15 * i) for i in range(1, 40)]
+    windows += [T0, T0 + timedelta(minutes=15)]
+    counts = {('fp-a', window): 3 for window in windows}
+    counts.update({('fp-b', window): 1 for window in windows})
+    loader = TableLoader(windows, counts)
+    cache = BaselineCache(lookback_days=7)
+    cache.load_fingerprint_rates(loader, ['fp-a'], T0)
+
+    # Incremental dotaz projde, dotaz na nový fingerprint spadne → nic se nezapíše
+    real_load = loader.load_dense_counts
+
+    def flaky(fingerprints, range_start, range_end):
+        if 'fp-b' in fingerprints:
+            raise RuntimeError('db down')
+        return real_load(fingerprints, range_start, range_end)
+
+    loader.load_dense_counts = flaky
+    next_start = T0 + timedelta(minutes=30)
+    with pytest.raises(RuntimeError):
+        cache.load_fingerprint_rates(loader, ['fp-a', 'fp-b'], next_start)
+
+    loader.load_dense_counts = real_load
+    resident = cache.load_fingerprint_rates(loader, ['fp-a', 'fp-b'], next_start)
+    fresh = BaselineCache(lookback_days=7).load_fingerprint_rates(loader, ['fp-a', 'fp-b'], next_start)
+    assert resident == fresh
+    assert resident['fp-a'][-2:] == [3.0, 3.0]
+    assert cache.stats['incremental_loads'] == 1
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+def test_connection_pool_reuses_rolls_back_and_discards_dead():
+    opened = []
+    prepared = []
+
+    def connect(key):
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    pool = ConnectionPool(connect, prepare=lambda conn, key: prepared.append(key), max_idle=1)
+
+    first = pool.acquire(True)
+    first.close()
+    second = pool.acquire(True)
+    assert second.rollbacks == 1
+    assert len(opened) == 1 and prepared == [True, True]
+
+    opened[0].closed = 2  # spojení spadlo mezi okny
+    second.close()
+    pool.acquire(True).close()
+    writer = pool.acquire(False)
+    assert len(opened) == 3
+    assert pool.stats == {'opened': 3, 'reused': 1, 'discarded': 1}
+
+    writer.close()
+    pool.close_all()
+    assert all(conn.closed for conn in opened)
+
+
+def test_due_window_ends_waits_for_close_and_caps_catchup():
+    last_end = T0
+    due, skipped = rp._due_window_ends(last_end, T0 + timedelta(minutes=14), timedelta(0), 4)
+    assert due == [] and skipped == 0
+
+    due, skipped = rp._due_window_ends(last_end, T0 + timedelta(minutes=16), timedelta(seconds=90), 4)
+    assert due == [] and skipped == 0
+
+    due, skipped = rp._due_window_ends(last_end, T0 + timedelta(minutes=100), timedelta(0), 2)
+    assert due == [T0 + timedelta(minutes=75), T0 + timedelta(minutes=90)]
+    assert skipped == 4
+
+
+def test_daemon_refuses_second_instance(tmp_path, monkeypatch):
+    monkeypatch.setenv('REGISTRY_DIR', str(tmp_path))
+    held = rp._acquire_daemon_lock(tmp_path)
+    try:
+        assert rp.run_daemon(max_windows=1) == 1
+    finally:
+        held.close()
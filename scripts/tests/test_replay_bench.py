@@ -0,0 +1,33 @@
+from scripts.bench import replay_bench
+
+
+def test_replay_benchmark_runs_fixture_through_mock_es(tmp_path):
+    docs = replay_bench.generate_docs(
+        records=1500, fingerprints=12, namespaces=3, trace_fanout=4, seed=3
+    )
+    fixture = tmp_path / 'fixture.jsonl'
+    replay_bench.save_fixture(docs, str(fixture))
+    loaded = replay_bench.load_fixture(str(fixture))
+    assert loaded == docs
+
+    report = replay_bench.run_benchmark(loaded, batch_size=400, work_dir=str(tmp_path / 'work'))
+
+    phases = {phase['phase']: phase for phase in report['phases']}
+    assert list(phases) == ['fetch_aggregate', 'pipeline', 'registry_update', 'export']
+    assert report['records'] == 1500
+    # 1500 docs / 400 per page → 4 full-or-partial pages, no extra empty request
+    assert phases['fetch_aggregate']['search_requests'] == 4
+    assert phases['pipeline']['incidents'] == phases['fetch_aggregate']['fingerprints']
+    assert phases['pipeline']['spill_bytes'] > 0
+    assert phases['export']['export_bytes'] > 0
+    assert all(phase['wall_sec'] > 0 for phase in report['phases'])
+
+    # Baseline: každá fáze 2× pomalejší, první fáze v ní chybí
+    before = {
+        'total_wall_sec': report['total_wall_sec'] * 2,
+        'phases': [dict(phase, wall_sec=phase['wall_sec'] * 2) for phase in report['phases'][1:]],
+    }
+    comparison = replay_bench.compare_reports(before, report)
+    assert comparison[-1]['phase'] == 'total'
+    assert comparison[0]['before_sec'] is None and comparison[0]['speedup'] is None
+    assert {row['speedup'] for row in comparison[1:]} == {2.0}
@@ -0,0 +1,180 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from incident_analysis import (
+    CausalChain,
+    IncidentAnalysis,
+    IncidentAnalysisResult,
+    IncidentScope,
+    IncidentTrigger,
+    SeverityLevel,
+    TriggerType,
+)
+from incident_analysis.formatter import IncidentReportFormatter
+from scripts import backfill_report_publisher, recent_incidents_exporter, recent_incidents_publisher
+from scripts.core import run_artifact
+from scripts.core.run_artifact import RunArtifactError
+
+START = datetime(2026, 1, 20, tzinfo=timezone.utc)
+END = datetime(2026, 1, 21, tzinfo=timezone.utc)
+
+
+def _incident(index, app, severity, cause_type, errors, action=''):
+    return IncidentAnalysis(
+        incident_id=f"INC-{index}",
+        severity=severity,
+        title=f"{cause_type.title()} issue in {app}",
+        trigger=IncidentTrigger(
+            trigger_type=TriggerType.SPIKE, app=app, namespace='ns-a', fingerprint=f"fp-{index}",
+            error_type='Err', message='boom', timestamp=START,
+        ),
+        scope=IncidentScope(apps=[app, 'svc-shared']),
+        causal_chain=CausalChain(
+            root_cause_fingerprint=f"fp-{index}", root_cause_app=app,
+            root_cause_type=cause_type, root_cause_description=f"{cause_type} failure in {app}",
+        ),
+        immediate_actions=[action] if action else [],
+        total_errors=errors,
+    )
+
+
+def _analysis_result():
+    incidents = [
+        _incident(1, 'svc-a', SeverityLevel.CRITICAL, 'database', 500, 'Check DB pool'),
+        _incident(2, 'svc-a', SeverityLevel.HIGH, 'database', 50),
+        _incident(3, 'svc-b', SeverityLevel.MEDIUM, 'network', 20, 'Check upstream'),
+        _incident(4, 'svc-c', SeverityLevel.LOW, 'external', 5),
+    ]
+    return IncidentAnalysisResult(
+        analysis_start=START, analysis_end=END, incidents=incidents, total_incidents=len(incidents),
+    )
+
+
+def test_artifact_round_trip_and_latest_selection(tmp_path):
+    daily = run_artifact.build_run_artifact(
+        'daily', run_id='r1', period_start=START, period_end=END,
+        incident_analysis={'date': '2026-01-20', 'apps': {'svc-b', 'svc-a'}},
+    )
+    backfill = run_artifact.build_run_artifact('backfill', run_id='r2', peaks=[{'peak_id': 'PK-1'}])
+    daily_files = run_artifact.write_run_artifact(daily, tmp_path, fmt='json', timestamp='20260121_010000')
+    run_artifact.write_run_artifact(backfill, tmp_path, fmt='json', timestamp='20260121_020000')
+
+    loaded = run_artifact.load_run_artifact(daily_files['json'])
+    assert loaded == daily
+    assert loaded['schema_version'] == run_artifact.SCHEMA_VERSION
+    assert loaded['period']['start'] == START.isoformat()
+    assert loaded['incident_analysis']['apps'] == ['svc-a', 'svc-b']
+
+    assert run_artifact.load_latest_run_artifact(tmp_path)['run_id'] == 'r2'
+    # Nejnovějšímu chybí sekce → fallback na text, ne starší běh
+    assert run_artifact.load_latest_run_artifact(tmp_path, require=('incident_analysis',)) is None
+    assert run_artifact.load_latest_run_artifact(tmp_path, kind='daily', require=('incident_analysis',))['run_id'] == 'r1'
+    assert run_artifact.load_latest_run_artifact(tmp_path, kind='regular') is None
+
+
+def test_consumers_ignore_newer_regular_artifacts_and_regular_is_pruned(tmp_path):
+    section = {'header': {'period': 'p', 'generated': 'g', 'run_id': 'backfill-1'},
+               'executive_summary': 'Total problems: 1', 'problem_details': ['#1 problem']}
+    backfill = run_artifact.build_run_artifact(
+        'backfill', run_id='backfill-1', incident_analysis={'date': '2026-01-20'},
+        problem_report=section, peaks=[],
+    )
+    run_artifact.write_run_artifact(backfill, tmp_path, fmt='json', timestamp='20260121_010000')
+    for minute in range(4):
+        regular = run_artifact.build_run_artifact(
+            'regular', run_id=f'regular-{minute}', problem_report=dict(section, executive_summary='15min'),
+        )
+        run_artifact.write_run_artifact(
+            regular, tmp_path, fmt='json', timestamp=f'20260121_02{minute}000', keep=2,
+        )
+
+    assert [path.stem for path in run_artifact.find_run_artifacts(tmp_path, 'regular')] == [
+        'run_artifact_regular_20260121_023000', 'run_artifact_regular_20260121_022000',
+    ]
+    assert recent_incidents_publisher.load_artifact_report(reports_dir=tmp_path)['run_id'] == 'backfill-1'
+    assert recent_incidents_publisher.load_artifact_report(reports_dir=tmp_path)['incident_analysis']
+
+
+def test_only_newest_artifact_is_used_and_not_when_older_than_text_report(tmp_path):
+    complete = run_artifact.build_run_artifact('backfill', run_id='old', incident_analysis={'date': '2026-01-19'})
+    partial = run_artifact.build_run_artifact('backfill', run_id='new', peaks=[])
+    run_artifact.write_run_artifact(complete, tmp_path, fmt='json', timestamp='20260120_010000')
+    newest = run_artifact.write_run_artifact(partial, tmp_path, fmt='json', timestamp='20260121_010000')['json']
+
+    assert run_artifact.load_latest_run_artifact(tmp_path, 'backfill', require=('incident_analysis',)) is None
+
+    current = run_artifact.build_run_artifact('backfill', run_id='current', incident_analysis={'date': '2026-01-21'})
+    current_path = run_artifact.write_run_artifact(current, tmp_path, fmt='json', timestamp='20260122_010000')['json']
+    text_report = tmp_path / 'incident_analysis_daily_20260122_020000.txt'
+    text_report.write_text('report', encoding='utf-8')
+    os.utime(newest, (1_000, 1_000))
+    os.utime(current_path, (2_000, 2_000))
+    os.utime(text_report, (3_000, 3_000))
+
+    # Zápis artefaktu novějšího běhu selhal → text report je novější
+    load = lambda: run_artifact.load_latest_run_artifact(
+        tmp_path, 'backfill', require=('incident_analysis',), text_glob='incident_analysis_daily_*.txt',
+    )
+    assert load() is None
+    os.utime(current_path, (3_000, 3_000))
+    assert load()['run_id'] == 'current'
+
+
+def test_newer_schema_is_rejected_and_skipped(tmp_path):
+    future = run_artifact.build_run_artifact('backfill', peaks=[])
+    future['schema_version'] = run_artifact.SCHEMA_VERSION + 1
+    path = tmp_path / 'run_artifact_backfill_20260121_030000.json'
+    path.write_text(json.dumps(future), encoding='utf-8')
+
+    with pytest.raises(RunArtifactError):
+        run_artifact.load_run_artifact(path)
+    assert run_artifact.load_latest_run_artifact(tmp_path) is None
+
+
+def test_exporter_csv_from_artifact_keeps_all_operational_incidents(tmp_path):
+    result = _analysis_result()
+    formatter = IncidentReportFormatter()
+    text_path = tmp_path / 'incident_analysis_daily_20260120_20260121_000000.txt'
+    text_path.write_text(formatter.format_daily(result), encoding='utf-8')
+    artifact = run_artifact.build_run_artifact('daily', incident_analysis=formatter.daily_summary(result))
+    artifact_path = run_artifact.write_run_artifact(artifact, tmp_path, fmt='json')['json']
+
+    legacy = recent_incidents_exporter.parse_daily_report(str(text_path))
+    structured = recent_incidents_exporter.load_report_data(artifact_path)
+    for key in ('date', 'raw_incidents', 'operational_incidents', 'severity_breakdown'):
+        assert structured[key] == legacy[key]
+
+    legacy_csv = recent_incidents_exporter.export_recent_incidents_csv(str(text_path), tmp_path / 'legacy')
+    artifact_csv = recent_incidents_exporter.export_recent_incidents_csv(artifact_path, tmp_path / 'artifact')
+    with open(legacy_csv, encoding='utf-8') as legacy_file, open(artifact_csv, encoding='utf-8') as artifact_file:
+        legacy_rows = legacy_file.read().splitlines()
+        artifact_rows = artifact_file.read().splitlines()
+    # Regex parser zahodí první incident (blok slepený s '-----' oddělovačem);
+    # artefakt má všechny operational incidenty, ostatní řádky shodné
+    assert len(artifact_rows) == 1 + structured['operational_incidents']
+    assert artifact_rows[1].startswith('Critical,svc-a,database failure in svc-a,2,')
+    assert [artifact_rows[0]] + artifact_rows[2:] == legacy_rows
+
+
+def test_publishers_read_problem_report_section(tmp_path):
+    section = {
+        'header': {'period': '2026-01-20 00:00 - 2026-01-21 00:00', 'generated': '2026-01-21 01:00:00', 'run_id': 'r1'},
+        'executive_summary': 'Total problems: 2',
+        'problem_details': [f"{'─' * 50}\n#{index} problem" for index in range(1, 31)],
+    }
+    artifact = run_artifact.build_run_artifact('backfill', run_id='r1', problem_report=section)
+    artifact_path = run_artifact.write_run_artifact(artifact, tmp_path, fmt='json')['json']
+
+    loaded = recent_incidents_publisher.load_artifact_report(artifact_path)
+    data = recent_incidents_publisher.report_data_from_artifact(loaded)
+    assert data['header'] == ('2026-01-20 00:00 - 2026-01-21 00:00', '2026-01-21 01:00:00', 'r1')
+    assert data['has_summary'] and data['has_details']
+    assert data['problem_details'].count('#') == 20
+    assert '<h3>Problem Details (Top 20)</h3>' in recent_incidents_publisher.convert_to_html(data)
+
+    summary, details = backfill_report_publisher.artifact_report_sections(loaded)
+    assert summary == 'Total problems: 2'
+    assert details.count('#') == 15 and details.endswith('#15 problem')
@@ -0,0 +1,157 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+pytest.importorskip('psycopg2')
+
+from scripts.core import run_data_maintenance
+
+
+class PartitionCursor:
+    def __init__(self, partitions, partition_rows):
+        self.partitions = partitions
+        self.partition_rows = partition_rows
+        self.statements = []
+        self.rowcount = 0
+        self._result = None
+
+    def execute(self, statement, params=None):
+        text = statement if isinstance(statement, str) else repr(statement)
+        normalized = ' '.join(text.split())
+        self.statements.append((normalized, params))
+        self._result = None
+        self.rowcount = 0
+        if 'FROM pg_inherits' in normalized:
+            self._result = [
+                (parent, child) for parent, child in self.partitions if parent in params[0]
+            ]
+        elif normalized.startswith('Composed') and 'SELECT COUNT(*)' in normalized:
+            child = next(name for name in self.partition_rows if f"'{name}'" in normalized)
+            self._result = [(self.partition_rows[child],)]
+        elif normalized.startswith('DELETE FROM'):
+            self.rowcount = 1
+
+    def fetchall(self):
+        return self._result
+
+    def fetchone(self):
+        return self._result[0]
+
+
+def test_retention_drops_only_partitions_entirely_before_cutoff():
+    cursor = PartitionCursor(
+        partitions=[
+            ('error_kind_counts', 'error_kind_counts_p202603'),
+            ('error_kind_counts', 'error_kind_counts_p202604'),
+            ('error_kind_counts', 'error_kind_counts_p202605'),
+            ('error_kind_counts', 'error_kind_counts_default'),
+            ('namespace_error_counts', 'namespace_error_counts_p202603'),
+        ],
+        partition_rows={
+            'error_kind_counts_p202603': 40,
+            'error_kind_counts_p202604': 25,
+            'namespace_error_counts_p202603': 96,
+        },
+    )
+    cutoff_at = datetime(2026, 5, 1, tzinfo=timezone.utc)
+
+    deleted = run_data_maintenance._delete_expired_rows(cursor, cutoff_at)
+
+    statements = [statement for statement, _ in cursor.statements]
+    detached = [s for s in statements if 'DETACH PARTITION' in s]
+    dropped = [s for s in statements if 'DROP TABLE' in s]
+    assert len(detached) == len(dropped) == 3
+    assert not any('p202605' in s or '_default' in s for s in detached + dropped)
+    assert deleted['dropped_partitions'] == 3
+    # partition rows + row-level DELETE for the boundary month/default partition
+    assert deleted['deleted_fact_rows'] == 40 + 25 + 1
+    assert deleted['deleted_namespace_rows'] == 96 + 1
+    first_row_delete = next(
+        i for i, s in enumerate(statements) if s.startswith('DELETE FROM ailog_peak.error_kind_counts')
+    )
+    assert max(statements.index(s) for s in dropped) < first_row_delete
+
+
+def test_partition_horizon_covers_current_and_future_months():
+    class Cursor:
+        def execute(self, statement, params=None):
+            self.params = params
+
+        def fetchone(self):
+            return (6,)
+
+    cursor = Cursor()
+    created = run_data_maintenance._ensure_partitions(
+        cursor, datetime(2026, 11, 20, 23, 30, tzinfo=timezone.utc)
+    )
+
+    assert created == 6
+    assert [value.isoformat() for value in cursor.params] == ['2026-11-01', '2027-03-01']
+
+
+class RollupDayCursor:
+    def __init__(self, marks, days, mismatches=None):
+        self.marks = marks
+        self.days = days
+        self.mismatches = mismatches or {}
+        self.statements = []
+        self._result = None
+
+    def execute(self, statement, params=None):
+        normalized = ' '.join(statement.split())
+        self.statements.append((normalized, params))
+        if 'FROM ailog_peak.rollup_watermarks' in normalized:
+            self._result = list(self.marks.items())
+        elif 'FROM ailog_peak.authoritative_run_windows' in normalized:
+            self._result = [(day,) for day in self.days]
+        elif 'FROM staged_error_kind_rollups' in normalized:
+            self._result = list(self.mismatches.get('error_kind', {}).items())
+        elif 'FROM staged_namespace_rollups' in normalized:
+            self._result = list(self.mismatches.get('namespace', {}).items())
+
+    def fetchall(self):
+        return self._result
+
+
+def test_pending_rollup_days_split_new_days_from_late_replays():
+    cursor = RollupDayCursor(
+        marks={
+            'daily_error_kind_rollups': date(2026, 2, 2),
+            'daily_namespace_rollups': date(2026, 2, 1),
+        },
+        days=[date(2026, 1, 16), date(2026, 2, 1), date(2026, 2, 2)],
+    )
+
+    high_water_mark = run_data_maintenance._load_high_water_mark(cursor)
+    new_days, late_days = run_data_maintenance._pending_rollup_days(
+        cursor, datetime(2026, 2, 3, tzinfo=timezone.utc), high_water_mark
+    )
+
+    assert high_water_mark == date(2026, 2, 1)
+    assert new_days == [date(2026, 2, 1), date(2026, 2, 2)]
+    assert late_days == [date(2026, 1, 16)]
+
+    cursor.marks.pop('daily_namespace_rollups')
+    assert run_data_maintenance._load_high_water_mark(cursor) is None
+
+
+def test_rollup_reconciliation_reports_each_failing_day():
+    cursor = RollupDayCursor(
+        marks={},
+        days=[],
+        mismatches={
+            'error_kind': {date(2026, 2, 2): 3},
+            'namespace': {date(2026, 2, 1): 1, date(2026, 2, 2): 1},
+        },
+    )
+
+    with pytest.raises(RuntimeError) as excinfo:
+        run_data_maintenance._assert_rollup_reconciliation(cursor)
+
+    message = str(excinfo.value)
+    assert 'for 2 day(s)' in message
+    assert '2026-02-01 (error_kind_mismatches=0, namespace_mismatches=1)' in message
+    assert message.index('2026-02-01') < message.index('2026-02-02 (error_kind_mismatches=3')
+
+    cursor.mismatches = {}
+    run_data_maintenance._assert_rollup_reconciliation(cursor)
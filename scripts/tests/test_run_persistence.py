@@ -10,6 +10,7 @@ from scripts.core.run_persistence import (
     build_error_kind_rows,
     build_namespace_rows,
     persist_analysis_run,
+    persist_phase_metrics,
     validate_reconciliation,
 )
 from scripts.pipeline.incident import Incident
@@ -75,6 +76,27 @@ def _fact(window_start, fingerprint, application, count):
     }
 
 
+def _incident(fingerprint):
+    return SimpleNamespace(
+        fingerprint=fingerprint,
+        stats=SimpleNamespace(baseline_rate=0),
+        flags=SimpleNamespace(
+            is_new=True,
+            is_spike=False,
+            is_burst=False,
+            is_cross_namespace=False,
+            is_regression=False,
+            is_cascade=False,
+        ),
+        error_type='RuntimeError',
+        normalized_message='failure',
+        score=10,
+        severity=SimpleNamespace(value='info'),
+        versions=[],
+        evidence=[],
+    )
+
+
 def test_fact_builders_keep_identity_dense_zeros_and_exact_totals():
     window_start = datetime(2026, 7, 31, 8, 0, tzinfo=timezone.utc)
     window_end = datetime(2026, 7, 31, 8, 30, tzinfo=timezone.utc)
@@ -103,24 +125,7 @@ def test_fact_builders_keep_identity_dense_zeros_and_exact_totals():
 def test_bulk_failure_rolls_back_data_and_marks_run_failed():
     window_start = datetime(2026, 7, 31, 8, 0, tzinfo=timezone.utc)
     window_end = datetime(2026, 7, 31, 8, 15, tzinfo=timezone.utc)
-    incident = SimpleNamespace(
-        fingerprint='fp-a',
-        stats=SimpleNamespace(baseline_rate=0),
-        flags=SimpleNamespace(
-            is_new=True,
-            is_spike=False,
-            is_burst=False,
-            is_cross_namespace=False,
-            is_regression=False,
-            is_cascade=False,
-        ),
-        error_type='RuntimeError',
-        normalized_message='failure',
-        score=10,
-        severity=SimpleNamespace(value='info'),
-        versions=[],
-        evidence=[],
-    )
+    incident = _incident('fp-a')
     collection = SimpleNamespace(
         run_id='run-failure',
         pipeline_version='test',
@@ -206,4 +211,115 @@ def test_detection_rows_keep_threshold_snapshot_and_flags():
     assert rows[0][4] == 'spike_p93_cap'
     assert rows[0][5] == 'namespace_p93_cap_v2'
     assert rows[0][8] == '00000000-0000-0000-0000-000000000001'
-    assert json.loads(rows[0][9])['is_spike'] is True
\ No newline at end of file
+    assert json.loads(rows[0][9])['is_spike'] is True
+
+def test_complete_run_refreshes_authoritative_windows_in_same_transaction():
+    window_start = datetime(2026, 7, 31, 8, 0, tzinfo=timezone.utc)
+    window_end = datetime(2026, 7, 31, 8, 15, tzinfo=timezone.utc)
+    collection = SimpleNamespace(
+        run_id='run-authority',
+        pipeline_version='test',
+        input_records=3,
+        error_kind_facts=[_fact(window_start, 'fp-a', 'app-a', 3)],
+        incidents=[_incident('fp-a')],
+    )
+    inserted = {}
+    commits_at = []
+
+    class RecordingCursor(FakeCursor):
+        def execute(self, statement, params=None):
+            normalized = ' '.join(statement.split())
+            self.statements.append((normalized, params))
+            self._result = None
+            self._rows = []
+            if 'FROM ailog_peak.error_kind_counts WHERE run_id' in normalized:
+                rows = inserted['error_kind_counts']
+                self._result = (len(rows), sum(row[8] for row in rows))
+            elif 'FROM ailog_peak.namespace_error_counts WHERE run_id' in normalized:
+                rows = inserted['namespace_error_counts']
+                self._result = (len(rows), sum(row[3] for row in rows))
+            elif 'FROM ailog_peak.peak_investigation WHERE run_id' in normalized:
+                self._result = (len(inserted.get('peak_investigation', [])),)
+            elif 'FROM ailog_peak.detection_events WHERE run_id' in normalized:
+                self._result = (len(inserted.get('detection_events', [])),)
+            elif normalized.startswith('SELECT DISTINCT fact_row.window_start'):
+                self._rows = [(window_start,)]
+            self.rowcount = 1
+
+        def fetchall(self):
+            return self._rows
+
+    connection = FakeConnection()
+    connection.cursor_instance = RecordingCursor()
+    original_commit = connection.commit
+
+    def commit():
+        commits_at.append(len(connection.cursor_instance.statements))
+        original_commit()
+
+    connection.commit = commit
+
+    def record_rows(cursor, statement, rows, page_size):
+        table = statement.split('INSERT INTO ailog_peak.')[1].split()[0]
+        inserted[table] = list(rows)
+
+    result = persist_analysis_run(
+        connection_factory=lambda: connection,
+        collection=collection,
+        run_type='regular',
+        window_start=window_start,
+        window_end=window_end,
+        monitored_namespaces=['ns-a'],
+        expected_count=3,
+        fetched_count=3,
+        source_index='logs-*',
+        execute_values_fn=record_rows,
+    )
+
+    statements = [statement for statement, _ in connection.cursor_instance.statements]
+    complete_at = next(i for i, s in enumerate(statements) if "SET status = 'complete'" in s)
+    lock_at = next(i for i, s in enumerate(statements) if 'pg_advisory_xact_lock' in s)
+    delete_at = next(
+        i for i, s in enumerate(statements)
+        if s.startswith('DELETE FROM ailog_peak.authoritative_run_windows')
+    )
+    insert_at = next(
+        i for i, s in enumerate(statements)
+        if s.startswith('INSERT INTO ailog_peak.authoritative_run_windows')
+    )
+
+    assert complete_at < lock_at < delete_at < insert_at
+    assert commits_at[-1] == len(statements)
+    assert connection.cursor_instance.statements[delete_at][1] == ([window_start],)
+    assert 'superseded_by_run_id IS NULL' in statements[insert_at]
+    assert result['authoritative_windows'] == 1
+
+
+def test_phase_metrics_upsert_one_row_per_phase():
+    connection = FakeConnection()
+    captured = {}
+
+    def record_rows(cursor, statement, rows, page_size):
+        captured['statement'] = ' '.join(statement.split())
+        captured['rows'] = list(rows)
+
+    written = persist_phase_metrics(
+        lambda: connection,
+        'run-spans',
+        [
+            {'phase': 'fetch', 'seq': 1, 'wall_ms': 12.5, 'rss_start_mb': 100.0,
+             'rss_delta_mb': 4.0, 'records': 30, 'fingerprints': 3},
+            {'phase': 'phase_b', 'seq': 2, 'wall_ms': 1.0, 'rss_start_mb': 104.0,
+             'rss_delta_mb': 0.0, 'records': None, 'fingerprints': 3},
+        ],
+        execute_values_fn=record_rows,
+    )
+
+    assert written == 2
+    assert captured['statement'].startswith('INSERT INTO ailog_peak.run_phase_metrics')
+    assert 'ON CONFLICT (run_id, phase) DO UPDATE' in captured['statement']
+    assert [row[:3] for row in captured['rows']] == [
+        ('run-spans', 'fetch', 1),
+        ('run-spans', 'phase_b', 2),
+    ]
+    assert connection.commits == 1 and connection.closed
@@ -0,0 +1,74 @@
+import time
+
+from scripts.core.run_profiler import alloc_checkpoint, profile_run
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+
+def test_profile_run_is_noop_without_env(tmp_path, monkeypatch):
+    monkeypatch.delenv('PROFILE_RUN', raising=False)
+
+    with profile_run('regular_phase', output_dir=str(tmp_path)) as mode:
+        _busy(0.01)
+
+    assert mode is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cpu_profile_writes_collapsed_stacks_and_report(tmp_path, monkeypatch):
+    monkeypatch.setenv('PROFILE_RUN', 'cpu')
+    monkeypatch.setenv('PROFILE_INTERVAL_MS', '1')
+
+    with profile_run('regular_phase', output_dir=str(tmp_path)) as mode:
+        _busy(0.2)
+
+    assert mode == 'cpu'
+    collapsed = next(tmp_path.glob('regular_phase-*.cpu.collapsed')).read_text().splitlines()
+    assert collapsed
+    stack, count = collapsed[0].rsplit(' ', 1)
+    assert int(count) > 0
+    assert any('_busy (test_run_profiler.py:' in line for line in collapsed)
+    assert 'run-profiler' not in '\n'.join(collapsed)
+    assert 'self%' in next(tmp_path.glob('regular_phase-*.cpu.txt')).read_text()
+
+
+def test_alloc_profile_reports_top_allocation_sites(tmp_path, monkeypatch):
+    monkeypatch.setenv('PROFILE_RUN', 'alloc')
+    retained = []
+
+    with profile_run('backfill', output_dir=str(tmp_path)) as mode:
+        retained.append([str(i) * 10 for i in range(20000)])
+
+    assert mode == 'alloc'
+    report = next(tmp_path.glob('backfill-*.alloc.txt')).read_text()
+    assert 'traced peak' in report
+    assert 'test_run_profiler.py' in report.splitlines()[3]
+    collapsed = next(tmp_path.glob('backfill-*.alloc.collapsed')).read_text()
+    assert 'test_run_profiler.py:' in collapsed
+
+
+def _transient_phase():
+    return [str(i) * 10 for i in range(50000)]
+
+
+def test_alloc_profile_keeps_snapshot_from_highest_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setenv('PROFILE_RUN', 'alloc')
+
+    with profile_run('regular_phase', output_dir=str(tmp_path)):
+        alloc_checkpoint('startup')
+        aggregated = _transient_phase()
+        alloc_checkpoint('fetch')
+        del aggregated  # na konci běhu už nic z fáze nežije
+
+    report = next(tmp_path.glob('regular_phase-*.alloc.txt')).read_text().splitlines()
+    assert report[0].startswith("Live allocations at 'fetch' (highest of 3 checkpoint(s))")
+    # top alokace = přechodná data fáze, ne to, co přežilo do konce
+    assert report[3].endswith(f"test_run_profiler.py:{_transient_phase.__code__.co_firstlineno + 1}")
+    # mimo profile_run je checkpoint no-op
+    alloc_checkpoint('outside')
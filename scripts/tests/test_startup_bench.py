@@ -0,0 +1,75 @@
+import importlib
+import os
+import sys
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from scripts.bench import startup_bench
+from scripts.bench.mock_es import MockElasticsearch
+
+SCRIPTS = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if SCRIPTS not in sys.path:
+    sys.path.insert(0, SCRIPTS)
+
+import regular_phase as rp  # noqa: E402
+from pipeline.spans import PhaseSpans  # noqa: E402
+
+fetch_module = importlib.import_module('core.fetch_unlimited')
+
+
+def test_parse_importtime_skips_header_and_keeps_nesting():
+    rows = startup_bench.parse_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   json.decoder\n"
+        "import time:       300 |        420 | json\n"
+        "unrelated warning line\n"
+    )
+
+    assert rows == [
+        {'module': 'json.decoder', 'depth': 1, 'self_us': 120, 'cumulative_us': 120},
+        {'module': 'json', 'depth': 0, 'self_us': 300, 'cumulative_us': 420},
+    ]
+
+
+def test_regular_phase_import_defers_heavy_modules():
+    report = startup_bench.measure_startup('regular_phase', repeats=1, top=5)
+
+    assert report['import_ms'] > 0
+    assert len(report['top_modules']) == 5
+    assert report['deferred_loaded'] == []
+
+    # Baseline: 3× pomalejší import a jiný nejdražší modul
+    first = report['top_modules'][0]['module']
+    before = dict(
+        report,
+        import_ms=report['import_ms'] * 3,
+        top_modules=[{'module': 'legacy_heavy'}] + report['top_modules'][1:],
+    )
+    comparison = startup_bench.compare_reports(before, report)
+    assert comparison['import_ms']['speedup'] == 3.0
+    assert comparison['dropped_from_top'] == ['legacy_heavy']
+    assert comparison['new_in_top'] == [first]
+
+
+def test_empty_window_exits_on_es_count_before_registry_and_pipeline():
+    docs = [{
+        '@timestamp': '2020-01-01T00:00:00Z',
+        'message': 'outside of any current window',
+        'kubernetes': {'namespace': 'ns-a'},
+    }]
+    spans = PhaseSpans()
+    with MockElasticsearch(docs) as mock_es, \
+            patch.object(fetch_module, 'BASE_URL', mock_es.base_url), \
+            patch.object(fetch_module, 'ES_PASSWORD', 'bench'), \
+            patch.object(fetch_module, '_load_monitored_namespaces', return_value=['ns-a']), \
+            patch.object(rp, '_load_monitored_namespaces', return_value=['ns-a']), \
+            patch.object(rp, 'init_registry', side_effect=AssertionError('registry must not load')), \
+            patch.object(rp, 'fetch_unlimited', side_effect=AssertionError('fetch must not run')):
+        result = rp._run_regular_phase(15, True, None, spans)
+
+    assert result['status'] == 'no_data'
+    assert result['run_id'].startswith('regular-')
+    assert mock_es.search_requests == 0
+    assert [metric['phase'] for metric in spans.as_dicts()] == ['es_count']
+    assert spans.as_dicts()[0]['records'] == 0
+    assert datetime.fromisoformat(result['window_end']) <= datetime.now(timezone.utc)
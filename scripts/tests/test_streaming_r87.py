@@ -20,6 +20,7 @@ Testy (dle zadání uživatele r87):
     8. SQLite cleanup      - osiřelé spill soubory po tvrdém ukončení se uklidí
 """
 
+import json
 import os
 import sys
 import random
@@ -291,6 +292,28 @@ def test_page_size_invariance():
     print("✅ 2. Page-size invariance: page 1/100/1000/5000/all → identické výsledky")
 
 
+def test_streaming_records_phase_spans_on_collection():
+    from spans import PhaseSpans
+
+    errors = make_errors(n_fingerprints=10, seed=5)
+    agg = StreamingAggregator()
+    agg.ingest_page(errors)
+    agg.finalize()
+    spans = PhaseSpans()
+    with spans.span('fetch') as span:
+        span.counters['records'] = len(errors)
+    col = _new_pipeline(build_trace_patterns=True).run_streaming(agg, run_id="spans", spans=spans)
+    agg.close()
+
+    phases = [metric['phase'] for metric in col.phase_metrics]
+    assert phases == ['phase_b', 'phase_c', 'phase_d', 'phase_e', 'build_incidents', 'trace_patterns']
+    assert [metric['phase'] for metric in spans.as_dicts()] == ['fetch'] + phases
+    assert [metric['seq'] for metric in spans.as_dicts()] == list(range(1, len(phases) + 2))
+    assert all(metric['wall_ms'] >= 0 for metric in col.phase_metrics)
+    assert col.phase_metrics[0]['records'] == len(errors)
+    assert col.to_dict()['phase_metrics'] == col.phase_metrics
+
+
 # ============================================================================ 3
 def test_stress_bounded_memory():
     import resource
@@ -400,7 +423,7 @@ def test_fetch_page_consumer_without_materialization():
             return self._payload
 
     class FakeSession:
-        close_count = 0
+        delete_count = 0
 
         def __init__(self):
             self.search_calls = 0
@@ -424,13 +447,11 @@ def test_fetch_page_consumer_without_materialization():
             return FakeResponse({'hits': {'total': {'value': 3}, 'hits': hits}})
 
         def delete(self, *_args, **_kwargs):
+            type(self).delete_count += 1
             return FakeResponse({})
 
-        def close(self):
-            type(self).close_count += 1
-
     pages = []
-    with patch.object(fetch_module.requests, 'Session', FakeSession):
+    with patch.object(fetch_module, '_es_session', FakeSession):
         result = fetch_module.fetch_unlimited(
             '2026-01-20T08:00:00Z',
             '2026-01-20T08:15:00Z',
@@ -448,7 +469,7 @@ def test_fetch_page_consumer_without_materialization():
         raise RuntimeError('consumer failed')
 
     try:
-        with patch.object(fetch_module.requests, 'Session', FakeSession):
+        with patch.object(fetch_module, '_es_session', FakeSession):
             fetch_module.fetch_unlimited(
                 '2026-01-20T08:00:00Z',
                 '2026-01-20T08:15:00Z',
@@ -461,8 +482,9 @@ def test_fetch_page_consumer_without_materialization():
     else:
         raise AssertionError('Consumer failure must propagate')
 
-    assert FakeSession.close_count == 2
-    print("✅ 6. Fetch consumer: stránky bez materializace, failure zavře session")
+    assert FakeSession.delete_count == 2
+    assert fetch_module._SHARED_PIT['id'] is None
+    print("✅ 6. Fetch consumer: stránky bez materializace, failure zavře PIT")
 
 
 def test_fetch_contract_preserves_metadata_and_scope():
@@ -536,7 +558,6 @@ def test_fetch_requires_pit():
             return {}
 
     class FakeSession:
-        close_count = 0
         search_count = 0
 
         def __init__(self):
@@ -549,10 +570,7 @@ def test_fetch_requires_pit():
                 type(self).search_count += 1
             return FakeResponse()
 
-        def close(self):
-            type(self).close_count += 1
-
-    with patch.object(fetch_module.requests, 'Session', FakeSession):
+    with patch.object(fetch_module, '_es_session', FakeSession):
         result = fetch_module.fetch_unlimited(
             '2026-07-31T08:00:00Z',
             '2026-07-31T08:15:00Z',
@@ -561,12 +579,99 @@ def test_fetch_requires_pit():
 
     assert result is None
     assert FakeSession.search_count == 0
-    assert FakeSession.close_count == 1
+    assert fetch_module._SHARED_PIT['id'] is None
     assert fetch_module.LAST_FETCH_STATS['failed']
     assert not fetch_module.LAST_FETCH_STATS['complete']
     print("✅ 6d. Fetch contract: PIT failure ukončí nekompletní run")
 
 
+def test_namespace_bucket_prepass_pages_composite_and_flags_peaks():
+    from phase_c_detect import evaluate_namespace_peaks
+
+    bucket_0800 = int(datetime(2026, 7, 31, 8, 0, tzinfo=timezone.utc).timestamp() * 1000)
+    bucket_0815 = bucket_0800 + 15 * 60 * 1000
+    pages = [
+        {
+            'hits': {'total': {'value': 9}, 'hits': []},
+            'aggregations': {'namespace_buckets': {
+                'after_key': {'namespace': 'ns-alpha', 'bucket': bucket_0815},
+                'buckets': [
+                    {'key': {'namespace': 'ns-alpha', 'bucket': bucket_0800}, 'doc_count': 2},
+                    {'key': {'namespace': 'ns-alpha', 'bucket': bucket_0815}, 'doc_count': 4},
+                ],
+            }},
+        },
+        {
+            'hits': {'total': {'value': 9}, 'hits': []},
+            'aggregations': {'namespace_buckets': {
+                'after_key': {'namespace': 'ns-beta', 'bucket': bucket_0800},
+                'buckets': [
+                    {'key': {'namespace': 'ns-beta', 'bucket': bucket_0800}, 'doc_count': 3},
+                ],
+            }},
+        },
+        {
+            'hits': {'total': {'value': 9}, 'hits': []},
+            'aggregations': {'namespace_buckets': {'buckets': []}},
+        },
+    ]
+
+    class FakeResponse:
+        status_code = 200
+
+        def __init__(self, payload):
+            self._payload = payload
+
+        def json(self):
+            return self._payload
+
+    class FakeSession:
+        queries = []
+
+        def __init__(self):
+            self.auth = None
+            self.verify = True
+            self.trust_env = False
+
+        def post(self, url, data=None, headers=None, **_kwargs):
+            assert headers['Content-Type'] == 'application/json'
+            type(self).queries.append(json.loads(data))
+            return FakeResponse(pages[len(type(self).queries) - 1])
+
+        def close(self):
+            pass
+
+    with patch.object(fetch_module, '_es_session', FakeSession), \
+            patch.object(fetch_module, 'ES_PASSWORD', 'secret'), \
+            patch.dict(os.environ, {'MONITORED_NAMESPACES': 'ns-alpha,ns-beta'}):
+        prepass = fetch_module.fetch_namespace_bucket_totals(
+            '2026-07-31T08:00:00Z', '2026-07-31T08:30:00Z'
+        )
+
+    first_query = FakeSession.queries[0]
+    assert first_query['size'] == 0
+    assert 'sort' not in first_query and '_source' not in first_query
+    assert first_query['query'] == fetch_module._build_error_query(
+        '2026-07-31T08:00:00Z', '2026-07-31T08:30:00Z', 0, ['ns-alpha', 'ns-beta']
+    )['query']
+    assert 'after' not in first_query['aggs']['namespace_buckets']['composite']
+    assert FakeSession.queries[1]['aggs']['namespace_buckets']['composite']['after'] == {
+        'namespace': 'ns-alpha', 'bucket': bucket_0815,
+    }
+    assert prepass['requests'] == 3
+    assert prepass['total'] == prepass['hits_total'] == 9
+    window_0815 = datetime(2026, 7, 31, 8, 15, tzinfo=timezone.utc)
+    assert prepass['totals']['ns-alpha'][window_0815] == 4
+
+    peaks = evaluate_namespace_peaks(FakePeakDetector(threshold=3.0), prepass['totals'])
+    assert sorted((namespace, bucket, total) for namespace, bucket, total, _ in peaks) == [
+        ('ns-alpha', window_0815, 4),
+        ('ns-beta', window_0815 - timedelta(minutes=15), 3),
+    ]
+    assert evaluate_namespace_peaks(None, prepass['totals']) == []
+    print("✅ 6e. Aggregation pre-pass: composite stránkování, součty a peak okna")
+
+
 def test_fetch_memory_guard_uses_absolute_ceiling():
     reason = fetch_module._should_stop_fetch(
         record_count=100,
@@ -654,6 +759,7 @@ def main():
         test_fetch_memory_guard_uses_absolute_ceiling,
         test_fetch_contract_preserves_metadata_and_scope,
         test_fetch_requires_pit,
+        test_namespace_bucket_prepass_pages_composite_and_flags_peaks,
         test_sqlite_trace_event_limit,
         test_stale_sqlite_cleanup,
         test_stress_bounded_memory,
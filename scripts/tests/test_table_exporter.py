@@ -0,0 +1,215 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from scripts.exports import table_exporter
+from scripts.exports.table_exporter import TableExporter, ProblemEntry, PeakEntry
+
+
+class _Registry:
+    def __init__(self, problems, peaks):
+        self.problems = {problem.problem_key: problem for problem in problems}
+        self.peaks = {peak.problem_key: peak for peak in peaks}
+
+
+def _problem(key, flow, namespaces, apps, occurrences, last_seen):
+    return ProblemEntry(
+        id=f'KP-{abs(hash(key)) % 1000000:06d}',
+        problem_key=key,
+        category='business',
+        flow=flow,
+        error_class='validation_error',
+        first_seen=datetime(2026, 7, 1, 8, 0),
+        last_seen=last_seen,
+        occurrences=occurrences,
+        affected_namespaces=set(namespaces),
+        affected_apps=set(apps),
+        sample_messages=[f'{key} failed'],
+    )
+
+
+def _peak(key, namespaces, apps, contributing=None):
+    return PeakEntry(
+        id=f'PK-{abs(hash(key)) % 1000000:06d}',
+        problem_key=key,
+        peak_type='SPIKE',
+        first_seen=datetime(2026, 7, 30, 8, 0),
+        last_seen=datetime(2026, 7, 31, 8, 0),
+        occurrences=2,
+        raw_error_count=40,
+        affected_namespaces=set(namespaces),
+        affected_apps=set(apps),
+        contributing_problems=dict(contributing or {}),
+    )
+
+
+def _registry():
+    seen = datetime(2026, 7, 31, 8, 0)
+    problems = [
+        _problem('BUSINESS:billing:a', 'billing', ['ns-a'], ['bl-billing-v1'], 10, seen),
+        _problem('BUSINESS:billing:b', 'billing', ['ns-a', 'ns-b'], ['bl-billing-v1'], 10, seen),
+        _problem('BUSINESS:billing:c', 'billing', ['ns-a', 'ns-b'], ['bl-billing-v1'], 10, seen),
+        _problem('BUSINESS:billing:d', 'billing', ['ns-c'], ['bl-other-v1'], 99, seen),
+        _problem('BUSINESS:codelist:e', 'codelist', ['ns-a', 'ns-b'], ['bl-codelist-v1'], 5, seen),
+    ]
+    peaks = [
+        _peak('PEAK:business:billing:spike', ['ns-a', 'ns-b'], ['bl-billing-v1'],
+              {'BUSINESS:billing:b': 30, 'BUSINESS:billing:a': 10, 'missing': 50}),
+        _peak('PEAK:business:codelist:spike', [], ['bl-codelist-v1']),
+        _peak('PEAK:business:payments:burst', ['ns-z'], ['bl-payments-v1']),
+    ]
+    return _Registry(problems, peaks)
+
+
+def _scan_related_problem(registry, peak, flow):
+    candidates = [
+        problem for problem in registry.problems.values()
+        if (not flow or problem.flow == flow)
+        and (not peak.affected_namespaces
+             or set(peak.affected_namespaces) & set(problem.affected_namespaces))
+    ]
+    if not candidates:
+        return None
+    candidates.sort(
+        key=lambda p: (
+            len(set(peak.affected_namespaces) & set(p.affected_namespaces)),
+            len(set(peak.affected_apps) & set(p.affected_apps)),
+            p.occurrences,
+            p.last_seen or datetime.min,
+        ),
+        reverse=True,
+    )
+    return candidates[0]
+
+
+def test_indexed_related_problem_matches_full_registry_scan():
+    registry = _registry()
+    exporter = TableExporter(registry)
+
+    for peak in registry.peaks.values():
+        for flow in ('', 'billing', 'codelist', 'payments'):
+            assert exporter._find_related_problem_for_peak(peak, flow) is (
+                _scan_related_problem(registry, peak, flow)
+            )
+
+    # Tie on overlap/apps/occurrences resolves to the first problem in registry order.
+    billing_peak = registry.peaks['PEAK:business:billing:spike']
+    related = exporter._find_related_problem_for_peak(billing_peak, 'billing')
+    assert related.problem_key == 'BUSINESS:billing:b'
+
+
+def test_contributing_problems_are_ranked_once_per_peak():
+    registry = _registry()
+    exporter = TableExporter(registry)
+    exporter._problem_index = exporter._build_problem_index()
+    peak = registry.peaks['PEAK:business:billing:spike']
+
+    top = exporter._resolve_contributing_problems(peak, limit=3)
+    assert [(p.problem_key, count) for p, count in top] == [
+        ('BUSINESS:billing:b', 30),
+        ('BUSINESS:billing:a', 10),
+    ]
+    registry.problems.pop('BUSINESS:billing:b')
+    assert exporter._resolve_contributing_problems(peak, limit=1) == top[:1]
+
+
+def test_latest_export_computes_rows_once_for_all_formats(tmp_path, monkeypatch):
+    exporter = TableExporter(_registry())
+    calls = {'errors': 0, 'peaks': 0, 'index': 0}
+    get_errors_rows = exporter.get_errors_rows
+    get_peaks_rows = exporter.get_peaks_rows
+    build_index = exporter._build_problem_index
+
+    def count(name, func):
+        def wrapper():
+            calls[name] += 1
+            return func()
+        return wrapper
+
+    monkeypatch.setattr(exporter, 'get_errors_rows', count('errors', get_errors_rows))
+    monkeypatch.setattr(exporter, 'get_peaks_rows', count('peaks', get_peaks_rows))
+    monkeypatch.setattr(exporter, '_build_problem_index', count('index', build_index))
+
+    files = exporter.export_latest(str(tmp_path))
+    exporter.export_daily(str(tmp_path))
+
+    assert len(files) == 6
+    assert calls == {'errors': 1, 'peaks': 1, 'index': 1}
+    assert table_exporter.Path(files['peaks_csv']).read_text(encoding='utf-8').count('PK-') == 3
+
+
+def test_unchanged_artifacts_are_not_rewritten(tmp_path):
+    registry = _registry()
+    first = TableExporter(registry)
+    files = first.export_latest(str(tmp_path))
+    assert len(first.export_stats['written']) == 6
+    mtimes = {key: os.stat(path).st_mtime_ns for key, path in files.items()}
+
+    second = TableExporter(registry)
+    second.generated_at = first.generated_at + timedelta(minutes=15)
+    assert second.export_latest(str(tmp_path)) == files
+    assert second.export_stats['written'] == []
+    assert {key: os.stat(path).st_mtime_ns for key, path in files.items()} == mtimes
+
+    registry.problems['BUSINESS:billing:a'].occurrences = 11
+    third = TableExporter(registry)
+    third.export_latest(str(tmp_path))
+    assert sorted(os.path.basename(p) for p in third.export_stats['written']) == [
+        'errors_table.csv', 'errors_table.json', 'errors_table.md',
+    ]
+
+
+def test_skipped_artifacts_keep_on_disk_size_in_manifest(tmp_path):
+    registry = _registry()
+    first = TableExporter(registry)
+    first.generated_at = first.generated_at.replace(microsecond=123456)
+    files = first.export_latest(str(tmp_path))
+
+    # isoformat bez mikrosekund → jiná délka řádku generated_at, stejný digest
+    for minutes in (15, 30):
+        later = TableExporter(registry)
+        later.generated_at = first.generated_at.replace(microsecond=0) + timedelta(minutes=minutes)
+        later.export_latest(str(tmp_path))
+        assert later.export_stats['written'] == []
+
+    manifest = json.loads((tmp_path / 'latest' / TableExporter.MANIFEST_NAME).read_text(encoding='utf-8'))
+    for path in files.values():
+        assert manifest[os.path.basename(path)]['size'] == os.path.getsize(path)
+
+
+def test_concurrent_exporters_keep_each_others_manifest_entries(tmp_path):
+    regular, backfill = TableExporter(_registry()), TableExporter(_registry())
+
+    def slow_render():
+        time.sleep(0.2)
+        return 'regular'
+
+    worker = threading.Thread(
+        target=regular._export_artifacts,
+        args=({'regular': (tmp_path / 'regular.md', slow_render)},),
+    )
+    worker.start()
+    time.sleep(0.05)
+    backfill._export_artifacts({'backfill': (tmp_path / 'backfill.md', lambda: 'backfill')})
+    worker.join()
+
+    manifest = json.loads((tmp_path / TableExporter.MANIFEST_NAME).read_text(encoding='utf-8'))
+    assert set(manifest) == {'regular.md', 'backfill.md'}
+
+
+def test_single_pass_export_covers_all_modes(tmp_path):
+    exporter = TableExporter(_registry())
+    results = exporter.export(str(tmp_path), modes=('latest', 'daily', 'weekly'))
+
+    assert set(results['latest']) == {
+        'errors_csv', 'errors_md', 'errors_json', 'peaks_csv', 'peaks_md', 'peaks_json',
+    }
+    assert set(results['daily']) == {'errors_csv', 'errors_md', 'peaks_csv', 'peaks_md'}
+    summary = table_exporter.Path(results['weekly']['summary']).read_text(encoding='utf-8')
+    assert '- **Total problems:** 5' in summary
+
+    # daily/weekly stay once-per-period unless forced
+    again = TableExporter(_registry()).export(str(tmp_path), modes=('daily', 'weekly'))
+    assert again == {'daily': {}, 'weekly': {}}
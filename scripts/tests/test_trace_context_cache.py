@@ -0,0 +1,145 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from scripts.core.trace_context_cache import TraceContextCache
+
+T0 = datetime(2026, 7, 31, 8, 0, tzinfo=timezone.utc)
+
+
+def _iso(ts):
+    return ts.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class FakeTraceStore:
+    """fetch_trace_context nad in-memory eventy; zaznamenává dotazy."""
+
+    def __init__(self, events, fail=False):
+        self.events = events
+        self.fail = fail
+        self.calls = []
+
+    def __call__(self, trace_ids, date_from, date_to):
+        self.calls.append((sorted(trace_ids), date_from, date_to))
+        if self.fail:
+            return None
+        out = {}
+        for event in self.events:
+            if event['trace_id'] in trace_ids and date_from <= event['timestamp'] < date_to:
+                out.setdefault(event['trace_id'], []).append(event)
+        return out
+
+
+def _events():
+    return [
+        {'trace_id': trace_id, 'timestamp': _iso(T0 + timedelta(minutes=minute)), 'level': 'WARN'}
+        for trace_id in ('trace-a', 'trace-b')
+        for minute in range(0, 45, 5)
+    ]
+
+
+def test_next_window_fetches_only_uncovered_delta(tmp_path):
+    store = FakeTraceStore(_events())
+    cache = TraceContextCache(str(tmp_path / 'cache.sqlite'))
+
+    first = cache.fetch(store, ['trace-a', 'trace-b'], _iso(T0), _iso(T0 + timedelta(minutes=15)))
+    second = cache.fetch(store, ['trace-a', 'trace-b'], _iso(T0), _iso(T0 + timedelta(minutes=30)))
+
+    assert [len(first[t]) for t in ('trace-a', 'trace-b')] == [3, 3]
+    assert second == FakeTraceStore(_events())(['trace-a', 'trace-b'], _iso(T0), _iso(T0 + timedelta(minutes=30)))
+    assert store.calls[1] == (
+        ['trace-a', 'trace-b'], _iso(T0 + timedelta(minutes=15)), _iso(T0 + timedelta(minutes=30)),
+    )
+    assert cache.stats['misses'] == 2 and cache.stats['partial_hits'] == 2
+    cache.close()
+
+    reopened = TraceContextCache(str(tmp_path / 'cache.sqlite'))
+    covered = reopened.fetch(store, ['trace-a'], _iso(T0 + timedelta(minutes=10)), _iso(T0 + timedelta(minutes=20)))
+    assert [event['timestamp'] for event in covered['trace-a']] == [
+        _iso(T0 + timedelta(minutes=10)), _iso(T0 + timedelta(minutes=15)),
+    ]
+    assert len(store.calls) == 2
+    assert reopened.stats['hits'] == 1 and reopened.stats['bytes_saved'] > 0
+    reopened.close()
+
+
+def test_failed_fetch_is_not_recorded_as_covered(tmp_path):
+    store = FakeTraceStore(_events(), fail=True)
+    cache = TraceContextCache(str(tmp_path / 'cache.sqlite'))
+
+    assert cache.fetch(store, ['trace-a'], _iso(T0), _iso(T0 + timedelta(minutes=15))) == {}
+    store.fail = False
+    result = cache.fetch(store, ['trace-a'], _iso(T0), _iso(T0 + timedelta(minutes=15)))
+
+    assert len(result['trace-a']) == 3
+    assert cache.stats['misses'] == 2
+    cache.close()
+
+
+def test_coverage_stops_before_unsettled_edge(tmp_path):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    events = [{'trace_id': 'trace-a', 'timestamp': _iso(now - timedelta(minutes=10)), 'level': 'INFO'}]
+    store = FakeTraceStore(events)
+    cache = TraceContextCache(str(tmp_path / 'cache.sqlite'), settle_seconds=300)
+
+    cache.fetch(store, ['trace-a'], _iso(now - timedelta(minutes=15)), _iso(now))
+    # Pozdě zaindexovaný event na okraji okna se při dalším dotazu dotáhne
+    store.events.append({'trace_id': 'trace-a', 'timestamp': _iso(now - timedelta(minutes=2)), 'level': 'ERROR'})
+    result = cache.fetch(store, ['trace-a'], _iso(now - timedelta(minutes=15)), _iso(now))
+
+    assert [event['level'] for event in result['trace-a']] == ['INFO', 'ERROR']
+    assert cache.stats['partial_hits'] == 1
+    cache.close()
+
+
+def test_coverage_is_capped_at_pit_snapshot(tmp_path):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    window_end = now - timedelta(minutes=10)
+    pit_opened_at = window_end + timedelta(seconds=30)
+    events = [{'trace_id': 'trace-a', 'timestamp': _iso(window_end - timedelta(minutes=5)), 'level': 'INFO'}]
+    pit_view = FakeTraceStore(list(events))
+    snapshot = {'at': pit_opened_at.timestamp()}
+    cache = TraceContextCache(
+        str(tmp_path / 'cache.sqlite'), settle_seconds=120, snapshot_at_fn=lambda: snapshot['at'],
+    )
+
+    # Pipeline běžela 10 minut po otevření PIT; event před koncem okna se
+    # zaindexoval až po otevření PIT → ve snapshotu chybí
+    cache.fetch(pit_view, ['trace-a'], _iso(window_end - timedelta(minutes=15)), _iso(window_end))
+    live = FakeTraceStore(events + [
+        {'trace_id': 'trace-a', 'timestamp': _iso(window_end - timedelta(seconds=20)), 'level': 'ERROR'},
+    ])
+    snapshot['at'] = None
+    result = cache.fetch(live, ['trace-a'], _iso(window_end - timedelta(minutes=15)), _iso(now))
+
+    assert [event['level'] for event in result['trace-a']] == ['INFO', 'ERROR']
+    assert live.calls == [(['trace-a'], _iso(pit_opened_at - timedelta(seconds=120)), _iso(now))]
+    cache.close()
+
+
+def test_eviction_by_age_and_size(tmp_path):
+    store = FakeTraceStore(_events())
+    cache = TraceContextCache(str(tmp_path / 'cache.sqlite'), max_age_hours=1)
+    cache.fetch(store, ['trace-a'], _iso(T0), _iso(T0 + timedelta(minutes=15)))
+    cache.fetch(store, ['trace-b'], _iso(T0), _iso(T0 + timedelta(minutes=15)))
+
+    cache.max_bytes = 1
+    assert cache.evict() == 2
+
+    cache.max_bytes = 10 ** 6
+    cache.fetch(store, ['trace-a'], _iso(T0), _iso(T0 + timedelta(minutes=15)))
+    assert cache.evict(now=time.time() + 2 * 3600) == 1
+    assert cache.stats['evicted'] == 3
+    cache.close()
+
+
+def test_truncated_traces_are_not_recorded_as_covered(tmp_path):
+    store = FakeTraceStore(_events())
+    cache = TraceContextCache(str(tmp_path / 'cache.sqlite'), truncated_ids_fn=lambda: ['trace-a'])
+    window = (_iso(T0), _iso(T0 + timedelta(minutes=15)))
+
+    cache.fetch(store, ['trace-a', 'trace-b'], *window)
+    cache.fetch(store, ['trace-a', 'trace-b'], *window)
+
+    assert store.calls[1] == (['trace-a'], *window)
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 3
+    cache.close()
@@ -0,0 +1,115 @@
+import importlib
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from scripts.bench.mock_es import MockElasticsearch
+
+SCRIPTS = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if SCRIPTS not in sys.path:
+    sys.path.insert(0, SCRIPTS)
+
+from analysis.trace_timeline import enrich_patterns_with_trace_context  # noqa: E402
+from core import es_client  # noqa: E402
+
+fetch_module = importlib.import_module('core.fetch_unlimited')
+
+DATE_FROM = '2026-07-31T08:00:00Z'
+DATE_TO = '2026-07-31T08:15:00Z'
+
+
+def _doc(trace_id, second, level='INFO', app='orders'):
+    return {
+        '@timestamp': f'2026-07-31T08:{second // 60:02d}:{second % 60:02d}Z',
+        'level': level,
+        'message': f'{trace_id} step {second}',
+        'traceId': trace_id,
+        'application': {'name': app},
+        'kubernetes': {'namespace': 'ns-a'},
+    }
+
+
+def _fixture():
+    # trace-chatty má 500 eventů, ostatní po 3
+    docs = [_doc('trace-chatty', second) for second in range(500)]
+    for index in range(24):
+        docs += [_doc(f'trace-{index}', second) for second in (10, 20, 30)]
+    return sorted(docs, key=lambda doc: doc['@timestamp'])
+
+
+def _run(mock_es, fn, *args, **kwargs):
+    es_client.close_session()
+    with patch.object(fetch_module, 'BASE_URL', mock_es.base_url), \
+            patch.object(fetch_module, 'ES_PASSWORD', 'secret'), \
+            patch.object(fetch_module, '_load_monitored_namespaces', return_value=['ns-a']):
+        result = fn(*args, **kwargs)
+        if not isinstance(result, dict) and result is not None:
+            result = list(result)
+    es_client.close_session()
+    return result
+
+
+def test_chatty_trace_is_capped_without_starving_others():
+    ids = ['trace-chatty'] + [f'trace-{index}' for index in range(24)]
+    with MockElasticsearch(_fixture()) as mock_es:
+        context = _run(
+            mock_es, fetch_module.fetch_trace_context, ids, DATE_FROM, DATE_TO,
+            max_events=3000, batch_size=10, workers=3,
+        )
+
+    assert mock_es.search_requests == 3
+    assert set(context) == set(ids)
+    assert len(context['trace-chatty']) == 100
+    assert all(len(context[f'trace-{index}']) == 3 for index in range(24))
+    stats = fetch_module.LAST_TRACE_CONTEXT_STATS
+    assert stats['truncated_ids'] == ['trace-chatty']
+    assert stats['batches'] == 3 and stats['per_trace_cap'] == 100
+
+
+def test_total_budget_is_split_per_trace():
+    ids = ['trace-chatty', 'trace-0']
+    with MockElasticsearch(_fixture()) as mock_es:
+        context = _run(mock_es, fetch_module.fetch_trace_context, ids, DATE_FROM, DATE_TO, max_events=40)
+
+    assert len(context['trace-chatty']) == 20
+    assert [event['timestamp'] for event in context['trace-chatty']][:2] == [
+        '2026-07-31T08:00:00Z', '2026-07-31T08:00:01Z',
+    ]
+
+
+def test_failed_batch_makes_dict_result_none_but_stream_keeps_good_batches():
+    ids = [f'trace-{index}' for index in range(6)]
+    real_search = fetch_module._search_trace_batch
+
+    def flaky(session, query, retry):
+        if 'trace-0' in query['query']['bool']['must'][1]['terms']['traceId']:
+            return None
+        return real_search(session, query, retry)
+
+    with MockElasticsearch(_fixture()) as mock_es, \
+            patch.object(fetch_module, '_search_trace_batch', flaky):
+        assert _run(mock_es, fetch_module.fetch_trace_context, ids, DATE_FROM, DATE_TO, batch_size=3) is None
+        streamed = _run(mock_es, fetch_module.iter_trace_context, ids, DATE_FROM, DATE_TO, batch_size=3)
+
+    assert sorted(trace_id for trace_id, _ in streamed) == ['trace-3', 'trace-4', 'trace-5']
+    assert fetch_module.LAST_TRACE_CONTEXT_STATS['failed_batches'] == 1
+
+
+def test_enrichment_consumes_streamed_batches():
+    timeline = SimpleNamespace(trace_id='trace-1', events=[])
+    pattern = SimpleNamespace(representative=timeline, propagation_path=[], root_cause=None, outcome=None)
+
+    def stream(trace_ids, date_from, date_to):
+        assert trace_ids == ['trace-1']
+        yield 'trace-1', [
+            {'timestamp': '2026-07-31T08:00:01Z', 'application': 'gateway', 'level': 'WARN',
+             'message': 'upstream slow'},
+            {'timestamp': '2026-07-31T08:00:02Z', 'application': 'orders', 'level': 'ERROR',
+             'message': 'timeout calling payments'},
+        ]
+
+    enrich_patterns_with_trace_context([pattern], stream, DATE_FROM, DATE_TO)
+
+    assert [event.level for event in pattern.representative.events] == ['WARN', 'ERROR']
+    assert pattern.propagation_path
@@ -0,0 +1,76 @@
+import random
+from collections import Counter
+
+from scripts.bench import aggregator_memory_bench as bench
+from scripts.core.streaming_aggregator import StreamingAggregator
+from scripts.core.trace_sketches import BoundedTraceCounter, HyperLogLog, SpaceSaving
+
+
+def _zipf_stream(events, distinct, seed=7):
+    rnd = random.Random(seed)
+    weights = [1.0 / (rank + 1) ** 1.2 for rank in range(distinct)]
+    return [f"trace-{index:06d}" for index in rnd.choices(range(distinct), weights=weights, k=events)]
+
+
+def test_space_saving_error_bounds_and_heavy_hitters():
+    stream = _zipf_stream(20000, 5000)
+    exact = Counter(stream)
+    sketch = SpaceSaving(100)
+    for item in stream:
+        sketch.add(item)
+
+    bound = len(stream) / sketch.capacity
+    assert len(sketch.counts) == 100 and sketch.max_error <= bound
+    for item, estimate in sketch.counts.items():
+        assert exact[item] <= estimate <= exact[item] + sketch.errors.get(item, 0)
+    # každý trace se skutečným počtem > N/K je monitorovaný
+    assert {item for item, count in exact.items() if count > bound} <= set(sketch.counts)
+    assert [item for item, _ in sketch.most_common(5)] == [item for item, _ in exact.most_common(5)]
+
+
+def test_hyperloglog_within_documented_error():
+    hll = HyperLogLog(12)
+    for index in range(50000):
+        hll.add(f"trace-{index}")
+        hll.add(f"trace-{index}")
+
+    assert abs(hll.count() - 50000) / 50000 <= 3 * hll.relative_error
+    small = HyperLogLog(12)
+    for index in range(300):
+        small.add(index)
+    assert abs(small.count() - 300) <= 5
+
+
+def test_bounded_counter_is_exact_until_capacity_then_estimates_distinct():
+    counter = BoundedTraceCounter(capacity=50)
+    for trace_id in ['a', 'b', 'a', 'c']:
+        counter.add(trace_id)
+    assert dict(counter) == {'a': 2, 'b': 1, 'c': 1}
+    assert counter.most_common(1) == [('a', 2)] and not counter.truncated
+    assert counter.distinct_count() == 3
+
+    for index in range(2000):
+        counter.add(f"trace-{index}")
+    assert counter.truncated and len(counter) == 50
+    assert abs(counter.distinct_count() - 2003) / 2003 <= 3 * counter.hll.relative_error
+
+
+def test_aggregator_bounded_mode_keeps_top_traces_of_exact_mode():
+    pages = list(bench.iter_record_pages(6000, fingerprints=5, trace_fanout=3, hours=1, page_size=1000))
+    exact = StreamingAggregator(parser=bench._PassthroughParser(), spill_details=False, trace_top_k=0)
+    bounded = StreamingAggregator(parser=bench._PassthroughParser(), spill_details=False, trace_top_k=64)
+    for page in pages:
+        exact.ingest_page(page)
+        bounded.ingest_page(page)
+
+    for fp, acc in exact.acc.items():
+        sketch = bounded.acc[fp].trace_counts
+        assert isinstance(acc.trace_counts, Counter)
+        assert len(sketch) <= 64
+        heavy = {trace for trace, count in acc.trace_counts.items() if count > sketch.top.total / 64}
+        assert heavy <= set(sketch)
+        if sketch.truncated:
+            distinct = len(acc.trace_counts)
+            assert abs(sketch.distinct_count() - distinct) / distinct <= 3 * sketch.hll.relative_error
+        else:
+            assert dict(sketch) == dict(acc.trace_counts)